@@ -32,6 +32,7 @@ from rdagent.app.qlib_rd_loop.model import main as fin_model
 from rdagent.app.qlib_rd_loop.quant import main as fin_quant
 from rdagent.app.utils.health_check import health_check
 from rdagent.app.utils.info import collect_info
+from rdagent.app.utils.pickle_cache import pickle_cache_prune, pickle_cache_stats
 from rdagent.log.mle_summary import grade_summary as grade_summary
 
 app = typer.Typer()
@@ -199,5 +200,15 @@ def collect_info_cli():
 app.command(name="ds_user_interact")(ds_user_interact)
 
 
+@app.command(name="pickle_cache_stats")
+def pickle_cache_stats_cli():
+    pickle_cache_stats()
+
+
+@app.command(name="pickle_cache_prune")
+def pickle_cache_prune_cli(size_limit: int, namespace: Optional[str] = None):
+    pickle_cache_prune(size_limit=size_limit, namespace=namespace)
+
+
 if __name__ == "__main__":
     app()
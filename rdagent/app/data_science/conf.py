@@ -58,6 +58,14 @@ class DataScienceBasePropSetting(KaggleBasePropSetting):
     ### notebook integration
     enable_notebook_conversion: bool = False
 
+    ### stage cache
+    enable_stage_cache: bool = False
+    """
+    Ship `stage_cache.py` in the workspace and ask the pipeline coder to checkpoint the stages of `main.py` with it,
+    so that a re-run only executes the stages whose code or inputs changed
+    (see `rdagent.scenarios.data_science.experiment.stage_cache`).
+    """
+
     #### enable specification
     spec_enabled: bool = True
 
@@ -71,6 +79,10 @@ class DataScienceBasePropSetting(KaggleBasePropSetting):
     runner_max_loop: int = 3
 
     sample_data_by_LLM: bool = True
+    sample_data_streaming: bool = False
+    """When the debug data is created by the default sampler, sample CSV/JSONL/Parquet files in one streaming pass"""
+    sample_data_n_jobs: int = 1
+    """The number of processes sampling files in parallel in the streaming mode"""
     use_raw_description: bool = False
     show_nan_columns: bool = False
 
@@ -108,6 +120,13 @@ class DataScienceBasePropSetting(KaggleBasePropSetting):
     enable_score_reward: bool = False
     """Enable using score-based reward for trace selection in multi-trace scheduling."""
 
+    exp_gen_batch_size: int = 1
+    """The max number of experiments proposed concurrently on distinct leaves when several coding slots are free.
+    The ones not used by the current loop are queued for the next loops (used in ParallelMultiTraceExpGen)."""
+
+    exp_gen_dedup_threshold: float = 0.9
+    """A concurrent proposal is dropped when its hypothesis is at least this similar to a queued or running one."""
+
     #### multi-trace:checkpoint selector
     selector_name: str = "rdagent.scenarios.data_science.proposal.exp_gen.select.expand.LatestCKPSelector"
     """The name of the selector to use"""
@@ -0,0 +1,37 @@
+"""
+Inspect and prune the storage of `cache_with_pickle` (see `rdagent.core.cache`).
+"""
+
+import time
+from typing import Optional
+
+from rdagent.core.cache import get_pickle_cache_backend
+from rdagent.log import rdagent_logger as logger
+
+
+def pickle_cache_stats():
+    """print the hit / miss counts and the size of every cached function"""
+    stats = get_pickle_cache_backend().stats()
+    if not stats:
+        logger.info("No statistics are recorded by the configured pickle cache backend.")
+        return
+    for s in stats:
+        lookups = s["hits"] + s["misses"]
+        hit_rate = s["hits"] / lookups if lookups else 0.0
+        last_access = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(s["last_access"])) if s["last_access"] else "-"
+        logger.info(
+            f"{s['namespace']}: {s['entries']} entries, {s['size'] / 2**20:.1f} MiB, "
+            f"hit rate {hit_rate:.1%} ({s['hits']}/{lookups}), "
+            f"read {s['bytes_read'] / 2**20:.1f} MiB, written {s['bytes_written'] / 2**20:.1f} MiB, "
+            f"last access {last_access}"
+        )
+
+
+def pickle_cache_prune(size_limit: int, namespace: Optional[str] = None):
+    """evict the least recently used results until the cache (or one namespace of it) fits in `size_limit` bytes"""
+    try:
+        n = get_pickle_cache_backend().prune(size_limit, namespace=namespace)
+    except NotImplementedError as e:
+        logger.warning(str(e))
+        return
+    logger.info(f"Evicted {n} cached results.")
@@ -22,6 +22,7 @@ from rdagent.components.coder.data_science.share.notebook import NotebookConvert
 from rdagent.components.coder.data_science.utils import remove_eda_part
 from rdagent.core.experiment import FBWorkspace, Task
 from rdagent.log import rdagent_logger as logger
+from rdagent.scenarios.data_science.experiment.experiment import DSFBWorkspace
 from rdagent.scenarios.data_science.test_eval import get_test_eval
 from rdagent.utils.agent.tpl import T
 from rdagent.utils.agent.workflow import build_cls_from_json_with_retry
@@ -164,6 +165,8 @@ class PipelineCoSTEEREvaluator(CoSTEEREvaluator):
                 env=env, entry=f"strace -e trace=file -f -o trace.log python -m coverage run main.py"
             )
         result_stdout = result.stdout
+        if isinstance(implementation, DSFBWorkspace):
+            implementation.log_stage_cache_report()
 
         nb_conversion_ret_code = 0
         nb_conversion_check_text = ""
@@ -0,0 +1,181 @@
+"""
+Cross-sectional correlation (IC / RankIC) of factor values.
+
+Factor values are indexed by (datetime, instrument); the IC of two factors is the correlation of their
+values across instruments on each date. Instead of `groupby("datetime").apply(...)` per pair of columns,
+the rows are sorted by date once and every statistic is a segment sum (`np.add.reduceat`) over the
+sorted group offsets, so all the pairs of all the dates are computed with a few array operations.
+"""
+
+from __future__ import annotations
+
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+BLOCK_SIZE = 1 << 22
+"""the maximum number of elements of the (rows, left columns, right columns) products computed at once"""
+
+
+def group_offsets(keys: pd.Index | np.ndarray) -> tuple[pd.Index, np.ndarray, np.ndarray]:
+    """
+    Sort the rows by their group key.
+
+    Returns
+    -------
+    tuple[pd.Index, np.ndarray, np.ndarray]
+        (the sorted unique keys, the order of the rows, the offset of each group in the sorted rows).
+        Rows with a missing key are dropped like `groupby` does.
+    """
+    codes, uniques = pd.factorize(keys, sort=True)
+    order = np.argsort(codes, kind="stable")
+    order = order[codes[order] >= 0]
+    sorted_codes = codes[order]
+    offsets = np.flatnonzero(np.diff(sorted_codes, prepend=-1))
+    return pd.Index(uniques[sorted_codes[offsets]]), order, offsets
+
+
+def _segment_sum(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    if len(offsets) == 0:
+        return np.zeros((0, *values.shape[1:]))
+    return np.add.reduceat(values, offsets, axis=0)
+
+
+def _segment_outer_sum(a: np.ndarray, b: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """sum of `outer(a[i], b[i])` over the rows of each group; shape (groups, a columns, b columns)"""
+    n, ka, kb = a.shape[0], a.shape[1], b.shape[1]
+    bounds = np.append(offsets, n)
+    out = np.empty((len(offsets), ka, kb))
+    rows_per_block = max(1, BLOCK_SIZE // (ka * kb))
+    g = 0
+    while g < len(offsets):
+        # a block is made of whole groups (at least one)
+        h = max(g + 1, int(np.searchsorted(bounds, bounds[g] + rows_per_block, side="right")) - 1)
+        start, end = bounds[g], bounds[h]
+        prod = np.einsum("ni,nj->nij", a[start:end], b[start:end]).reshape(end - start, ka * kb)
+        out[g:h] = np.add.reduceat(prod, offsets[g:h] - start, axis=0).reshape(h - g, ka, kb)
+        g = h
+    return out
+
+
+def rank_within_groups(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Rank each column within each group (rows sorted by group), averaging ties like `pd.Series.rank`.
+    Missing values stay missing and are not ranked.
+    """
+    n = values.shape[0]
+    codes = np.zeros(n, dtype=np.int64)
+    codes[offsets[1:]] = 1
+    codes = np.cumsum(codes)
+    ranks = np.full(values.shape, np.nan)
+    for j in range(values.shape[1]):
+        idx = np.flatnonzero(~np.isnan(values[:, j]))
+        v, c = values[idx, j], codes[idx]
+        order = np.argsort(v)
+        order = order[np.argsort(c[order], kind="stable")]  # faster than np.lexsort((v, c))
+        v, c = v[order], c[order]
+        m = len(order)
+        if m == 0:
+            continue
+        new_group = np.ones(m, dtype=bool)
+        new_group[1:] = c[1:] != c[:-1]
+        new_run = new_group.copy()
+        new_run[1:] |= v[1:] != v[:-1]
+        pos = np.arange(m)
+        group_start = np.maximum.accumulate(np.where(new_group, pos, 0))
+        run_start = np.flatnonzero(new_run)
+        run_end = np.append(run_start[1:], m) - 1
+        run_rank = (run_start + run_end) / 2 - group_start[run_start] + 1
+        col = np.empty(m)
+        col[order] = run_rank[np.cumsum(new_run) - 1]
+        ranks[idx, j] = col
+    return ranks
+
+
+def _pearson(x: np.ndarray, y: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    counts = np.diff(np.append(offsets, x.shape[0]))
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if mx.all() and my.all():
+            # standardize each column within each group, then the correlation is the sum of the products
+            x = x - np.repeat(_segment_sum(x, offsets) / counts[:, None], counts, axis=0)
+            y = y - np.repeat(_segment_sum(y, offsets) / counts[:, None], counts, axis=0)
+            x /= np.repeat(np.sqrt(_segment_sum(x * x, offsets)), counts, axis=0)
+            y /= np.repeat(np.sqrt(_segment_sum(y * y, offsets)), counts, axis=0)
+            corr = _segment_outer_sum(x, y, offsets)
+            corr[counts < 2] = np.nan
+            return corr
+
+        # pairwise complete observations, like `pd.Series.corr`
+        def _center(v: np.ndarray, m: np.ndarray) -> np.ndarray:
+            v = np.where(m, v, 0.0)
+            mean = _segment_sum(v, offsets) / _segment_sum(m.astype(float), offsets)
+            return np.where(m, v - np.repeat(np.nan_to_num(mean), counts, axis=0), 0.0)
+
+        x, y = _center(x, mx), _center(y, my)
+        mx, my = mx.astype(float), my.astype(float)
+        n = _segment_outer_sum(mx, my, offsets)
+        sx, sy = _segment_outer_sum(x, my, offsets), _segment_outer_sum(mx, y, offsets)
+        vx = _segment_outer_sum(x * x, my, offsets) - sx * sx / n
+        vy = _segment_outer_sum(mx, y * y, offsets) - sy * sy / n
+        corr = (_segment_outer_sum(x, y, offsets) - sx * sy / n) / np.sqrt(vx * vy)
+    corr[(n < 2) | (vx <= 0) | (vy <= 0)] = np.nan
+    return corr
+
+
+def cross_sectional_corr(
+    x: pd.DataFrame | pd.Series,
+    y: pd.DataFrame | pd.Series,
+    method: Literal["pearson", "spearman"] = "pearson",
+    level: str = "datetime",
+) -> tuple[pd.Index, np.ndarray]:
+    """
+    The correlation of every column of `x` with every column of `y` within each group of `level`.
+
+    Parameters
+    ----------
+    x, y : pd.DataFrame | pd.Series
+        Factor values sharing the index (they are aligned by an outer join otherwise).
+    method : "pearson" | "spearman"
+        "pearson" gives the IC and "spearman" gives the RankIC.
+        Pearson uses the pairwise complete observations of each pair like `pd.Series.corr`.
+        For Spearman, each column is ranked over its own non-missing values, which is the same as
+        `pd.Series.corr(method="spearman")` for a single pair (incomplete rows are dropped first) or
+        when the missing values of the columns are aligned.
+    level : str
+        The index level to group by.
+
+    Returns
+    -------
+    tuple[pd.Index, np.ndarray]
+        (the groups, the correlations with shape (groups, x columns, y columns));
+        NaN where a pair has fewer than 2 observations or no variance in a group.
+    """
+    x, y = x.to_frame() if isinstance(x, pd.Series) else x, y.to_frame() if isinstance(y, pd.Series) else y
+    if not x.index.equals(y.index):
+        x, y = x.align(y, join="outer", axis=0)
+    xv, yv = x.to_numpy(dtype=float), y.to_numpy(dtype=float)
+    keys = x.index.get_level_values(level)
+    if method == "spearman" and xv.shape[1] == 1 and yv.shape[1] == 1:
+        complete = ~(np.isnan(xv[:, 0]) | np.isnan(yv[:, 0]))
+        xv, yv, keys = xv[complete], yv[complete], keys[complete]
+
+    groups, order, offsets = group_offsets(keys)
+    xv, yv = xv[order], yv[order]
+    if method == "spearman":
+        xv, yv = rank_within_groups(xv, offsets), rank_within_groups(yv, offsets)
+    elif method != "pearson":
+        raise ValueError(f"Unsupported correlation method: {method}")
+    return groups, _pearson(xv, yv, offsets)
+
+
+def calc_ic(
+    x: pd.Series, y: pd.Series, method: Literal["pearson", "spearman"] = "pearson", level: str = "datetime"
+) -> pd.Series:
+    """
+    The daily IC (or RankIC with method="spearman") of two factors, equal to
+    `pd.concat([x, y], axis=1).groupby(level).apply(lambda df: df.iloc[:, 0].corr(df.iloc[:, 1], method=method))`
+    """
+    groups, corr = cross_sectional_corr(x, y, method=method, level=level)
+    return pd.Series(corr[:, 0, 0], index=groups.rename(level))
@@ -6,6 +6,7 @@ from typing import Dict, Tuple
 import pandas as pd
 
 from rdagent.components.coder.factor_coder.config import FACTOR_COSTEER_SETTINGS
+from rdagent.components.coder.factor_coder.correlation import calc_ic
 from rdagent.components.coder.factor_coder.factor import FactorTask
 from rdagent.core.experiment import Task, Workspace
 from rdagent.oai.llm_conf import LLM_SETTINGS
@@ -363,13 +364,8 @@ class FactorCorrelationEvaluator(FactorEvaluator):
             )
         concat_df = pd.concat([gen_df, gt_df], axis=1)
         concat_df.columns = ["source", "gt"]
-        ic = concat_df.groupby("datetime").apply(lambda df: df["source"].corr(df["gt"])).dropna().mean()
-        ric = (
-            concat_df.groupby("datetime")
-            .apply(lambda df: df["source"].corr(df["gt"], method="spearman"))
-            .dropna()
-            .mean()
-        )
+        ic = calc_ic(concat_df["source"], concat_df["gt"]).dropna().mean()
+        ric = calc_ic(concat_df["source"], concat_df["gt"], method="spearman").dropna().mean()
 
         if self.hard_check:
             if ic > 0.99 and ric > 0.99:
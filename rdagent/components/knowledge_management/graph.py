@@ -8,7 +8,7 @@ from typing import Any, NoReturn
 
 from rdagent.components.knowledge_management.vector_base import (
     KnowledgeMetaData,
-    PDVectorBase,
+    MatrixVectorBase,
     VectorBase,
     cosine,
 )
@@ -111,7 +111,7 @@ class UndirectedGraph(Graph):
     """
 
     def __init__(self, path: str | Path | None = None) -> None:
-        self.vector_base: VectorBase = PDVectorBase()
+        self.vector_base: VectorBase = MatrixVectorBase()
         super().__init__(path=path)
 
     def __str__(self) -> str:
@@ -311,9 +311,48 @@ class UndirectedGraph(Graph):
         )
         return [self.get_node(doc.id) for doc in docs]
 
+    def batch_semantic_search(
+        self,
+        nodes: list[UndirectedNode | str],
+        similarity_threshold: float = 0.0,
+        topk_k: int = None,
+        constraint_labels: list[str] | None = None,
+    ) -> list[list[UndirectedNode]]:
+        """
+        Semantic search for a batch of nodes, see `semantic_search` for the meaning of the parameters.
+
+        When the vector base supports it, all the queries are embedded with one `create_embedding` call and
+        scored against the node matrix in one pass; otherwise the queries are searched one by one.
+
+        Returns
+        -------
+        list[list[UndirectedNode]]
+            The result of `semantic_search` for each node, in the same order as `nodes`.
+        """
+        contents = [node if isinstance(node, str) else node.content for node in nodes]
+        if isinstance(self.vector_base, MatrixVectorBase):
+            results = self.vector_base.batch_search(
+                contents,
+                topk_k=topk_k,
+                similarity_threshold=similarity_threshold,
+                constraint_labels=constraint_labels,
+            )
+        else:
+            # e.g. graphs dumped with the former PDVectorBase
+            results = [
+                self.vector_base.search(
+                    content=content,
+                    topk_k=topk_k,
+                    similarity_threshold=similarity_threshold,
+                    constraint_labels=constraint_labels,
+                )
+                for content in contents
+            ]
+        return [[self.get_node(doc.id) for doc in docs] for docs, _ in results]
+
     def clear(self) -> None:
         self.nodes.clear()
-        self.vector_base: VectorBase = PDVectorBase()
+        self.vector_base: VectorBase = MatrixVectorBase()
 
     def query_by_node(
         self,
@@ -397,14 +436,15 @@ class UndirectedGraph(Graph):
         if isinstance(content, str):
             content = [content]
 
-        res_list = []
-        for query in content:
-            similar_nodes = self.semantic_search(
-                content=query,
-                topk_k=topk_k,
-                similarity_threshold=similarity_threshold,
-            )
+        # all the queries are embedded and scored in one batch, the graph expansion is done per query
+        similar_nodes_list = self.batch_semantic_search(
+            nodes=content,
+            topk_k=topk_k,
+            similarity_threshold=similarity_threshold,
+        )
 
+        res_list = []
+        for similar_nodes in similar_nodes_list:
             connected_nodes = []
             for node in similar_nodes:
                 graph_query_node_res = self.query_by_node(
@@ -2,6 +2,7 @@ import uuid
 from pathlib import Path
 from typing import List, Tuple, Union
 
+import numpy as np
 import pandas as pd
 from scipy.spatial.distance import cosine
 
@@ -115,6 +116,9 @@ class PDVectorBase(VectorBase):
     def shape(self):
         return self.vector_df.shape
 
+    def __len__(self) -> int:
+        return self.vector_df.shape[0]
+
     def add(self, document: Union[Document, List[Document]]):
         """
         add new node to vector_df
@@ -206,3 +210,178 @@ class PDVectorBase(VectorBase):
             docs.append(Document().from_dict(similar_docs.to_dict()))
 
         return docs, searched_similarities.to_list()
+
+
+class MatrixVectorBase(VectorBase):
+    """
+    Implement of VectorBase using a contiguous NumPy matrix.
+
+    Embeddings are L2-normalized and kept as float32 rows of a pre-allocated matrix that grows geometrically,
+    so the cosine similarity against all rows is a single matrix-vector product and `add` is amortized O(1).
+    A label-to-rows index serves `constraint_labels` without scanning the metadata.
+    """
+
+    # upper bound of the number of scores materialized at once when searching a batch of queries
+    max_score_block_size: int = 1 << 24
+
+    def __init__(self, path: Union[str, Path] = None, initial_capacity: int = 1024):
+        self.initial_capacity = initial_capacity
+        self.matrix: np.ndarray | None = None  # (capacity, dim); only the first `size` rows are valid
+        self.size = 0
+        self.rows: list[dict] = []  # metadata of each row: id, label, content, trunk and the raw embedding
+        self.label_to_rows: dict[str | None, list[int]] = {}
+        super().__init__(path)
+
+    def __getstate__(self) -> dict:
+        # drop the unused capacity when pickling
+        state = self.__dict__.copy()
+        if self.matrix is not None:
+            state["matrix"] = self.matrix[: self.size].copy()
+        return state
+
+    def __len__(self) -> int:
+        return self.size
+
+    def shape(self) -> tuple[int, int]:
+        return self.size, 0 if self.matrix is None else self.matrix.shape[1]
+
+    @staticmethod
+    def _normalize(embeddings: list | np.ndarray) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+    def _append(self, records: list[dict]) -> None:
+        if not records:
+            return
+        vectors = self._normalize([record["embedding"] for record in records])
+        if self.matrix is None:
+            self.matrix = np.empty((max(self.initial_capacity, len(records)), vectors.shape[1]), dtype=np.float32)
+        elif vectors.shape[1] != self.matrix.shape[1]:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match {self.matrix.shape[1]}.")
+
+        new_size = self.size + len(records)
+        if new_size > self.matrix.shape[0]:
+            grown = np.empty((max(new_size, 2 * self.matrix.shape[0]), self.matrix.shape[1]), dtype=np.float32)
+            grown[: self.size] = self.matrix[: self.size]
+            self.matrix = grown
+        self.matrix[self.size : new_size] = vectors
+
+        for row, record in enumerate(records, start=self.size):
+            self.rows.append(record)
+            self.label_to_rows.setdefault(record["label"], []).append(row)
+        self.size = new_size
+
+    def add(self, document: Union[Document, List[Document]]):
+        """
+        add new node (and its trunks) to the matrix
+        Parameters
+        ----------
+        document
+
+        Returns
+        -------
+
+        """
+        documents = [document] if isinstance(document, Document) else document
+        records = []
+        for doc in documents:
+            if doc.embedding is None:
+                doc.create_embedding()
+            meta = {"id": doc.id, "label": doc.label, "content": doc.content}
+            records.append({**meta, "trunk": doc.content, "embedding": doc.embedding})
+            records.extend(
+                {**meta, "trunk": trunk, "embedding": embedding}
+                for trunk, embedding in zip(doc.trunks, doc.trunks_embedding)
+            )
+        self._append(records)
+
+    def search_by_embeddings(
+        self,
+        embeddings: list,
+        topk_k: int | None = None,
+        similarity_threshold: float = 0,
+        constraint_labels: list[str] | None = None,
+    ) -> List[Tuple[List[Document], List[float]]]:
+        """
+        Search a batch of query embeddings at once.
+
+        Returns
+        -------
+        List[Tuple[List[Document], List[float]]]
+            For each query, the documents and their similarity scores sorted by similarity score in
+            descending order. All documents meet the `similarity_threshold` and `constraint_labels` criteria.
+        """
+        if len(embeddings) == 0:
+            return []
+        if self.size == 0:
+            return [([], []) for _ in embeddings]
+
+        if constraint_labels is None:
+            candidates = None
+            matrix = self.matrix[: self.size]
+        else:
+            candidates = np.array(
+                sorted(row for label in set(constraint_labels) for row in self.label_to_rows.get(label, [])),
+                dtype=np.int64,
+            )
+            if candidates.size == 0:
+                return [([], []) for _ in embeddings]
+            matrix = self.matrix[candidates]
+
+        queries = self._normalize(embeddings)
+        block = max(1, self.max_score_block_size // matrix.shape[0])
+        results = []
+        for start in range(0, queries.shape[0], block):
+            scores_block = queries[start : start + block] @ matrix.T
+            for scores in scores_block:
+                if topk_k is not None and topk_k < scores.shape[0]:
+                    idx = np.argpartition(scores, -topk_k)[-topk_k:]
+                else:
+                    idx = np.arange(scores.shape[0])
+                idx = idx[scores[idx] > similarity_threshold]
+                idx = idx[np.argsort(-scores[idx], kind="stable")]
+                rows = idx if candidates is None else candidates[idx]
+                docs = [Document().from_dict(self.rows[row]) for row in rows]
+                results.append((docs, scores[idx].astype(float).tolist()))
+        return results
+
+    def batch_search(
+        self,
+        contents: List[str],
+        topk_k: int | None = None,
+        similarity_threshold: float = 0,
+        constraint_labels: list[str] | None = None,
+    ) -> List[Tuple[List[Document], List[float]]]:
+        """
+        Search a batch of contents with a single embedding call and a single matrix product.
+        """
+        if not contents or self.size == 0:
+            return [([], []) for _ in contents]
+        embeddings = APIBackend().create_embedding(input_content=list(contents))
+        return self.search_by_embeddings(
+            embeddings,
+            topk_k=topk_k,
+            similarity_threshold=similarity_threshold,
+            constraint_labels=constraint_labels,
+        )
+
+    def search(
+        self,
+        content: str,
+        topk_k: int | None = None,
+        similarity_threshold: float = 0,
+        constraint_labels: list[str] | None = None,
+    ) -> Tuple[List[Document], List]:
+        """
+        Search vector by node's embedding.
+        Same as `PDVectorBase.search`, but the results are always sorted by similarity score.
+        """
+        return self.batch_search(
+            [content],
+            topk_k=topk_k,
+            similarity_threshold=similarity_threshold,
+            constraint_labels=constraint_labels,
+        )[0]
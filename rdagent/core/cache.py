@@ -0,0 +1,279 @@
+"""
+Storage backends of `rdagent.core.utils.cache_with_pickle`.
+
+The backend is selected by `RD_AGENT_SETTINGS.pickle_cache_backend` (a class path), so applications can plug
+in their own storage. Each decorated function gets its own namespace (`<module>.<function name>`).
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import importlib
+import os
+import pickle
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+
+
+class PickleCacheBackend(ABC):
+    """
+    The interface of a `cache_with_pickle` storage.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> tuple[bool, Any]:
+        """
+        Returns
+        -------
+        tuple[bool, Any]
+            (whether the key is hit, the cached value)
+        """
+
+    @abstractmethod
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        """Store the value of the key"""
+
+    @abstractmethod
+    def lock_path(self, namespace: str, key: str) -> Path:
+        """The file lock which avoids computing the same key concurrently"""
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Usage statistics of each namespace; backends without an index report nothing."""
+        return []
+
+    def prune(self, size_limit: int, namespace: str | None = None) -> int:
+        """Evict entries until the cache fits in `size_limit` bytes; return the number of evicted entries."""
+        raise NotImplementedError(f"{self.__class__.__name__} does not support pruning.")
+
+
+class FlatPickleCacheBackend(PickleCacheBackend):
+    """
+    The original layout: `<root>/<namespace>/<key>.pkl`, without index.
+
+    The mtime of an entry is used as its last access time, so `prune` evicts the least recently used entries.
+    """
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.root / namespace / f"{key}.pkl"
+
+    def get(self, namespace: str, key: str) -> tuple[bool, Any]:
+        path = self._path(namespace, key)
+        try:
+            with path.open("rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return False, None
+        return True, value
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            pickle.dump(value, f)
+
+    def lock_path(self, namespace: str, key: str) -> Path:
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_suffix(".lock")
+
+    def prune(self, size_limit: int, namespace: str | None = None) -> int:
+        entries = []  # (last access, size, path)
+        for path in self.root.glob(f"{namespace if namespace is not None else '*'}/*.pkl"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= size_limit:
+                break
+            path.unlink(missing_ok=True)
+            evicted += 1
+            total -= size
+        return evicted
+
+
+class ShardedPickleCacheBackend(PickleCacheBackend):
+    """
+    `<root>/<namespace>/<2 hex of md5(key)>/<key>.pkl[.gz]` with an sqlite index at `<root>/index.db`.
+
+    - The index records the size, the creation time, the last access time and the hit count of every entry,
+      and the hits / misses / bytes read / bytes written of every namespace.
+    - When `size_limit` > 0, the least recently used entries are evicted after a write until the cache fits.
+    - When `compress` is True, new entries are written with gzip; both formats are readable.
+    - Entries of the flat layout are moved into their shard on first access, so existing caches keep working.
+    """
+
+    SUFFIXES = (".pkl", ".pkl.gz")
+
+    def __init__(self, root: str | Path, compress: bool = False, size_limit: int = 0) -> None:
+        super().__init__(root)
+        self.compress = compress
+        self.size_limit = size_limit
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+    # index
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():  # never share a connection with a forked parent
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.root / "index.db", timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key TEXT, file TEXT, size INTEGER, "
+                "created REAL, last_access REAL, hits INTEGER, PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats (namespace TEXT PRIMARY KEY, hits INTEGER, misses INTEGER, "
+                "bytes_read INTEGER, bytes_written INTEGER)"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _count(
+        self, namespace: str, hits: int = 0, misses: int = 0, bytes_read: int = 0, bytes_written: int = 0
+    ) -> None:
+        self.conn.execute(
+            "INSERT INTO stats VALUES (?, ?, ?, ?, ?) ON CONFLICT(namespace) DO UPDATE SET "
+            "hits = hits + excluded.hits, misses = misses + excluded.misses, "
+            "bytes_read = bytes_read + excluded.bytes_read, bytes_written = bytes_written + excluded.bytes_written",
+            (namespace, hits, misses, bytes_read, bytes_written),
+        )
+
+    # layout
+    def _shard(self, namespace: str, key: str) -> Path:
+        return self.root / namespace / hashlib.md5(key.encode()).hexdigest()[:2]  # noqa: S324
+
+    def _find(self, namespace: str, key: str) -> Path | None:
+        shard = self._shard(namespace, key)
+        for suffix in self.SUFFIXES:
+            if (path := shard / f"{key}{suffix}").exists():
+                return path
+        legacy = self.root / namespace / f"{key}.pkl"
+        if legacy.exists():
+            shard.mkdir(parents=True, exist_ok=True)
+            try:
+                os.replace(legacy, shard / legacy.name)
+            except FileNotFoundError:  # moved by another process
+                pass
+            return self._find(namespace, key)
+        return None
+
+    def get(self, namespace: str, key: str) -> tuple[bool, Any]:
+        path = self._find(namespace, key)
+        if path is None:
+            self._count(namespace, misses=1)
+            return False, None
+        try:
+            with gzip.open(path, "rb") if path.suffix == ".gz" else path.open("rb") as f:
+                value = pickle.load(f)
+            size = path.stat().st_size
+        except FileNotFoundError:  # evicted concurrently
+            self._count(namespace, misses=1)
+            return False, None
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, 0) ON CONFLICT(namespace, key) DO NOTHING",
+                (namespace, key, str(path.relative_to(self.root)), size, now, now),
+            )
+            self.conn.execute(
+                "UPDATE entries SET last_access = ?, hits = hits + 1 WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+            self._count(namespace, hits=1, bytes_read=size)
+        return True, value
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        shard = self._shard(namespace, key)
+        shard.mkdir(parents=True, exist_ok=True)
+        path = shard / f"{key}{'.pkl.gz' if self.compress else '.pkl'}"
+        tmp = shard / f".{key}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(tmp, "wb", compresslevel=1) if self.compress else tmp.open("wb") as f:
+            pickle.dump(value, f)
+        os.replace(tmp, path)
+        for suffix in self.SUFFIXES:  # drop the copy in the other format
+            if (other := shard / f"{key}{suffix}") != path:
+                other.unlink(missing_ok=True)
+        size = path.stat().st_size
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (namespace, key, str(path.relative_to(self.root)), size, now, now),
+            )
+            self._count(namespace, bytes_written=size)
+        if self.size_limit > 0:
+            self.prune(self.size_limit)
+
+    def lock_path(self, namespace: str, key: str) -> Path:
+        shard = self._shard(namespace, key)
+        shard.mkdir(parents=True, exist_ok=True)
+        return shard / f"{key}.lock"
+
+    def stats(self) -> list[dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT s.namespace, s.hits, s.misses, s.bytes_read, s.bytes_written, "
+            "COALESCE(e.n, 0), COALESCE(e.size, 0), e.last_access FROM stats s LEFT JOIN "
+            "(SELECT namespace, COUNT(*) AS n, SUM(size) AS size, MAX(last_access) AS last_access "
+            "FROM entries GROUP BY namespace) e ON s.namespace = e.namespace ORDER BY s.namespace"
+        ).fetchall()
+        columns = ["namespace", "hits", "misses", "bytes_read", "bytes_written", "entries", "size", "last_access"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def prune(self, size_limit: int, namespace: str | None = None) -> int:
+        where, params = ("WHERE namespace = ?", (namespace,)) if namespace is not None else ("", ())
+        total = self.conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM entries {where}", params).fetchone()[0]
+        if total <= size_limit:
+            return 0
+        evicted = []
+        for ns, key, file, size in self.conn.execute(
+            f"SELECT namespace, key, file, size FROM entries {where} ORDER BY last_access", params
+        ).fetchall():
+            if total <= size_limit:
+                break
+            (self.root / file).unlink(missing_ok=True)
+            evicted.append((ns, key))
+            total -= size
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", evicted)
+        return len(evicted)
+
+
+_BACKENDS: dict[tuple, PickleCacheBackend] = {}
+
+
+def get_pickle_cache_backend() -> PickleCacheBackend:
+    """Return the (per process, per setting) backend configured in `RD_AGENT_SETTINGS`."""
+    conf = (
+        RD_AGENT_SETTINGS.pickle_cache_backend,
+        RD_AGENT_SETTINGS.pickle_cache_folder_path_str,
+        RD_AGENT_SETTINGS.pickle_cache_compress,
+        RD_AGENT_SETTINGS.pickle_cache_size_limit,
+    )
+    if conf not in _BACKENDS:
+        module_path, class_name = conf[0].rsplit(".", 1)
+        cls = getattr(importlib.import_module(module_path), class_name)
+        if issubclass(cls, ShardedPickleCacheBackend):
+            _BACKENDS[conf] = cls(conf[1], compress=conf[2], size_limit=conf[3])
+        else:
+            _BACKENDS[conf] = cls(conf[1])
+    return _BACKENDS[conf]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import cast
+from typing import Literal, cast
 
 from pydantic_settings import (
     BaseSettings,
@@ -62,8 +62,30 @@ class RDAgentSettings(ExtendedBaseSettings):
     0 (or any value <=0) means *no* size limit for files in workspace checkpoints
     """
 
+    # session checkpoint conf
+    session_incremental_checkpoint: bool = True
+    """
+    whether the session of a loop is dumped incrementally after each step: the large contents are appended
+    once to a log shared by the steps instead of being pickled into every step file
+    """
+    session_blob_min_size: int = 1024  # the minimal size of a str/bytes to be stored in the log
+    session_compact_interval: int = 50
+    """the number of dumps between two checks of compacting the log; 0 (or any value <=0) disables the check"""
+
     # multi processing conf
     multi_proc_n: int = 1
+    multi_proc_persistent_pool: bool = False
+    """
+    whether `multiprocessing_wrapper` reuses long-lived worker processes instead of creating a pool per call.
+    The workers are started lazily and keep the module state of the time they are started, so call
+    `rdagent.core.utils.shutdown_worker_pool` after changing global settings that the tasks rely on.
+    """
+    multi_proc_warmup_imports: list[str] = []
+    """the modules imported by each persistent worker when it starts, e.g. ["pandas", "rdagent.oai.llm_utils"]"""
+    multi_proc_start_method: Literal["fork", "spawn", "forkserver"] | None = None
+    """the start method of the persistent workers; None means the platform default"""
+    multi_proc_task_timeout: float | None = None
+    """the default timeout (in seconds) of each task of `multiprocessing_wrapper`; None means no timeout"""
 
     # pickle cache conf
     cache_with_pickle: bool = True  # whether to use pickle cache
@@ -74,11 +96,33 @@ class RDAgentSettings(ExtendedBaseSettings):
         True  # when calling the function with same parameters, whether to use file lock to avoid
         # executing the function multiple times
     )
+    pickle_cache_backend: str = "rdagent.core.cache.ShardedPickleCacheBackend"
+    """the class path of the storage of the pickle cache, e.g. rdagent.core.cache.FlatPickleCacheBackend"""
+    pickle_cache_compress: bool = False  # whether to gzip the newly cached results
+    pickle_cache_size_limit: int = 0
+    """
+    the size budget (in bytes) of the pickle cache, the least recently used results are evicted beyond it.
+    0 (or any value <=0) means *no* size limit
+    """
+
+    # `Env.cached_run` conf
+    env_cache_size_limit: int = 0
+    """
+    the size budget (in bytes) of the file contents kept by `Env.cached_run`;
+    0 (or any value <=0) means *no* size limit
+    """
 
     # misc
     """The limitation of context stdout"""
     stdout_context_len: int = 400
     stdout_line_len: int = 10000
+    stdout_filter_pattern_library: str = "./git_ignore_folder/stdout_filter_patterns.json"
+    """
+    the json file of the regex patterns suggested by the LLM to filter redundant stdout, shared by the runs;
+    the known patterns are applied before asking the LLM. An empty string disables the library.
+    """
+    stdout_filter_pattern_limit: int = 200
+    """the number of patterns kept in the library; the least recently used ones are dropped beyond it"""
 
     enable_mlflow: bool = False
 
@@ -104,6 +148,14 @@ class RDAgentSettings(ExtendedBaseSettings):
 
     # Template:
     app_tpl: str | None = None  # for application to override the default template, example: "app/fintune/tpl"
+    tpl_log_sample_rate: float = 1.0
+    """
+    The fraction of the template renderings logged with their context (tag `debug_tpl`); 0 disables the logging.
+    The UI reads some of these logs (e.g. to tell merge loops and to show the evaluated stdout), so lowering it
+    trades the details shown in the UI for less logging.
+    """
+    tpl_log_uris: list[str] = []
+    """The renderings of the templates whose uri contains one of these strings are always logged."""
 
 
 RD_AGENT_SETTINGS = RDAgentSettings()
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import copy
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING, Generic, TypeVar
 
@@ -138,6 +139,65 @@ ASpecificScen = TypeVar("ASpecificScen", bound=Scenario)
 ASpecificKB = TypeVar("ASpecificKB", bound=KnowledgeBase)
 
 
+class _DAGIndex:
+    """
+    The index of the DAG of a trace, grown with it: the children of the nodes, their depth, their nearest
+    SOTA ancestor (the nearest ancestor, or the node itself, with a positive decision), the leaves and the
+    index of the experiments by identity.
+
+    Only the nodes in both `dag_parent` and `hist` are indexed. The path of a node follows the first parent.
+    """
+
+    def __init__(self, dag_parent: list[tuple[int, ...]], hist: list) -> None:
+        self.dag_parent = dag_parent
+        self.hist = hist
+        self.size = 0
+        self.children: dict[int | None, list[int]] = {None: []}  # None -> the roots
+        self.depth: list[int] = []
+        self.sota_ancestor: list[int | None] = []
+        self.leaves: set[int] = set()
+        self.exp2idx: dict[int, int] = {}  # id(experiment) -> index
+        self.last_node: object = None
+
+    def is_valid(self, dag_parent: list[tuple[int, ...]], hist: list) -> bool:
+        """Whether the indexed lists are the ones of the trace and have only been appended to since"""
+        return (
+            self.dag_parent is dag_parent
+            and self.hist is hist
+            and self.size <= min(len(dag_parent), len(hist))
+            and (self.size == 0 or hist[self.size - 1] is self.last_node)
+        )
+
+    def copy(self, dag_parent: list[tuple[int, ...]], hist: list) -> _DAGIndex:
+        """A copy indexing `dag_parent` and `hist`, copies of the indexed lists"""
+        index = copy.copy(self)
+        index.dag_parent, index.hist = dag_parent, hist
+        index.children = {k: list(v) for k, v in self.children.items()}
+        index.depth, index.sota_ancestor = list(self.depth), list(self.sota_ancestor)
+        index.leaves, index.exp2idx = set(self.leaves), dict(self.exp2idx)
+        return index
+
+    def update(self) -> None:
+        for i in range(self.size, min(len(self.dag_parent), len(self.hist))):
+            parents = self.dag_parent[i]
+            parent = parents[0] if parents and 0 <= parents[0] < i else None
+            self.children.setdefault(i, [])
+            if parents == () or parents == (parent,):
+                self.children[parent].append(i)
+            self.depth.append(0 if parent is None else self.depth[parent] + 1)
+            node = self.hist[i]
+            if node is not None and getattr(node[1], "decision", False):
+                self.sota_ancestor.append(i)
+            else:
+                self.sota_ancestor.append(None if parent is None else self.sota_ancestor[parent])
+            self.leaves.add(i)
+            self.leaves.difference_update(parents)
+            if node is not None:
+                self.exp2idx.setdefault(id(node[0]), i)
+            self.size = i + 1
+            self.last_node = node
+
+
 class Trace(Generic[ASpecificScen, ASpecificKB]):
     NodeType = tuple[Experiment, ExperimentFeedback]  # Define NodeType as a new type representing the tuple
     NEW_ROOT: tuple = ()
@@ -175,6 +235,40 @@ class Trace(Generic[ASpecificScen, ASpecificKB]):
         # The next expending point of the selection. Set it as a state of the trace will make
         self.current_selection: tuple[int, ...] = self.SEL_LATEST_SOTA
 
+        self._dag_index: _DAGIndex | None = None
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_dag_index"] = None  # the identities of the experiments change when unpickled
+        return state
+
+    def snapshot(self) -> Trace:
+        """
+        A shallow copy with its own graph structure and index, which can be read from another thread while
+        this trace keeps being recorded.
+        """
+        trace = copy.copy(self)
+        trace.hist, trace.dag_parent = list(self.hist), list(self.dag_parent)
+        trace.idx2loop_id = dict(self.idx2loop_id)
+        index = getattr(self, "_dag_index", None)
+        if index is not None and index.is_valid(self.dag_parent, self.hist):
+            trace._dag_index = index.copy(trace.dag_parent, trace.hist)
+        else:
+            trace._dag_index = None
+        return trace
+
+    @property
+    def dag_index(self) -> _DAGIndex:
+        """
+        The index of the DAG serving the queries of the structure of the trace.
+        It is updated by `sync_dag_parent_and_hist` and rebuilt when `hist` or `dag_parent` are changed otherwise.
+        """
+        index = getattr(self, "_dag_index", None)  # traces pickled before the index have no `_dag_index`
+        if index is None or not index.is_valid(self.dag_parent, self.hist):
+            index = self._dag_index = _DAGIndex(self.dag_parent, self.hist)
+        index.update()
+        return index
+
     def get_sota_hypothesis_and_experiment(self) -> tuple[Hypothesis | None, Experiment | None]:
         """Access the last experiment result, sub-task, and the corresponding hypothesis."""
         # TODO: The return value does not align with the signature.
@@ -221,9 +315,14 @@ class Trace(Generic[ASpecificScen, ASpecificKB]):
             exps: list[Experiment] = exp
 
             # keep the order
-            exp_to_index: dict[Experiment, int] = {_exp: i for i, (_exp, _) in enumerate(self.hist)}
-            return [exp_to_index[_exp] for _exp in exps]
-        for i, (_exp, _) in enumerate(self.hist):
+            indices = [self.exp2idx(_exp) for _exp in exps]
+            if None in indices:
+                raise KeyError(exps[indices.index(None)])
+            return indices
+        i = self.dag_index.exp2idx.get(id(exp))
+        if i is not None and self.hist[i][0] is exp:
+            return i
+        for i, (_exp, _) in enumerate(self.hist):  # the experiment of a node replaced in place
             if _exp == exp:
                 return i
         return None
@@ -234,23 +333,46 @@ class Trace(Generic[ASpecificScen, ASpecificKB]):
             return [self.hist[_idx][0] for _idx in idxs]
         return self.hist[idx][0]
 
-    def is_parent(self, parent_idx: int, child_idx: int) -> bool:
-        ancestors = self.get_parents(child_idx)
-        return parent_idx in ancestors
+    def _parent(self, idx: int) -> int | None:
+        parent_tuple = self.dag_parent[idx]
+        return parent_tuple[0] if parent_tuple and 0 <= parent_tuple[0] < idx else None
+
+    def is_parent(self, parent_idx: int | None, child_idx: int) -> bool:
+        if parent_idx is None or self.is_selection_new_tree((child_idx,)):
+            return False
+        index = self.dag_index
+        if child_idx < 0:
+            child_idx += len(self.dag_parent)
+        if parent_idx < 0:
+            parent_idx += len(self.dag_parent)
+        if child_idx >= index.size or parent_idx >= index.size:
+            return parent_idx in self.get_parents(child_idx)
+        # climb from the child to the depth of the parent
+        curr: int | None = child_idx
+        for _ in range(index.depth[child_idx] - index.depth[parent_idx]):
+            curr = self._parent(curr)
+        return curr == parent_idx
 
     def get_parents(self, child_idx: int) -> list[int]:
+        """The path from the root to the node: [root, ..., parent, child_idx]"""
         if self.is_selection_new_tree((child_idx,)):
             return []
-
-        ancestors: list[int] = []
-        curr = child_idx
-        while True:
-            ancestors.insert(0, curr)
-            parent_tuple = self.dag_parent[curr]
-            if not parent_tuple or parent_tuple[0] == curr:
-                break
-            curr = parent_tuple[0]
-
+        if child_idx < 0:
+            child_idx += len(self.dag_parent)
+
+        index = self.dag_index
+        if child_idx >= index.size:  # the node being synced
+            ancestors = [child_idx]
+            while (parent := self._parent(ancestors[-1])) is not None:
+                ancestors.append(parent)
+            ancestors.reverse()
+            return ancestors
+
+        # the first parents of the indexed nodes below the root are valid
+        dag_parent = self.dag_parent
+        ancestors = [child_idx] * (index.depth[child_idx] + 1)
+        for pos in range(len(ancestors) - 2, -1, -1):
+            ancestors[pos] = dag_parent[ancestors[pos + 1]][0]
         return ancestors
 
     def sync_dag_parent_and_hist(
@@ -282,18 +404,21 @@ class Trace(Generic[ASpecificScen, ASpecificKB]):
             self.dag_parent.append((current_node_idx,))
         self.hist.append(exp_and_fb)
         self.idx2loop_id[len(self.hist) - 1] = cur_loop_id
+        self.dag_index.update()
 
     def get_children(self, parent_idx: int | None = None) -> list[NodeType]:
         """
         Get all children nodes for a given parent index.
         If parent_idx is None, returns the root nodes (experiments starting from scratch).
         """
-        target_parents = (parent_idx,) if parent_idx is not None else self.NEW_ROOT
-        children = []
-        for i, parents in enumerate(self.dag_parent):
-            if parents == target_parents and i < len(self.hist):
-                children.append(self.hist[i])
-        return children
+        return [self.hist[i] for i in self.dag_index.children.get(parent_idx, [])]
+
+    def get_leaves(self) -> list[int]:
+        """
+        Get the indices of nodes (in hist) that have no children—i.e., "leaves" of current DAG.
+        Leaves with lower index comes first.
+        """
+        return sorted(self.dag_index.leaves)
 
     def get_sota_experiment(self, node_id: int | None = None) -> Experiment | None:
         """
@@ -311,6 +436,13 @@ class Trace(Generic[ASpecificScen, ASpecificKB]):
                 return None
             node_id = len(self.hist) - 1
 
+        if node_id < 0:
+            node_id += len(self.dag_parent)
+        index = self.dag_index
+        if node_id < index.size:
+            sota_idx = index.sota_ancestor[node_id]
+            return None if sota_idx is None else self.hist[sota_idx][0]
+
         ancestors = self.get_parents(node_id)
         for i in reversed(ancestors):
             if self.hist[i][1].decision:
@@ -1,18 +1,24 @@
 from __future__ import annotations
 
+import atexit
 import functools
 import importlib
 import json
 import multiprocessing as mp
+import os
 import pickle
 import random
-from collections.abc import Callable
-from pathlib import Path
+import threading
+import time
+from collections.abc import Callable, Iterator
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
 from typing import Any, ClassVar, NoReturn, cast
 
 from filelock import FileLock
 from fuzzywuzzy import fuzz  # type: ignore[import-untyped]
 
+from rdagent.core.cache import get_pickle_cache_backend
 from rdagent.core.conf import RD_AGENT_SETTINGS
 from rdagent.oai.llm_conf import LLM_SETTINGS
 
@@ -121,7 +127,223 @@ def _subprocess_wrapper(f: Callable, seed: int, args: list) -> Any:
     return f(*args)
 
 
-def multiprocessing_wrapper(func_calls: list[tuple[Callable, tuple]], n: int) -> list:
+def _task_context() -> dict[str, Any]:
+    """The context of the caller which a long-lived worker does not inherit."""
+    from rdagent.log import rdagent_logger  # rdagent.log depends on this module
+
+    return {"log_tag": rdagent_logger.current_tag}
+
+
+def _worker_main(conn: Connection, warmup_imports: list[str]) -> None:
+    """The loop of a persistent worker: receive `(index, f, seed, args, context)` and send `(index, ok, result)`."""
+    from rdagent.log import rdagent_logger  # rdagent.log depends on this module
+
+    for module in warmup_imports:
+        try:
+            importlib.import_module(module)
+        except Exception as e:  # noqa: BLE001
+            rdagent_logger.warning(f"Failed to warm up {module} in the worker: {e}")
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if task is None:
+            break
+        index, f, seed, args, context = task
+        rdagent_logger.current_tag = context["log_tag"]
+        try:
+            reply = (index, True, _subprocess_wrapper(f, seed, args))
+        except Exception as e:  # noqa: BLE001
+            reply = (index, False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:  # noqa: BLE001  # e.g. the result or the exception can't be pickled
+            conn.send((index, False, RuntimeError(f"Failed to send the result of task {index}: {e!r}")))
+
+
+class WorkerPool:
+    """
+    Long-lived worker processes for `multiprocessing_wrapper`.
+
+    Compared with `mp.Pool` per call:
+    - the workers are started lazily (up to the largest `n` requested) and reused by later calls,
+      so the cost of starting processes and importing modules is paid once;
+    - results are yielded as the tasks complete;
+    - each task can have a timeout; the worker of a timed out (or cancelled) task is killed and replaced.
+
+    Only one call uses the workers at a time; a concurrent (or nested) call falls back to a fresh `mp.Pool`.
+    """
+
+    def __init__(self, warmup_imports: list[str] | None = None, start_method: str | None = None) -> None:
+        self.warmup_imports = warmup_imports or []
+        self.start_method = start_method
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._workers: list[tuple[BaseProcess, Connection]] = []
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():  # the workers belong to the parent process
+            self._reset()
+
+    def _start_worker(self) -> tuple[BaseProcess, Connection]:
+        ctx = mp.get_context(self.start_method)
+        conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=_worker_main, args=(child_conn, self.warmup_imports), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, conn
+
+    def _get_workers(self, n: int) -> list[tuple[BaseProcess, Connection]]:
+        self._workers = [w for w in self._workers if w[0].is_alive()]
+        while len(self._workers) < n:
+            self._workers.append(self._start_worker())
+        return self._workers[:n]
+
+    def _kill(self, worker: tuple[BaseProcess, Connection]) -> None:
+        process, conn = worker
+        process.kill()
+        process.join()
+        conn.close()
+        self._workers.remove(worker)
+
+    def imap_unordered(
+        self, func_calls: list[tuple[Callable, tuple]], n: int, timeout: float | None = None
+    ) -> Iterator[tuple[int, Any]]:
+        """
+        Yield `(index, f(*args))` of `func_calls` as the tasks complete.
+
+        The exception of a task is raised; a task running longer than `timeout` seconds raises `TimeoutError`.
+        Closing the generator (e.g. leaving the loop) cancels the remaining tasks.
+        """
+        seeds = [LLM_CACHE_SEED_GEN.get_next_seed() for _ in func_calls]
+        self._check_pid()
+        if not self._lock.acquire(blocking=False):
+            yield from _pool_imap(func_calls, seeds, n, timeout)
+            return
+        running: dict[tuple[BaseProcess, Connection], tuple[int, float | None]] = {}
+        try:
+            context = _task_context()
+            pending = list(range(len(func_calls)))[::-1]
+            workers = self._get_workers(max(1, min(n, len(func_calls))))
+            while pending or running:
+                for worker in workers:
+                    if worker not in running and pending:
+                        index = pending.pop()
+                        f, args = func_calls[index]
+                        worker[1].send((index, f, seeds[index], args, context))
+                        running[worker] = (index, None if timeout is None else time.monotonic() + timeout)
+                deadlines = [d for _, d in running.values() if d is not None]
+                wait_time = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                wait([c for _, c in running] + [p.sentinel for p, _ in running], timeout=wait_time)
+                for worker, (index, deadline) in list(running.items()):
+                    process, conn = worker
+                    reply = None
+                    if conn.poll():
+                        try:
+                            reply = conn.recv()
+                        except EOFError:  # the worker exited
+                            process.join()
+                    if reply is not None:
+                        del running[worker]
+                        _, ok, result = reply
+                        if not ok:
+                            raise result
+                        yield index, result
+                    elif not process.is_alive():
+                        del running[worker]
+                        workers[workers.index(worker)] = self._replace(worker)
+                        raise RuntimeError(f"The worker running task {index} exited with code {process.exitcode}.")
+                    elif deadline is not None and time.monotonic() >= deadline:
+                        del running[worker]
+                        workers[workers.index(worker)] = self._replace(worker)
+                        raise TimeoutError(f"Task {index} did not finish in {timeout} seconds.")
+        finally:
+            for worker in running:  # cancelled
+                self._kill(worker)
+            self._lock.release()
+
+    def _replace(self, worker: tuple[BaseProcess, Connection]) -> tuple[BaseProcess, Connection]:
+        self._kill(worker)
+        new_worker = self._start_worker()
+        self._workers.append(new_worker)
+        return new_worker
+
+    def shutdown(self) -> None:
+        self._check_pid()
+        for process, conn in self._workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process, conn in self._workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+            conn.close()
+        self._workers = []
+
+
+def _pool_imap(
+    func_calls: list[tuple[Callable, tuple]], seeds: list[int], n: int, timeout: float | None = None
+) -> Iterator[tuple[int, Any]]:
+    """Run `func_calls` in a fresh `mp.Pool` and yield `(index, result)` in order."""
+    with mp.Pool(processes=max(1, min(n, len(func_calls)))) as pool:
+        results = [
+            pool.apply_async(_subprocess_wrapper, args=(f, seed, args)) for (f, args), seed in zip(func_calls, seeds)
+        ]
+        for index, result in enumerate(results):
+            try:
+                yield index, result.get(timeout)
+            except mp.TimeoutError as e:
+                raise TimeoutError(f"Task {index} did not finish in {timeout} seconds.") from e
+
+
+_WORKER_POOL: WorkerPool | None = None
+
+
+def get_worker_pool() -> WorkerPool:
+    """The process-wide `WorkerPool` configured by `RD_AGENT_SETTINGS`; the workers are started on first use."""
+    global _WORKER_POOL
+    if _WORKER_POOL is None:
+        _WORKER_POOL = WorkerPool(
+            warmup_imports=RD_AGENT_SETTINGS.multi_proc_warmup_imports,
+            start_method=RD_AGENT_SETTINGS.multi_proc_start_method,
+        )
+        atexit.register(shutdown_worker_pool)
+    return _WORKER_POOL
+
+
+def shutdown_worker_pool() -> None:
+    """Stop the persistent workers; they are restarted by the next call."""
+    global _WORKER_POOL
+    if _WORKER_POOL is not None:
+        _WORKER_POOL.shutdown()
+        _WORKER_POOL = None
+
+
+def multiprocessing_imap(
+    func_calls: list[tuple[Callable, tuple]], n: int, timeout: float | None = None
+) -> Iterator[tuple[int, Any]]:
+    """
+    Like `multiprocessing_wrapper`, but yield `(index, result)` as soon as the results are available.
+    The results come in completion order with the persistent pool and in order otherwise.
+    """
+    if timeout is None:
+        timeout = RD_AGENT_SETTINGS.multi_proc_task_timeout
+    if n == 1 or max(1, min(n, len(func_calls))) == 1:
+        for index, (f, args) in enumerate(func_calls):
+            yield index, f(*args)
+    elif RD_AGENT_SETTINGS.multi_proc_persistent_pool:
+        yield from get_worker_pool().imap_unordered(func_calls, n, timeout)
+    else:
+        yield from _pool_imap(func_calls, [LLM_CACHE_SEED_GEN.get_next_seed() for _ in func_calls], n, timeout)
+
+
+def multiprocessing_wrapper(func_calls: list[tuple[Callable, tuple]], n: int, timeout: float | None = None) -> list:
     """It will use multiprocessing to call the functions in func_calls with the given parameters.
     The results equals to `return  [f(*args) for f, args in func_calls]`
     It will not call multiprocessing if `n=1`
@@ -130,27 +352,28 @@ def multiprocessing_wrapper(func_calls: list[tuple[Callable, tuple]], n: int) ->
     We cooperate with chat_cache_seed feature
     We ensure get the same seed trace even we have multiple number of seed
 
+    When `RD_AGENT_SETTINGS.multi_proc_persistent_pool` is enabled, the tasks run in the long-lived
+    workers of `get_worker_pool()` instead of a new `mp.Pool`.
+
     Parameters
     ----------
     func_calls : List[Tuple[Callable, Tuple]]
         the list of functions and their parameters
     n : int
         the number of subprocesses
+    timeout : float | None
+        the timeout (in seconds) of each task, `TimeoutError` is raised when it is exceeded;
+        defaults to `RD_AGENT_SETTINGS.multi_proc_task_timeout`. It is not applied when `n=1`.
 
     Returns
     -------
     list
 
     """
-    if n == 1 or max(1, min(n, len(func_calls))) == 1:
-        return [f(*args) for f, args in func_calls]
-
-    with mp.Pool(processes=max(1, min(n, len(func_calls)))) as pool:
-        results = [
-            pool.apply_async(_subprocess_wrapper, args=(f, LLM_CACHE_SEED_GEN.get_next_seed(), args))
-            for f, args in func_calls
-        ]
-        return [result.get() for result in results]
+    results: list = [None] * len(func_calls)
+    for index, result in multiprocessing_imap(func_calls, n, timeout):
+        results[index] = result
+    return results
 
 
 def cache_with_pickle(hash_func: Callable, post_process_func: Callable | None = None, force: bool = False) -> Callable:
@@ -158,7 +381,8 @@ def cache_with_pickle(hash_func: Callable, post_process_func: Callable | None =
     This decorator will cache the return value of the function with pickle.
     The cache key is generated by the hash_func. The hash function returns a string or None.
     If it returns None, the cache will not be used. The cache will be stored in the folder
-    specified by RD_AGENT_SETTINGS.pickle_cache_folder_path_str with name hash_key.pkl.
+    specified by RD_AGENT_SETTINGS.pickle_cache_folder_path_str by the backend specified by
+    RD_AGENT_SETTINGS.pickle_cache_backend (see `rdagent.core.cache`).
     The post_process_func will be called with the original arguments and the cached result
     to give each caller a chance to process the cached result. The post_process_func should
     return the final result.
@@ -179,29 +403,25 @@ def cache_with_pickle(hash_func: Callable, post_process_func: Callable | None =
             if not RD_AGENT_SETTINGS.cache_with_pickle and not force:
                 return func(*args, **kwargs)
 
-            target_folder = Path(RD_AGENT_SETTINGS.pickle_cache_folder_path_str) / f"{func.__module__}.{func.__name__}"
-            target_folder.mkdir(parents=True, exist_ok=True)
             hash_key = hash_func(*args, **kwargs)
 
             if hash_key is None:
                 return func(*args, **kwargs)
 
-            cache_file = target_folder / f"{hash_key}.pkl"
-            lock_file = target_folder / f"{hash_key}.lock"
+            backend = get_pickle_cache_backend()
+            namespace = f"{func.__module__}.{func.__name__}"
 
-            if cache_file.exists():
-                with cache_file.open("rb") as f:
-                    cached_res = pickle.load(f)
+            hit, cached_res = backend.get(namespace, hash_key)
+            if hit:
                 return post_process_func(*args, cached_res=cached_res, **kwargs) if post_process_func else cached_res
 
             if RD_AGENT_SETTINGS.use_file_lock:
-                with FileLock(lock_file):
+                with FileLock(backend.lock_path(namespace, hash_key)):
                     result = func(*args, **kwargs)
             else:
                 result = func(*args, **kwargs)
 
-            with cache_file.open("wb") as f:
-                pickle.dump(result, f)
+            backend.put(namespace, hash_key, result)
 
             return result
 
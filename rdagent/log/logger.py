@@ -63,6 +63,15 @@ class RDAgentLog(SingletonBaseClass):
     def _tag(self, value: str) -> None:
         self._tag_ctx.set(value)
 
+    @property
+    def current_tag(self) -> str:
+        """The full tag of the current context, e.g. to carry it into a worker process"""
+        return self._tag
+
+    @current_tag.setter
+    def current_tag(self, value: str) -> None:
+        self._tag = value
+
     def __init__(self) -> None:
         logger.remove()
         self._configure_console_sinks()
@@ -1,4 +1,3 @@
-import pickle
 import traceback
 from collections import defaultdict
 from pathlib import Path
@@ -20,6 +19,7 @@ from rdagent.scenarios.data_science.test_eval import (
 
 # from rdagent.scenarios.kaggle.kaggle_crawler import score_rank
 from rdagent.utils.workflow import LoopBase
+from rdagent.utils.workflow.checkpoint import load_session_obj
 
 
 def save_grade_info(log_trace_path: Path):
@@ -54,8 +54,7 @@ def save_all_grade_info(log_folder: str | Path) -> None:
 def _get_loop_and_fn_after_hours(log_folder: Path, hours: int):
     stop_session_fp = get_first_session_file_after_duration(log_folder, f"{hours}h")
 
-    with stop_session_fp.open("rb") as f:
-        session_obj: LoopBase = pickle.load(f)
+    session_obj: LoopBase = load_session_obj(stop_session_fp)
 
     loop_trace = session_obj.loop_trace
     stop_li = max(loop_trace.keys())
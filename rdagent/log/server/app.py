@@ -1,7 +1,10 @@
+import json
 import logging
 import os
 import random
+import threading
 import traceback
+from array import array
 from collections import defaultdict
 from contextlib import redirect_stderr, redirect_stdout
 from datetime import datetime, timezone
@@ -18,6 +21,7 @@ from werkzeug.utils import secure_filename
 from rdagent.log.storage import FileStorage
 from rdagent.log.ui.conf import UI_SETTING
 from rdagent.log.ui.storage import WebStorage
+from rdagent.utils import md5_hash
 
 app = Flask(__name__, static_folder=str(Path(UI_SETTING.static_path).resolve()))
 CORS(app)
@@ -83,8 +87,18 @@ class RDAgentTask:
                 name=f"rdagent:{self.scenario}:{self.trace_name}",
             )
         self.messages: list[dict] = []
+        self.history: TraceMessageCache | None = None  # the messages of the log folder, loaded on first request
         self.pointers: defaultdict[str, int] = defaultdict(int)
 
+    def n_messages(self) -> int:
+        return (len(self.history) if self.history is not None else 0) + len(self.messages)
+
+    def get_messages(self, start: int, stop: int) -> list[dict]:
+        """The messages [start, stop) of the history followed by the ones received by the server"""
+        n_history = len(self.history) if self.history is not None else 0
+        msgs = self.history.read(start, min(stop, n_history)) if start < n_history else []
+        return msgs + self.messages[max(start - n_history, 0) : max(stop - n_history, 0)]
+
     def start(self) -> None:
         if self.process is not None:
             self.process.start()
@@ -247,25 +261,128 @@ def _resolve_stdout_path(trace_id: str) -> Path | None:
     return stdout_path
 
 
+class TraceMessageCache:
+    """
+    The messages of a log folder converted for the frontend by `WebStorage._obj_to_json`.
+
+    They are appended to `<web_message_cache_folder>/<md5 of the folder>.jsonl` (one json message per line),
+    with the watermark of the `FileStorage` index they are converted up to, so loading the trace again (e.g. after
+    a restart of the server) only unpickles the objects logged since. Only the byte offsets of the lines are kept
+    in memory; the messages are read from the file by page.
+    """
+
+    VERSION = 1
+
+    def __init__(self, log_path: str | Path) -> None:
+        self.log_path = Path(log_path).absolute()
+        key = md5_hash(str(self.log_path))
+        self.path = Path(UI_SETTING.web_message_cache_folder) / f"{key}.jsonl"
+        self.meta_path = self.path.with_suffix(".meta.json")
+        self.offsets = array("q", [0])  # the start of each line, and the end of the file
+        self.watermark: tuple[int, int] | None = None
+        self.last_timestamp: str | None = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _load(self) -> None:
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (FileNotFoundError, ValueError):
+            meta = None
+        if (
+            not meta
+            or meta.get("version") != self.VERSION
+            or meta.get("log_path") != str(self.log_path)
+            or not self.path.exists()
+            or self.path.stat().st_size < meta["size"]
+        ):
+            self._reset()
+            return
+        with self.path.open("r+b") as f:
+            f.truncate(meta["size"])  # the lines appended after the meta was saved (e.g. an interrupted sync)
+            data = f.read()
+        pos = data.find(b"\n")
+        while pos != -1:
+            self.offsets.append(pos + 1)
+            pos = data.find(b"\n", pos + 1)
+        self.watermark = tuple(meta["watermark"])
+        self.last_timestamp = meta["last_timestamp"]
+
+    def _reset(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_bytes(b"")
+        self.offsets = array("q", [0])
+        self.watermark = None
+        self.last_timestamp = None
+
+    def _save_meta(self) -> None:
+        meta = {
+            "version": self.VERSION,
+            "log_path": str(self.log_path),
+            "size": self.offsets[-1],
+            "watermark": self.watermark,
+            "last_timestamp": self.last_timestamp,
+        }
+        tmp = self.meta_path.with_name(f"{self.meta_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self.meta_path)
+
+    def sync(self) -> int:
+        """Convert and append the messages logged since the last sync; return their number."""
+        with self._lock:
+            fs = FileStorage(self.log_path)
+            entries, watermark = fs.read_index(self.watermark)
+            if self.watermark is not None and watermark[0] != self.watermark[0] or watermark[0] == -1:
+                self._reset()  # the index has been rewritten (e.g. truncated), or can not be written
+
+            ws = WebStorage(port=1, path=str(self.log_path))
+            lines = []
+            for entry in sorted(entries, key=lambda e: e["timestamp"]):
+                msg = fs.load_msg(entry)
+                if msg is None:
+                    continue
+                timestamp = msg.timestamp.isoformat()
+                data = ws._obj_to_json(obj=msg.content, tag=msg.tag, id=str(self.log_path), timestamp=timestamp)
+                if data:
+                    lines.extend(
+                        json.dumps(d["msg"]).encode() + b"\n" for d in (data if isinstance(data, list) else [data])
+                    )
+                    self.last_timestamp = timestamp
+
+            with self.path.open("ab") as f:
+                for line in lines:
+                    f.write(line)
+                    self.offsets.append(self.offsets[-1] + len(line))
+            self.watermark = watermark
+            self._save_meta()
+            return len(lines)
+
+    def read(self, start: int, stop: int) -> list[dict]:
+        with self._lock:
+            start, stop = max(start, 0), min(stop, len(self))
+            if start >= stop:
+                return []
+            with self.path.open("rb") as f:
+                f.seek(self.offsets[start])
+                data = f.read(self.offsets[stop] - self.offsets[start])
+        return [json.loads(line) for line in data.splitlines()]
+
+
 def read_trace(log_path: Path, id: str = "") -> None:
-    fs = FileStorage(log_path)
-    ws = WebStorage(port=1, path=log_path)
+    """
+    Load the messages of a log folder into the task `id` from their cache (`TraceMessageCache`), converting the
+    ones logged since it was written. An END message is added when the last one is more than 30 minutes old.
+    """
     task = _get_or_create_task(id)
-    task.messages = []
-    last_timestamp = None
-    for msg in fs.iter_msg():
-        data = ws._obj_to_json(obj=msg.content, tag=msg.tag, id=id, timestamp=msg.timestamp.isoformat())
-        if data:
-            if isinstance(data, list):
-                for d in data:
-                    task.messages.append(d["msg"])
-                    last_timestamp = msg.timestamp
-            else:
-                task.messages.append(data["msg"])
-                last_timestamp = msg.timestamp
+    task.history = TraceMessageCache(log_path)
+    task.history.sync()
 
     now = datetime.now(timezone.utc)
-    if last_timestamp and (now - last_timestamp).total_seconds() > 1800:
+    last_timestamp = task.history.last_timestamp
+    if not task.messages and last_timestamp and (now - datetime.fromisoformat(last_timestamp)).total_seconds() > 1800:
         task.messages.append(
             {
                 "tag": "END",
@@ -275,6 +392,21 @@ def read_trace(log_path: Path, id: str = "") -> None:
         )
 
 
+_load_trace_lock = threading.Lock()
+
+
+def _ensure_trace_loaded(task: RDAgentTask, trace_id: str) -> None:
+    """Load the messages of a trace not started by this server (e.g. before a restart) on its first request."""
+    if task.process is not None or task.history is not None or not Path(trace_id).is_dir():
+        return
+    with _load_trace_lock:
+        if task.history is None:
+            try:
+                read_trace(Path(trace_id), id=trace_id)
+            except Exception:
+                app.logger.exception("Failed to load trace from %s", trace_id)
+
+
 def _collect_existing_trace_ids(trace_root: Path) -> list[str]:
     """Return trace ids that should be visible in the UI history panel."""
 
@@ -287,7 +419,8 @@ def _collect_existing_trace_ids(trace_root: Path) -> list[str]:
             continue
         if "uploads" in trace_dir.relative_to(trace_root).parts:
             continue
-        if not any(trace_dir.rglob("*.pkl")):
+        # the folders logged with an index do not need to be walked
+        if not (trace_dir / FileStorage.INDEX_NAME).exists() and not any(trace_dir.rglob("*.pkl")):
             continue
 
         trace_ids.append(trace_dir.relative_to(trace_root).as_posix())
@@ -295,18 +428,6 @@ def _collect_existing_trace_ids(trace_root: Path) -> list[str]:
     return trace_ids
 
 
-def _load_existing_traces(trace_root: Path) -> None:
-    """Load persisted traces into memory so the UI survives a server restart."""
-
-    for trace_id in _collect_existing_trace_ids(trace_root):
-        trace_dir = trace_root / trace_id
-
-        try:
-            read_trace(trace_dir, id=str(trace_dir))
-        except Exception:
-            app.logger.exception("Failed to load trace from %s", trace_dir)
-
-
 @app.route("/trace", methods=["POST"])
 def update_trace():
     data = request.get_json()
@@ -321,6 +442,7 @@ def update_trace():
     trace_id = str(log_folder_path / trace_id)
 
     task = _get_or_create_task(trace_id)
+    _ensure_trace_loaded(task, trace_id)
 
     # Make sure any pending user-interaction requests are visible to the frontend.
     _drain_user_requests_into_messages(task)
@@ -339,6 +461,25 @@ def update_trace():
             )
             app.logger.warning(f"Process for {trace_id} has ended.")
 
+    n_messages = task.n_messages()
+    offset = data.get("offset")
+    if offset is not None:
+        # paging by offset, without the pointer of the client
+        offset = max(int(offset), 0)
+        limit = int(data.get("limit") or UI_SETTING.trace_page_size)
+        returned_msgs = task.get_messages(offset, offset + limit)
+        return (
+            jsonify(
+                {
+                    "messages": returned_msgs,
+                    "offset": offset,
+                    "next_offset": offset + len(returned_msgs),
+                    "total": n_messages,
+                }
+            ),
+            200,
+        )
+
     user_ip = request.remote_addr
 
     if reset:
@@ -346,10 +487,10 @@ def update_trace():
 
     start_pointer = task.pointers[user_ip]
     end_pointer = start_pointer + msg_num
-    if end_pointer > len(task.messages) or return_all:
-        end_pointer = len(task.messages)
+    if end_pointer > n_messages or return_all:
+        end_pointer = n_messages
 
-    returned_msgs = task.messages[start_pointer:end_pointer]
+    returned_msgs = task.get_messages(start_pointer, end_pointer)
     task.pointers[user_ip] = end_pointer
     if returned_msgs:
         app.logger.info([msg["tag"] for msg in returned_msgs])
@@ -571,7 +712,7 @@ def control_process():
 @app.route("/test", methods=["GET"])
 def test():
     # return 'Hello, World!'
-    msgs = {k: [i["tag"] for i in task.messages] for k, task in rdagent_processes.items()}
+    msgs = {k: [i["tag"] for i in task.get_messages(0, task.n_messages())] for k, task in rdagent_processes.items()}
     pointers = {k: dict(task.pointers) for k, task in rdagent_processes.items()}
     return jsonify({"msgs": msgs, "pointers": pointers}), 200
 
@@ -590,7 +731,7 @@ def server_static_files(fn):
 
 def main(port: int = 19899):
     app.config["UI_SERVER_PORT"] = port
-    _load_existing_traces(log_folder_path)
+    # the existing traces are loaded on their first request (`_ensure_trace_loaded`)
     app.run(debug=False, host="0.0.0.0", port=port)
 
 
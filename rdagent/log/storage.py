@@ -1,15 +1,20 @@
 import json
+import os
 import pickle
 import re
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Generator, Literal
 
+from filelock import FileLock
+
 from .base import Message, Storage
 from .utils import gen_datetime
 
 LOG_LEVEL = Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
 
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S-%f"
+
 
 def _remove_empty_dir(path: Path) -> None:
     """
@@ -29,11 +34,125 @@ class FileStorage(Storage):
     """
     The info are logginged to the file systems
 
-    TODO: describe the storage format
+    Each object is saved to `<path>/<tag as folders>/<pid>/<timestamp>.<pkl|json|log>`.
+
+    The pickled objects are also recorded in the index `<path>/.index.jsonl` (one json line per object with
+    its relative path, tag, pid, timestamp and size) when they are logged, so `iter_msg` can select the messages
+    and sort them by time without listing the folders or unpickling the objects it does not yield.
+    The index of a folder logged by a previous version is built on first use.
     """
 
+    INDEX_NAME = ".index.jsonl"
+
     def __init__(self, path: str | Path) -> None:
         self.path = Path(path)
+        self._index_cache: tuple[int, list[dict[str, Any]], int] = (-1, [], 0)  # (inode, entries, offset)
+
+    @property
+    def index_path(self) -> Path:
+        return self.path / self.INDEX_NAME
+
+    def _index_lock(self) -> FileLock:
+        self.path.mkdir(parents=True, exist_ok=True)
+        return FileLock(self.path / ".index.lock")
+
+    def _index_entry(self, file: Path) -> dict[str, Any]:
+        rel = file.relative_to(self.path).as_posix()
+        return {
+            "path": rel,
+            "tag": ".".join(rel.replace("/", ".").split(".")[:-3]),
+            "pid": file.parent.name,
+            "timestamp": file.stem,
+            "size": file.stat().st_size,
+        }
+
+    def _scan(self) -> list[dict[str, Any]]:
+        return [self._index_entry(f) for f in self.path.glob("**/*.pkl") if f.name != "debug_llm.pkl"]
+
+    def _write_index(self, entries: list[dict[str, Any]]) -> None:
+        """Replace the index; the caller holds the index lock."""
+        tmp = self.index_path.with_name(f"{self.INDEX_NAME}.{os.getpid()}.tmp")
+        tmp.write_text("".join(json.dumps(e) + "\n" for e in entries))
+        os.replace(tmp, self.index_path)
+
+    def _append_index(self, file: Path) -> None:
+        with self._index_lock():
+            if not self.index_path.exists():
+                self._write_index(self._scan())  # includes `file`
+                return
+            fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, (json.dumps(self._index_entry(file)) + "\n").encode())
+            finally:
+                os.close(fd)
+
+    def _read_index(self, locked: bool = False) -> list[dict[str, Any]]:
+        if not self.index_path.exists():
+            if not self.path.exists():
+                return []
+            if locked:
+                self._write_index(self._scan())
+            else:
+                try:
+                    with self._index_lock():
+                        if not self.index_path.exists():
+                            self._write_index(self._scan())
+                except OSError:  # e.g. a read-only folder
+                    return self._scan()
+        # only parse the lines appended since the last call (e.g. the refreshes of a UI)
+        with self.index_path.open("rb") as f:
+            st = os.fstat(f.fileno())
+            ino, entries, offset = self._index_cache
+            if ino != st.st_ino or st.st_size < offset:  # rewritten by `truncate` or a rebuild
+                entries, offset = [], 0
+            f.seek(offset)
+            data = f.read()
+        complete = data[: data.rfind(b"\n") + 1]  # the last line may be being written
+        entries = entries + [json.loads(line) for line in complete.splitlines() if line]
+        self._index_cache = (st.st_ino, entries, offset + len(complete))
+        return list(entries)
+
+    def read_index(self, watermark: tuple[int, int] | None = None) -> tuple[list[dict[str, Any]], tuple[int, int]]:
+        """
+        Read the entries of the index appended after `watermark` and return them with the new watermark.
+
+        The watermark `(inode, offset)` of the index is the one returned by the previous call. When the index has
+        been rewritten since (e.g. by `truncate`, the inode changes) all its entries are returned; the
+        watermark of a folder without an index (e.g. read-only) is `(-1, 0)` and all the entries are scanned.
+        """
+        if not self.index_path.exists():
+            self._read_index()  # build it
+            if not self.index_path.exists():
+                return self._scan(), (-1, 0)
+        with self.index_path.open("rb") as f:
+            st = os.fstat(f.fileno())
+            ino, offset = watermark or (-1, 0)
+            if ino != st.st_ino or st.st_size < offset:
+                offset = 0
+            f.seek(offset)
+            data = f.read()
+        complete = data[: data.rfind(b"\n") + 1]  # the last line may be being written
+        return [json.loads(line) for line in complete.splitlines() if line], (st.st_ino, offset + len(complete))
+
+    @staticmethod
+    def entry_has_tag(entry: dict[str, Any], tag: str) -> bool:
+        """Whether the folders of the index entry contain `tag` (like "Loop_1.coding"), as `iter_msg` selects"""
+        tag_parts = tag.split(".")
+        n = len(tag_parts)
+        folders = entry["path"].split("/")[:-1]
+        return any(folders[i : i + n] == tag_parts for i in range(len(folders) - n + 1))
+
+    def load_msg(self, entry: dict[str, Any]) -> Message | None:
+        """Unpickle the message of an index entry; None if its file has been removed."""
+        try:
+            with (self.path / entry["path"]).open("rb") as f:
+                content = pickle.load(f)
+        except FileNotFoundError:  # removed after being indexed
+            return None
+        timestamp = datetime.strptime(entry["timestamp"], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+        return Message(
+            tag=entry["tag"], level="INFO", timestamp=timestamp, caller="", pid_trace=entry["pid"], content=content
+        )
 
     def log(
         self,
@@ -49,7 +168,7 @@ class FileStorage(Storage):
         cur_p = self.path / tag.replace(".", "/")
         cur_p.mkdir(parents=True, exist_ok=True)
 
-        path = cur_p / f"{timestamp.strftime('%Y-%m-%d_%H-%M-%S-%f')}.log"
+        path = cur_p / f"{timestamp.strftime(TIMESTAMP_FORMAT)}.log"
 
         if save_type == "json":
             path = path.with_suffix(".json")
@@ -63,6 +182,7 @@ class FileStorage(Storage):
             path = path.with_suffix(".pkl")
             with path.open("wb") as f:
                 pickle.dump(obj, f)
+            self._append_index(path)
             return path
         elif save_type == "text":
             obj = str(obj)
@@ -76,39 +196,60 @@ class FileStorage(Storage):
         r"(?P<caller>.+:.+:\d+) - "
     )
 
-    def iter_msg(self, tag: str | None = None, pattern: str | None = None) -> Generator[Message, None, None]:
-        msg_l = []
+    def iter_msg(
+        self,
+        tag: str | None = None,
+        pattern: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> Generator[Message, None, None]:
+        """
+        Yield the pickled messages in timestamp order; each object is unpickled when its message is yielded.
 
+        Parameters
+        ----------
+        tag : str | None
+            Only the messages whose folders contain `tag` (like "Loop_1.coding"), as `**/<tag>/**/*.pkl` does.
+        pattern : str | None
+            A glob pattern of the files relative to the storage path; it lists the files instead of using the index.
+        start, end : datetime | None
+            Only the messages logged in [start, end].
+        """
         if pattern:
-            pkl_files = pattern
-        elif tag:
-            pkl_files = f"**/{tag.replace('.','/')}/**/*.pkl"
+            files = [f for f in self.path.glob(pattern) if f.name != "debug_llm.pkl"]
+            entries = [self._index_entry(f) for f in files]
         else:
-            pkl_files = "**/*.pkl"
-        for file in self.path.glob(pkl_files):
-            if file.name == "debug_llm.pkl":
-                continue
-            pkl_log_tag = ".".join(file.relative_to(self.path).as_posix().replace("/", ".").split(".")[:-3])
-            pid = file.parent.name
-
-            with file.open("rb") as f:
-                content = pickle.load(f)
-
-            timestamp = datetime.strptime(file.stem, "%Y-%m-%d_%H-%M-%S-%f").replace(tzinfo=timezone.utc)
-
-            m = Message(tag=pkl_log_tag, level="INFO", timestamp=timestamp, caller="", pid_trace=pid, content=content)
+            entries = self._read_index()
+            if tag:
+                entries = [e for e in entries if self.entry_has_tag(e, tag)]
 
-            msg_l.append(m)
+        # the timestamps are fixed-width, so comparing the strings is comparing the times
+        if start is not None:
+            start_str = gen_datetime(start).strftime(TIMESTAMP_FORMAT)
+            entries = [e for e in entries if e["timestamp"] >= start_str]
+        if end is not None:
+            end_str = gen_datetime(end).strftime(TIMESTAMP_FORMAT)
+            entries = [e for e in entries if e["timestamp"] <= end_str]
+        entries.sort(key=lambda e: e["timestamp"])
 
-        msg_l.sort(key=lambda x: x.timestamp)
-        for m in msg_l:
-            yield m
+        for e in entries:
+            msg = self.load_msg(e)
+            if msg is not None:
+                yield msg
 
     def truncate(self, time: datetime) -> None:
-        for file in self.path.glob("**/*.pkl"):
-            timestamp = datetime.strptime(file.stem, "%Y-%m-%d_%H-%M-%S-%f").replace(tzinfo=timezone.utc)
-            if timestamp > time.replace(tzinfo=timezone.utc):
-                file.unlink()
+        if not self.path.exists():
+            return
+        time = time.replace(tzinfo=timezone.utc)
+        with self._index_lock():
+            kept = []
+            time_str = time.strftime(TIMESTAMP_FORMAT)
+            for e in self._read_index(locked=True):
+                if e["timestamp"] > time_str:
+                    (self.path / e["path"]).unlink(missing_ok=True)
+                else:
+                    kept.append(e)
+            self._write_index(kept)
 
         _remove_empty_dir(self.path)
 
@@ -20,5 +20,32 @@ class UIBasePropSetting(ExtendedBaseSettings):
 
     enable_cache: bool = True
 
+    summary_cache_folder: str = "./git_ignore_folder/ui_summary"
+    """The statistics of the runs folded incrementally from their logs are persisted here (when `enable_cache`)"""
+
+    # the log server
+    web_message_cache_folder: str = "./git_ignore_folder/ui_messages"
+    """The messages of the traces converted for the frontend are appended here, so a restart does not unpickle them"""
+    trace_page_size: int = 200
+    """The default number of messages of a `/trace` request paged by offset"""
+
+    # WebStorage: the messages are shipped to the UI server by a background sender
+    web_storage_queue_size: int = 10000
+    """The max number of messages waiting to be sent; `log` waits `web_storage_put_timeout` for room, then spills"""
+    web_storage_put_timeout: float = 0.05
+    web_storage_batch_size: int = 200
+    web_storage_flush_interval: float = 0.5
+    """The max seconds the sender waits for new messages before checking the spill files"""
+    web_storage_timeout: float = 5.0
+    """The timeout of a POST to the UI server"""
+    web_storage_retry_interval: float = 10.0
+    """After a failed POST, messages are spilled without contacting the server for this many seconds"""
+    web_storage_spill_folder: str = "./git_ignore_folder/web_storage_spill"
+    """The messages which can not be sent are appended here and replayed when the server is back"""
+    web_storage_spill_max_bytes: int = 256 * 2**20
+    """Per process; the messages are dropped when the spill file is larger"""
+    web_storage_replay_max_failures: int = 3
+    """A replayed batch the server fails on (5xx) this many times is split to isolate and drop the failing messages"""
+
 
 UI_SETTING = UIBasePropSetting()
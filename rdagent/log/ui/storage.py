@@ -1,7 +1,16 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Generator
+from urllib.parse import urlparse
 
+import psutil
 import requests
 
 from rdagent.log.base import Message, Storage
@@ -10,10 +19,243 @@ from rdagent.log.utils import extract_evoid, extract_loopid_func_name, gen_datet
 from .conf import UI_SETTING
 
 
+class WebLogSender:
+    """
+    Ship the serialized messages of a `WebStorage` to `<url>/receive` from a background thread.
+
+    - `put` only serializes the messages and puts them in a bounded queue; when the queue is full it waits
+      `web_storage_put_timeout` for room (backpressure) and then spills the messages instead of blocking the loop.
+    - The thread posts what is in the queue as one list per request over a pooled `requests.Session`.
+    - When the server is unreachable (or fails) the batch is appended to the spill file of the process
+      `<web_storage_spill_folder>/<port>-<pid>.jsonl` and the server is not contacted for
+      `web_storage_retry_interval` seconds. The spill files of this process and of dead processes are replayed
+      once the server is back.
+    - Messages rejected by the server (4xx) or which can not be serialized or spilled are dropped.
+      A replayed batch the server keeps failing on (5xx, `web_storage_replay_max_failures` times) is split in halves
+      until the failing messages are isolated and dropped, so they do not hold back the others.
+
+    The counters of the messages are in `stats`.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.pid = os.getpid()
+        self.queue: queue.Queue[str] = queue.Queue(maxsize=UI_SETTING.web_storage_queue_size)
+        self.counters = {"queued": 0, "sent": 0, "spilled": 0, "replayed": 0, "dropped": 0}
+        self._counters_lock = threading.Lock()
+        self.spill_folder = Path(UI_SETTING.web_storage_spill_folder)
+        self.spill_prefix = f"{urlparse(url).port}-"
+        self.spill_path = self.spill_folder / f"{self.spill_prefix}{self.pid}.jsonl"
+        self._spill_lock = threading.Lock()
+        self._session = requests.Session()  # only used by the thread
+        self._down_until = 0.0
+        self._last_replay = 0.0
+        self._replay_failures: dict[int, int] = {}  # hash of a spilled message -> failed replays (5xx)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="WebLogSender", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _count(self, name: str, n: int) -> None:
+        with self._counters_lock:
+            self.counters[name] += n
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._counters_lock:
+            return {**self.counters, "pending": self.queue.unfinished_tasks}
+
+    def put(self, msgs: list[dict]) -> str:
+        lines = []
+        for msg in msgs:
+            try:
+                lines.append(json.dumps(msg))
+            except (TypeError, ValueError) as e:
+                print(f"Failed to serialize a message for the web storage server at {self.url}: {e}")
+                self._count("dropped", 1)
+        for i, line in enumerate(lines):
+            try:
+                self.queue.put(line, timeout=UI_SETTING.web_storage_put_timeout)
+            except queue.Full:
+                self._spill(lines[i:])
+                return "spilled"
+            self._count("queued", 1)
+        return "queued"
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until the queued messages are sent (or spilled); return False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks and self._thread.is_alive():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop the thread after it has shipped the queue; spill what is left after `timeout`."""
+        if self.pid != os.getpid() or self._stop.is_set():
+            return  # a copy inherited by a forked process has no thread
+        self._stop.set()
+        self._thread.join(UI_SETTING.web_storage_timeout if timeout is None else timeout)
+        if not self._thread.is_alive():
+            left = []
+            while not self.queue.empty():
+                left.append(self.queue.get_nowait())
+                self.queue.task_done()
+            if left:
+                self._spill(left)
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self.queue.empty()):
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=UI_SETTING.web_storage_flush_interval))
+                while len(batch) < UI_SETTING.web_storage_batch_size:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                if batch:
+                    self._ship(batch)
+                if not self._stop.is_set():
+                    self._replay()
+            except Exception as e:  # noqa: BLE001  the thread must keep running
+                print(f"The web storage sender failed: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _post(self, batch: list[str]) -> int | None:
+        """The status code of the response; None if the server is unreachable."""
+        try:
+            resp = self._session.post(
+                f"{self.url}/receive",
+                data="[" + ",".join(batch) + "]",
+                headers={"Content-Type": "application/json"},
+                timeout=UI_SETTING.web_storage_timeout,
+            )
+        except requests.RequestException:
+            return None
+        return resp.status_code
+
+    def _ship(self, batch: list[str], counter: str = "sent") -> bool:
+        if time.monotonic() < self._down_until:
+            self._spill(batch, count=counter == "sent")
+            return False
+        status = self._post(batch)
+        if counter == "replayed" and self._isolate_failures(batch, status):
+            return self._ship_split(batch)
+        if status is None or status >= 500:
+            self._down_until = time.monotonic() + UI_SETTING.web_storage_retry_interval
+            self._spill(batch, count=counter == "sent")
+            return False
+        if status >= 400:
+            print(f"The web storage server at {self.url} rejected {len(batch)} messages: {status}")
+            self._count("dropped", len(batch))
+        else:
+            self._count(counter, len(batch))
+        return True
+
+    def _isolate_failures(self, batch: list[str], status: int | None) -> bool:
+        """Count the failed replays of the messages; True when the batch has failed too many times"""
+        keys = [hash(line) for line in batch]
+        if status is None or status < 500:
+            for k in keys:
+                self._replay_failures.pop(k, None)
+            return False
+        for k in keys:
+            self._replay_failures[k] = self._replay_failures.get(k, 0) + 1
+        if max(self._replay_failures[k] for k in keys) < UI_SETTING.web_storage_replay_max_failures:
+            return False
+        for k in keys:
+            self._replay_failures.pop(k, None)
+        return True
+
+    def _ship_split(self, batch: list[str]) -> bool:
+        """Send the halves of a batch the server fails on, until the single messages it fails on are dropped"""
+        parts = [batch]
+        while parts:
+            part = parts.pop(0)
+            if part is not batch:
+                status = self._post(part)
+                if status is None:
+                    self._down_until = time.monotonic() + UI_SETTING.web_storage_retry_interval
+                    self._spill([line for p in [part, *parts] for line in p], count=False)
+                    return False
+                if status < 400:
+                    self._count("replayed", len(part))
+                    continue
+                if status < 500:
+                    print(f"The web storage server at {self.url} rejected {len(part)} messages: {status}")
+                    self._count("dropped", len(part))
+                    continue
+            if len(part) == 1:
+                print(f"The web storage server at {self.url} keeps failing on a message, dropping it")
+                self._count("dropped", 1)
+                continue
+            mid = len(part) // 2
+            parts[:0] = [part[:mid], part[mid:]]
+        return True
+
+    def _spill(self, lines: list[str], count: bool = True) -> None:
+        with self._spill_lock:
+            try:
+                self.spill_folder.mkdir(parents=True, exist_ok=True)
+                size = self.spill_path.stat().st_size if self.spill_path.exists() else 0
+                if size > UI_SETTING.web_storage_spill_max_bytes:
+                    self._count("dropped", len(lines))
+                    return
+                with self.spill_path.open("a", encoding="utf-8") as f:
+                    f.writelines(line + "\n" for line in lines)
+            except OSError as e:
+                print(f"Failed to spill the messages for the web storage server at {self.url}: {e}")
+                self._count("dropped", len(lines))
+                return
+        if count:
+            self._count("spilled", len(lines))
+
+    def _claim_spill_files(self) -> list[Path]:
+        """Move the spill files which can be replayed by this process out of the way of the writers."""
+        claimed = []
+        for path in sorted(self.spill_folder.glob(f"{self.spill_prefix}*")):
+            # `<port>-<pid>.jsonl` is written by pid; `<port>-<pid>-<uuid>.replay` is being replayed by pid
+            try:
+                pid = int(path.name[len(self.spill_prefix) :].split(".")[0].split("-")[0])
+            except ValueError:
+                continue
+            if (pid != self.pid or path.suffix != ".jsonl") and psutil.pid_exists(pid):
+                continue
+            target = self.spill_folder / f"{self.spill_prefix}{self.pid}-{uuid.uuid4().hex}.replay"
+            try:
+                with self._spill_lock:
+                    path.rename(target)
+            except FileNotFoundError:  # claimed by another process
+                continue
+            claimed.append(target)
+        return claimed
+
+    def _replay(self) -> None:
+        now = time.monotonic()
+        if now < self._down_until or now - self._last_replay < UI_SETTING.web_storage_retry_interval:
+            return
+        self._last_replay = now
+        if not self.spill_folder.exists():
+            return
+        for path in self._claim_spill_files():
+            lines = path.read_text(encoding="utf-8").splitlines()
+            batch_size = UI_SETTING.web_storage_batch_size
+            for i in range(0, len(lines), batch_size):
+                if not self._ship(lines[i : i + batch_size], counter="replayed"):
+                    self._spill(lines[i + batch_size :], count=False)  # the failed batch is spilled by `_ship`
+                    break
+            path.unlink()
+
+
 class WebStorage(Storage):
     """
     The storage for web app.
     It is used to provide the data for the web app.
+    The messages are shipped by a `WebLogSender` created when the first message is logged.
     """
 
     def __init__(self, port: int, path: str) -> None:
@@ -26,30 +268,46 @@ class WebStorage(Storage):
         self.url = f"http://localhost:{port}"
         self.path = path
         self.msgs = []
+        self._sender: WebLogSender | None = None
+        self._sender_lock = threading.Lock()
 
     def __str__(self):
         return f"WebStorage({self.url})"
 
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_sender"] = None
+        state["_sender_lock"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._sender_lock = threading.Lock()
+
+    @property
+    def sender(self) -> WebLogSender:
+        with self._sender_lock:
+            if self._sender is None or self._sender.pid != os.getpid():  # the thread does not survive a fork
+                self._sender = WebLogSender(self.url)
+            return self._sender
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """The counters of the messages queued/sent/spilled/replayed/dropped by the sender"""
+        return self.sender.stats
+
     def log(self, obj: object, tag: str, timestamp: datetime | None = None, **kwargs: Any) -> str | Path:
         timestamp = gen_datetime(timestamp)
         if "pdf_image" in tag or "load_pdf_screenshot" in tag:
             Path(f"{UI_SETTING.static_path}/pdf_images").mkdir(parents=True, exist_ok=True)
             obj.save(f"{UI_SETTING.static_path}/pdf_images/{timestamp.isoformat()}.jpg")
 
-        try:
-            data = self._obj_to_json(obj=obj, tag=tag, id=str(self.path), timestamp=timestamp.isoformat())
-            if not data:
-                return "Normal log, skipped"
-            if isinstance(data, list):
-                for d in data:
-                    self.msgs.append(d)
-            else:
-                self.msgs.append(data)
-            headers = {"Content-Type": "application/json"}
-            resp = requests.post(f"{self.url}/receive", json=data, headers=headers, timeout=1)
-            return f"{resp.status_code} {resp.text}"
-        except (requests.ConnectionError, requests.Timeout) as e:
-            print(f"Failed to connect to the web storage server at {self.url}: {e}")
+        data = self._obj_to_json(obj=obj, tag=tag, id=str(self.path), timestamp=timestamp.isoformat())
+        if not data:
+            return "Normal log, skipped"
+        data = data if isinstance(data, list) else [data]
+        self.msgs.extend(data)
+        return self.sender.put(data)
 
     def truncate(self, time: datetime) -> None:
         self.msgs = [m for m in self.msgs if datetime.fromisoformat(m["msg"]["timestamp"]) <= time]
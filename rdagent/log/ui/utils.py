@@ -1,10 +1,12 @@
 import math
+import os
 import pickle
 import re
+import threading
 from collections import defaultdict, deque
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Literal
+from typing import Any, Callable, Literal
 
 import matplotlib.pyplot as plt
 import networkx as nx
@@ -179,8 +181,298 @@ if UI_SETTING.enable_cache:
     get_best_report = cache_with_pickle(_log_path_hash_func, force=True)(get_best_report)
 
 
-def _get_sota_exp_stat_hash_func(log_path: Path, selector: Literal["auto", "best_valid"] = "auto") -> str:
-    return _log_path_hash_func(log_path) + selector
+RUNNING_EXP_RE = re.compile(r"(?:^|/)running/[^/]+/[^/]+\.pkl$")  # `**/running/*/*.pkl`
+MLE_SCORE_RE = re.compile(r"(?:^|/)Loop_(\d+)/running/mle_score/")  # the tag `Loop_<id>.running.mle_score`
+DEBUG_TPL_RE = re.compile(r"^Loop_(\d+)/direct_exp_gen/debug_tpl/[^/]+/[^/]+\.pkl$")
+
+
+def _exp_fingerprint(exp: DSExperiment) -> str:
+    """Experiments with the same code and hypothesis have the same fingerprint"""
+    hypothesis = "".join(str(i) for i in exp.hypothesis.__dict__.values())
+    return md5_hash(f"{exp.experiment_workspace.all_codes}\0{hypothesis}")
+
+
+class RunSummary:
+    """
+    The statistics of a run (`load_times_info`, `get_sota_exp_stat` and `get_score_stat`) folded incrementally
+    from the messages of its log folder.
+
+    `update` reads the lines appended to the index of the `FileStorage` since the watermark of the last
+    update and sorts the new messages by what they are used for; the messages are only unpickled (once) when
+    a statistic needing them is asked for. The results are cached until the messages they depend on change.
+    When the index has been rewritten (e.g. the log folder has been truncated) the summary starts over.
+    """
+
+    VERSION = 1
+    KINDS = ("time_info", "exp_gen_time_info", "running", "mle_score", "debug_tpl")
+
+    def __init__(self, log_path: Path, persist: bool = True) -> None:
+        self.version = self.VERSION
+        self.log_path = Path(log_path)
+        self.persist = persist
+        self.lock = threading.RLock()
+        self.dirty = False
+        self.reset()
+
+    def reset(self) -> None:
+        self.watermark: tuple[int, int] | None = None
+        self.pending: dict[str, list[dict[str, Any]]] = {kind: [] for kind in self.KINDS}
+        self.versions: dict[str, int] = defaultdict(int)
+        # the folded messages
+        self.times: dict[int, dict[str, tuple[str, dict]]] = defaultdict(dict)  # loop -> step -> (timestamp, times)
+        self.running_loop_ids: dict[str, int] = {}  # fingerprint of an experiment -> the latest loop running it
+        self.mle_scores: dict[int, tuple[str, Any]] = {}  # loop -> (timestamp, content) of its first mle score
+        self.merge_loop_ids: set[int] = set()
+        self.latest: dict[str, dict[str, Any]] = {}  # "trace"/"sota_exp_to_submit" -> the latest index entry
+        self.trace_tags: list[tuple[str, str]] = []  # (timestamp, tag) of the trace messages
+        self.results: dict[Any, tuple[tuple[int, ...], Any]] = {}  # name -> (versions of its inputs, result)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def cache_path(log_path: Path) -> Path:
+        return Path(UI_SETTING.summary_cache_folder) / f"{md5_hash(str(Path(log_path).absolute()))}.pkl"
+
+    @classmethod
+    def load(cls, log_path: Path) -> "RunSummary":
+        try:
+            with cls.cache_path(log_path).open("rb") as f:
+                summary = pickle.load(f)
+            if isinstance(summary, cls) and summary.version == cls.VERSION and summary.log_path == Path(log_path):
+                return summary
+        except Exception:  # noqa: BLE001  missing, corrupted or from an incompatible version
+            pass
+        return cls(log_path)
+
+    def save(self) -> None:
+        if not (self.persist and self.dirty):
+            return
+        path = self.cache_path(self.log_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with self.lock:
+            with tmp.open("wb") as f:
+                pickle.dump(self, f)
+            os.replace(tmp, path)
+            self.dirty = False
+
+    def update(self) -> None:
+        """Sort the messages logged since the last update"""
+        with self.lock:
+            storage = FileStorage(self.log_path)
+            entries, watermark = storage.read_index(self.watermark)
+            if self.watermark is None or watermark[0] != self.watermark[0] or watermark[0] == -1:
+                self.reset()  # `entries` are all the entries of the index
+            self.watermark = watermark
+            if not entries:
+                return
+            self.dirty = True
+            for e in entries:
+                path = e["path"]
+                if storage.entry_has_tag(e, "time_info"):
+                    self.pending["time_info"].append(e)
+                elif storage.entry_has_tag(e, "exp_gen_time_info"):
+                    self.pending["exp_gen_time_info"].append(e)
+                if storage.entry_has_tag(e, "trace"):
+                    self.trace_tags.append((e["timestamp"], e["tag"]))
+                for kind in ("trace", "sota_exp_to_submit"):
+                    if storage.entry_has_tag(e, kind) and e["timestamp"] >= self.latest.get(kind, {}).get(
+                        "timestamp", ""
+                    ):
+                        self.latest[kind] = e
+                        self.versions[kind] += 1
+                if RUNNING_EXP_RE.search(path) and re.search(r".*Loop_(\d+).*", e["tag"]):
+                    self.pending["running"].append(e)
+                if MLE_SCORE_RE.search(path):
+                    self.pending["mle_score"].append(e)
+                if DEBUG_TPL_RE.match(path):
+                    self.pending["debug_tpl"].append(e)
+
+    def _fold(self, kind: str) -> None:
+        """Unpickle the pending messages of a kind into the summary"""
+        entries, self.pending[kind] = self.pending[kind], []
+        if not entries:
+            return
+        self.dirty = True
+        self.versions[kind] += 1
+        storage = FileStorage(self.log_path)
+        for e in entries:
+            msg = storage.load_msg(e)
+            if msg is None:
+                continue
+            if kind in ("time_info", "exp_gen_time_info"):
+                li, fn = extract_loopid_func_name(msg.tag)
+                if li is None:
+                    continue
+                step = "exp_gen" if kind == "exp_gen_time_info" else fn
+                if e["timestamp"] >= self.times[int(li)].get(step, ("",))[0]:
+                    self.times[int(li)][step] = (e["timestamp"], msg.content)
+            elif kind == "running":
+                loop_id = int(re.search(r".*Loop_(\d+).*", e["tag"])[1])
+                try:
+                    fingerprint = _exp_fingerprint(msg.content)
+                except AttributeError:  # not an experiment
+                    continue
+                self.running_loop_ids[fingerprint] = max(loop_id, self.running_loop_ids.get(fingerprint, loop_id))
+            elif kind == "mle_score":
+                loop_id = int(MLE_SCORE_RE.search(e["path"])[1])
+                if loop_id not in self.mle_scores or e["timestamp"] < self.mle_scores[loop_id][0]:
+                    self.mle_scores[loop_id] = (e["timestamp"], msg.content)
+            elif kind == "debug_tpl":
+                uri = msg.content.get("uri") if isinstance(msg.content, dict) else getattr(msg.content, "uri", None)
+                if isinstance(uri, str) and "scenarios.data_science.proposal.exp_gen.merge" in uri:
+                    self.merge_loop_ids.add(int(DEBUG_TPL_RE.match(e["path"])[1]))
+
+    def _cached(self, name: Any, inputs: tuple[str, ...], compute: Callable[[], Any]) -> Any:
+        """The result of `compute`, computed again only when the messages of its `inputs` kinds have changed"""
+        for kind in inputs:
+            if kind in self.pending:
+                self._fold(kind)
+        versions = tuple(self.versions[kind] for kind in inputs)
+        if name not in self.results or self.results[name][0] != versions:
+            self.results[name] = (versions, compute())
+            self.dirty = True
+        return self.results[name][1]
+
+    def _load_latest(self, kind: str) -> Any:
+        e = self.latest.get(kind)
+        msg = FileStorage(self.log_path).load_msg(e) if e is not None else None
+        return None if msg is None else msg.content
+
+    def _trace_info(self) -> tuple[DSExperiment | None, list[tuple[int, bool, float | None]] | None]:
+        """The SOTA experiment selected by the best valid score and the (loop id, decision, valid score) of the nodes
+        of the final trace"""
+
+        def compute():
+            final_trace = self._load_latest("trace")
+            if final_trace is None:
+                return None, None
+            final_trace.scen.metric_direction = get_metric_direction(
+                final_trace.scen.competition
+            )  # FIXME: remove this later.
+            best_valid = BestValidSelector().get_sota_exp_to_submit(final_trace)
+            trace_tags = [tag for _, tag in sorted(self.trace_tags)]
+            nodes = []
+            for loop_index, (exp, fb) in enumerate(final_trace.hist):
+                if hasattr(final_trace, "idx2loop_id"):
+                    loop_id = final_trace.idx2loop_id[loop_index]
+                else:
+                    loop_id = int(re.search(r"\d+", trace_tags[loop_index]).group())
+                valid_score = None
+                if fb.decision:
+                    try:
+                        valid_score = pd.DataFrame(exp.result).loc["ensemble"].iloc[0]
+                    except Exception:  # noqa: BLE001  no valid score
+                        pass
+                nodes.append((loop_id, bool(fb.decision), valid_score))
+            return best_valid, nodes
+
+        return self._cached("trace_info", ("trace",), compute)
+
+    def times_info(self) -> dict[int, dict[str, dict[Literal["start_time", "end_time"], datetime]]]:
+        with self.lock:
+            times = self._cached(
+                "times_info",
+                ("time_info", "exp_gen_time_info"),
+                lambda: {li: {fn: t for fn, (_, t) in steps.items()} for li, steps in self.times.items()},
+            )
+            self.save()
+        return defaultdict(dict, {li: dict(steps) for li, steps in times.items()})
+
+    def sota_exp_stat(
+        self, selector: Literal["auto", "best_valid"] = "auto"
+    ) -> tuple[DSExperiment | None, int | None, dict | None, str | None]:
+        def compute():
+            if selector == "auto":
+                sota_exp = self._load_latest("sota_exp_to_submit")
+            else:
+                sota_exp = self._trace_info()[0]
+            if sota_exp is None:
+                return None, None, None, None
+            sota_loop_id = self.running_loop_ids.get(_exp_fingerprint(sota_exp))
+            try:
+                sota_mle_score = extract_json(self.mle_scores[sota_loop_id][1])
+            except Exception:
+                # sota exp is not tested yet
+                return sota_exp, sota_loop_id, None, None
+            return sota_exp, sota_loop_id, sota_mle_score, map_stat(sota_mle_score)
+
+        source = "sota_exp_to_submit" if selector == "auto" else "trace"
+        with self.lock:
+            res = self._cached(("sota_exp_stat", selector), (source, "running", "mle_score"), compute)
+            self.save()
+        return res
+
+    def score_stat(self, sota_loop_id: int | None) -> tuple[float | None, float | None, bool | None, float | None]:
+        def compute():
+            nodes = self._trace_info()[1]
+            if nodes is None:
+                return None, None, None, None
+            valid_before_merge, test_before_merge, valid_after_merge, test_after_merge = [], [], [], []
+            submit_is_merge = is_lower_better = valid_improve = test_improve = False
+            total_merge_loops = 0
+            for loop_id, decision, valid_score in nodes:
+                is_merge = loop_id in self.merge_loop_ids
+                if is_merge:
+                    total_merge_loops += 1
+                    submit_is_merge = submit_is_merge or sota_loop_id == loop_id
+                if not decision or loop_id not in self.mle_scores or valid_score is None:
+                    continue
+                try:
+                    mle_score = extract_json(self.mle_scores[loop_id][1])
+                except Exception:
+                    continue
+                if not mle_score:
+                    continue
+                is_lower_better = mle_score.get("is_lower_better", False)
+                if is_merge:
+                    valid_after_merge.append(valid_score)
+                    if mle_score["score"] is not None:
+                        test_after_merge.append(mle_score["score"])
+                else:
+                    valid_before_merge.append(valid_score)
+                    if mle_score["score"] is not None:
+                        test_before_merge.append(mle_score["score"])
+
+            best = min if is_lower_better else max
+            better = (lambda a, b: a < b) if is_lower_better else (lambda a, b: a > b)
+            if valid_after_merge:
+                valid_improve = not valid_before_merge or better(best(valid_after_merge), best(valid_before_merge))
+            if test_after_merge:
+                test_improve = not test_before_merge or better(best(test_after_merge), best(test_before_merge))
+            merge_sota_rate = 0 if not total_merge_loops else len(test_after_merge) / total_merge_loops
+            return valid_improve, test_improve, submit_is_merge, merge_sota_rate
+
+        with self.lock:
+            res = self._cached(("score_stat", sota_loop_id), ("trace", "debug_tpl", "mle_score"), compute)
+            self.save()
+        return res
+
+
+_RUN_SUMMARIES: dict[str, RunSummary] = {}
+
+
+def get_run_summary(log_path: Path) -> RunSummary:
+    """
+    The up-to-date `RunSummary` of a log folder: kept in memory and persisted in `UI_SETTING.summary_cache_folder`
+    when `UI_SETTING.enable_cache`, otherwise built from all the messages on each call.
+    """
+    if UI_SETTING.enable_cache:
+        key = str(Path(log_path).absolute())
+        summary = _RUN_SUMMARIES.get(key)
+        if summary is None:
+            summary = _RUN_SUMMARIES[key] = RunSummary.load(log_path)
+    else:
+        summary = RunSummary(log_path, persist=False)
+    summary.update()
+    return summary
 
 
 def get_sota_exp_stat(
@@ -209,58 +501,7 @@ def get_sota_exp_stat(
         - sota_exp_stat : str or None
             The medal status string ("gold", "silver", "bronze", etc.) or None if not found.
     """
-    log_storage = FileStorage(log_path)
-
-    # get sota exp
-    sota_exp = None
-    if selector == "auto":
-        sota_exp_list = [i.content for i in log_storage.iter_msg(tag="sota_exp_to_submit")]
-        sota_exp = sota_exp_list[-1] if sota_exp_list else None
-    elif selector == "best_valid":
-        trace_list = [i.content for i in log_storage.iter_msg(tag="trace")]
-        if trace_list:
-            final_trace = trace_list[-1]
-            final_trace.scen.metric_direction = get_metric_direction(
-                final_trace.scen.competition
-            )  # FIXME: remove this later.
-            bvs = BestValidSelector()
-            sota_exp = bvs.get_sota_exp_to_submit(final_trace)
-
-    if sota_exp is None:
-        return None, None, None, None
-
-    # find sota exp's loop id
-    sota_loop_id = None
-    running_exps: list[tuple[DSExperiment, int]] = [
-        (i.content, int(re.search(r".*Loop_(\d+).*", str(i.tag))[1]))
-        for i in log_storage.iter_msg(pattern="**/running/*/*.pkl")
-    ]
-    running_exps.sort(key=lambda x: x[1], reverse=True)
-    for exp, loop_id in running_exps:
-        if exp.experiment_workspace.all_codes == sota_exp.experiment_workspace.all_codes and "".join(
-            str(i) for i in exp.hypothesis.__dict__.values()
-        ) == "".join(str(i) for i in sota_exp.hypothesis.__dict__.values()):
-            sota_loop_id = loop_id
-            break
-
-    # get sota exp's mle score
-    try:
-        sota_mle_score = extract_json(
-            [i.content for i in log_storage.iter_msg(tag=f"Loop_{sota_loop_id}.running.mle_score")][0]
-        )
-    except Exception as e:
-        # sota exp is not tested yet
-        return sota_exp, sota_loop_id, None, None
-
-    return sota_exp, sota_loop_id, sota_mle_score, map_stat(sota_mle_score)
-
-
-if UI_SETTING.enable_cache:
-    get_sota_exp_stat = cache_with_pickle(_get_sota_exp_stat_hash_func, force=True)(get_sota_exp_stat)
-
-
-def _get_score_stat_hash_func(log_path: Path, sota_loop_id: int) -> str:
-    return _log_path_hash_func(log_path) + str(sota_loop_id)
+    return get_run_summary(log_path).sota_exp_stat(selector)
 
 
 def get_score_stat(log_path: Path, sota_loop_id: int) -> tuple[float | None, float | None, bool | None, float | None]:
@@ -287,79 +528,7 @@ def get_score_stat(log_path: Path, sota_loop_id: int) -> tuple[float | None, flo
         - merge_sota_rate : float | None
             The merge sota rate.
     """
-    valid_before_merge = []
-    test_before_merge = []
-    valid_after_merge = []
-    test_after_merge = []
-    submit_is_merge = False
-    is_lower_better = False
-    valid_improve = False
-    test_improve = False
-    total_merge_loops = 0
-    log_storage = FileStorage(log_path)
-    all_trace = list(log_storage.iter_msg(tag="trace"))
-    if all_trace:
-        final_trace = all_trace[-1].content
-    else:
-        return None, None, None, None
-    for loop_index, (exp, fb) in enumerate(final_trace.hist):
-        if hasattr(final_trace, "idx2loop_id"):
-            loop_id = final_trace.idx2loop_id[loop_index]
-        else:
-            loop_id = int(re.search(r"\d+", all_trace[loop_index].tag).group())
-
-        is_merge = False
-        direct_exp_gen = log_storage.iter_msg(pattern=f"Loop_{loop_id}/direct_exp_gen/debug_tpl/*/*.pkl")
-        for tr in direct_exp_gen:
-            uri = tr.content.get("uri") if isinstance(tr.content, dict) else getattr(tr.content, "uri", None)
-            if isinstance(uri, str) and "scenarios.data_science.proposal.exp_gen.merge" in uri:
-                is_merge = True
-                total_merge_loops += 1
-                if sota_loop_id == loop_id:
-                    submit_is_merge = True
-                break
-        if not fb.decision:
-            continue
-
-        try:
-            mle_score = extract_json(
-                [i.content for i in log_storage.iter_msg(tag=f"Loop_{loop_id}.running.mle_score")][0]
-            )
-        except Exception:
-            continue
-
-        if not mle_score:
-            continue
-
-        is_lower_better = mle_score.get("is_lower_better", False)
-        valid_score = pd.DataFrame(exp.result).loc["ensemble"].iloc[0]
-
-        if is_merge:
-            valid_after_merge.append(valid_score)
-            if mle_score["score"] is not None:
-                test_after_merge.append(mle_score["score"])
-        else:
-            valid_before_merge.append(valid_score)
-            if mle_score["score"] is not None:
-                test_before_merge.append(mle_score["score"])
-
-    if is_lower_better:
-        if valid_after_merge:
-            valid_improve = not valid_before_merge or min(valid_after_merge) < min(valid_before_merge)
-        if test_after_merge:
-            test_improve = not test_before_merge or min(test_after_merge) < min(test_before_merge)
-    else:
-        if valid_after_merge:
-            valid_improve = not valid_before_merge or max(valid_after_merge) > max(valid_before_merge)
-        if test_after_merge:
-            test_improve = not test_before_merge or max(test_after_merge) > max(test_before_merge)
-
-    merge_sota_rate = 0 if not total_merge_loops else len(test_after_merge) / total_merge_loops
-    return valid_improve, test_improve, submit_is_merge, merge_sota_rate
-
-
-if UI_SETTING.enable_cache:
-    get_score_stat = cache_with_pickle(_get_score_stat_hash_func, force=True)(get_score_stat)
+    return get_run_summary(log_path).score_stat(sota_loop_id)
 
 
 def load_times_deprecated(log_path: Path):
@@ -403,21 +572,7 @@ def load_times_info(log_path: Path) -> dict[int, dict[str, dict[Literal["start_t
                 },
             }
     """
-    log_storage = FileStorage(log_path)
-    time_msgs = list(log_storage.iter_msg(tag="time_info"))
-    exp_gen_time_msgs = list(log_storage.iter_msg(tag="exp_gen_time_info"))
-    times_info = defaultdict(dict)
-    for msg in time_msgs:
-        li, fn = extract_loopid_func_name(msg.tag)
-        times_info[int(li)][fn] = msg.content
-    for msg in exp_gen_time_msgs:
-        li, fn = extract_loopid_func_name(msg.tag)
-        times_info[int(li)]["exp_gen"] = msg.content
-    return times_info
-
-
-if UI_SETTING.enable_cache:
-    load_times_info = cache_with_pickle(_log_path_hash_func, force=True)(load_times_info)
+    return get_run_summary(log_path).times_info()
 
 
 def _log_folders_summary_hash_func(log_folder: str | Path, hours: int | None = None):
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import io
 import json
+import multiprocessing
+import os
 import re
 import sqlite3
+import threading
 import time
 import tokenize
 import uuid
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, List, Optional, Tuple, Type, Union, cast
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, Type, Union, cast
 
 import pytz
 from pydantic import BaseModel, TypeAdapter
@@ -23,6 +29,7 @@ from rdagent.log import rdagent_logger as logger
 from rdagent.log.timer import RD_Agent_TIMER_wrapper
 from rdagent.oai.llm_conf import LLM_SETTINGS
 from rdagent.oai.utils.embedding import truncate_content_list
+from rdagent.oai.utils.rate_limit import backoff_seconds, get_rate_limiter
 from rdagent.utils import md5_hash
 
 try:
@@ -271,10 +278,213 @@ class SQliteLazyCache(SingletonBaseClass):
         return None
 
 
+class _LRUCache:
+    """A small thread-safe LRU mapping used in front of the sqlite cache."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def reset_lock(self) -> None:
+        """The lock may be held by another thread at fork time, so the child needs a fresh one."""
+        self._lock = threading.Lock()
+
+
+class SQliteWALCache(SQliteLazyCache):
+    """
+    Multi-process friendly variant of `SQliteLazyCache` (enabled by `prompt_cache_engine="sqlite_wal"`).
+    It shares the same schema, so the two engines can read and write the same database file.
+
+    - The database runs in WAL journal mode with `synchronous=NORMAL`, so readers do not block the writer
+      and a commit does not fsync the main database file.
+    - The connection is created lazily and bound to the current pid. A forked child (e.g. a worker of
+      `multiprocessing_wrapper`) opens its own connection instead of reusing the parent's one.
+    - Writes are buffered and committed in a single transaction when `prompt_cache_batch_size` writes are
+      pending or the oldest pending write is older than `prompt_cache_flush_interval` seconds.
+      Pending writes are flushed by a background thread, before forking and at exit.
+    - In a child process every write is committed right away: pool workers exit through `os._exit` (or are
+      terminated), which skips both the exit hooks and the background thread.
+    - Reads go through an in-memory LRU and the pending writes before touching the database.
+    """
+
+    # logical name -> (table, key column, value column)
+    _TABLES: dict[str, tuple[str, str, str]] = {
+        "chat": ("chat_cache", "md5_key", "chat"),
+        "embedding": ("embedding_cache", "md5_key", "embedding"),
+        "message": ("message_cache", "conversation_id", "message"),
+    }
+
+    def __init__(self, cache_location: str) -> None:
+        # SingletonBaseClass returns the same instance for the same kwargs but `__init__` is still called.
+        if getattr(self, "_initialized", False):
+            return
+        self.cache_location = cache_location
+        self.batch_size = max(1, LLM_SETTINGS.prompt_cache_batch_size)
+        self.flush_interval = LLM_SETTINGS.prompt_cache_flush_interval
+        self._lru = _LRUCache(LLM_SETTINGS.prompt_cache_lru_size)
+        self._reset_process_state()
+        os.register_at_fork(before=self.flush, after_in_child=lambda: self._reset_process_state(forked=True))
+        atexit.register(self.close)
+        with self._lock:
+            self._get_conn()  # make sure the tables exist
+        self._initialized = True
+
+    def _reset_process_state(self, forked: bool = False) -> None:
+        """
+        Reset everything that must not be shared across processes.
+        Pending writes inherited by a forked child are dropped; they belong to (and are flushed by) the parent.
+        """
+        # multiprocessing only records the parent after the fork hooks have run, so a fork is recorded here
+        self._sync_writes = forked or multiprocessing.parent_process() is not None
+        self._lock = threading.RLock()
+        self._lru.reset_lock()
+        self._pending: dict[str, dict[str, str]] = {name: {} for name in self._TABLES}
+        self._oldest_pending: float | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self._flusher: threading.Thread | None = None
+        self._flusher_stop = threading.Event()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        """Return the connection of the current process; the caller must hold `self._lock`."""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.cache_location, timeout=20, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for table, key_col, value_col in self._TABLES.values():
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({key_col} TEXT PRIMARY KEY, {value_col} TEXT)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._flusher_stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, args=(self._flusher_stop,), daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self, stop: threading.Event) -> None:
+        while not stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                # keep the pending writes and retry in the next round
+                logger.warning(f"Failed to flush the prompt cache: {e}")
+
+    def _get(self, name: str, key: str) -> str | None:
+        lru_key = f"{name}:{key}"
+        value = self._lru.get(lru_key)
+        if value is not None:
+            return value
+        with self._lock:
+            value = self._pending[name].get(key)
+            if value is None:
+                table, key_col, value_col = self._TABLES[name]
+                row = self._get_conn().execute(f"SELECT {value_col} FROM {table} WHERE {key_col}=?", (key,)).fetchone()
+                value = None if row is None else row[0]
+        if value is not None:
+            self._lru.put(lru_key, value)
+        return value
+
+    def _set(self, name: str, items: list[tuple[str, str]]) -> None:
+        with self._lock:
+            for key, value in items:
+                self._pending[name][key] = value
+                self._lru.put(f"{name}:{key}", value)
+            now = time.monotonic()
+            if self._oldest_pending is None:
+                self._oldest_pending = now
+            n_pending = sum(len(p) for p in self._pending.values())
+            if self._sync_writes or n_pending >= self.batch_size or now - self._oldest_pending >= self.flush_interval:
+                self._flush_locked()
+            else:
+                self._ensure_flusher()
+
+    def _flush_locked(self) -> None:
+        if not any(self._pending.values()):
+            return
+        conn = self._get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for name, pending in self._pending.items():
+                if pending:
+                    table, key_col, value_col = self._TABLES[name]
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO {table} ({key_col}, {value_col}) VALUES (?, ?)",
+                        list(pending.items()),
+                    )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        for pending in self._pending.values():
+            pending.clear()
+        self._oldest_pending = None
+
+    def flush(self) -> None:
+        """Commit all pending writes of the current process in one transaction."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        self._flusher_stop.set()
+        with self._lock:
+            self._flush_locked()
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+
+    def chat_get(self, key: str) -> str | None:
+        return self._get("chat", md5_hash(key))
+
+    def embedding_get(self, key: str) -> list | dict | str | None:
+        result = self._get("embedding", md5_hash(key))
+        return None if result is None else json.loads(result)
+
+    def chat_set(self, key: str, value: str) -> None:
+        self._set("chat", [(md5_hash(key), value)])
+
+    def embedding_set(self, content_to_embedding_dict: dict) -> None:
+        self._set("embedding", [(md5_hash(k), json.dumps(v)) for k, v in content_to_embedding_dict.items()])
+
+    def message_get(self, conversation_id: str) -> list[dict[str, Any]]:
+        result = self._get("message", conversation_id)
+        return [] if result is None else cast(list[dict[str, Any]], json.loads(result))
+
+    def message_set(self, conversation_id: str, message_value: list[dict[str, Any]]) -> None:
+        self._set("message", [(conversation_id, json.dumps(message_value))])
+
+
+def get_prompt_cache(cache_location: str) -> SQliteLazyCache:
+    """Build the prompt cache according to `LLM_SETTINGS.prompt_cache_engine`."""
+    if LLM_SETTINGS.prompt_cache_engine == "sqlite_wal":
+        return SQliteWALCache(cache_location=cache_location)
+    return SQliteLazyCache(cache_location=cache_location)
+
+
 class SessionChatHistoryCache(SingletonBaseClass):
     def __init__(self) -> None:
         """load all history conversation json file from self.session_cache_location"""
-        self.cache = SQliteLazyCache(cache_location=LLM_SETTINGS.prompt_cache_path)
+        self.cache = get_prompt_cache(cache_location=LLM_SETTINGS.prompt_cache_path)
 
     def message_get(self, conversation_id: str) -> list[dict[str, Any]]:
         return self.cache.message_get(conversation_id)
@@ -350,6 +560,43 @@ class ChatSession:
         pass
 
 
+_INFLIGHT_CHAT_COMPLETIONS: dict[str, asyncio.Future] = {}
+
+
+async def _coalesce_inflight(key: str, create: Callable[[], Awaitable[str]]) -> str:
+    """
+    Await the call for `key` already in flight in the running event loop if any, otherwise run `create()`
+    and share its result (or error) with the callers arriving before it finishes.
+    """
+    loop = asyncio.get_running_loop()
+    inflight = _INFLIGHT_CHAT_COMPLETIONS.get(key)
+    if inflight is not None and inflight.get_loop() is loop:
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            if not inflight.cancelled():
+                raise  # the caller itself is cancelled
+            # the shared call is cancelled, make our own
+
+    future = loop.create_future()
+    _INFLIGHT_CHAT_COMPLETIONS[key] = future
+    try:
+        result = await create()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark it as retrieved even if nobody else waits for it
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        if _INFLIGHT_CHAT_COMPLETIONS.get(key) is future:
+            del _INFLIGHT_CHAT_COMPLETIONS[key]
+
+
 class APIBackend(ABC):
     """
     Abstract base class for LLM API backends
@@ -374,9 +621,10 @@ class APIBackend(ABC):
         )
         if self.dump_chat_cache or self.use_chat_cache or self.dump_embedding_cache or self.use_embedding_cache:
             self.cache_file_location = LLM_SETTINGS.prompt_cache_path
-            self.cache = SQliteLazyCache(cache_location=self.cache_file_location)
+            self.cache = get_prompt_cache(cache_location=self.cache_file_location)
 
         self.retry_wait_seconds = LLM_SETTINGS.retry_wait_seconds
+        self.rate_limiter = get_rate_limiter()
 
     def build_chat_session(
         self,
@@ -502,6 +750,61 @@ class APIBackend(ABC):
             return resp[0]  # type: ignore[return-value]
         return resp  # type: ignore[return-value]
 
+    async def acreate_chat_completion(  # type: ignore[no-untyped-def]
+        self,
+        user_prompt: str,
+        system_prompt: str | None = None,
+        former_messages: list | None = None,
+        chat_cache_prefix: str = "",
+        shrink_multiple_break: bool = False,
+        *args,
+        **kwargs,
+    ) -> str:
+        """
+        The async counterpart of `build_messages_and_create_chat_completion`, so concurrent steps can share one
+        event loop. All the calls of the process share the client-side rate limiter (`LLM_SETTINGS.rpm_limit`,
+        `LLM_SETTINGS.tpm_limit`), and identical prompts in flight at the same time share one call when the
+        chat cache is used.
+        """
+        if former_messages is None:
+            former_messages = []
+        messages = self._build_messages(
+            user_prompt,
+            system_prompt,
+            former_messages,
+            shrink_multiple_break=shrink_multiple_break,
+        )
+
+        start_time = datetime.now(pytz.timezone("Asia/Shanghai"))
+        resp = await self._atry_create_chat_completion_or_embedding(  # type: ignore[misc]
+            *args,
+            messages=messages,
+            chat_completion=True,
+            chat_cache_prefix=chat_cache_prefix,
+            **kwargs,
+        )
+        end_time = datetime.now(pytz.timezone("Asia/Shanghai"))
+        if isinstance(resp, list):
+            raise ValueError("The response of _atry_create_chat_completion_or_embedding should be a string.")
+        logger.log_object(
+            {"system": system_prompt, "user": user_prompt, "resp": resp, "start": start_time, "end": end_time},
+            tag="debug_llm",
+        )
+        return resp
+
+    async def acreate_embedding(self, input_content: str | list[str], *args, **kwargs) -> list[float] | list[list[float]]:  # type: ignore[no-untyped-def]
+        """The async counterpart of `create_embedding`"""
+        input_content_list = [input_content] if isinstance(input_content, str) else input_content
+        resp = await self._atry_create_chat_completion_or_embedding(  # type: ignore[misc]
+            input_content_list=input_content_list,
+            embedding=True,
+            *args,
+            **kwargs,
+        )
+        if isinstance(input_content, str):
+            return resp[0]  # type: ignore[return-value]
+        return resp  # type: ignore[return-value]
+
     def build_messages_and_calculate_token(
         self,
         user_prompt: str,
@@ -528,9 +831,7 @@ class APIBackend(ABC):
         """This function to share operation between embedding and chat completion"""
         assert not (chat_completion and embedding), "chat_completion and embedding cannot be True at the same time"
         max_retry = LLM_SETTINGS.max_retry if LLM_SETTINGS.max_retry is not None else max_retry
-        timeout_count = 0
-        violation_count = 0
-        embedding_truncated = False  # Track if we've already tried truncation
+        retry_state = {"timeout_count": 0, "violation_count": 0, "embedding_truncated": False}
         for i in range(max_retry):
             API_start_time = datetime.now()
             try:
@@ -539,72 +840,39 @@ class APIBackend(ABC):
                 if chat_completion:
                     return self._create_chat_completion_auto_continue(*args, **kwargs)
             except Exception as e:  # noqa: BLE001
-                if hasattr(e, "message") and (
-                    "'messages' must contain the word 'json' in some form" in e.message
-                    or "\\'messages\\' must contain the word \\'json\\' in some form" in e.message
-                ):
-                    kwargs["add_json_in_prompt"] = True
-
-                too_long_error_message = hasattr(e, "message") and (
-                    "maximum context length" in e.message or "input must have less than" in e.message
-                )
+                wait_seconds = self._handle_retry_error(e, i, embedding, retry_state, kwargs)
+                if wait_seconds is not None:
+                    time.sleep(wait_seconds)
+                    if RD_Agent_TIMER_wrapper.timer.started and not isinstance(e, json.decoder.JSONDecodeError):
+                        RD_Agent_TIMER_wrapper.timer.add_duration(datetime.now() - API_start_time)
+                logger.warning(str(e))
+                logger.warning(f"Retrying {i+1}th time...")
+        error_message = f"Failed to create chat completion after {max_retry} retries."
+        raise RuntimeError(error_message)
 
-                if embedding and too_long_error_message:
-                    if not embedding_truncated:
-                        # Handle embedding text too long error - truncate once and retry
-                        model_name = LLM_SETTINGS.embedding_model
-                        logger.warning(f"Embedding text too long for model {model_name}, truncating content")
-
-                        # Apply truncation to content list and continue to retry
-                        original_content_list = kwargs.get("input_content_list", [])
-                        kwargs["input_content_list"] = truncate_content_list(original_content_list, model_name)
-                        embedding_truncated = True  # Mark that we've tried truncation
-                        # Continue to next iteration to retry embedding with truncated content
-                    else:
-                        # Already tried truncation, raise error with guidance
-                        raise RuntimeError(
-                            f"Embedding failed even after truncation. "
-                            f"Please set LLM_SETTINGS.embedding_max_length to a smaller value."
-                        ) from e
-                else:
-                    RD_Agent_TIMER_wrapper.api_fail_count += 1
-                    RD_Agent_TIMER_wrapper.latest_api_fail_time = datetime.now(pytz.timezone("Asia/Shanghai"))
-
-                    if (
-                        openai_imported
-                        and isinstance(e, litellm.BadRequestError)
-                        and (
-                            isinstance(e.__cause__, litellm.ContentPolicyViolationError)
-                            or "The response was filtered due to the prompt triggering Azure OpenAI's content management policy"
-                            in str(e)
-                        )
-                    ):
-                        violation_count += 1
-                        if violation_count >= LLM_SETTINGS.violation_fail_limit:
-                            logger.warning("Content policy violation detected.")
-                            raise PolicyError(e)
-
-                    if (
-                        openai_imported
-                        and isinstance(e, openai.APITimeoutError)
-                        or (
-                            isinstance(e, openai.APIError)
-                            and hasattr(e, "message")
-                            and "Your resource has been temporarily blocked because we detected behavior that may violate our content policy."
-                            in e.message
-                        )
-                    ):
-                        timeout_count += 1
-                        if timeout_count >= LLM_SETTINGS.timeout_fail_limit:
-                            logger.warning("Timeout error, please check your network connection.")
-                            raise e
-
-                    recommended_wait_seconds = self.retry_wait_seconds
-                    if openai_imported and isinstance(e, openai.RateLimitError) and hasattr(e, "message"):
-                        match = re.search(r"Please retry after (\d+) seconds\.", e.message)
-                        if match:
-                            recommended_wait_seconds = int(match.group(1))
-                    time.sleep(recommended_wait_seconds)
+    async def _atry_create_chat_completion_or_embedding(  # type: ignore[no-untyped-def]
+        self,
+        max_retry: int = 10,
+        chat_completion: bool = False,
+        embedding: bool = False,
+        *args,
+        **kwargs,
+    ) -> str | list[list[float]]:
+        """The async counterpart of `_try_create_chat_completion_or_embedding`"""
+        assert not (chat_completion and embedding), "chat_completion and embedding cannot be True at the same time"
+        max_retry = LLM_SETTINGS.max_retry if LLM_SETTINGS.max_retry is not None else max_retry
+        retry_state = {"timeout_count": 0, "violation_count": 0, "embedding_truncated": False}
+        for i in range(max_retry):
+            API_start_time = datetime.now()
+            try:
+                if embedding:
+                    return await self._acreate_embedding_with_cache(*args, **kwargs)
+                if chat_completion:
+                    return await self._acreate_chat_completion_auto_continue(*args, **kwargs)
+            except Exception as e:  # noqa: BLE001
+                wait_seconds = self._handle_retry_error(e, i, embedding, retry_state, kwargs)
+                if wait_seconds is not None:
+                    await asyncio.sleep(wait_seconds)
                     if RD_Agent_TIMER_wrapper.timer.started and not isinstance(e, json.decoder.JSONDecodeError):
                         RD_Agent_TIMER_wrapper.timer.add_duration(datetime.now() - API_start_time)
                 logger.warning(str(e))
@@ -612,6 +880,79 @@ class APIBackend(ABC):
         error_message = f"Failed to create chat completion after {max_retry} retries."
         raise RuntimeError(error_message)
 
+    def _handle_retry_error(
+        self, e: Exception, attempt: int, embedding: bool, retry_state: dict[str, Any], kwargs: dict[str, Any]
+    ) -> float | None:
+        """
+        Shared by the sync and async retry loops: raise if `e` must not be retried, update `kwargs` for the next
+        attempt and return the seconds to wait before it (None if the next attempt does not need to wait).
+        """
+        if hasattr(e, "message") and (
+            "'messages' must contain the word 'json' in some form" in e.message
+            or "\\'messages\\' must contain the word \\'json\\' in some form" in e.message
+        ):
+            kwargs["add_json_in_prompt"] = True
+
+        too_long_error_message = hasattr(e, "message") and (
+            "maximum context length" in e.message or "input must have less than" in e.message
+        )
+
+        if embedding and too_long_error_message:
+            if not retry_state["embedding_truncated"]:
+                # Handle embedding text too long error - truncate once and retry
+                model_name = LLM_SETTINGS.embedding_model
+                logger.warning(f"Embedding text too long for model {model_name}, truncating content")
+
+                # Apply truncation to content list and continue to retry
+                original_content_list = kwargs.get("input_content_list", [])
+                kwargs["input_content_list"] = truncate_content_list(original_content_list, model_name)
+                retry_state["embedding_truncated"] = True  # Mark that we've tried truncation
+                # Continue to next iteration to retry embedding with truncated content
+                return None
+            # Already tried truncation, raise error with guidance
+            raise RuntimeError(
+                f"Embedding failed even after truncation. "
+                f"Please set LLM_SETTINGS.embedding_max_length to a smaller value."
+            ) from e
+
+        RD_Agent_TIMER_wrapper.api_fail_count += 1
+        RD_Agent_TIMER_wrapper.latest_api_fail_time = datetime.now(pytz.timezone("Asia/Shanghai"))
+
+        if (
+            openai_imported
+            and isinstance(e, litellm.BadRequestError)
+            and (
+                isinstance(e.__cause__, litellm.ContentPolicyViolationError)
+                or "The response was filtered due to the prompt triggering Azure OpenAI's content management policy"
+                in str(e)
+            )
+        ):
+            retry_state["violation_count"] += 1
+            if retry_state["violation_count"] >= LLM_SETTINGS.violation_fail_limit:
+                logger.warning("Content policy violation detected.")
+                raise PolicyError(e)
+
+        if (
+            openai_imported
+            and isinstance(e, openai.APITimeoutError)
+            or (
+                isinstance(e, openai.APIError)
+                and hasattr(e, "message")
+                and "Your resource has been temporarily blocked because we detected behavior that may violate our content policy."
+                in e.message
+            )
+        ):
+            retry_state["timeout_count"] += 1
+            if retry_state["timeout_count"] >= LLM_SETTINGS.timeout_fail_limit:
+                logger.warning("Timeout error, please check your network connection.")
+                raise e
+
+        if openai_imported and isinstance(e, openai.RateLimitError) and hasattr(e, "message"):
+            match = re.search(r"Please retry after (\d+) seconds\.", e.message)
+            if match:
+                return int(match.group(1))
+        return backoff_seconds(attempt, self.retry_wait_seconds)
+
     def _add_json_in_prompt(self, messages: list[dict[str, Any]]) -> None:
         """
         add json related content in the prompt if add_json_in_prompt is True
@@ -643,18 +984,10 @@ class APIBackend(ABC):
             response_format = {"type": "json_object"}
 
         # 0) return directly if cache is hit
-        if seed is None and LLM_SETTINGS.use_auto_chat_cache_seed_gen:
-            seed = LLM_CACHE_SEED_GEN.get_next_seed()
-        input_content_json = json.dumps(messages)
-        input_content_json = (
-            chat_cache_prefix + input_content_json + f"<seed={seed}/>"
-        )  # FIXME this is a hack to make sure the cache represents the round index
+        input_content_json = self._chat_cache_key(messages, chat_cache_prefix, seed)
         if self.use_chat_cache:
-            cache_result = self.cache.chat_get(input_content_json)
+            cache_result = self._chat_cache_get(messages, input_content_json)
             if cache_result is not None:
-                if LLM_SETTINGS.log_llm_chat_content:
-                    logger.info(self._build_log_messages(messages), tag="llm_messages")
-                    logger.info(f"{LogColors.CYAN}Response:{cache_result}{LogColors.END}", tag="llm_messages")
                 return cache_result
 
         # 1) get a full response
@@ -668,26 +1001,139 @@ class APIBackend(ABC):
             if response_format == {"type": "json_object"} and add_json_in_prompt and not json_added:
                 self._add_json_in_prompt(new_messages)
                 json_added = True
+            self.rate_limiter.acquire(self._count_limited_tokens(new_messages))
             response, finish_reason = self._create_chat_completion_inner_function(
                 messages=new_messages,
                 response_format=response_format,
                 **kwargs,
             )
+            self.rate_limiter.consume(self._count_limited_tokens([{"role": "assistant", "content": response}]))
             all_response += response
 
-            # Handle litellm bug: finish_reason='stop' but code block not closed
-            # TODO: this is a temporary solution, and should be removed when litellm is fixed.
-            if finish_reason == "stop" and code_block_language:
-                if all_response.count("```") % 2 == 1:  # Odd count = unclosed code block
-                    logger.warning("Detected unclosed code block with finish_reason='stop', treating as truncated")
-                    finish_reason = "length"
-
-            if finish_reason is None or finish_reason != "length":
+            if not self._is_response_truncated(all_response, finish_reason, code_block_language):
                 break  # we get a full response now.
             new_messages.append({"role": "assistant", "content": response})
         else:
             raise RuntimeError(f"Failed to continue the conversation after {try_n} retries.")
 
+        all_response = self._refine_chat_response(
+            all_response,
+            response_format=response_format,
+            json_target_type=json_target_type,
+            add_json_in_prompt=add_json_in_prompt,
+            code_block_language=code_block_language,
+            code_block_fallback=code_block_fallback,
+        )
+        if self.dump_chat_cache:
+            self.cache.chat_set(input_content_json, all_response)
+        return all_response
+
+    async def _acreate_chat_completion_auto_continue(
+        self,
+        messages: list[dict[str, Any]],
+        json_mode: bool = False,
+        chat_cache_prefix: str = "",
+        seed: Optional[int] = None,
+        json_target_type: Optional[str] = None,
+        add_json_in_prompt: bool = False,
+        response_format: Optional[Union[dict, Type[BaseModel]]] = None,
+        code_block_language: Optional[str] = None,
+        code_block_fallback: bool = False,
+        **kwargs: Any,
+    ) -> str:
+        """
+        The async counterpart of `_create_chat_completion_auto_continue`.
+        When the chat cache is used, identical requests in flight at the same time share a single call.
+        """
+        if response_format is None and json_mode:
+            response_format = {"type": "json_object"}
+
+        input_content_json = self._chat_cache_key(messages, chat_cache_prefix, seed)
+        if self.use_chat_cache:
+            cache_result = self._chat_cache_get(messages, input_content_json)
+            if cache_result is not None:
+                return cache_result
+
+        async def _complete() -> str:
+            all_response = ""
+            new_messages = deepcopy(messages)
+            if response_format == {"type": "json_object"} and add_json_in_prompt:
+                self._add_json_in_prompt(new_messages)
+            try_n = 6
+            for _ in range(try_n):
+                await self.rate_limiter.aacquire(self._count_limited_tokens(new_messages))
+                response, finish_reason = await self._acreate_chat_completion_inner_function(
+                    messages=new_messages,
+                    response_format=response_format,
+                    **kwargs,
+                )
+                self.rate_limiter.consume(self._count_limited_tokens([{"role": "assistant", "content": response}]))
+                all_response += response
+                if not self._is_response_truncated(all_response, finish_reason, code_block_language):
+                    break
+                new_messages.append({"role": "assistant", "content": response})
+            else:
+                raise RuntimeError(f"Failed to continue the conversation after {try_n} retries.")
+
+            all_response = self._refine_chat_response(
+                all_response,
+                response_format=response_format,
+                json_target_type=json_target_type,
+                add_json_in_prompt=add_json_in_prompt,
+                code_block_language=code_block_language,
+                code_block_fallback=code_block_fallback,
+            )
+            if self.dump_chat_cache:
+                self.cache.chat_set(input_content_json, all_response)
+            return all_response
+
+        if not self.use_chat_cache:
+            return await _complete()
+        return await _coalesce_inflight(input_content_json, _complete)
+
+    def _chat_cache_key(self, messages: list[dict[str, Any]], chat_cache_prefix: str, seed: Optional[int]) -> str:
+        if seed is None and LLM_SETTINGS.use_auto_chat_cache_seed_gen:
+            seed = LLM_CACHE_SEED_GEN.get_next_seed()
+        input_content_json = json.dumps(messages)
+        return (
+            chat_cache_prefix + input_content_json + f"<seed={seed}/>"
+        )  # FIXME this is a hack to make sure the cache represents the round index
+
+    def _chat_cache_get(self, messages: list[dict[str, Any]], input_content_json: str) -> str | None:
+        cache_result = self.cache.chat_get(input_content_json)
+        if cache_result is not None and LLM_SETTINGS.log_llm_chat_content:
+            logger.info(self._build_log_messages(messages), tag="llm_messages")
+            logger.info(f"{LogColors.CYAN}Response:{cache_result}{LogColors.END}", tag="llm_messages")
+        return cache_result
+
+    def _count_limited_tokens(self, messages: list[dict[str, Any]]) -> int:
+        """The tokens charged to the rate limiter; they are only counted when a tokens-per-minute limit is set."""
+        if not self.rate_limiter.tpm:
+            return 0
+        try:
+            return self._calculate_token_from_messages(messages)
+        except ValueError:  # unknown tokenizer, about 4 characters per token
+            return sum(len(str(m["content"])) for m in messages) // 4
+
+    @staticmethod
+    def _is_response_truncated(all_response: str, finish_reason: str | None, code_block_language: str | None) -> bool:
+        # Handle litellm bug: finish_reason='stop' but code block not closed
+        # TODO: this is a temporary solution, and should be removed when litellm is fixed.
+        if finish_reason == "stop" and code_block_language:
+            if all_response.count("```") % 2 == 1:  # Odd count = unclosed code block
+                logger.warning("Detected unclosed code block with finish_reason='stop', treating as truncated")
+                finish_reason = "length"
+        return finish_reason == "length"
+
+    def _refine_chat_response(
+        self,
+        all_response: str,
+        response_format: Optional[Union[dict, Type[BaseModel]]],
+        json_target_type: Optional[str],
+        add_json_in_prompt: bool,
+        code_block_language: Optional[str],
+        code_block_fallback: bool,
+    ) -> str:
         # 2) refine the response and return
         if LLM_SETTINGS.reasoning_think_rm:
             # Only remove <think>...</think> if it appears at the beginning of the response
@@ -726,13 +1172,29 @@ class APIBackend(ABC):
                 logger.info(f"Using OpenAI response format: {response_format}")
             else:
                 logger.warning(f"Unknown response_format: {response_format}, skipping validation.")
-        if self.dump_chat_cache:
-            self.cache.chat_set(input_content_json, all_response)
         return all_response
 
     def _create_embedding_with_cache(
         self, input_content_list: list[str], *args: Any, **kwargs: Any
     ) -> list[list[float]]:
+        content_to_embedding_dict, filtered_input_content_list = self._embedding_cache_lookup(input_content_list)
+        if len(filtered_input_content_list) > 0:
+            self.rate_limiter.acquire(self._count_limited_embedding_tokens(filtered_input_content_list))
+            resp = self._create_embedding_inner_function(input_content_list=filtered_input_content_list)
+            self._embedding_cache_update(content_to_embedding_dict, filtered_input_content_list, resp)
+        return [content_to_embedding_dict[content] for content in input_content_list]  # type: ignore[misc]
+
+    async def _acreate_embedding_with_cache(
+        self, input_content_list: list[str], *args: Any, **kwargs: Any
+    ) -> list[list[float]]:
+        content_to_embedding_dict, filtered_input_content_list = self._embedding_cache_lookup(input_content_list)
+        if len(filtered_input_content_list) > 0:
+            await self.rate_limiter.aacquire(self._count_limited_embedding_tokens(filtered_input_content_list))
+            resp = await self._acreate_embedding_inner_function(input_content_list=filtered_input_content_list)
+            self._embedding_cache_update(content_to_embedding_dict, filtered_input_content_list, resp)
+        return [content_to_embedding_dict[content] for content in input_content_list]  # type: ignore[misc]
+
+    def _embedding_cache_lookup(self, input_content_list: list[str]) -> tuple[dict[str, Any], list[str]]:
         content_to_embedding_dict = {}
         filtered_input_content_list = []
         if self.use_embedding_cache:
@@ -744,14 +1206,22 @@ class APIBackend(ABC):
                     filtered_input_content_list.append(content)
         else:
             filtered_input_content_list = input_content_list
+        return content_to_embedding_dict, filtered_input_content_list
 
-        if len(filtered_input_content_list) > 0:
-            resp = self._create_embedding_inner_function(input_content_list=filtered_input_content_list)
-            for index, data in enumerate(resp):
-                content_to_embedding_dict[filtered_input_content_list[index]] = data
-            if self.dump_embedding_cache:
-                self.cache.embedding_set(content_to_embedding_dict)
-        return [content_to_embedding_dict[content] for content in input_content_list]  # type: ignore[misc]
+    def _embedding_cache_update(
+        self,
+        content_to_embedding_dict: dict[str, Any],
+        filtered_input_content_list: list[str],
+        resp: list[list[float]],
+    ) -> None:
+        for index, data in enumerate(resp):
+            content_to_embedding_dict[filtered_input_content_list[index]] = data
+        if self.dump_embedding_cache:
+            self.cache.embedding_set(content_to_embedding_dict)
+
+    def _count_limited_embedding_tokens(self, input_content_list: list[str]) -> int:
+        # about 4 characters per token; counting them exactly is not worth it for the rate limiter
+        return sum(len(content) for content in input_content_list) // 4 if self.rate_limiter.tpm else 0
 
     @abstractmethod
     def supports_response_schema(self) -> bool:
@@ -787,6 +1257,28 @@ class APIBackend(ABC):
         """
         raise NotImplementedError("Subclasses must implement this method")
 
+    async def _acreate_embedding_inner_function(self, input_content_list: list[str]) -> list[list[float]]:
+        """
+        Call the embedding function asynchronously.
+        Backends without an async client run the sync call in a thread.
+        """
+        return await asyncio.to_thread(self._create_embedding_inner_function, input_content_list)
+
+    async def _acreate_chat_completion_inner_function(  # type: ignore[no-untyped-def]
+        self,
+        messages: list[dict[str, Any]],
+        response_format: Optional[Union[dict, Type[BaseModel]]] = None,
+        *args,
+        **kwargs,
+    ) -> tuple[str, str | None]:
+        """
+        Call the chat completion function asynchronously.
+        Backends without an async client run the sync call in a thread.
+        """
+        return await asyncio.to_thread(
+            self._create_chat_completion_inner_function, messages, response_format, *args, **kwargs
+        )
+
     @property
     def chat_token_limit(self) -> int:
         return LLM_SETTINGS.chat_token_limit
@@ -3,6 +3,8 @@ from typing import Any, Literal, Optional, Type, TypedDict, Union, cast
 
 import numpy as np
 from litellm import (
+    acompletion,
+    aembedding,
     completion,
     completion_cost,
     embedding,
@@ -86,6 +88,18 @@ class LiteLLMAPIBackend(APIBackend):
         response_list = [data["embedding"] for data in response.data]
         return response_list
 
+    async def _acreate_embedding_inner_function(self, input_content_list: list[str]) -> list[list[float]]:
+        """
+        Call the embedding function asynchronously
+        """
+        model_name = LITELLM_SETTINGS.embedding_model
+        logger.info(f"{LogColors.GREEN}Using emb model{LogColors.END} {model_name}", tag="debug_litellm_emb")
+        response = await aembedding(
+            model=model_name,
+            input=input_content_list,
+        )
+        return [data["embedding"] for data in response.data]
+
     class CompleteKwargs(TypedDict):
         model: str
         temperature: float
@@ -134,7 +148,64 @@ class LiteLLMAPIBackend(APIBackend):
         """
         Call the chat completion function
         """
+        complete_kwargs = self._prepare_chat_completion(messages, response_format, **kwargs)
+        response = completion(messages=messages, **complete_kwargs)
+        if LITELLM_SETTINGS.log_llm_chat_content:
+            logger.info(
+                f"{LogColors.GREEN}Using chat model{LogColors.END} {complete_kwargs['model']}", tag="llm_messages"
+            )
+
+        if LITELLM_SETTINGS.chat_stream:
+            if LITELLM_SETTINGS.log_llm_chat_content:
+                logger.info(f"{LogColors.BLUE}assistant:{LogColors.END}", tag="llm_messages")
+            content = ""
+            finish_reason = None
+            for message in response:
+                chunk, finish_reason = self._read_stream_chunk(message, finish_reason)
+                content += chunk
+            if LITELLM_SETTINGS.log_llm_chat_content:
+                logger.info("\n", raw=True, tag="llm_messages")
+        else:
+            content, finish_reason = self._read_response(response)
+        return self._record_chat_completion(complete_kwargs["model"], messages, content, finish_reason)
+
+    async def _acreate_chat_completion_inner_function(  # type: ignore[no-untyped-def]
+        self,
+        messages: list[dict[str, Any]],
+        response_format: Optional[Union[dict, Type[BaseModel]]] = None,
+        *args,
+        **kwargs,
+    ) -> tuple[str, str | None]:
+        """
+        Call the chat completion function asynchronously
+        """
+        complete_kwargs = self._prepare_chat_completion(messages, response_format, **kwargs)
+        response = await acompletion(messages=messages, **complete_kwargs)
+        if LITELLM_SETTINGS.log_llm_chat_content:
+            logger.info(
+                f"{LogColors.GREEN}Using chat model{LogColors.END} {complete_kwargs['model']}", tag="llm_messages"
+            )
+
+        if LITELLM_SETTINGS.chat_stream:
+            # the chunks of concurrent calls would interleave in the log, so only the full content is logged
+            content = ""
+            finish_reason = None
+            async for message in response:
+                chunk, finish_reason = self._read_stream_chunk(message, finish_reason, log_chunk=False)
+                content += chunk
+            if LITELLM_SETTINGS.log_llm_chat_content:
+                logger.info(f"{LogColors.BLUE}assistant:{LogColors.END}\n{content}", tag="llm_messages")
+        else:
+            content, finish_reason = self._read_response(response)
+        return self._record_chat_completion(complete_kwargs["model"], messages, content, finish_reason)
 
+    def _prepare_chat_completion(
+        self,
+        messages: list[dict[str, Any]],
+        response_format: Optional[Union[dict, Type[BaseModel]]] = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """The keyword arguments of `completion` besides the messages"""
         if response_format and not supports_response_schema(model=LITELLM_SETTINGS.chat_model):
             # Deepseek will enter this branch
             logger.warning(
@@ -149,49 +220,41 @@ class LiteLLMAPIBackend(APIBackend):
         if LITELLM_SETTINGS.log_llm_chat_content:
             logger.info(self._build_log_messages(messages), tag="llm_messages")
 
-        complete_kwargs = self.get_complete_kwargs()
-        model = complete_kwargs["model"]
-
-        response = completion(
-            messages=messages,
-            stream=LITELLM_SETTINGS.chat_stream,
-            max_retries=0,
-            **complete_kwargs,
+        return {
+            "stream": LITELLM_SETTINGS.chat_stream,
+            "max_retries": 0,
+            **self.get_complete_kwargs(),
             **kwargs,
+        }
+
+    def _read_stream_chunk(
+        self, message: Any, finish_reason: str | None, log_chunk: bool = True
+    ) -> tuple[str, str | None]:
+        if message["choices"][0]["finish_reason"]:
+            finish_reason = message["choices"][0]["finish_reason"]
+        chunk = ""
+        if "content" in message["choices"][0]["delta"]:
+            chunk = message["choices"][0]["delta"]["content"] or ""  # when finish_reason is "stop", content is None
+            if LITELLM_SETTINGS.log_llm_chat_content and log_chunk:
+                logger.info(LogColors.CYAN + chunk + LogColors.END, raw=True, tag="llm_messages")
+        return chunk, finish_reason
+
+    def _read_response(self, response: Any) -> tuple[str, str | None]:
+        content = str(response.choices[0].message.content)
+        finish_reason = response.choices[0].finish_reason
+        finish_reason_str = (
+            f"({LogColors.RED}Finish reason: {finish_reason}{LogColors.END})"
+            if finish_reason and finish_reason != "stop"
+            else ""
         )
         if LITELLM_SETTINGS.log_llm_chat_content:
-            logger.info(f"{LogColors.GREEN}Using chat model{LogColors.END} {model}", tag="llm_messages")
-
-        if LITELLM_SETTINGS.chat_stream:
-            if LITELLM_SETTINGS.log_llm_chat_content:
-                logger.info(f"{LogColors.BLUE}assistant:{LogColors.END}", tag="llm_messages")
-            content = ""
-            finish_reason = None
-            for message in response:
-                if message["choices"][0]["finish_reason"]:
-                    finish_reason = message["choices"][0]["finish_reason"]
-                if "content" in message["choices"][0]["delta"]:
-                    chunk = (
-                        message["choices"][0]["delta"]["content"] or ""
-                    )  # when finish_reason is "stop", content is None
-                    content += chunk
-                    if LITELLM_SETTINGS.log_llm_chat_content:
-                        logger.info(LogColors.CYAN + chunk + LogColors.END, raw=True, tag="llm_messages")
-            if LITELLM_SETTINGS.log_llm_chat_content:
-                logger.info("\n", raw=True, tag="llm_messages")
-        else:
-            content = str(response.choices[0].message.content)
-            finish_reason = response.choices[0].finish_reason
-            finish_reason_str = (
-                f"({LogColors.RED}Finish reason: {finish_reason}{LogColors.END})"
-                if finish_reason and finish_reason != "stop"
-                else ""
-            )
-            if LITELLM_SETTINGS.log_llm_chat_content:
-                logger.info(
-                    f"{LogColors.BLUE}assistant:{LogColors.END} {finish_reason_str}\n{content}", tag="llm_messages"
-                )
+            logger.info(f"{LogColors.BLUE}assistant:{LogColors.END} {finish_reason_str}\n{content}", tag="llm_messages")
+        return content, finish_reason
 
+    def _record_chat_completion(
+        self, model: str, messages: list[dict[str, Any]], content: str, finish_reason: str | None
+    ) -> tuple[str, str | None]:
+        """Accumulate the cost and log the token statistics of a chat completion"""
         global ACC_COST
         try:
             cost = completion_cost(model=model, messages=messages, completion=content)
@@ -40,11 +40,34 @@ class LLMSettings(ExtendedBaseSettings):
     managed_identity_client_id: str | None = None
     max_retry: int = 10
     retry_wait_seconds: int = 1
+    retry_backoff_factor: float = 1.0
+    """
+    The wait before the n-th retry is `retry_wait_seconds * retry_backoff_factor ** n` (with jitter),
+    at most `retry_backoff_max_seconds`. The default 1 waits `retry_wait_seconds` before every retry.
+    """
+    retry_backoff_max_seconds: float = 60.0
+    rpm_limit: int | None = None
+    """Client-side limit of the LLM requests per minute, shared by all the calls of the process. None disables it"""
+    tpm_limit: int | None = None
+    """Client-side limit of the LLM tokens (prompt + completion) per minute. None disables it"""
     dump_chat_cache: bool = False
     use_chat_cache: bool = False
     dump_embedding_cache: bool = False
     use_embedding_cache: bool = False
     prompt_cache_path: str = str(Path.cwd() / "prompt_cache.db")
+    prompt_cache_engine: Literal["sqlite", "sqlite_wal"] = "sqlite"
+    """
+    - "sqlite": one connection per process, commit after every write.
+    - "sqlite_wal": WAL journaling, a lazily created connection per process (safe after fork),
+      batched write-behind and an in-memory LRU in front of the database.
+      Recommended when the cache is shared by the workers of `multiprocessing_wrapper`.
+    """
+    prompt_cache_batch_size: int = 64
+    """The number of pending writes that triggers a flush in the "sqlite_wal" engine"""
+    prompt_cache_flush_interval: float = 0.5
+    """The max seconds a write stays in memory before being flushed in the "sqlite_wal" engine"""
+    prompt_cache_lru_size: int = 4096
+    """The number of entries kept in the in-memory LRU of the "sqlite_wal" engine; 0 disables it"""
     max_past_message_include: int = 10
     timeout_fail_limit: int = 10
     violation_fail_limit: int = 1
@@ -0,0 +1,105 @@
+"""
+Client-side rate limiting and retry delays shared by the sync and async paths of `APIBackend`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+
+from rdagent.oai.llm_conf import LLM_SETTINGS
+
+
+class TokenBucketRateLimiter:
+    """
+    Two token buckets: requests per minute and tokens per minute.
+
+    Each bucket holds at most one minute of budget and refills continuously. A caller reserves its budget
+    immediately (the level may go below zero) and then waits until the deficit is refilled, so the callers are
+    served in the order they arrive and a thread and a coroutine share the same limiter.
+    The completion tokens are only known after the response; `consume` charges them without waiting, which
+    delays the following callers instead.
+    """
+
+    def __init__(self, rpm: int | None = None, tpm: int | None = None) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm or 0)
+        self._tokens = float(tpm or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rpm or self.tpm)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(float(self.rpm), self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(float(self.tpm), self._tokens + elapsed * self.tpm / 60)
+
+    def reserve(self, tokens: int = 0, requests: int = 1) -> float:
+        """Take the budget of a call and return the seconds to wait before sending it."""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0
+            if self.rpm:
+                self._requests -= requests
+                wait = max(wait, -self._requests * 60 / self.rpm)
+            if self.tpm:
+                self._tokens -= tokens
+                wait = max(wait, -self._tokens * 60 / self.tpm)
+            return wait
+
+    def consume(self, tokens: int) -> None:
+        """Charge tokens which were not reserved (e.g. the completion tokens)."""
+        if self.tpm and tokens > 0:
+            with self._lock:
+                self._refill(time.monotonic())
+                self._tokens -= tokens
+
+    def acquire(self, tokens: int = 0) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_LIMITERS: dict[tuple[int | None, int | None], TokenBucketRateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucketRateLimiter:
+    """The limiter shared by all the backends of the process for the current `LLM_SETTINGS` limits."""
+    key = (LLM_SETTINGS.rpm_limit, LLM_SETTINGS.tpm_limit)
+    with _LIMITERS_LOCK:
+        if key not in _LIMITERS:
+            _LIMITERS[key] = TokenBucketRateLimiter(*key)
+        return _LIMITERS[key]
+
+
+def backoff_seconds(attempt: int, base: float | None = None) -> float:
+    """
+    Exponential backoff with jitter for the `attempt`-th retry (starting from 0):
+    a random value in [d / 2, d] where d = min(base * retry_backoff_factor ** attempt, retry_backoff_max_seconds)
+    and base defaults to `retry_wait_seconds`. The jitter keeps the callers which failed together from retrying
+    together. With a factor <= 1 (the default) the wait is `base`, as the retries always waited.
+    """
+    base = LLM_SETTINGS.retry_wait_seconds if base is None else base
+    if LLM_SETTINGS.retry_backoff_factor <= 1:
+        return base
+    delay = min(base * LLM_SETTINGS.retry_backoff_factor**attempt, LLM_SETTINGS.retry_backoff_max_seconds)
+    return random.uniform(delay / 2, delay)  # noqa: S311
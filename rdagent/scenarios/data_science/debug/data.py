@@ -1,9 +1,12 @@
+import concurrent.futures
 import json
 import os
 import shutil
+import sys
+import time
 from collections import Counter, defaultdict
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -14,6 +17,17 @@ try:
 except:
     pass
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 
 class DataHandler:
     """Base DataHandler interface."""
@@ -333,54 +347,9 @@ class DefaultSampler(DataSampler):
             for f in self.data_folder.iterdir()
             if f.name.startswith(("train", "test"))
         )
-        processed_files = []
-        sample_used_file_names = set()
-        has_id_col = False
-
-        for file_path in tqdm(files_to_process, desc="Processing data", unit="file"):
-            sampled_file_path = self.sample_folder / file_path.relative_to(self.data_folder)
-            if sampled_file_path.exists():
-                continue
-
-            if file_path.suffix.lower() not in self.included_extensions:
-                continue
-
-            if skip_subfolder_data and file_path.parent != self.data_folder:
-                continue  # bypass files in subfolders
-
-            sampled_file_path.parent.mkdir(parents=True, exist_ok=True)
-
-            # Load the original data
-            if sample_json:
-                if file_path.suffix.lower() == ".json":
-                    data = json.load(file_path.open())
-                    data_sampled = self.data_reducer.reduce(data)
-                    sample_used_file_names = [file_path.parent / i for i in self.data_reducer.sampled_files]
-                    print("sample_used_file_names", len(sample_used_file_names))
-            else:
-                df = self.data_handler.load(file_path)
-                if df is None:
-                    continue
-
-                # Create a sampled subset
-                df_sampled = self.data_reducer.reduce(df)
-                processed_files.append(file_path)
-                # Dump the sampled data
-                try:
-                    self.data_handler.dump(df_sampled, sampled_file_path)
-                    # Extract possible file references from the sampled data
-                    if "submission" in file_path.stem:
-                        continue  # Skip submission files
-                    for col in df_sampled.columns:
-                        if "id" in col:
-                            has_id_col = True
-                            sample_used_file_names.extend([df_sampled[col].astype(str).unique()])
-                            continue
-                    for col in df_sampled.columns:
-                        sample_used_file_names.extend([df_sampled[col].astype(str).unique()])
-                except Exception as e:
-                    print(f"Error processing {file_path}: {e}")
-                    continue
+        processed_files, sample_used_file_names = self._sample_data_files(
+            files_to_process, skip_subfolder_data, sample_json
+        )
 
         # Process non-data files
         subfolder_dict = {}
@@ -463,6 +432,343 @@ class DefaultSampler(DataSampler):
             f"[INFO] After sampling, the sample folder `{self.sample_folder}` contains {final_files_count} files in total."
         )
 
+    def _sample_data_files(
+        self, files_to_process: list[Path], skip_subfolder_data: bool, sample_json: bool
+    ) -> tuple[list[Path], Any]:
+        """Write the reduced data files; return them and the names referred to by the sampled data."""
+        processed_files = []
+        sample_used_file_names = set()
+        has_id_col = False
+
+        for file_path in tqdm(files_to_process, desc="Processing data", unit="file"):
+            sampled_file_path = self.sample_folder / file_path.relative_to(self.data_folder)
+            if sampled_file_path.exists():
+                continue
+
+            if file_path.suffix.lower() not in self.included_extensions:
+                continue
+
+            if skip_subfolder_data and file_path.parent != self.data_folder:
+                continue  # bypass files in subfolders
+
+            sampled_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Load the original data
+            if sample_json:
+                if file_path.suffix.lower() == ".json":
+                    data = json.load(file_path.open())
+                    data_sampled = self.data_reducer.reduce(data)
+                    sample_used_file_names = [file_path.parent / i for i in self.data_reducer.sampled_files]
+                    print("sample_used_file_names", len(sample_used_file_names))
+            else:
+                df = self.data_handler.load(file_path)
+                if df is None:
+                    continue
+
+                # Create a sampled subset
+                df_sampled = self.data_reducer.reduce(df)
+                processed_files.append(file_path)
+                # Dump the sampled data
+                try:
+                    self.data_handler.dump(df_sampled, sampled_file_path)
+                    # Extract possible file references from the sampled data
+                    if "submission" in file_path.stem:
+                        continue  # Skip submission files
+                    for col in df_sampled.columns:
+                        if "id" in col:
+                            has_id_col = True
+                            sample_used_file_names.extend([df_sampled[col].astype(str).unique()])
+                            continue
+                    for col in df_sampled.columns:
+                        sample_used_file_names.extend([df_sampled[col].astype(str).unique()])
+                except Exception as e:
+                    print(f"Error processing {file_path}: {e}")
+                    continue
+        return processed_files, sample_used_file_names
+
+
+STREAMING_SUFFIXES = {".csv", ".jsonl", ".parquet"}
+MAX_STREAMING_LABELS = 1000
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    # kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def _iter_chunks(path: Path, chunksize: int) -> Iterator[Union[pd.DataFrame, "pa.Table"]]:
+    """CSV and JSONL files are read `chunksize` rows at a time, Parquet files by batches of their row groups."""
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        yield from pd.read_csv(path, encoding="utf-8", chunksize=chunksize)
+    elif suffix == ".jsonl":
+        with pd.read_json(path, lines=True, chunksize=chunksize) as reader:
+            yield from reader
+    elif suffix == ".parquet":
+        # arrow tables keep the schema (and the pandas index metadata) of the file unchanged
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield pa.Table.from_batches([batch])
+    else:
+        raise ValueError(f"Unsupported file type for streaming: {suffix}")
+
+
+def _column(chunk: Union[pd.DataFrame, "pa.Table"], name: str) -> pd.Series:
+    return chunk.column(name).to_pandas() if isinstance(chunk, pa.Table) else chunk[name].reset_index(drop=True)
+
+
+def _columns(chunk: Union[pd.DataFrame, "pa.Table"]) -> list[str]:
+    return list(chunk.column_names if isinstance(chunk, pa.Table) else chunk.columns)
+
+
+def _take(chunk: Union[pd.DataFrame, "pa.Table"], indices: np.ndarray) -> Union[pd.DataFrame, "pa.Table"]:
+    return chunk.take(pa.array(indices, type=pa.int64())) if isinstance(chunk, pa.Table) else chunk.iloc[indices]
+
+
+def _concat(parts: list) -> Union[pd.DataFrame, "pa.Table"]:
+    return pa.concat_tables(parts) if isinstance(parts[0], pa.Table) else pd.concat(parts)
+
+
+class _ChunkWriter:
+    """Append chunks to a CSV/JSONL/Parquet file in the format `GenericDataHandler.dump` writes."""
+
+    def __init__(self, path: Path, first_chunk: Union[pd.DataFrame, "pa.Table"]) -> None:
+        self.path = path
+        self.suffix = path.suffix.lower()
+        if self.suffix == ".parquet":
+            self.writer = pq.ParquetWriter(path, first_chunk.schema)
+        elif self.suffix == ".csv":
+            first_chunk.iloc[:0].to_csv(path, index=False, encoding="utf-8")  # the header
+        else:
+            path.write_text("")
+
+    def write(self, chunk: Union[pd.DataFrame, "pa.Table"]) -> None:
+        if not len(chunk):
+            return
+        if self.suffix == ".parquet":
+            self.writer.write_table(chunk)
+        elif self.suffix == ".csv":
+            chunk.to_csv(self.path, mode="a", header=False, index=False, encoding="utf-8")
+        else:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(chunk.to_json(orient="records", lines=True))
+
+    def close(self) -> None:
+        if self.suffix == ".parquet":
+            self.writer.close()
+
+
+def _find_id_column(chunk: Union[pd.DataFrame, "pa.Table"]) -> Optional[str]:
+    for col in _columns(chunk):
+        name = str(col).lower()
+        if name == "id" or name.endswith("_id") or str(col).endswith(("Id", "ID")):
+            return col
+    return None
+
+
+def _find_label_column(chunk: Union[pd.DataFrame, "pa.Table"]) -> Optional[str]:
+    """The same rule as `UniqueIDDataReducer`: the last column (or the second one) if it looks like a class label."""
+    columns = _columns(chunk)
+    for col in [columns[-1]] + ([columns[1]] if len(columns) > 2 else []):
+        values = _column(chunk, col)
+        if pd.api.types.is_float_dtype(values) or not len(values):
+            continue
+        try:
+            if 0 < values.nunique() < len(values) * 0.5:
+                return col
+        except TypeError:  # unhashable values
+            continue
+    return None
+
+
+def stream_sample_file(
+    src: Path,
+    dst: Path,
+    min_frac: float = 0.02,
+    min_num: int = 5,
+    chunksize: int = 100_000,
+    seed: int = 1,
+) -> dict[str, Any]:
+    """
+    Sample a CSV/JSONL/Parquet file in one pass with memory bounded by `chunksize` rows.
+
+    Every row gets a 64-bit key: the hash of its ID column if it has one (so the files sharing the IDs keep
+    the same rows), otherwise a seeded random number. The rows whose key is below `min_frac * 2**64` are
+    written as soon as their chunk is read; a bottom-k reservoir of the other rows with the smallest keys tops
+    the sample up to `min_num` rows, and the first row of each class of the label column (as detected by
+    `UniqueIDDataReducer`) not sampled otherwise is added at the end.
+
+    Returns the statistics of the file and the string values of the sampled rows (possible file references).
+    """
+    start = time.time()
+    rng = np.random.default_rng(seed)
+    threshold = np.uint64(min(min_frac, 1.0) * (2**64 - 1))
+    writer = None
+    id_col = label_col = None
+    rows_in = rows_out = 0
+    reservoir, reservoir_keys = None, np.empty(0, dtype=np.uint64)
+    kept_labels: set = set()
+    label_rows: dict = {}
+    used_names: set[str] = set()
+
+    def _collect_names(part: Union[pd.DataFrame, "pa.Table"]) -> None:
+        if "submission" in src.stem:
+            return
+        for col in _columns(part):
+            values = _column(part, col)
+            if not pd.api.types.is_float_dtype(values):
+                used_names.update(values.dropna().astype(str).unique())
+
+    try:
+        for chunk in _iter_chunks(src, chunksize):
+            if writer is None:
+                writer = _ChunkWriter(dst, chunk)
+                id_col = _find_id_column(chunk)
+                label_col = _find_label_column(chunk)
+            n = len(chunk)
+            rows_in += n
+            if id_col is not None:
+                keys = pd.util.hash_pandas_object(_column(chunk, id_col).astype(str), index=False).to_numpy()
+            else:
+                keys = rng.integers(0, 2**64 - 1, size=n, dtype=np.uint64, endpoint=True)
+            mask = keys < threshold
+            kept = _take(chunk, np.flatnonzero(mask))
+            writer.write(kept)
+            rows_out += len(kept)
+            _collect_names(kept)
+
+            skipped = ~mask
+            if label_col is not None:
+                labels = _column(chunk, label_col)
+                kept_labels.update(labels[mask].unique())
+                new = labels[skipped].dropna().drop_duplicates()
+                new = new[~new.isin(kept_labels) & ~new.isin(list(label_rows))]
+                for idx, label in new.items():
+                    label_rows[label] = _take(chunk, np.array([idx]))
+                    skipped[idx] = False  # not a reservoir candidate, it may be written at the end
+                if len(kept_labels) + len(label_rows) > MAX_STREAMING_LABELS:
+                    label_col, label_rows = None, {}  # not a class label
+
+            if rows_out < min_num:
+                candidates = np.flatnonzero(skipped)
+                order = np.argsort(keys[candidates], kind="stable")[:min_num]
+                parts = ([reservoir] if reservoir is not None else []) + [_take(chunk, candidates[order])]
+                merged_keys = np.concatenate([reservoir_keys, keys[candidates[order]]])
+                best = np.argsort(merged_keys, kind="stable")[:min_num]
+                reservoir, reservoir_keys = _take(_concat(parts), best), merged_keys[best]
+
+        if writer is None:  # empty file
+            shutil.copy(src, dst)
+            return {"file": str(src), "rows_in": 0, "rows_out": 0, "seconds": time.time() - start}
+
+        extra = [row for label, row in label_rows.items() if label not in kept_labels]
+        if rows_out + len(extra) < min_num and reservoir is not None:
+            extra.append(_take(reservoir, np.arange(min(min_num - rows_out - len(extra), len(reservoir)))))
+        for part in extra:
+            writer.write(part)
+            rows_out += len(part)
+            _collect_names(part)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    seconds = time.time() - start
+    return {
+        "file": str(src),
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "seconds": seconds,
+        "id_column": id_col,
+        "peak_rss_mb": _peak_rss_mb(),
+        "used_names": used_names,
+    }
+
+
+class StreamingSampler(DefaultSampler):
+    """
+    `DefaultSampler` for large datasets: CSV/JSONL/Parquet files are sampled by `stream_sample_file` in one
+    pass with bounded memory (files are processed by `n_jobs` processes) instead of being loaded entirely and
+    reduced by the data reducer. The other data files are reduced as in `DefaultSampler`.
+
+    The rows of the files sharing an ID column are sampled consistently, and the files referred to by the
+    sampled rows are kept.
+    """
+
+    def __init__(self, data_folder, sample_folder, reducer, n_jobs: int = 1, chunksize: int = 100_000):
+        super().__init__(data_folder, sample_folder, reducer)
+        self.n_jobs = n_jobs
+        self.chunksize = chunksize
+
+    def _sample_data_files(
+        self, files_to_process: list[Path], skip_subfolder_data: bool, sample_json: bool
+    ) -> tuple[list[Path], Any]:
+        if sample_json or pa is None:
+            return super()._sample_data_files(files_to_process, skip_subfolder_data, sample_json)
+
+        streamed = []
+        for file_path in files_to_process:
+            sampled_file_path = self.sample_folder / file_path.relative_to(self.data_folder)
+            if (
+                file_path.suffix.lower() in STREAMING_SUFFIXES
+                and not sampled_file_path.exists()
+                and not (skip_subfolder_data and file_path.parent != self.data_folder)
+            ):
+                sampled_file_path.parent.mkdir(parents=True, exist_ok=True)
+                streamed.append((file_path, sampled_file_path))
+        # the largest files first to balance the workers
+        streamed.sort(key=lambda x: x[0].stat().st_size, reverse=True)
+        kwargs = {
+            "min_frac": self.data_reducer.min_frac,
+            "min_num": self.data_reducer.min_num,
+            "chunksize": self.chunksize,
+        }
+
+        start = time.time()
+        results = []
+        failed = []
+        if self.n_jobs > 1 and len(streamed) > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                futures = {executor.submit(stream_sample_file, src, dst, **kwargs): (src, dst) for src, dst in streamed}
+                for future in tqdm(
+                    concurrent.futures.as_completed(futures), total=len(futures), desc="Streaming data", unit="file"
+                ):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        print(f"Error streaming {futures[future][0]}: {e}")
+                        failed.append(futures[future])
+        else:
+            for src, dst in tqdm(streamed, desc="Streaming data", unit="file"):
+                try:
+                    results.append(stream_sample_file(src, dst, **kwargs))
+                except Exception as e:
+                    print(f"Error streaming {src}: {e}")
+                    failed.append((src, dst))
+        for _, dst in failed:
+            dst.unlink(missing_ok=True)  # reduced by `DefaultSampler` below
+        seconds = time.time() - start
+
+        used_names: set[str] = set()
+        for r in results:
+            used_names |= r.pop("used_names", set())
+            print(
+                f"[INFO] Streamed {r['file']}: {r['rows_out']} / {r['rows_in']} rows "
+                f"({r['rows_in'] / max(r['seconds'], 1e-9):.0f} rows/s, id column: {r.get('id_column')})"
+            )
+        rows_in = sum(r["rows_in"] for r in results)
+        peak_rss = [r["peak_rss_mb"] for r in results if r.get("peak_rss_mb") is not None] + [_peak_rss_mb() or 0]
+        print(
+            f"[INFO] Streamed {len(results)} files, {rows_in} rows in {seconds:.1f}s "
+            f"({rows_in / max(seconds, 1e-9):.0f} rows/s) with {self.n_jobs} jobs, peak RSS {max(peak_rss):.0f} MB"
+        )
+
+        # the streamed files are skipped since their samples exist
+        processed_files, sample_used_file_names = super()._sample_data_files(
+            files_to_process, skip_subfolder_data, sample_json
+        )
+        return processed_files + [Path(r["file"]) for r in results], set(sample_used_file_names) | used_names
+
 
 class FolderSampler(DataSampler):
     """
@@ -608,11 +914,17 @@ def create_debug_data(
     min_frac=0.01,
     min_num=5,
     sample_path=None,
+    streaming: bool = False,
+    n_jobs: int = 1,
+    chunksize: int = 100_000,
 ):
     """
     Reads the original data file, creates a reduced sample,
     and renames/moves files for easier debugging.
     Automatically detects file type (csv, pkl, parquet, hdf, etc.).
+
+    With `streaming`, the default sampler is replaced by `StreamingSampler`: CSV/JSONL/Parquet files are sampled
+    `chunksize` rows at a time by `n_jobs` processes, for datasets too large to be loaded in memory.
     """
     if sample_path is None:
         sample_path = Path(dataset_path) / "sample"
@@ -620,6 +932,16 @@ def create_debug_data(
     # Prepare data handler and reducer
     reduce_method, sample_method = map_competition(competition)
     data_reducer = reduce_method(min_frac=min_frac, min_num=min_num)
-    sampler = sample_method(Path(dataset_path) / competition, Path(sample_path) / competition, data_reducer)
+    if streaming and sample_method is DefaultSampler:
+        sampler = StreamingSampler(
+            Path(dataset_path) / competition,
+            Path(sample_path) / competition,
+            data_reducer,
+            n_jobs=n_jobs,
+            chunksize=chunksize,
+        )
+        sample_method = StreamingSampler
+    else:
+        sampler = sample_method(Path(dataset_path) / competition, Path(sample_path) / competition, data_reducer)
     print(f"processing {competition}, sample_method: {sample_method}, reduce_method: {reduce_method}")
     sampler.sample()
@@ -18,6 +18,7 @@ from rdagent.core.experiment import FBWorkspace, Task
 from rdagent.log import rdagent_logger as logger
 from rdagent.log.timer import RD_Agent_TIMER_wrapper
 from rdagent.scenarios.data_science.dev.runner import DSRunnerCoSTEERSettings
+from rdagent.scenarios.data_science.experiment.experiment import DSFBWorkspace
 from rdagent.scenarios.data_science.test_eval import (
     MLETestEval,
     NoTestEvalError,
@@ -103,6 +104,8 @@ class DSRunnerEvaluator(CoSTEEREvaluator):
         stdout = result.stdout
         execute_ret_code = result.exit_code
         implementation.running_info.running_time = result.running_time
+        if isinstance(implementation, DSFBWorkspace):
+            implementation.log_stage_cache_report()
 
         match = re.search(r"(.*?)=== Start of EDA part ===(.*)=== End of EDA part ===", stdout, re.DOTALL)
         eda_output = match.groups()[1] if match else None
@@ -1,13 +1,53 @@
 import re
+from functools import cache
+from pathlib import Path
 from typing import Literal
 
 import pandas as pd
 
+from rdagent.app.data_science.conf import DS_RD_SETTING
 from rdagent.core.experiment import Experiment, FBWorkspace, Task, UserInstructions
+from rdagent.log import rdagent_logger as logger
+from rdagent.scenarios.data_science.experiment import stage_cache
 
 COMPONENT = Literal["DataLoadSpec", "FeatureEng", "Model", "Ensemble", "Workflow", "Pipeline"]
 
 
+@cache
+def _stage_cache_code() -> str:
+    return Path(stage_cache.__file__).read_text()
+
+
+class DSFBWorkspace(FBWorkspace):
+    """
+    The workspace of the data science experiments.
+
+    When the stage cache is enabled, `stage_cache.py` is kept in the workspace (but not in `file_dict`, so it is not
+    shown to the coders) for `main.py` to checkpoint its stages.
+    """
+
+    STAGE_CACHE_FILE = "stage_cache.py"
+
+    def prepare(self) -> None:
+        super().prepare()
+        if DS_RD_SETTING.enable_stage_cache:
+            target = self.workspace_path / self.STAGE_CACHE_FILE
+            code = _stage_cache_code()
+            if not target.exists() or target.read_text() != code:
+                target.write_text(code)
+
+    def log_stage_cache_report(self) -> dict | None:
+        """Log (and consume) the stage cache report of the last run of `main.py`."""
+        report = stage_cache.read_report(self.workspace_path)
+        if report is not None and report["stages"]:
+            logger.info(
+                f"Stage cache: {report['n_hits']}/{len(report['stages'])} stages loaded, "
+                f"{report['saved_seconds']:.1f}s saved"
+            )
+            logger.log_object(report, tag="stage_cache")
+        return report
+
+
 class DSExperiment(Experiment[Task, FBWorkspace, FBWorkspace]):
     def __init__(self, pending_tasks_list: list, hypothesis_candidates: list | None = None, *args, **kwargs) -> None:
         super().__init__(sub_tasks=[], *args, **kwargs)
@@ -16,7 +56,7 @@ class DSExperiment(Experiment[Task, FBWorkspace, FBWorkspace]):
         # - Injecting from SOTA code;
         # - New version no matter successful or not
         # the initial workspace or the successful new version after coding
-        self.experiment_workspace = FBWorkspace()
+        self.experiment_workspace = DSFBWorkspace()
         self.pending_tasks_list = pending_tasks_list
         self.hypothesis_candidates = hypothesis_candidates
 
@@ -0,0 +1,274 @@
+"""
+Checkpoint the stages of a data science pipeline so that a re-run resumes from the first invalidated stage.
+
+This file is copied as ``stage_cache.py`` into the workspace of the experiments when
+`DS_RD_SETTING.enable_stage_cache` is on, so it only depends on the standard library.
+
+Usage in ``main.py``:
+
+.. code-block:: python
+
+    from stage_cache import StageCache
+
+    cache = StageCache()
+    X, y, X_test, test_ids = cache.run("load_data", load_data)
+    X, y, X_test = cache.run("feature", feat_eng, X, y, X_test)
+    val_pred, test_pred = cache.run("model_lgb", train_lgb, X, y, X_test, deps=[build_lgb_params])
+
+The outputs of a stage are stored in the cache folder (shared by the experiments on the same data) under the hash of
+
+- the source code of the stage function and of its `deps` (functions, modules or file paths);
+- the module-level values the functions use: the constants (e.g. ``N_FOLDS``) and the source of the helpers;
+- the keys of the stages which produced its arguments, or the content of the other arguments;
+- the input data (file names, sizes and modification times) and the command line arguments.
+
+So editing the ensemble code only re-runs the ensemble stage, and editing the features re-runs the stages after it.
+A stage must return what it produces: its other side effects (e.g. files written) are not replayed on a hit.
+
+The stages of the run are reported in ``stage_cache.json`` in the working directory, with the time saved by the hits.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import sys
+import time
+import types
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+DEFAULT_ROOT = "./workspace_cache/stage_cache"
+DEFAULT_INPUT_PATH = "./workspace_input/"
+REPORT_NAME = "stage_cache.json"
+
+
+def _source(dep: Any) -> bytes:
+    """The code `dep` stands for: the source of a function/class/module, or the content of a file path."""
+    if isinstance(dep, (str, os.PathLike)):
+        path = Path(dep)
+        return path.read_bytes() if path.is_file() else str(dep).encode()
+    try:
+        return inspect.getsource(dep).encode()
+    except (OSError, TypeError):
+        code = getattr(dep, "__code__", None)
+        if code is not None:  # e.g. defined in an interactive session
+            return code.co_code + repr(code.co_consts).encode()
+        return repr(dep).encode()
+
+
+def _input_fingerprint(path: str | Path) -> list:
+    """The names, sizes and modification times of the files under `path`."""
+    files = []
+    for root, dirs, names in os.walk(path, followlinks=True):
+        dirs.sort()
+        for name in sorted(names):
+            p = os.path.join(root, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            files.append((os.path.relpath(p, path), st.st_size, st.st_mtime_ns))
+    return files
+
+
+def _global_names(code: types.CodeType) -> set[str]:
+    """The global names used by `code` and by the functions, lambdas and comprehensions nested in it."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _global_names(const)
+    return names
+
+
+def _globals_source(func: Any, seen: set[int] | None = None) -> bytes:
+    """
+    The module-level values used by `func`: the source of the functions and classes, the repr of the others.
+    The helpers defined in the same module are followed, so a constant used by a helper is covered too.
+    """
+    code = getattr(func, "__code__", None)
+    module_globals = getattr(func, "__globals__", None)
+    if code is None or module_globals is None:
+        return b""
+    seen = set() if seen is None else seen
+    seen.add(id(func))
+    parts = []
+    for name in sorted(_global_names(code)):
+        if name not in module_globals:
+            continue  # a builtin or an attribute
+        value = module_globals[name]
+        if isinstance(value, types.ModuleType):
+            part = value.__name__.encode()
+        elif inspect.isfunction(value) or inspect.isclass(value):
+            part = _source(value)
+            if getattr(value, "__globals__", None) is module_globals and id(value) not in seen:
+                part += _globals_source(value, seen)
+        else:
+            # the addresses in the default reprs change between the runs
+            part = re.sub(r" at 0x[0-9a-fA-F]+", "", repr(value)).encode()
+        parts.append(name.encode() + b"=" + hashlib.sha256(part).digest())
+    return b"\n".join(parts)
+
+
+class StageCache:
+    """
+    Parameters
+    ----------
+    root : str | Path
+        The folder of the cache; the default one is persistent and shared by the experiments on the same data.
+    input_path : str | Path
+        The input data of the pipeline; a change of the data invalidates all the stages.
+    size_limit : int
+        The stages used least recently are evicted when the cache is larger (in bytes). No limit if <= 0.
+    report_path : str | Path | None
+        Where to report the stages of this run; no report if None.
+    """
+
+    def __init__(
+        self,
+        root: str | Path = DEFAULT_ROOT,
+        input_path: str | Path = DEFAULT_INPUT_PATH,
+        size_limit: int = 20 * 1024**3,
+        report_path: str | Path | None = REPORT_NAME,
+    ) -> None:
+        self.root = Path(root)
+        self.size_limit = size_limit
+        self.report_path = None if report_path is None else Path(report_path)
+        self.base_key = hashlib.sha256(
+            json.dumps({"input": _input_fingerprint(input_path), "argv": sys.argv[1:]}).encode()
+        ).hexdigest()
+        # id of a stage output -> (key of the stage, the output); the output is kept so that its id is not reused
+        self._produced: dict[int, tuple[str, Any]] = {}
+        self.stages: list[dict] = []
+        self._write_report()
+
+    def _arg_key(self, arg: Any) -> str:
+        if id(arg) in self._produced:
+            return self._produced[id(arg)][0]
+        try:
+            return hashlib.sha256(pickle.dumps(arg, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+        except Exception:  # not picklable
+            return repr(arg)
+
+    def key(self, name: str, func: Callable, args: tuple, kwargs: dict, deps: Iterable = ()) -> str:
+        h = hashlib.sha256(self.base_key.encode())
+        h.update(name.encode())
+        for dep in (func, *deps):
+            h.update(hashlib.sha256(_source(dep)).digest())
+            h.update(hashlib.sha256(_globals_source(dep)).digest())
+        for arg in args:
+            h.update(self._arg_key(arg).encode())
+        for k in sorted(kwargs):
+            h.update(k.encode() + self._arg_key(kwargs[k]).encode())
+        return h.hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        folder = self.root / key[:2]
+        return folder / f"{key}.pkl", folder / f"{key}.json"
+
+    def run(self, name: str, func: Callable, *args: Any, deps: Iterable = (), **kwargs: Any) -> Any:
+        """Return `func(*args, **kwargs)`, loaded from the cache if the stage is unchanged since it was stored."""
+        key = self.key(name, func, args, kwargs, deps)
+        data_path, meta_path = self._paths(key)
+        start = time.perf_counter()
+        result, hit = None, False
+        if meta_path.exists():
+            try:
+                meta = json.loads(meta_path.read_text())
+                with data_path.open("rb") as f:
+                    result = pickle.load(f)
+                hit = True
+                os.utime(meta_path)  # the last use, for the eviction
+            except Exception as e:  # e.g. a partially evicted entry
+                print(f"[stage_cache] Failed to load stage {name}, running it: {e}", file=sys.stderr)
+        elapsed = time.perf_counter() - start
+
+        if hit:
+            stage = {
+                "name": name,
+                "hit": True,
+                "seconds": elapsed,
+                "saved_seconds": max(0.0, meta["seconds"] - elapsed),
+            }
+            print(f"[stage_cache] Stage {name} loaded from the cache, {stage['saved_seconds']:.1f}s saved")
+        else:
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            stage = {"name": name, "hit": False, "seconds": elapsed, "saved_seconds": 0.0}
+            self._store(name, key, result, elapsed)
+        stage["key"] = key
+        self.stages.append(stage)
+        self._register(key, result)
+        self._write_report()
+        return result
+
+    def _register(self, key: str, result: Any) -> None:
+        # the latest stage wins: a stage may modify its input in place and return it
+        if isinstance(result, (tuple, list)):
+            for i, item in enumerate(result):
+                self._produced[id(item)] = (f"{key}[{i}]", item)
+        elif isinstance(result, dict):
+            for k, item in result.items():
+                self._produced[id(item)] = (f"{key}[{k!r}]", item)
+        self._produced[id(result)] = (key, result)
+
+    def _store(self, name: str, key: str, result: Any, seconds: float) -> None:
+        data_path, meta_path = self._paths(key)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = data_path.with_name(f".{uuid.uuid4().hex}.tmp")
+        try:
+            with tmp.open("wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, data_path)
+            size = data_path.stat().st_size
+            tmp.write_text(json.dumps({"name": name, "seconds": seconds, "size": size}))
+            os.replace(tmp, meta_path)  # the entry is complete once its meta is written
+        except Exception as e:  # e.g. not picklable or no space left
+            print(f"[stage_cache] Failed to store stage {name}: {e}", file=sys.stderr)
+            tmp.unlink(missing_ok=True)
+            return
+        if self.size_limit > 0:
+            self.evict(self.size_limit)
+
+    def evict(self, size_limit: int) -> None:
+        """Remove the stages used least recently until the cache is not larger than `size_limit` bytes."""
+        entries = []
+        for meta_path in self.root.glob("*/*.json"):
+            try:
+                entries.append((meta_path.stat().st_mtime, json.loads(meta_path.read_text())["size"], meta_path))
+            except Exception:
+                continue
+        total = sum(size for _, size, _ in entries)
+        for _, size, meta_path in sorted(entries, key=lambda e: e[0]):
+            if total <= size_limit:
+                break
+            meta_path.unlink(missing_ok=True)
+            meta_path.with_suffix(".pkl").unlink(missing_ok=True)
+            total -= size
+
+    def _write_report(self) -> None:
+        if self.report_path is not None:
+            self.report_path.write_text(json.dumps({"stages": self.stages}, indent=2))
+
+
+def read_report(folder: str | Path, remove: bool = True) -> dict | None:
+    """The stage report of the last run in `folder`, with the total time saved; None if the run did not report."""
+    path = Path(folder) / REPORT_NAME
+    if not path.exists():
+        return None
+    try:
+        report = json.loads(path.read_text())
+    except ValueError:
+        return None
+    finally:
+        if remove:
+            path.unlink(missing_ok=True)
+    report["n_hits"] = sum(stage["hit"] for stage in report["stages"])
+    report["saved_seconds"] = sum(stage["saved_seconds"] for stage in report["stages"])
+    return report
@@ -85,6 +85,11 @@ class DSTrace(Trace[DataScienceScen, KnowledgeBase]):
         if loop_id in self.uncommitted_experiments:
             del self.uncommitted_experiments[loop_id]
 
+    def snapshot(self) -> "DSTrace":
+        trace = super().snapshot()
+        trace.uncommitted_experiments = dict(self.uncommitted_experiments)
+        return trace
+
     def set_sota_exp_to_submit(self, exp: DSExperiment) -> None:
         self.sota_exp_to_submit = exp
 
@@ -103,13 +108,7 @@ class DSTrace(Trace[DataScienceScen, KnowledgeBase]):
         # If we implement the most correct merging logic,  merge 2 traces, will result in a single trace(2 traces currently).
         # So user may get unexpected results when he want to know ho many branches are created.
 
-        # Build a set of all parent indices found in dag_parent (skip empty tuples which represent roots)
-        parent_indices = set(idx for parents in self.dag_parent for idx in parents)
-        # All node indices
-        all_indices = set(range(len(self.hist)))
-        # The leaf nodes have no children, so they are not present as parents of any other node
-        leaves = list(sorted(all_indices - parent_indices))
-        return leaves
+        return super().get_leaves()
 
     def get_sibling_exps(self, current_selection: tuple[int, ...] | None = None):
         """
@@ -160,6 +159,7 @@ class DSTrace(Trace[DataScienceScen, KnowledgeBase]):
             self.dag_parent.append((current_node_idx,))
         self.hist.append(exp_and_fb)
         self.idx2loop_id[len(self.hist) - 1] = cur_loop_id
+        self.dag_index.update()
         self.deregister_uncommitted_exp(cur_loop_id)
 
     def retrieve_search_list(
@@ -95,7 +95,7 @@ class DSKnowledgeBase(UndirectedGraph):
             self.add_nodes(idea_node, neighbor_list)
 
     def build_idea_pool(self, idea_pool_json_path: str | Path):
-        if len(self.vector_base.vector_df) > 0:
+        if len(self.vector_base) > 0:
             logger.warning("Knowledge graph is not empty, please clear it first. Ignore reading from json file.")
             return
         else:
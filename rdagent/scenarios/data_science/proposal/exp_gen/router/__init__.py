@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import asyncio
+import difflib
+import re
 from datetime import datetime, timedelta, timezone
 from typing import TYPE_CHECKING
 
@@ -33,6 +35,22 @@ if TYPE_CHECKING:
     from rdagent.utils.workflow.loop import LoopBase
 
 
+def _proposal_text(exp: DSExperiment) -> str:
+    """The hypothesis of the experiment (or the description of its tasks) as compared for deduplication"""
+    hypothesis = exp.hypothesis
+    if hypothesis is not None and hypothesis.hypothesis:
+        return f"{getattr(hypothesis, 'component', '')} {hypothesis.hypothesis}"
+    return " ".join(task.description for tasks in exp.pending_tasks_list for task in tasks)
+
+
+def _text_similarity(a: str, b: str) -> float:
+    """The similarity ratio (in [0, 1]) of the words of two texts, ignoring the case and the punctuation"""
+    words_a, words_b = re.findall(r"\w+", a.lower()), re.findall(r"\w+", b.lower())
+    if not words_a and not words_b:
+        return 1.0
+    return difflib.SequenceMatcher(None, words_a, words_b, autojunk=False).ratio()
+
+
 class ParallelMultiTraceExpGen(ExpGen):
     """
     An experiment generation strategy that enables parallel multi-trace exploration.
@@ -40,6 +58,10 @@ class ParallelMultiTraceExpGen(ExpGen):
     This generator is designed to work with the "Attribute Injection" model.
     It uses a TraceScheduler to determine which parent node to expand, and
     injects this parent context into the experiment object itself.
+
+    When several loops can be kicked off (and `DS_RD_SETTING.exp_gen_batch_size > 1`), up to that many distinct
+    parents are selected at once and their experiments are proposed concurrently; the ones not returned are queued
+    for the next calls, after dropping the near-duplicates of the queued and running experiments.
     """
 
     def __init__(self, *args, **kwargs):
@@ -54,6 +76,7 @@ class ParallelMultiTraceExpGen(ExpGen):
             DS_RD_SETTING.scheduler_temperature,
         )
         self.planner = import_class(DS_RD_SETTING.planner)(self.scen)
+        self.queued_exps: list[DSExperiment] = []  # proposed concurrently, waiting for a loop
 
     def gen(
         self,
@@ -66,6 +89,56 @@ class ParallelMultiTraceExpGen(ExpGen):
 
     def reset(self) -> None:
         self.trace_scheduler.reset()
+        self.queued_exps = []
+
+    def _gen_on_selection(self, trace: DSTrace, local_selection: tuple[int, ...]) -> tuple[DSExperiment, str]:
+        """Propose an experiment expanding `local_selection` (a draft if its sub-trace has no SOTA yet)."""
+        trace.set_current_selection(local_selection)
+        ds_plan = self.planner.plan(trace) if DS_RD_SETTING.enable_planner else DSExperimentPlan()
+        if trace.sota_experiment(selection=local_selection) is None and DS_RD_SETTING.enable_draft_before_first_sota:
+            exp_gen = self.draft_exp_gen
+        else:
+            exp_gen = self.exp_gen
+        exp = exp_gen.gen(trace, plan=ds_plan)
+        exp.set_local_selection(local_selection)
+        exp.plan = ds_plan
+        return exp, type(exp_gen).__name__
+
+    async def _gen_concurrently(
+        self, trace: DSTrace, selections: list[tuple[int, ...]]
+    ) -> list[tuple[DSExperiment, str]]:
+        """
+        Propose an experiment on each selection in a thread, on a snapshot of the trace holding the selection
+        (the event loop may record other experiments in the trace meanwhile).
+        The selections whose proposal fails are released; the error is raised if they all fail.
+        """
+        results = await asyncio.gather(
+            *[asyncio.to_thread(self._gen_on_selection, trace.snapshot(), selection) for selection in selections],
+            return_exceptions=True,
+        )
+        exps = []
+        for selection, result in zip(selections, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to propose an experiment on {selection}: {result}")
+                self.trace_scheduler.release(trace, selection)
+            else:
+                exps.append(result)
+        if not exps:
+            raise results[0]
+        trace.set_current_selection(exps[0][0].local_selection)
+        return exps
+
+    def _queue(self, trace: DSTrace, exps: list[DSExperiment], returned_exp: DSExperiment) -> None:
+        """Queue the experiments proposed concurrently, except the near-duplicates of the queued/running ones."""
+        others = [returned_exp, *self.queued_exps, *trace.uncommitted_experiments.values()]
+        for exp in exps:
+            text = _proposal_text(exp)
+            if any(_text_similarity(text, _proposal_text(o)) >= DS_RD_SETTING.exp_gen_dedup_threshold for o in others):
+                logger.info(f"Drop the experiment proposed on {exp.local_selection}: {exp.hypothesis} is a duplicate")
+                self.trace_scheduler.release(trace, exp.local_selection)
+                continue
+            self.queued_exps.append(exp)
+            others.append(exp)
 
     async def async_gen(self, trace: DSTrace, loop: LoopBase) -> DSExperiment:
         """
@@ -78,14 +151,29 @@ class ParallelMultiTraceExpGen(ExpGen):
         local_selection: tuple[int, ...] = None
 
         while True:
-            if loop.get_unfinished_loop_cnt(loop.loop_idx) < RD_AGENT_SETTINGS.get_max_parallel():
+            n_free = RD_AGENT_SETTINGS.get_max_parallel() - loop.get_unfinished_loop_cnt(loop.loop_idx)
+            if n_free > 0:
+                if self.queued_exps:
+                    exp = self.queued_exps.pop(0)
+                    logger.info(f"Use the experiment proposed concurrently on {exp.local_selection}")
+                    trace.set_current_selection(exp.local_selection)
+                    trace.register_uncommitted_exp(exp, loop.loop_idx)
+                    return exp
+
                 # set trace current selection
                 leaves: list[int] = trace.get_leaves()
+                start = datetime.now(timezone.utc)
+                n_exps = 1
                 if not timer.started or timer.remain_time() >= timedelta(hours=DS_RD_SETTING.merge_hours):
-                    local_selection = await self.trace_scheduler.next(trace)
-
-                    # set the local selection as the global current selection for the trace
-                    trace.set_current_selection(local_selection)
+                    n = max(1, min(n_free, DS_RD_SETTING.exp_gen_batch_size))
+                    selections = await self.trace_scheduler.next_batch(trace, n)
+                    if len(selections) == 1:
+                        # set the local selection as the global current selection for the trace
+                        exp, exp_gen_type = self._gen_on_selection(trace, selections[0])
+                    else:
+                        exps = await self._gen_concurrently(trace, selections)
+                        (exp, exp_gen_type), n_exps = exps[0], len(exps)
+                        self._queue(trace, [e for e, _ in exps[1:]], exp)
                 else:
                     if len(leaves) < 2:
                         local_selection = (-1,)
@@ -99,41 +187,28 @@ class ParallelMultiTraceExpGen(ExpGen):
                                     break
                         trace.set_current_selection(local_selection)
 
-                ds_plan = self.planner.plan(trace) if DS_RD_SETTING.enable_planner else DSExperimentPlan()
-
-                start = datetime.now(timezone.utc)
-                exp_gen_type = ""
-                if (
-                    (not timer.started or timer.remain_time() >= timedelta(hours=DS_RD_SETTING.merge_hours))
-                    and trace.sota_experiment(selection=local_selection) is None
-                    and DS_RD_SETTING.enable_draft_before_first_sota
-                ):
-                    exp = self.draft_exp_gen.gen(trace, plan=ds_plan)
-                    exp_gen_type = type(self.draft_exp_gen).__name__
-                elif (
-                    timer.started
-                    and timer.remain_time() < timedelta(hours=DS_RD_SETTING.merge_hours)
-                    and len(leaves) >= 2
-                ):
-                    DS_RD_SETTING.coding_fail_reanalyze_threshold = 100000
-                    DS_RD_SETTING.consecutive_errors = 100000
-                    exp = self.merge_exp_gen.gen(trace, plan=ds_plan)
-                    exp_gen_type = type(self.merge_exp_gen).__name__
-                else:
-                    # If there is a sota experiment in the sub-trace and not in merge time, we use default exp_gen
-                    exp = self.exp_gen.gen(trace, plan=ds_plan)
-                    exp_gen_type = type(self.exp_gen).__name__
+                    ds_plan = self.planner.plan(trace) if DS_RD_SETTING.enable_planner else DSExperimentPlan()
+                    if len(leaves) >= 2:
+                        DS_RD_SETTING.coding_fail_reanalyze_threshold = 100000
+                        DS_RD_SETTING.consecutive_errors = 100000
+                        exp = self.merge_exp_gen.gen(trace, plan=ds_plan)
+                        exp_gen_type = type(self.merge_exp_gen).__name__
+                    else:
+                        # If there is a sota experiment in the sub-trace and not in merge time, we use default exp_gen
+                        exp = self.exp_gen.gen(trace, plan=ds_plan)
+                        exp_gen_type = type(self.exp_gen).__name__
+                    exp.set_local_selection(local_selection)
+                    exp.plan = ds_plan
                 end = datetime.now(timezone.utc)
                 logger.log_object(
                     {
                         "exp_gen_type": exp_gen_type,
                         "start_time": start,
                         "end_time": end,
+                        "n_exps": n_exps,
                     },
                     tag="exp_gen_time_info",
                 )
-                exp.set_local_selection(local_selection)
-                exp.plan = ds_plan
 
                 # Register the newly created experiment before returning
                 trace.register_uncommitted_exp(exp, loop.loop_idx)
@@ -0,0 +1,160 @@
+"""
+Replay a recorded trace with trace schedulers, offline and without LLM calls, to compare their throughput and
+the outcomes of their selections.
+
+The outcome of expanding a node is drawn from the recorded trace: a simulated node stands for a recorded one,
+and expanding it gives one of the recorded children of that node (the experiment and its feedback), or any
+recorded node when it has none. Up to `n_parallel` selections are pending at once, and they are committed in
+order as the loops of `DataScienceRDLoop` would record them.
+
+Usage:
+
+    python -m rdagent.scenarios.data_science.proposal.exp_gen.scheduler_replay compare <log folder or trace.pkl> \
+        --schedulers MCTSScheduler,SOTABasedScheduler --n_steps 200 --n_parallel 4
+"""
+
+from __future__ import annotations
+
+import copy
+import pickle
+import random
+import time
+from collections import deque
+from pathlib import Path
+
+import fire
+import numpy as np
+import pandas as pd
+
+from rdagent.app.data_science.conf import DS_RD_SETTING
+from rdagent.core.utils import import_class
+from rdagent.log.storage import FileStorage
+from rdagent.scenarios.data_science.proposal.exp_gen.base import DSTrace
+from rdagent.scenarios.data_science.proposal.exp_gen.trace_scheduler import (
+    BaseScheduler,
+)
+
+
+def load_recorded_trace(path: str | Path) -> DSTrace:
+    """The pickled trace at `path`, or the latest trace logged in the log folder `path`."""
+    path = Path(path)
+    if path.is_file():
+        with path.open("rb") as f:
+            return pickle.load(f)
+    storage = FileStorage(path)
+    entries, _ = storage.read_index()
+    entries = sorted((e for e in entries if e["tag"] == "trace"), key=lambda e: e["timestamp"])
+    if not entries:
+        raise ValueError(f"No trace is logged in {path}")
+    return storage.load_msg(entries[-1]).content
+
+
+def _score(exp: object) -> float | None:
+    try:
+        return float(exp.result.loc["ensemble"].iloc[0])
+    except Exception:  # no result (e.g. a failed experiment)
+        return None
+
+
+def replay(
+    scheduler: BaseScheduler,
+    recorded: DSTrace,
+    n_steps: int = 100,
+    n_parallel: int = 1,
+    seed: int = 0,
+) -> dict:
+    """
+    Expand a new trace `n_steps` times with `scheduler`, drawing the outcomes from `recorded`.
+
+    Returns the time spent by the scheduler and the statistics of the simulated trace.
+    """
+    if not recorded.hist:
+        raise ValueError("The recorded trace is empty")
+    rng = random.Random(seed)
+    random.seed(seed)  # the probabilistic schedulers sample with `random`
+    children: dict[int | None, list[int]] = {}
+    for i, parents in enumerate(recorded.dag_parent):
+        children.setdefault(parents[0] if parents else None, []).append(i)
+
+    sim = DSTrace(scen=recorded.scen)
+    recorded_idx: list[int] = []  # the recorded node each simulated node stands for
+    pending: deque[tuple[int, ...]] = deque()
+    select_seconds, n_blocked = 0.0, 0
+    while len(sim.hist) < n_steps:
+        if len(pending) < n_parallel and len(sim.hist) + len(pending) < n_steps:
+            start = time.perf_counter()
+            selections = scheduler.try_next_batch(sim, n_parallel - len(pending))
+            select_seconds += time.perf_counter() - start
+            if selections:
+                pending.extend(selections)
+                continue
+            n_blocked += 1
+            if not pending:
+                break  # nothing can be selected nor committed
+
+        # the oldest pending loop is recorded
+        selection = pending.popleft()
+        parent = recorded_idx[selection[0]] if selection != sim.NEW_ROOT else None
+        node = rng.choice(children.get(parent) or range(len(recorded.hist)))
+        exp, fb = recorded.hist[node]
+        exp = copy.copy(exp)
+        exp.set_local_selection(selection)
+        sim.set_current_selection(selection)
+        sim.sync_dag_parent_and_hist((exp, fb), len(sim.hist))
+        recorded_idx.append(node)
+
+    decisions = [bool(getattr(fb, "decision", False)) for _, fb in sim.hist]
+    sota_scores = [s for (exp, _), d in zip(sim.hist, decisions) if d and (s := _score(exp)) is not None]
+    depth = [len(sim.get_parents(i)) for i in range(len(sim.hist))]
+    return {
+        "n_nodes": len(sim.hist),
+        "n_sub_traces": sim.sub_trace_count,
+        "n_sota": sum(decisions),
+        "max_sota_score": max(sota_scores, default=np.nan),
+        "min_sota_score": min(sota_scores, default=np.nan),
+        "mean_depth": float(np.mean(depth)) if depth else 0.0,
+        "n_blocked_selections": n_blocked,
+        "select_seconds": select_seconds,
+        "selections_per_second": len(sim.hist) / select_seconds if select_seconds > 0 else np.inf,
+    }
+
+
+def _scheduler_class(name: str) -> type[BaseScheduler]:
+    if "." not in name:
+        name = f"rdagent.scenarios.data_science.proposal.exp_gen.trace_scheduler.{name}"
+    return import_class(name)
+
+
+def compare(
+    trace_path: str,
+    schedulers: str | list[str] = "RoundRobinScheduler,TraceLengthScheduler,SOTABasedScheduler,MCTSScheduler",
+    n_steps: int = 100,
+    n_parallel: int = 1,
+    max_trace_num: int | None = None,
+    temperature: float | None = None,
+    seeds: int = 5,
+) -> pd.DataFrame:
+    """
+    Replay the trace at `trace_path` (see `load_recorded_trace`) with each scheduler (comma-separated class names
+    of `trace_scheduler` or import paths) and `seeds` seeds; return the mean statistics of each scheduler.
+    """
+    recorded = load_recorded_trace(trace_path)
+    if max_trace_num is None:  # as many sub-traces as recorded
+        max_trace_num = max(DS_RD_SETTING.max_trace_num, sum(1 for parents in recorded.dag_parent if not parents))
+    if temperature is None:
+        temperature = DS_RD_SETTING.scheduler_temperature
+    if isinstance(schedulers, str):
+        schedulers = schedulers.split(",")
+    rows = []
+    for name in schedulers:
+        cls = _scheduler_class(name.strip())
+        for seed in range(seeds):
+            scheduler = cls(max_trace_num, temperature)
+            rows.append({"scheduler": cls.__name__, **replay(scheduler, recorded, n_steps, n_parallel, seed=seed)})
+    summary = pd.DataFrame(rows).groupby("scheduler", sort=False).mean()
+    print(summary.to_string())
+    return summary
+
+
+if __name__ == "__main__":
+    fire.Fire({"compare": compare})
@@ -7,6 +7,8 @@ from abc import ABC, abstractmethod
 from collections import defaultdict
 from typing import TYPE_CHECKING
 
+import numpy as np
+
 from rdagent.app.data_science.conf import DS_RD_SETTING
 from rdagent.log import rdagent_logger as logger
 from rdagent.scenarios.kaggle.kaggle_crawler import get_metric_direction
@@ -40,6 +42,20 @@ class TraceScheduler(ABC):
         """
         raise NotImplementedError
 
+    async def next_batch(self, trace: DSTrace, n: int) -> list[tuple[int, ...]]:
+        """
+        Selects up to `n` distinct parents to expand concurrently (at least one, waiting like `next`).
+
+        The default implementation only selects one.
+        """
+        return [await self.next(trace)]
+
+    def release(self, trace: DSTrace, parents: tuple[int, ...]) -> None:
+        """
+        Give up a selection returned by `next`/`next_batch` which will never be recorded in the trace
+        (e.g. a dropped speculative experiment).
+        """
+
     def reset(self) -> None:
         """
         Reset the scheduler to the initial state.
@@ -56,31 +72,48 @@ class BaseScheduler(TraceScheduler):
         """
         Atomically selects the next leaf node from the trace in order.
         """
+        return (await self.next_batch(trace, 1))[0]
+
+    async def next_batch(self, trace: DSTrace, n: int) -> list[tuple[int, ...]]:
+        """
+        Selects up to `n` parents by calling `select` repeatedly; each selection is recorded as uncommitted before
+        the next one, so the leaves are distinct. Stops early when `select` returns None or repeats a leaf.
+        """
         while True:
-            # step 1: Commit the pending selections
-            self.process_uncommitted_nodes(trace)
-
-            # step 2: update uncommited_rec_status & rec_commit_idx
-            for i in range(self.rec_commit_idx, len(trace.dag_parent)):
-                parent_of_i = trace.dag_parent[i]
-                if parent_of_i == trace.NEW_ROOT:
-                    self.uncommited_rec_status[trace.NEW_ROOT] -= 1
-                else:
-                    for p in parent_of_i:
-                        self.uncommited_rec_status[p] -= 1
-            self.rec_commit_idx = len(trace.hist)
+            selections = self.try_next_batch(trace, n)
+            if selections:
+                return selections
 
-            parents = self.select(trace)
+            await asyncio.sleep(1)
 
-            if parents is not None:
-                if parents == trace.NEW_ROOT:
-                    self.uncommited_rec_status[trace.NEW_ROOT] += 1
-                else:
-                    for p in parents:
-                        self.uncommited_rec_status[p] += 1
-                return parents
+    def try_next_batch(self, trace: DSTrace, n: int) -> list[tuple[int, ...]]:
+        """The non-blocking `next_batch`: an empty list if no selection can be made now."""
+        # step 1: Commit the pending selections
+        self.process_uncommitted_nodes(trace)
 
-            await asyncio.sleep(1)
+        # step 2: update uncommited_rec_status & rec_commit_idx
+        for i in range(self.rec_commit_idx, len(trace.dag_parent)):
+            self._update_status(trace, trace.dag_parent[i], -1)
+        self.rec_commit_idx = len(trace.hist)
+
+        selections: list[tuple[int, ...]] = []
+        while len(selections) < n:
+            parents = self.select(trace)
+            if parents is None or (parents != trace.NEW_ROOT and parents in selections):
+                break
+            self._update_status(trace, parents, 1)
+            selections.append(parents)
+        return selections
+
+    def _update_status(self, trace: DSTrace, parents: tuple[int, ...], delta: int) -> None:
+        if parents == trace.NEW_ROOT:
+            self.uncommited_rec_status[trace.NEW_ROOT] += delta
+        else:
+            for p in parents:
+                self.uncommited_rec_status[p] += delta
+
+    def release(self, trace: DSTrace, parents: tuple[int, ...]) -> None:
+        self._update_status(trace, parents, -1)
 
     def process_uncommitted_nodes(self, trace: DSTrace) -> None:
         """
@@ -136,10 +169,23 @@ class RoundRobinScheduler(BaseScheduler):
 # ======================================================================================
 
 
+def _grow(arr: np.ndarray, size: int) -> np.ndarray:
+    """Return `arr` with room for `size` entries (zero-filled), doubling the capacity when needed"""
+    if size <= len(arr):
+        return arr
+    grown = np.zeros(max(size, 2 * len(arr)), dtype=arr.dtype)
+    grown[: len(arr)] = arr
+    return grown
+
+
 class ProbabilisticScheduler(BaseScheduler):
     """
     A concurrency-safe scheduling strategy that samples the next trace to expand
     based on a probability distribution derived from a potential function.
+
+    The length of the path to each committed node and its number of SOTA experiments are kept in arrays updated
+    when the nodes are committed, so the potentials of all the leaves are computed at once by
+    `calculate_potentials` (which falls back to `calculate_potential` per leaf for the custom potentials).
     """
 
     def __init__(self, max_trace_num: int, temperature: float = 1.0, *args, **kwargs):
@@ -156,6 +202,52 @@ class ProbabilisticScheduler(BaseScheduler):
         self.max_trace_num = max_trace_num
         self.temperature = temperature
         super().__init__()
+        self._reset_node_stats()
+
+    def _reset_node_stats(self) -> None:
+        self.n_observed_nodes = 0
+        self.path_len = np.zeros(64, dtype=np.int64)  # the number of nodes from the root to the node
+        self.sota_count = np.zeros(64, dtype=np.int64)  # the number of SOTA experiments on that path
+
+    def observe_nodes(self, trace: DSTrace) -> None:
+        """Update the statistics of the nodes committed since the last call."""
+        n = min(len(trace.dag_parent), len(trace.hist))
+        if n < self.n_observed_nodes:  # the trace has been reset or replaced
+            self._reset_node_stats()
+        if n == self.n_observed_nodes:
+            return
+        self.path_len = _grow(self.path_len, n)
+        self.sota_count = _grow(self.sota_count, n)
+        for i in range(self.n_observed_nodes, n):
+            parents = trace.dag_parent[i]
+            decision = int(bool(getattr(trace.hist[i][1], "decision", False)))
+            if not parents or parents[0] == i:
+                self.path_len[i], self.sota_count[i] = 1, decision
+            else:  # the first parent, as `get_parents` follows
+                self.path_len[i] = self.path_len[parents[0]] + 1
+                self.sota_count[i] = self.sota_count[parents[0]] + decision
+        self.n_observed_nodes = n
+
+    def process_uncommitted_nodes(self, trace: DSTrace) -> None:
+        self.observe_nodes(trace)
+
+    def reset(self) -> None:
+        super().reset()
+        self._reset_node_stats()
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if "path_len" not in state:  # pickled before the statistics of the nodes
+            self._reset_node_stats()
+
+    def calculate_potentials(self, trace: DSTrace, leaves: list[int]) -> np.ndarray:
+        """
+        Calculate the potential scores of the leaves at once.
+        Subclasses defining their potential by `calculate_potential` only need to override that one.
+        """
+        if type(self).calculate_potential is ProbabilisticScheduler.calculate_potential:
+            return np.ones(len(leaves))
+        return np.array([self.calculate_potential(trace, leaf) for leaf in leaves], dtype=float)
 
     def calculate_potential(self, trace: DSTrace, leaf_id: int) -> float:
         """
@@ -181,22 +273,19 @@ class ProbabilisticScheduler(BaseScheduler):
         Returns:
             List of probabilities that sum to 1.
         """
-        if not potentials:
+        if len(potentials) == 0:
             return []
+        return self._softmax(np.asarray(potentials, dtype=float)).tolist()
 
-        # Apply temperature scaling
-        scaled_potentials = [p / self.temperature for p in potentials]
-
-        # Compute softmax
-        max_potential = max(scaled_potentials)
-        exp_potentials = [math.exp(p - max_potential) for p in scaled_potentials]
-        sum_exp = sum(exp_potentials)
-
+    def _softmax(self, potentials: np.ndarray) -> np.ndarray:
+        # Apply temperature scaling, and subtract the max for stability
+        scaled = potentials / self.temperature
+        exp_potentials = np.exp(scaled - scaled.max())
+        sum_exp = exp_potentials.sum()
         if sum_exp == 0:
             # If all potentials are very small, return uniform distribution
-            return [1.0 / len(potentials)] * len(potentials)
-
-        return [exp_p / sum_exp for exp_p in exp_potentials]
+            return np.full(len(potentials), 1.0 / len(potentials))
+        return exp_potentials / sum_exp
 
     def select(self, trace: DSTrace) -> tuple[int, ...] | None:
         """
@@ -215,16 +304,18 @@ class ProbabilisticScheduler(BaseScheduler):
             return None
 
         # Calculate potential for each available leaf
-        potentials = [self.calculate_potential(trace, leaf) for leaf in available_leaves]
+        potentials = self.calculate_potentials(trace, available_leaves)
 
-        if any(p < 0 for p in potentials):
+        if (potentials < 0).any():
             raise ValueError("Potential function returned a negative value.")
 
         # Convert potentials to probabilities using softmax
-        probabilities = self._softmax_probabilities(potentials)
+        probabilities = self._softmax(potentials)
 
-        # Select a leaf based on probabilities
-        selected_leaf = random.choices(available_leaves, weights=probabilities, k=1)[0]
+        # Select a leaf based on probabilities (as `random.choices` does)
+        cum_weights = np.cumsum(probabilities)
+        idx = int(np.searchsorted(cum_weights, random.random() * cum_weights[-1], side="right"))
+        selected_leaf = available_leaves[min(idx, len(available_leaves) - 1)]
 
         return (selected_leaf,)
 
@@ -263,6 +354,11 @@ class TraceLengthScheduler(ProbabilisticScheduler):
 
         return 1.0 / path_len if self.inverse else float(path_len)
 
+    def calculate_potentials(self, trace: DSTrace, leaves: list[int]) -> np.ndarray:
+        self.observe_nodes(trace)
+        path_len = self.path_len[leaves].astype(float)
+        return 1.0 / path_len if self.inverse else path_len
+
 
 class SOTABasedScheduler(ProbabilisticScheduler):
     """
@@ -300,6 +396,11 @@ class SOTABasedScheduler(ProbabilisticScheduler):
             return 1.0 / (sota_count + 1)
         return float(sota_count)
 
+    def calculate_potentials(self, trace: DSTrace, leaves: list[int]) -> np.ndarray:
+        self.observe_nodes(trace)
+        sota_count = self.sota_count[leaves].astype(float)
+        return 1.0 / (sota_count + 1) if self.inverse else sota_count
+
 
 class RandomScheduler(ProbabilisticScheduler):
     """
@@ -312,6 +413,9 @@ class RandomScheduler(ProbabilisticScheduler):
         """
         return random.random()
 
+    def calculate_potentials(self, trace: DSTrace, leaves: list[int]) -> np.ndarray:
+        return np.array([random.random() for _ in leaves])
+
 
 class MCTSScheduler(ProbabilisticScheduler):
     """
@@ -323,37 +427,74 @@ class MCTSScheduler(ProbabilisticScheduler):
 
     Design goals for the initial version:
     - Reuse ProbabilisticScheduler's potential calculation as prior P (via softmax).
-    - Maintain visit/value statistics per leaf to compute Q and U.
+    - Maintain visit/value statistics per node to compute Q and U.
     - Update visits on selection; update values after feedback via observe_feedback.
     - Keep NEW_ROOT policy and uncommitted status handling identical to base classes.
+
+    The statistics are arrays indexed by node, so the scores of all the nodes are computed at once.
     """
 
     def __init__(self, max_trace_num: int, temperature: float = 1.0, *args, **kwargs):
         super().__init__(max_trace_num, temperature)
         # Read c_puct from settings if available, otherwise fall back to default 1.0
         self.c_puct = getattr(DS_RD_SETTING, "scheduler_c_puct", 1.0) or 1.0
-        # Statistics keyed by leaf node index
-        self.node_visit_count: dict[int, int] = {}
-        self.node_value_sum: dict[int, float] = {}
-        self.node_prior: dict[int, float] = {}
+        self._reset_mcts_stats()
+
+    def _reset_mcts_stats(self) -> None:
+        # Statistics indexed by node
+        self.visit_count = np.zeros(64, dtype=np.int64)
+        self.value_sum = np.zeros(64, dtype=float)
+        self.prior = np.zeros(64, dtype=float)
         # Global counter to stabilize U term
         self.global_visit_count: int = 0
         # Last observed commit index for batch feedback observation
         self.last_observed_commit_idx: int = 0
 
+    def __setstate__(self, state: dict) -> None:
+        # the schedulers pickled with the statistics in dicts
+        if "node_visit_count" in state:
+            n = max([*state["node_visit_count"], *state["node_value_sum"], *state["node_prior"], 63]) + 1
+            for key, name, dtype in [
+                ("node_visit_count", "visit_count", np.int64),
+                ("node_value_sum", "value_sum", float),
+                ("node_prior", "prior", float),
+            ]:
+                arr = np.zeros(n, dtype=dtype)
+                for node_id, value in state.pop(key).items():
+                    arr[node_id] = value
+                state[name] = arr
+        super().__setstate__(state)
+
+    def _ensure_capacity(self, n: int) -> None:
+        self.visit_count = _grow(self.visit_count, n)
+        self.value_sum = _grow(self.value_sum, n)
+        self.prior = _grow(self.prior, n)
+
     def _get_q(self, node_id: int) -> float:
-        visits = self.node_visit_count.get(node_id, 0)
-        value_sum = self.node_value_sum.get(node_id, 0.0)
-        if visits <= 0:
+        if node_id >= len(self.visit_count) or self.visit_count[node_id] <= 0:
             # Unseen nodes default to neutral Q
             return 0.0
-        return value_sum / visits
+        return float(self.value_sum[node_id] / self.visit_count[node_id])
 
     def _get_u(self, node_id: int) -> float:
-        prior = self.node_prior.get(node_id, 0.0)
-        visits = self.node_visit_count.get(node_id, 0)
+        prior = self.prior[node_id] if node_id < len(self.prior) else 0.0
+        visits = self.visit_count[node_id] if node_id < len(self.visit_count) else 0
         # Avoid div-by-zero; encourage exploration when visits are small
-        return self.c_puct * prior * math.sqrt(max(1, self.global_visit_count)) / (1 + visits)
+        return float(self.c_puct * prior * math.sqrt(max(1, self.global_visit_count)) / (1 + visits))
+
+    def scores(self, trace: DSTrace) -> np.ndarray:
+        """The PUCT scores Q + U of all the nodes of the trace, updating their priors"""
+        n = len(trace.hist)
+        self._ensure_capacity(n)
+        potentials = self.calculate_potentials(trace, list(range(n)))
+        if (potentials < 0).any():
+            raise ValueError("Potential function returned a negative value.")
+        self.prior[:n] = self._softmax(potentials)
+
+        visits = self.visit_count[:n]
+        q = np.divide(self.value_sum[:n], visits, out=np.zeros(n), where=visits > 0)
+        u = self.c_puct * self.prior[:n] * math.sqrt(max(1, self.global_visit_count)) / (1 + visits)
+        return q + u
 
     def select(self, trace: DSTrace) -> tuple[int, ...] | None:
         # Step 1: keep same policy to reach target number of parallel traces
@@ -361,32 +502,12 @@ class MCTSScheduler(ProbabilisticScheduler):
         if trace.sub_trace_count + self.uncommited_rec_status[trace.NEW_ROOT] < self.max_trace_num:
             return trace.NEW_ROOT
 
-        # Step 2: consider only available leaves (not being expanded)
-        available_leaves = list(set(range(len(trace.hist))))
-        if not available_leaves:
+        # Step 2: consider all the nodes
+        if len(trace.hist) == 0:
             return None
 
-        # Step 3: compute priors (P) from potentials via softmax
-        potentials = [self.calculate_potential(trace, leaf) for leaf in available_leaves]
-        if any(p < 0 for p in potentials):
-            raise ValueError("Potential function returned a negative value.")
-        priors = self._softmax_probabilities(potentials)
-        for leaf, p in zip(available_leaves, priors):
-            self.node_prior[leaf] = p
-
-        # Step 4: score each leaf using PUCT-like rule: Q + U
-        best_leaf = None
-        best_score = -float("inf")
-        for leaf in available_leaves:
-            q = self._get_q(leaf)
-            u = self._get_u(leaf)
-            score = q + u
-            if score > best_score:
-                best_score = score
-                best_leaf = leaf
-
-        if best_leaf is None:
-            return None
+        # Step 3 & 4: compute priors (P) from potentials via softmax, and score each node using PUCT-like rule: Q + U
+        best_leaf = int(np.argmax(self.scores(trace)))
 
         # # Step 5: optimistic visit update on selection; value update deferred to observe_feedback
         self.global_visit_count += 1
@@ -413,26 +534,23 @@ class MCTSScheduler(ProbabilisticScheduler):
         else:
             reward = 1.0 if getattr(fb, "decision", False) else 0.0
         id_list = trace.get_parents(new_idx)
-        for id in id_list:
-            self.node_value_sum[id] = self.node_value_sum.get(id, 0.0) + float(reward)
-            self.node_visit_count[id] = self.node_visit_count.get(id, 0) + 1
+        self._ensure_capacity(len(trace.hist))
+        self.value_sum[id_list] += float(reward)
+        self.visit_count[id_list] += 1
 
     def reset(self) -> None:
         """
         Clear all maintained statistics. Should be called when the underlying trace is reset.
         """
         super().reset()
-        self.node_visit_count.clear()
-        self.node_value_sum.clear()
-        self.node_prior.clear()
-        self.global_visit_count = 0
-        self.last_observed_commit_idx = 0
+        self._reset_mcts_stats()
 
     def process_uncommitted_nodes(self, trace: DSTrace) -> None:
         """
         Batch observe all newly committed experiments since last observation.
         Should be called before making a new selection to ensure statistics are up-to-date.
         """
+        super().process_uncommitted_nodes(trace)
         start_idx = max(0, self.last_observed_commit_idx)
         # Only observe fully committed items (both dag_parent and hist appended)
         end_idx = min(len(trace.dag_parent), len(trace.hist))
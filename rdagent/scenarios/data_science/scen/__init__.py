@@ -49,7 +49,12 @@ class DataScienceScen(Scenario):
                         },
                     )
                 else:
-                    create_debug_data(competition, dataset_path=local_path)
+                    create_debug_data(
+                        competition,
+                        dataset_path=local_path,
+                        streaming=DS_RD_SETTING.sample_data_streaming,
+                        n_jobs=DS_RD_SETTING.sample_data_n_jobs,
+                    )
         else:
             self.debug_path = f"{local_path}/{competition}"
 
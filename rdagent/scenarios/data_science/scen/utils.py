@@ -67,18 +67,29 @@ scab (int64) has 2 unique values: [0, 1]
 
 """
 
+import io
 import json
+import math
 import os
+import random
 import reprlib
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import humanize
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 
+from rdagent.core.utils import cache_with_pickle
 from rdagent.log import rdagent_logger as logger
+from rdagent.utils import md5_hash
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
 
 # these files are treated as code (e.g. markdown wrapped)
 code_files = {".py", ".sh", ".yaml", ".yml", ".md", ".html", ".xml", ".log", ".rst"}
@@ -87,6 +98,15 @@ plaintext_files = {".txt", ".csv", ".json", ".tsv"} | code_files
 # system-generated directories/files to filter out
 system_names = {"__MACOSX", ".DS_Store", "Thumbs.db"}
 
+# files larger than this are previewed from a sample instead of being read entirely
+PREVIEW_FULL_READ_MAX_BYTES = 64 * 2**20
+# the sample: the first rows of the file and the complete lines of random byte ranges (CSV) or row groups (Parquet)
+PREVIEW_HEAD_ROWS = 1000
+PREVIEW_SAMPLE_RANGES = 16
+PREVIEW_SAMPLE_RANGE_BYTES = 256 * 2**10
+# bump it when the format of the previews changes to invalidate the cached previews
+PREVIEW_CACHE_VERSION = 1
+
 
 class FileTreeGenerationError(Exception):
     """File tree generation related errors"""
@@ -112,20 +132,165 @@ def get_file_len_size(f: Path) -> Tuple[int, str]:
     Also returns a human-readable string representation of the size.
     """
     if f.suffix in plaintext_files:
-        num_lines = sum(1 for _ in open(f))
+        if f.stat().st_size > PREVIEW_FULL_READ_MAX_BYTES:
+            num_lines = estimate_num_lines(f)
+            return num_lines, f"about {num_lines} lines"
+        with open(f, "rb") as fb:
+            num_lines, last = 0, b""
+            for chunk in iter(lambda: fb.read(2**20), b""):
+                num_lines += chunk.count(b"\n")
+                last = chunk[-1:]
+        num_lines += last not in (b"", b"\n")  # the last line without a line break
         return num_lines, f"{num_lines} lines"
     else:
         s = f.stat().st_size
         return s, humanize.naturalsize(s)
 
 
-def preview_df(df: pd.DataFrame, file_name: str, simple=True, show_nan_columns=False) -> str:
-    """Generate a textual preview of a dataframe"""
+def _read_line_ranges(p: Path, start: int = 0, seed: int = 0) -> List[bytes]:
+    """
+    Read the first and `PREVIEW_SAMPLE_RANGES - 1` random byte ranges of about `PREVIEW_SAMPLE_RANGE_BYTES`
+    after the offset `start` of a file. The ranges do not overlap and are cut to complete lines.
+    """
+    size = p.stat().st_size
+    rng = random.Random(seed)
+    last_offset = max(size - PREVIEW_SAMPLE_RANGE_BYTES, start)
+    offsets = sorted({start} | {rng.randint(start, last_offset) for _ in range(PREVIEW_SAMPLE_RANGES - 1)})
+    blocks = []
+    end = start  # the end of the previous range, at the start of a line
+    with open(p, "rb") as f:
+        for offset in offsets:
+            f.seek(max(offset, end))
+            if offset > end:
+                f.readline()  # the partial line
+            pos = f.tell()
+            block = f.read(PREVIEW_SAMPLE_RANGE_BYTES)
+            if len(block) == PREVIEW_SAMPLE_RANGE_BYTES:
+                block = block[: block.rfind(b"\n") + 1]
+            if block:
+                blocks.append(block)
+                end = pos + len(block)
+    return blocks
+
+
+def _estimate_lines(blocks: List[bytes], n_bytes: int) -> int:
+    """Estimate the number of lines of `n_bytes` bytes from the mean length of the lines of the sampled `blocks`"""
+    sampled_bytes = sum(len(b) for b in blocks)
+    if not sampled_bytes:
+        return 0
+    sampled_lines = sum(b.count(b"\n") + (not b.endswith(b"\n")) for b in blocks)
+    return round(n_bytes * sampled_lines / sampled_bytes)
+
+
+def estimate_num_lines(p: Path) -> int:
+    """Estimate the number of lines of a (large) file from its size and the mean length of sampled lines"""
+    return _estimate_lines(_read_line_ranges(p), p.stat().st_size)
+
+
+def _estimate_distinct(s: pd.Series, n_rows: int) -> int:
+    """
+    Estimate the number of distinct values of a column of `n_rows` rows from a sample `s` of it with the
+    GEE estimator `sqrt(n_rows / len(s)) * f1 + (d - f1)` (Charikar et al., 2000), where `f1` of the `d`
+    distinct sampled values are seen only once. When all of them are seen once (e.g. an ID column), `d` is
+    scaled to the size of the column instead.
+    """
+    counts = s.value_counts()
+    d = len(counts)
+    if not d:
+        return 0
+    f1 = int((counts == 1).sum())
+    if f1 == d:
+        estimate = d * n_rows / len(s)
+    else:
+        estimate = math.sqrt(n_rows / len(s)) * f1 + (d - f1)
+    return int(min(max(round(estimate), d), n_rows))
+
+
+def _sample_csv(p: Path) -> Tuple[pd.DataFrame, int]:
+    """
+    Sample a csv file: its first `PREVIEW_HEAD_ROWS` rows followed by the rows of random byte ranges.
+    Returns the sample and the number of rows of the file estimated from the sampled lines.
+    """
+    head = pd.read_csv(p, nrows=PREVIEW_HEAD_ROWS)
+    with open(p, "rb") as f:
+        header = f.readline()
+    blocks = _read_line_ranges(p, start=len(header))
+    parts = [head]
+    for block in blocks[1:]:  # the first range is in the head
+        try:
+            parts.append(pd.read_csv(io.BytesIO(header + block)))
+        except (pd.errors.ParserError, UnicodeDecodeError):
+            continue  # e.g. a range starting inside a quoted multi-line value
+    n_rows = _estimate_lines(blocks, p.stat().st_size - len(header))
+    return pd.concat(parts, ignore_index=True), n_rows
+
+
+def _parquet_column_stats(metadata: "pq.FileMetaData") -> Dict[str, Dict[str, Any]]:
+    """The min/max/null_count of the columns aggregated from the statistics of the row groups in the footer"""
+    column_stats = {}
+    for j in range(metadata.num_columns):
+        mins, maxs, null_count = [], [], 0
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            stats = row_group.column(j).statistics
+            if stats is None or not stats.has_null_count:
+                break
+            null_count += stats.null_count
+            if stats.has_min_max:
+                mins.append(stats.min)
+                maxs.append(stats.max)
+            elif stats.null_count < row_group.num_rows:
+                break
+        else:
+            name = metadata.schema.column(j).path
+            column_stats[name] = {"null_count": null_count}
+            if mins:
+                column_stats[name].update(min=min(mins), max=max(maxs))
+    return column_stats
+
+
+def _sample_parquet(p: Path) -> Tuple[pd.DataFrame, int, Dict[str, Dict[str, Any]]]:
+    """
+    Sample a parquet file: the first `PREVIEW_HEAD_ROWS` rows of its first row group and of random ones.
+    Returns the sample, the number of rows and the statistics of the columns in the footer of the file.
+    """
+    pf = pq.ParquetFile(p)
+    metadata = pf.metadata
+    rng = random.Random(0)
+    others = range(1, metadata.num_row_groups)
+    row_groups = [0] + sorted(rng.sample(others, min(PREVIEW_SAMPLE_RANGES - 1, len(others))))
+    parts = []
+    for i in row_groups[: metadata.num_row_groups]:
+        batch = next(pf.iter_batches(batch_size=PREVIEW_HEAD_ROWS, row_groups=[i]), None)
+        if batch is not None:
+            parts.append(batch)
+    df = pa.Table.from_batches(parts, schema=pf.schema_arrow).to_pandas()
+    return df, metadata.num_rows, _parquet_column_stats(metadata)
+
+
+def preview_df(
+    df: pd.DataFrame,
+    file_name: str,
+    simple=True,
+    show_nan_columns=False,
+    n_rows: Optional[int] = None,
+    exact_rows: bool = True,
+    column_stats: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> str:
+    """
+    Generate a textual preview of a dataframe
+
+    `df` may be a sample of a table of `n_rows` rows (an estimate unless `exact_rows`). The information about
+    the columns is then estimated from the sample, except the exact `min`/`max`/`null_count` in `column_stats`.
+    """
     out = []
+    column_stats = column_stats or {}
+    n_rows = df.shape[0] if n_rows is None else max(n_rows, df.shape[0])
+    sampled = n_rows > df.shape[0]
 
     out.append(f"### {file_name}: ")
     out.append(f"#### 1.DataFrame preview:")
-    out.append(f"It has {df.shape[0]} rows and {df.shape[1]} columns.")
+    out.append(f"It has {n_rows if exact_rows else f'about {n_rows}'} rows and {df.shape[1]} columns.")
 
     if simple:
         cols = df.columns.tolist()
@@ -136,26 +301,37 @@ def preview_df(df: pd.DataFrame, file_name: str, simple=True, show_nan_columns=F
             res += f"... and {len(cols)-sel_cols} more columns"
         out.append(res)
     else:
-        out.append("Here is some information about the columns:")
+        if sampled:
+            out.append(f"Here is some information about the columns (estimated from a sample of {df.shape[0]} rows):")
+        else:
+            out.append("Here is some information about the columns:")
         for col in sorted(df.columns):
             dtype = df[col].dtype
             name = f"{col} ({dtype})"
+            stats = column_stats.get(col, {})
 
-            nan_count = df[col].isnull().sum()
+            nan_count = stats.get("null_count", df[col].isnull().sum())
+            if sampled and "null_count" not in stats:
+                nan_count = f"about {round(nan_count * n_rows / df.shape[0])}"
+            nunique = _estimate_distinct(df[col], n_rows) if sampled else df[col].nunique()
+            nunique_str = f"about {nunique}" if sampled else nunique
 
             if dtype == "bool":
                 v = df[col][df[col].notnull()].mean()
                 out.append(f"{name} is {v*100:.2f}% True, {100-v*100:.2f}% False")
-            elif df[col].nunique() < 10:
-                out.append(f"{name} has {df[col].nunique()} unique values: {df[col].unique().tolist()}")
+            elif nunique < 10:
+                out.append(f"{name} has {nunique_str} unique values: {df[col].unique().tolist()}")
             elif is_numeric_dtype(df[col]):
-                out.append(f"{name} has range: {df[col].min():.2f} - {df[col].max():.2f}, {nan_count} nan values")
+                col_min, col_max = stats.get("min", df[col].min()), stats.get("max", df[col].max())
+                out.append(f"{name} has range: {col_min:.2f} - {col_max:.2f}, {nan_count} nan values")
             elif dtype == "object":
                 out.append(
-                    f"{name} has {df[col].nunique()} unique values. Some example values: {df[col].value_counts().head(4).index.tolist()}"
+                    f"{name} has {nunique_str} unique values. Some example values: {df[col].value_counts().head(4).index.tolist()}"
                 )
     if show_nan_columns:
-        nan_cols = [col for col in df.columns.tolist() if df[col].isnull().any()]
+        nan_cols = [
+            col for col in df.columns.tolist() if column_stats.get(col, {}).get("null_count", df[col].isnull().sum())
+        ]
         if nan_cols:
             out.append(f"Columns containing NaN values: {', '.join(nan_cols)}")
 
@@ -174,18 +350,38 @@ def preview_df(df: pd.DataFrame, file_name: str, simple=True, show_nan_columns=F
     return "\n".join(out)
 
 
+def _preview_hash_func(p: Path, file_name: str, *args: Any, **kwargs: Any) -> str:
+    """The previews are cached by the path, size and modification time of the file"""
+    st = p.stat()
+    return md5_hash(
+        f"{PREVIEW_CACHE_VERSION}|{p.resolve()}|{st.st_size}|{st.st_mtime_ns}|{file_name}|{args}|{sorted(kwargs.items())}"
+        f"|{PREVIEW_FULL_READ_MAX_BYTES}|{PREVIEW_HEAD_ROWS}|{PREVIEW_SAMPLE_RANGES}|{PREVIEW_SAMPLE_RANGE_BYTES}"
+    )
+
+
+@cache_with_pickle(_preview_hash_func)
 def preview_csv(p: Path, file_name: str, simple=True, show_nan_columns=False) -> str:
-    """Generate a textual preview of a csv file"""
-    df = pd.read_csv(p)
-    return preview_df(df, file_name, simple=simple, show_nan_columns=show_nan_columns)
+    """Generate a textual preview of a csv file; a file larger than `PREVIEW_FULL_READ_MAX_BYTES` is sampled"""
+    if p.stat().st_size <= PREVIEW_FULL_READ_MAX_BYTES:
+        df = pd.read_csv(p)
+        return preview_df(df, file_name, simple=simple, show_nan_columns=show_nan_columns)
+    df, n_rows = _sample_csv(p)
+    return preview_df(df, file_name, simple=simple, show_nan_columns=show_nan_columns, n_rows=n_rows, exact_rows=False)
 
 
+@cache_with_pickle(_preview_hash_func)
 def preview_parquet(p: Path, file_name: str, simple=True, show_nan_columns=False) -> str:
-    """Generate a textual preview of a parquet file"""
-    df = pd.read_parquet(p)
-    return preview_df(df, file_name, simple=simple, show_nan_columns=show_nan_columns)
+    """Generate a textual preview of a parquet file; a file larger than `PREVIEW_FULL_READ_MAX_BYTES` is sampled"""
+    if p.stat().st_size <= PREVIEW_FULL_READ_MAX_BYTES or pq is None:
+        df = pd.read_parquet(p)
+        return preview_df(df, file_name, simple=simple, show_nan_columns=show_nan_columns)
+    df, n_rows, column_stats = _sample_parquet(p)
+    return preview_df(
+        df, file_name, simple=simple, show_nan_columns=show_nan_columns, n_rows=n_rows, column_stats=column_stats
+    )
 
 
+@cache_with_pickle(_preview_hash_func)
 def preview_json(p: Path, file_name: str):
     """Generate a textual preview of a json file using reprlib for compact object display"""
     result = []
@@ -1,8 +1,15 @@
 """Utilities for fine-tuning scenario data extraction and analysis."""
 
+import functools
 import json
+import math
+import os
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
 
 import numpy as np
 import pandas as pd
@@ -14,9 +21,29 @@ from rdagent.log import rdagent_logger as logger
 from rdagent.scenarios.data_science.scen.utils import FileTreeGenerator
 from rdagent.utils import md5_hash
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 # Fixed tokenizer model for token counting
 _TOKENIZER_MODEL = "gpt-3.5-turbo"
 
+# The token statistics are computed on a uniform sample of at most this many records of the data files
+STATS_MAX_SAMPLES = 50000
+# The files are read by chunks of this many bytes (JSON/JSONL) or batches of this many rows (CSV/Parquet)
+STATS_READ_CHUNK_BYTES = 4 * 2**20
+STATS_READ_BATCH_ROWS = 10000
+# The texts are tokenized by a pool of at most STATS_MAX_WORKERS processes beyond this many texts
+STATS_PARALLEL_MIN_TEXTS = 20000
+STATS_MAX_WORKERS = 8
+# Bump it when the statistics change to invalidate the cached ones
+STATS_CACHE_VERSION = 1
+
+_BLANK_LINE = re.compile(rb"^[ \t\r\f\v]*\n", re.MULTILINE)
+_WHITESPACE = re.compile(r"\s*")
+
 
 def _find_data_files(dataset_path: Path, max_files: int = 50) -> list[Path]:
     """Find data files in dataset directory using recursive glob.
@@ -64,14 +91,223 @@ def _truncate_long_values(obj, max_length: int = 3000):
     return obj
 
 
-def _compute_column_stats(data: list[dict]) -> dict[str, dict]:
+def _files_fingerprint(data_files: list[Path], *args: Any, **kwargs: Any) -> str | None:
+    """The statistics of data files are cached by their paths, sizes and modification times (None if missing)"""
+    parts = [str(STATS_CACHE_VERSION), str(args), str(sorted(kwargs.items()))]
+    try:
+        for data_file in data_files:
+            st = data_file.stat()
+            parts.append(f"{data_file.resolve()}|{st.st_size}|{st.st_mtime_ns}")
+    except OSError:
+        return None
+    return md5_hash("|".join(parts))
+
+
+def _count_jsonl_lines(data_file: Path) -> int:
+    """Count the non-blank lines of a JSONL file on its raw bytes, without decoding them"""
+    count, tail = 0, b""
+    with open(data_file, "rb") as f:
+        for chunk in iter(lambda: f.read(STATS_READ_CHUNK_BYTES), b""):
+            block = tail + chunk
+            cut = block.rfind(b"\n") + 1
+            block, tail = block[:cut], block[cut:]
+            count += block.count(b"\n") - len(_BLANK_LINE.findall(block))
+    return count + bool(tail.strip())
+
+
+def _iter_json_records(data_file: Path) -> Iterator[Any]:
+    """Stream the elements of a top-level JSON array one at a time; a top-level object is a single record.
+
+    Only a chunk of the file and the current element are held in memory, instead of the whole parsed file.
+    """
+    decoder = json.JSONDecoder()
+    with open(data_file, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def _fill() -> None:
+            nonlocal buf, pos, eof
+            # read at least as much as buffered, so that a large element is decoded in a few attempts
+            chunk = f.read(max(STATS_READ_CHUNK_BYTES, len(buf) - pos))
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+
+        def _next_char() -> str:
+            """Skip the whitespaces; the next character or "" at the end of the file"""
+            nonlocal pos
+            pos = _WHITESPACE.match(buf, pos).end()
+            while pos == len(buf) and not eof:
+                _fill()
+                pos = _WHITESPACE.match(buf, pos).end()
+            return buf[pos : pos + 1]
+
+        if _next_char() != "[":
+            data = json.loads(buf[pos:] + f.read())
+            if isinstance(data, dict):
+                yield data
+            return
+        pos += 1
+        sep = _next_char()
+        while sep != "]":
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                _fill()
+                continue
+            if end == len(buf) and not eof:  # e.g. a number which may go on in the next chunk
+                _fill()
+                continue
+            yield record
+            pos = end
+            sep = _next_char()
+            if sep == ",":
+                pos += 1
+                _next_char()
+            elif sep != "]":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+
+
+@cache_with_pickle(lambda data_file: _files_fingerprint([data_file]))
+def _count_samples(data_file: Path) -> int:
+    """Count the samples of a data file without loading it: the footer of Parquet files, the raw lines of JSONL
+    files, a streaming parse of JSON arrays and a chunked read of CSV files."""
+    suffix = data_file.suffix.lower()
+    if suffix == ".json":
+        return sum(1 for _ in _iter_json_records(data_file))
+    if suffix == ".jsonl":
+        return _count_jsonl_lines(data_file)
+    if suffix == ".csv":
+        return sum(len(chunk) for chunk in pd.read_csv(data_file, usecols=[0], chunksize=STATS_READ_BATCH_ROWS))
+    if suffix == ".parquet":
+        return pq.ParquetFile(data_file).metadata.num_rows if pq is not None else len(pd.read_parquet(data_file))
+    return 0
+
+
+def _iter_record_batches(data_file: Path) -> Iterator[tuple[int, Callable[[list[int]], list]]]:
+    """Iterate the records of a data file by batches of `(n, take)`, where `take(indices)` returns the records
+    at the given indices of the batch; the records which are not taken are not converted to Python objects.
+    The records of JSONL files are returned as their raw lines, to be decoded once sampled."""
+    suffix = data_file.suffix.lower()
+    if suffix == ".json":
+        records = iter(_iter_json_records(data_file))
+        while batch := list(islice(records, STATS_READ_BATCH_ROWS)):
+            yield len(batch), lambda idx, batch=batch: [batch[i] for i in idx]
+    elif suffix == ".jsonl":
+        with open(data_file, "rb") as f:
+            tail = b""
+            for chunk in iter(lambda: f.read(STATS_READ_CHUNK_BYTES), b""):
+                block = tail + chunk
+                cut = block.rfind(b"\n") + 1
+                block, tail = block[:cut], block[cut:]
+                lines = [line for line in block.split(b"\n") if line.strip()]
+                yield len(lines), lambda idx, lines=lines: [lines[i] for i in idx]
+            if tail.strip():
+                yield 1, lambda idx, tail=tail: [tail]
+    elif suffix == ".csv":
+        for df in pd.read_csv(data_file, chunksize=STATS_READ_BATCH_ROWS):
+            yield len(df), lambda idx, df=df: df.iloc[idx].to_dict("records")
+    elif suffix == ".parquet":
+        if pq is None:
+            df = pd.read_parquet(data_file)
+            yield len(df), lambda idx: df.iloc[idx].to_dict("records")
+            return
+        for batch in pq.ParquetFile(data_file).iter_batches(batch_size=STATS_READ_BATCH_ROWS):
+            yield batch.num_rows, lambda idx, batch=batch: batch.take(pa.array(idx, type=pa.int64())).to_pylist()
+
+
+def _sample_records(data_files: list[Path], max_samples: int = STATS_MAX_SAMPLES, seed: int = 0) -> tuple[list, int]:
+    """Draw a uniform sample of at most `max_samples` records across the data files in a single streaming pass.
+
+    Reservoir sampling with Li's Algorithm L: the gaps between the records entering the full reservoir are drawn
+    directly, so only the sampled records are converted, and the raw JSONL lines are decoded once the sample is
+    drawn. All the records are kept, in order, when they fit.
+
+    Returns:
+        The sampled records and the total number of records of the files
+    """
+    rng = random.Random(seed)
+    reservoir: list = []
+    seen = 0  # the records before the current batch
+    w = math.exp(math.log(1.0 - rng.random()) / max_samples) if max_samples > 0 else 0.0
+    # the index of the next record replacing a random one of the full reservoir
+    next_pick = max_samples + math.floor(math.log(1.0 - rng.random()) / math.log1p(-w)) if 0 < w < 1 else math.inf
+
+    for data_file in data_files:
+        try:
+            for n, take in _iter_record_batches(data_file):
+                n_fill = min(max(max_samples - len(reservoir), 0), n)
+                picks: list[tuple[int, int]] = []  # (index in the batch, slot in the reservoir)
+                while next_pick < seen + n:
+                    picks.append((next_pick - seen, rng.randrange(max_samples)))
+                    w *= math.exp(math.log(1.0 - rng.random()) / max_samples)
+                    gap = math.floor(math.log(1.0 - rng.random()) / math.log1p(-w)) if 0 < w < 1 else math.inf
+                    next_pick += gap + 1
+                if n_fill or picks:
+                    records = take(list(range(n_fill)) + [i for i, _ in picks])
+                    reservoir.extend(records[:n_fill])
+                    for (_, slot), record in zip(picks, records[n_fill:]):
+                        reservoir[slot] = record
+                seen += n
+        except Exception as e:
+            logger.warning(f"Failed to load {data_file.name} for stats: {e}")
+
+    samples = []
+    for record in reservoir:
+        if isinstance(record, bytes):  # a raw JSONL line
+            try:
+                record = json.loads(record)
+            except ValueError as e:
+                logger.warning(f"Skipping an invalid JSONL record for stats: {e}")
+                continue
+        samples.append(record)
+    return samples, seen
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding() -> "tiktoken.Encoding":
+    """The tiktoken encoder of the fixed tokenizer model"""
+    try:
+        return tiktoken.encoding_for_model(_TOKENIZER_MODEL)
+    except Exception:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def _token_counts(texts: list[str]) -> list[int]:
+    """Count the tokens of texts with tiktoken batch encoding (10-50x faster than individual calls)"""
+    encoding = _get_encoding()
+    try:
+        return [len(tokens) for tokens in encoding.encode_batch(texts)]
+    except Exception as e:
+        logger.warning(f"Batch encoding failed: {e}, falling back to sequential")
+        return [len(encoding.encode(t)) for t in texts]
+
+
+def _parallel_token_counts(texts: list[str], max_workers: int | None = None) -> list[int]:
+    """Count the tokens of texts, with a pool of processes when there are many of them"""
+    if max_workers is None:
+        max_workers = min(STATS_MAX_WORKERS, os.cpu_count() or 1)
+    if max_workers <= 1 or len(texts) < STATS_PARALLEL_MIN_TEXTS:
+        return _token_counts(texts)
+    size = math.ceil(len(texts) / (max_workers * 4))
+    chunks = [texts[i : i + size] for i in range(0, len(texts), size)]
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            return [count for counts in pool.map(_token_counts, chunks) for count in counts]
+    except Exception as e:
+        logger.warning(f"Parallel token counting failed: {e}, falling back to a single process")
+        return _token_counts(texts)
+
+
+def _compute_column_stats(data: list[dict], max_workers: int | None = None) -> dict[str, dict]:
     """Compute token statistics for each string column in the dataset.
 
-    Uses tiktoken batch encoding for 10-50x faster processing.
-    Fixed to use gpt-3.5-turbo tokenizer.
+    The texts of all the columns are tokenized together with tiktoken batch encoding, by a pool of processes
+    for large samples. Fixed to use gpt-3.5-turbo tokenizer.
 
     Args:
         data: List of dictionaries representing dataset samples
+        max_workers: Number of tokenizing processes (defaults to the number of CPUs, at most STATS_MAX_WORKERS)
 
     Returns:
         Dictionary mapping column names to their token statistics:
@@ -86,18 +322,12 @@ def _compute_column_stats(data: list[dict]) -> dict[str, dict]:
         if isinstance(item, dict):
             all_columns.update(item.keys())
 
-    # Get tiktoken encoder (cached after first call)
-    try:
-        encoding = tiktoken.encoding_for_model(_TOKENIZER_MODEL)
-    except Exception:
-        encoding = tiktoken.get_encoding("cl100k_base")
-
-    column_stats = {}
-    for col in all_columns:
-        texts: list[str] = []
-        empty_count = 0
-
-        # Collect all non-empty texts for this column
+    # Collect the non-empty texts of each column
+    columns = sorted(all_columns)
+    texts: list[str] = []
+    spans: dict[str, tuple[int, int, int]] = {}  # column -> the (start, end) of its texts and its empty count
+    for col in columns:
+        start, empty_count = len(texts), 0
         for item in data:
             if isinstance(item, dict):
                 val = item.get(col, "")
@@ -106,16 +336,15 @@ def _compute_column_stats(data: list[dict]) -> dict[str, dict]:
                         empty_count += 1
                     else:
                         texts.append(val)
+        spans[col] = (start, len(texts), empty_count)
 
-        if texts:
-            # Batch encode all texts at once (10-50x faster than individual calls)
-            try:
-                encoded_batch = encoding.encode_batch(texts)
-                token_counts = [len(tokens) for tokens in encoded_batch]
-            except Exception as e:
-                logger.warning(f"Batch encoding failed for column '{col}': {e}, falling back to sequential")
-                token_counts = [len(encoding.encode(t)) for t in texts]
+    all_counts = _parallel_token_counts(texts, max_workers) if texts else []
 
+    column_stats = {}
+    for col in columns:
+        start, end, empty_count = spans[col]
+        token_counts = all_counts[start:end]
+        if token_counts:
             column_stats[col] = {
                 "empty_count": empty_count,
                 "min_tokens": int(min(token_counts)),
@@ -135,8 +364,8 @@ def _compute_column_stats(data: list[dict]) -> dict[str, dict]:
     return column_stats
 
 
-def _load_dataset_for_stats(data_files: list[Path], max_samples: int = 50000) -> list[dict]:
-    """Load dataset samples from data files for statistics computation.
+def _load_dataset_for_stats(data_files: list[Path], max_samples: int = STATS_MAX_SAMPLES) -> list[dict]:
+    """Load a uniform sample of the records of the data files for statistics computation.
 
     Args:
         data_files: List of data file paths
@@ -145,43 +374,14 @@ def _load_dataset_for_stats(data_files: list[Path], max_samples: int = 50000) ->
     Returns:
         List of dictionaries representing dataset samples
     """
-    all_data: list[dict] = []
-
-    for data_file in data_files:
-        if len(all_data) >= max_samples:
-            break
-
-        suffix = data_file.suffix.lower()
-        try:
-            if suffix == ".json":
-                with open(data_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        all_data.extend(data[: max_samples - len(all_data)])
-                    elif isinstance(data, dict):
-                        all_data.append(data)
+    return _sample_records(data_files, max_samples)[0]
 
-            elif suffix == ".jsonl":
-                with open(data_file, "r", encoding="utf-8") as f:
-                    for line in f:
-                        if len(all_data) >= max_samples:
-                            break
-                        line = line.strip()
-                        if line:
-                            all_data.append(json.loads(line))
-
-            elif suffix == ".csv":
-                df = pd.read_csv(data_file, nrows=max_samples - len(all_data))
-                all_data.extend(df.to_dict("records"))
-
-            elif suffix == ".parquet":
-                df = pd.read_parquet(data_file)
-                all_data.extend(df.head(max_samples - len(all_data)).to_dict("records"))
 
-        except Exception as e:
-            logger.warning(f"Failed to load {data_file.name} for stats: {e}")
-
-    return all_data
+@cache_with_pickle(_files_fingerprint)
+def _dataset_stats(data_files: list[Path], max_samples: int = STATS_MAX_SAMPLES) -> dict[str, Any]:
+    """The number of records of the data files and the token statistics of their columns on a sample of them"""
+    samples, sample_count = _sample_records(data_files, max_samples)
+    return {"sample_count": sample_count, "column_stats": _compute_column_stats(samples)}
 
 
 class FinetuneDatasetDescription(dict):
@@ -248,25 +448,8 @@ class FinetuneDatasetDescriptor:
         Returns:
             Total number of samples in file (0 if error or unsupported format)
         """
-        suffix = data_file.suffix.lower()
-
         try:
-            if suffix == ".json":
-                with open(data_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        return len(data)
-                    elif isinstance(data, dict):
-                        return 1  # Single object
-
-            elif suffix == ".jsonl":
-                with open(data_file, "r", encoding="utf-8") as f:
-                    return sum(1 for line in f if line.strip())
-
-            elif suffix in [".csv", ".parquet"]:
-                df = pd.read_csv(data_file) if suffix == ".csv" else pd.read_parquet(data_file)
-                return len(df)
-
+            return _count_samples(data_file)
         except Exception as e:
             logger.warning(f"Cannot count samples in {data_file.name}: {e}")
 
@@ -292,6 +475,14 @@ class FinetuneDatasetDescriptor:
             total_size_bytes = 0
             file_count = len(data_files)
 
+            # Compute column token statistics if requested; the same pass counts the samples
+            dataset_stats = None
+            if include_column_stats and data_files:
+                try:
+                    dataset_stats = _dataset_stats(data_files)
+                except Exception as e:
+                    logger.warning(f"Failed to compute column token stats: {e}")
+
             for data_file in data_files:
                 # Calculate file size
                 try:
@@ -300,26 +491,21 @@ class FinetuneDatasetDescriptor:
                     logger.warning(f"Cannot get size of {data_file}")
 
                 # Count samples using unified method
-                total_samples += self._count_samples_in_file(data_file)
+                if dataset_stats is None:
+                    total_samples += self._count_samples_in_file(data_file)
 
             stats = {
-                "sample_count": total_samples,
+                "sample_count": dataset_stats["sample_count"] if dataset_stats is not None else total_samples,
                 "total_size_mb": round(total_size_bytes / (1024 * 1024), 2),
                 "file_count": file_count,
             }
 
-            # Compute column token statistics if requested
-            if include_column_stats and data_files:
-                try:
-                    dataset_samples = _load_dataset_for_stats(data_files)
-                    if dataset_samples:
-                        stats["column_stats"] = _compute_column_stats(dataset_samples)
-                        logger.info(
-                            f"Computed column token stats for {len(stats['column_stats'])} columns "
-                            f"(using tokenizer: {_TOKENIZER_MODEL})"
-                        )
-                except Exception as e:
-                    logger.warning(f"Failed to compute column token stats: {e}")
+            if dataset_stats is not None and dataset_stats["column_stats"]:
+                stats["column_stats"] = dataset_stats["column_stats"]
+                logger.info(
+                    f"Computed column token stats for {len(stats['column_stats'])} columns "
+                    f"(using tokenizer: {_TOKENIZER_MODEL})"
+                )
 
             return stats
 
@@ -579,13 +765,8 @@ class FinetuneDatasetDescriptor:
     def describe_file_json(self, data_file: Path, max_samples: int = 3) -> FinetuneFileDescription:
         samples = []
         try:
-            with open(data_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, list) and len(data) > 0:
-                    samples = _truncate_long_values(data[:max_samples])
-                elif isinstance(data, dict):
-                    truncated_data = _truncate_long_values(data)
-                    samples = [truncated_data]
+            # only the first records of a JSON array are parsed
+            samples = _truncate_long_values(list(islice(_iter_json_records(data_file), max_samples)))
         except Exception as e:
             logger.warning(f"Error extracting samples from {data_file.name}: {e}")
 
@@ -618,11 +799,11 @@ class FinetuneDatasetDescriptor:
         df_shape = None
         df_columns = []
         try:
-            df = pd.read_csv(data_file)
+            df = pd.read_csv(data_file, nrows=max_samples)
             if len(df) > 0:
-                samples = df.head(max_samples).to_dict("records")
+                samples = df.to_dict("records")
                 samples = _truncate_long_values(samples)
-            df_shape = df.shape
+            df_shape = (_count_samples(data_file), df.shape[1])
             df_columns = df.columns.tolist()
         except Exception as e:
             logger.warning(f"Error extracting samples from {data_file.name}: {e}")
@@ -636,11 +817,19 @@ class FinetuneDatasetDescriptor:
         df_shape = None
         df_columns = []
         try:
-            df = pd.read_parquet(data_file)
+            if pq is not None:
+                # the first rows and the number of rows in the footer, instead of the whole file
+                pf = pq.ParquetFile(data_file)
+                batch = next(pf.iter_batches(batch_size=max_samples), None)
+                table = pa.Table.from_batches([batch] if batch is not None else [], schema=pf.schema_arrow)
+                df, n_rows = table.to_pandas(), pf.metadata.num_rows
+            else:
+                df = pd.read_parquet(data_file)
+                n_rows, df = len(df), df.head(max_samples)
             if len(df) > 0:
-                samples = df.head(max_samples).to_dict("records")
+                samples = df.to_dict("records")
                 samples = _truncate_long_values(samples)
-            df_shape = df.shape
+            df_shape = (n_rows, df.shape[1])
             df_columns = df.columns.tolist()
         except Exception as e:
             logger.warning(f"Error extracting samples from {data_file.name}: {e}")
@@ -752,9 +941,10 @@ class FinetuneDatasetDescriptor:
         total_size = 0
         for name, info in tasks.items():
             file_paths = info["file_paths"]
-            data = _load_dataset_for_stats(file_paths)
-            info["sample_count"] = len(data)
-            info["column_stats"] = _compute_column_stats(data)
+            # the exact number of records, and the token statistics of a uniform sample of them
+            dataset_stats = _dataset_stats(file_paths)
+            info["sample_count"] = dataset_stats["sample_count"]
+            info["column_stats"] = dataset_stats["column_stats"]
             info["samples"] = _truncate_long_values(self._extract_samples_for_template(file_paths, max_samples=3))
             total_samples += info["sample_count"]
             total_size += sum(f.stat().st_size for f in file_paths)
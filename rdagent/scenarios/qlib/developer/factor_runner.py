@@ -1,16 +1,13 @@
 from pathlib import Path
 
 import pandas as pd
-from pandarallel import pandarallel
-
-from rdagent.core.conf import RD_AGENT_SETTINGS
-from rdagent.core.utils import cache_with_pickle
-
-pandarallel.initialize(verbose=1)
 
 from rdagent.app.qlib_rd_loop.conf import FactorBasePropSetting
+from rdagent.components.coder.factor_coder.correlation import cross_sectional_corr
 from rdagent.components.runner import CachedRunner
+from rdagent.core.conf import RD_AGENT_SETTINGS
 from rdagent.core.exception import FactorEmptyError
+from rdagent.core.utils import cache_with_pickle
 from rdagent.log import rdagent_logger as logger
 from rdagent.scenarios.qlib.developer.utils import process_factor_data
 from rdagent.scenarios.qlib.experiment.factor_experiment import QlibFactorExperiment
@@ -35,13 +32,19 @@ class QlibFactorRunner(CachedRunner[QlibFactorExperiment]):
     def calculate_information_coefficient(
         self, concat_feature: pd.DataFrame, SOTA_feature_column_size: int, new_feature_columns_size: int
     ) -> pd.DataFrame:
-        res = pd.Series(index=range(SOTA_feature_column_size * new_feature_columns_size))
-        for col1 in range(SOTA_feature_column_size):
-            for col2 in range(SOTA_feature_column_size, SOTA_feature_column_size + new_feature_columns_size):
-                res.loc[col1 * new_feature_columns_size + col2 - SOTA_feature_column_size] = concat_feature.iloc[
-                    :, col1
-                ].corr(concat_feature.iloc[:, col2])
-        return res
+        """
+        The daily IC between each SOTA feature (the first `SOTA_feature_column_size` columns) and each new feature;
+        the columns are the (SOTA feature, new feature) pairs.
+        """
+        dates, ic = cross_sectional_corr(
+            concat_feature.iloc[:, :SOTA_feature_column_size],
+            concat_feature.iloc[:, SOTA_feature_column_size : SOTA_feature_column_size + new_feature_columns_size],
+        )
+        return pd.DataFrame(
+            ic.reshape(len(dates), SOTA_feature_column_size * new_feature_columns_size),
+            index=dates,
+            columns=pd.MultiIndex.from_product([range(SOTA_feature_column_size), range(new_feature_columns_size)]),
+        )
 
     def deduplicate_new_factors(self, SOTA_feature: pd.DataFrame, new_feature: pd.DataFrame) -> pd.DataFrame:
         # calculate the IC between each column of SOTA_feature and new_feature
@@ -50,14 +53,11 @@ class QlibFactorRunner(CachedRunner[QlibFactorExperiment]):
 
         concat_feature = pd.concat([SOTA_feature, new_feature], axis=1)
         IC_max = (
-            concat_feature.groupby("datetime")
-            .parallel_apply(
-                lambda x: self.calculate_information_coefficient(x, SOTA_feature.shape[1], new_feature.shape[1])
-            )
+            self.calculate_information_coefficient(concat_feature, SOTA_feature.shape[1], new_feature.shape[1])
             .mean()
+            .unstack()
+            .max(axis=0)
         )
-        IC_max.index = pd.MultiIndex.from_product([range(SOTA_feature.shape[1]), range(new_feature.shape[1])])
-        IC_max = IC_max.unstack().max(axis=0)
         return new_feature.iloc[:, IC_max[IC_max < 0.99].index]
 
     @cache_with_pickle(CachedRunner.get_cache_key, CachedRunner.assign_cached_result)
@@ -92,7 +92,9 @@ ${DATA_SAMPLE}
    tokenizer.save_pretrained(output_path)
 5. Fix tokenizer_config.json if needed (remove extra_special_tokens list format)
 6. Submit for evaluation:
-   curl -X POST ${GRADING_SERVER_URL}/submit -H 'Content-Type: application/json' -d '{\\\"model_path\\\": \\\"${OUTPUT_DIR}/v1\\\"}'
+   curl -X POST ${GRADING_SERVER_URL}/submit -H 'Content-Type: application/json' -d '{\\\"model_path\\\": \\\"${OUTPUT_DIR}/v1\\\", \\\"wait\\\": 600}'
+   Evaluations run in a queue: while the returned status is queued/running, wait for the result with
+   curl '${GRADING_SERVER_URL}/jobs/<job_id>?wait=600'
 7. Based on the score, iterate: improve your approach and submit again as v2, v3, etc.
 8. Keep iterating until you achieve the best possible score or run out of time.
 
@@ -56,11 +56,16 @@ def gsm8k_reward_func(completions, answer, **kwargs):
     return rewards
 
 
-def submit_for_grading(grading_url: str, model_path: str) -> dict | None:
+def submit_for_grading(grading_url: str, model_path: str, timeout: int = 3600) -> dict | None:
     if not grading_url:
         return None
     try:
-        resp = requests.post(f"{grading_url}/submit", json={"model_path": model_path}, timeout=600)
+        resp = requests.post(f"{grading_url}/submit", json={"model_path": model_path}, timeout=30)
+        job = resp.json()
+        deadline = time.time() + timeout
+        # 评测在服务端排队执行，long-poll 直到结束
+        while resp.status_code == 202 and time.time() < deadline:
+            resp = requests.get(f"{grading_url}/jobs/{job['job_id']}", params={"wait": 300}, timeout=330)
         if resp.status_code == 200:
             return resp.json()
     except Exception as e:
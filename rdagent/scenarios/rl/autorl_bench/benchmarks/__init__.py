@@ -76,6 +76,7 @@ BENCHMARKS: Dict[str, BenchmarkConfig] = {
         eval_config={
             "max_steps": 50,
             "env_num": 134,  # 完整评测集（valid_unseen），之前调试时设为 1
+            "concurrency": 8,  # 同时进行的局数，每步批量生成
         },
         expose_files=["eval.py"],
     ),
@@ -88,6 +89,7 @@ BENCHMARKS: Dict[str, BenchmarkConfig] = {
             "max_steps": 50,
             "num_instructions": 100,
             "webshop_port": 8080,
+            "concurrency": 8,  # 同时进行的 episode 数，每步批量生成
         },
         expose_files=["eval.py"],
     ),
@@ -16,6 +16,13 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable, Dict, List
 
+from rdagent.scenarios.rl.autorl_bench.core.episodes import (
+    Episode,
+    EpisodeRunner,
+    batch_llm_fn,
+    run_episode,
+    split_round_robin,
+)
 from rdagent.scenarios.rl.autorl_bench.core.evaluator import BaseEvaluator
 
 # 日志目录
@@ -86,36 +93,70 @@ def process_ob(ob: str) -> str:
     return ob
 
 
-def alfworld_run(llm_fn: Callable, env, prompt: str, ob: str, max_steps: int = 50) -> tuple:
+def alfworld_episode(env, prompt: str, ob: str, max_steps: int = 50, log_prefix: str = "") -> Episode:
     """
-    ReAct 官方的单局评测逻辑。
-
-    Args:
-        llm_fn: llm(prompt, stop) -> str
-        env: ALFWorld 环境实例
-        prompt: few-shot prompt（含 2 个示例）
-        ob: 初始 observation
-        max_steps: 最大步数
+    ReAct 官方的单局评测逻辑（episode 生成器：yield prompt，接收 LLM 输出）。
 
     Returns:
-        (reward, steps): reward=1 表示成功，steps 为实际步数
+        {"reward", "steps"}: reward=1 表示成功，steps 为实际步数
     """
     init_prompt = prompt + ob + "\n>"
     history = ""
     for i in range(1, max_steps + 1):
-        action = llm_fn(init_prompt + history, stop=["\n"]).strip()
+        action = (yield init_prompt + history).strip()
         observation, reward, done, info = env.step([action])
         observation = process_ob(observation[0])
         reward = info["won"][0]
         done = done[0]
         if action.startswith("think:"):
             observation = "OK."
-        _log(f"  Act {i}: {action}")
-        _log(f"  Obs {i}: {observation}")
+        _log(f"{log_prefix}  Act {i}: {action}")
+        _log(f"{log_prefix}  Obs {i}: {observation}")
         history += f" {action}\n{observation}\n>"
         if done:
-            return reward, i
-    return 0, max_steps
+            return {"reward": reward, "steps": i}
+    return {"reward": 0, "steps": max_steps}
+
+
+def alfworld_run(llm_fn: Callable, env, prompt: str, ob: str, max_steps: int = 50) -> tuple:
+    """
+    ReAct 官方的单局评测逻辑（逐步调用 llm_fn）。
+
+    Args:
+        llm_fn: llm(prompt, stop) -> str
+        env: ALFWorld 环境实例
+        prompt: few-shot prompt（含 2 个示例）
+        ob: 初始 observation
+        max_steps: 最大步数
+
+    Returns:
+        (reward, steps): reward=1 表示成功，steps 为实际步数
+    """
+    result = run_episode(alfworld_episode(env, prompt, ob, max_steps), llm_fn, stop=["\n"])
+    return result["reward"], result["steps"]
+
+
+def alfworld_game_episode(env, react_prompts: dict, max_steps: int = 50, label: str = "") -> Episode:
+    """
+    重置环境到下一局并按任务类型选 few-shot prompt 运行；结果带上 game 名和任务类型 task，
+    未知任务类型不运行（task 为 None）。
+    """
+    ob, info = env.reset()
+    ob = "\n".join(ob[0].split("\n\n")[1:])
+    name = "/".join(info["extra.gamefile"][0].split("/")[-3:-1])
+    _log(f"\n[Game {label}] {name}")
+
+    for prefix, prompt_key in TASK_PREFIXES.items():
+        if name.startswith(prefix):
+            prompt = (
+                "Interact with a household to solve a task. Here are two examples.\n"
+                + react_prompts[f"react_{prompt_key}_1"]
+                + react_prompts[f"react_{prompt_key}_0"]
+                + "\nHere is the task.\n"
+            )
+            result = yield from alfworld_episode(env, prompt, ob, max_steps, log_prefix=f"[Game {label}]")
+            return {"game": name, "task": prefix, **result}
+    return {"game": name, "task": None}
 
 
 # ============================================================
@@ -123,15 +164,15 @@ def alfworld_run(llm_fn: Callable, env, prompt: str, ob: str, max_steps: int = 5
 # ============================================================
 
 
-def create_llm_fn(backend: str, model_path: str, **kwargs) -> tuple:
+def create_batch_llm_fn(backend: str, model_path: str, **kwargs) -> tuple:
     """
-    创建统一的 llm(prompt, stop) 函数。
+    创建批量的 generate(prompts, stop) -> outputs 函数。
 
-    backend="vllm": 本地模型，text completion（和 ReAct 原版行为一致）
-    backend="api":  OpenAI 兼容 chat API
+    backend="vllm": 本地模型，text completion（和 ReAct 原版行为一致），一次 generate 调用生成整批
+    backend="api":  OpenAI 兼容 chat API，max_workers 个线程并发请求
 
     Returns:
-        (llm_fn, cleanup_fn): cleanup_fn 释放 GPU 显存
+        (generate_fn, cleanup_fn): cleanup_fn 释放 GPU 显存
     """
     if backend == "vllm":
         from vllm import LLM, SamplingParams
@@ -147,12 +188,12 @@ def create_llm_fn(backend: str, model_path: str, **kwargs) -> tuple:
         tokenizer = llm_engine.get_tokenizer()
         max_context_tokens = kwargs.get("max_model_len", 4096)
 
-        def vllm_fn(prompt: str, stop: List[str] = None) -> str:
+        def vllm_fn(prompts: List[str], stop: List[str] = None) -> List[str]:
             max_output_tokens = 100
-            prompt = _truncate_prompt_to_fit(prompt, tokenizer, max_context_tokens, max_output_tokens)
+            prompts = [_truncate_prompt_to_fit(p, tokenizer, max_context_tokens, max_output_tokens) for p in prompts]
             params = SamplingParams(temperature=0, max_tokens=max_output_tokens, stop=stop or ["\n"])
-            outputs = llm_engine.generate([prompt], params)
-            return outputs[0].outputs[0].text
+            outputs = llm_engine.generate(prompts, params, use_tqdm=False)
+            return [output.outputs[0].text for output in outputs]
 
         def cleanup():
             nonlocal llm_engine
@@ -203,12 +244,27 @@ def create_llm_fn(backend: str, model_path: str, **kwargs) -> tuple:
                 text = text[2:]
             return text
 
-        return api_fn, lambda: None
+        return batch_llm_fn(api_fn, max_workers=kwargs.get("max_workers", 8)), lambda: None
 
     else:
         raise ValueError(f"Unknown backend: {backend}. Use 'vllm' or 'api'.")
 
 
+def create_llm_fn(backend: str, model_path: str, **kwargs) -> tuple:
+    """
+    创建统一的 llm(prompt, stop) 函数（逐条调用，见 create_batch_llm_fn）。
+
+    Returns:
+        (llm_fn, cleanup_fn): cleanup_fn 释放 GPU 显存
+    """
+    generate, cleanup = create_batch_llm_fn(backend, model_path, **kwargs)
+
+    def llm_fn(prompt: str, stop: List[str] = None) -> str:
+        return generate([prompt], stop=stop)[0]
+
+    return llm_fn, cleanup
+
+
 # ============================================================
 # Evaluator
 # ============================================================
@@ -225,6 +281,7 @@ class ALFWorldEvaluator(BaseEvaluator):
         backend:      "vllm" 或 "api"（默认自动判断）
         api_key:      API 密钥（backend=api 时）
         api_base:     API 地址（backend=api 时）
+        concurrency:  同时进行的局数（默认 8），每个 tick 批量生成一次
     """
 
     def __init__(self, config):
@@ -246,6 +303,7 @@ class ALFWorldEvaluator(BaseEvaluator):
         cfg = {**self.eval_config, **kwargs}
         max_steps = cfg.get("max_steps", 50)
         env_num = cfg.get("env_num", 134)
+        concurrency = max(1, int(cfg.get("concurrency", 8)))
 
         # --- 设置日志 Tee ---
         LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -254,7 +312,7 @@ class ALFWorldEvaluator(BaseEvaluator):
         old_stdout = sys.stdout
         tee = _Tee(log_file)
         sys.stdout = tee
-        env = None
+        envs = []
         llm_cleanup = None
 
         try:
@@ -266,7 +324,7 @@ class ALFWorldEvaluator(BaseEvaluator):
             _log(f"ALFWorld eval: backend={backend}, model={model_path}")
 
             # --- 创建 LLM 函数 ---
-            llm_fn, llm_cleanup = create_llm_fn(
+            generate, llm_cleanup = create_batch_llm_fn(
                 backend=backend,
                 model_path=model_path,
                 api_key=cfg.get("api_key"),
@@ -274,6 +332,7 @@ class ALFWorldEvaluator(BaseEvaluator):
                 tensor_parallel_size=cfg.get("tensor_parallel_size", 1),
                 max_model_len=cfg.get("max_model_len", 4096),
                 enforce_eager=cfg.get("enforce_eager", os.getenv("VLLM_ENFORCE_EAGER", "0") == "1"),
+                max_workers=concurrency,
             )
 
             # --- 加载 ReAct few-shot prompts ---
@@ -307,47 +366,57 @@ class ALFWorldEvaluator(BaseEvaluator):
             split = cfg.get("split", "eval_out_of_distribution")
             env_type = env_config.get("env", {}).get("type", "AlfredTWEnv")
             alfred_env = get_environment(env_type)(env_config, train_eval=split)
-            env = alfred_env.init_env(batch_size=1)
-
             num_games = min(env_num, alfred_env.num_games)
-            _log(f"ALFWorld: {num_games} games, max {max_steps} steps, split={split}")
+
+            # 每个并发位置一个环境，轮流分配游戏；每个环境按顺序 reset 到自己的下一局
+            game_nos = list(range(num_games))
+            all_game_files = list(alfred_env.game_files)
+            streams = []
+
+            def _stream(env, nos: List[int]):
+                for n in nos:
+                    yield str(n), alfworld_game_episode(env, react_prompts, max_steps, label=f"{n + 1}/{num_games}")
+
+            for nos in split_round_robin(game_nos, concurrency):
+                alfred_env.game_files = [all_game_files[n] for n in nos]
+                alfred_env.num_games = len(nos)
+                envs.append(alfred_env.init_env(batch_size=1))
+                streams.append(_stream(envs[-1], nos))
+            _log(f"ALFWorld: {num_games} games, max {max_steps} steps, split={split}, {len(envs)} concurrent games")
 
             # --- 评测循环（ReAct 官方逻辑） ---
             cnts = [0] * 6
             rs = [0] * 6
-
-            for game_no in range(num_games):
-                ob, info = env.reset()
-                ob = "\n".join(ob[0].split("\n\n")[1:])
-                name = "/".join(info["extra.gamefile"][0].split("/")[-3:-1])
-                _log(f"\n[Game {game_no + 1}/{num_games}] {name}")
-
-                matched = False
-                for i, (prefix, prompt_key) in enumerate(TASK_PREFIXES.items()):
-                    if name.startswith(prefix):
-                        prompt = (
-                            "Interact with a household to solve a task. Here are two examples.\n"
-                            + react_prompts[f"react_{prompt_key}_1"]
-                            + react_prompts[f"react_{prompt_key}_0"]
-                            + "\nHere is the task.\n"
-                        )
-                        reward, steps = alfworld_run(llm_fn, env, prompt, ob, max_steps)
-                        rs[i] += reward
-                        cnts[i] += 1
-                        matched = True
-                        _log(f"  Result: {'WON' if reward else 'LOST'} ({steps} steps)")
-                        break
-
-                if not matched:
-                    _log(f"  WARNING: Unknown task type: {name}, skipping")
-                    continue
-
-                total_r, total_c = sum(rs), sum(cnts)
+            errors = 0
+            task_index = {prefix: i for i, prefix in enumerate(TASK_PREFIXES)}
+
+            def _on_result(record: dict) -> None:
+                nonlocal errors
+                label = f"[Game {int(record['key']) + 1}/{num_games}]"
+                if "error" in record:
+                    errors += 1
+                    _log(f"{label} ERROR: {record['error']}")
+                elif record["task"] is None:
+                    _log(f"{label} WARNING: Unknown task type: {record['game']}, skipping")
+                    return
+                else:
+                    i = task_index[record["task"]]
+                    rs[i] += record["reward"]
+                    cnts[i] += 1
+                    _log(f"{label} Result: {'WON' if record['reward'] else 'LOST'} ({record['steps']} steps)")
+
+                total_r, total_c = sum(rs), sum(cnts) + errors
                 _log(f"  Running: {total_r}/{total_c} = {total_r / max(total_c, 1):.1%}")
 
+            episodes_file = log_file.with_suffix(".episodes.jsonl")
+            runner = EpisodeRunner(generate, results_path=episodes_file, on_result=_on_result)
+            runner.run(streams)
+            _log(f"Episodes: {episodes_file}, generation stats: {runner.stats}")
+
             # --- 汇总结果 ---
+            # 出错的局算作失败
             total_success = sum(rs)
-            total_count = sum(cnts)
+            total_count = sum(cnts) + errors
             success_rate = total_success / total_count if total_count > 0 else 0.0
 
             per_task = {}
@@ -361,6 +430,7 @@ class ALFWorldEvaluator(BaseEvaluator):
                 "total_count": total_count,
                 "success_rate": success_rate,
                 "per_task": per_task,
+                "errors": errors,
             }
 
             _log(f"\nALFWorld done: {total_success}/{total_count} = {success_rate:.2%}")
@@ -373,7 +443,7 @@ class ALFWorldEvaluator(BaseEvaluator):
             _log(result["error"])
             return result
         finally:
-            if env is not None:
+            for env in envs:
                 try:
                     env.close()
                 except Exception as e:
@@ -17,6 +17,12 @@ from pathlib import Path
 from typing import Any, Callable, Dict, List, Tuple
 
 from rdagent.log import rdagent_logger as logger
+from rdagent.scenarios.rl.autorl_bench.core.episodes import (
+    Episode,
+    EpisodeRunner,
+    batch_llm_fn,
+    run_episode,
+)
 from rdagent.scenarios.rl.autorl_bench.core.evaluator import BaseEvaluator
 
 from .data import WEBSHOP_REPO_DIR, _clone_webshop_repo, _ensure_repo_in_path
@@ -57,16 +63,24 @@ def _log(msg: str):
 # LLM 后端工厂
 # ============================================================
 
+SYSTEM_MSG = (
+    "You are a helpful shopping assistant browsing an e-commerce website. "
+    "Given a user instruction, current observation, and available actions, "
+    "pick the best action to find and purchase a matching product. "
+    "Output ONLY one action (e.g., 'search[red shoes]', 'click[buy now]') "
+    "with NO extra text, NO explanation."
+)
 
-def create_llm_fn(backend: str, model_path: str, **kwargs) -> Tuple[Callable, Callable]:
+
+def create_batch_llm_fn(backend: str, model_path: str, **kwargs) -> Tuple[Callable, Callable]:
     """
-    创建统一的 llm(prompt, stop) 函数。
+    创建批量的 generate(prompts, stop) -> outputs 函数。
 
-    backend="vllm": 本地模型，text completion
-    backend="api":  OpenAI 兼容 chat API
+    backend="vllm": 本地模型，一次 chat 调用生成整批
+    backend="api":  OpenAI 兼容 chat API，max_workers 个线程并发请求
 
     Returns:
-        (llm_fn, cleanup_fn): cleanup_fn 释放资源
+        (generate_fn, cleanup_fn): cleanup_fn 释放资源
     """
     if backend == "vllm":
         from vllm import LLM, SamplingParams
@@ -76,22 +90,17 @@ def create_llm_fn(backend: str, model_path: str, **kwargs) -> Tuple[Callable, Ca
             model=model_path, tensor_parallel_size=kwargs.get("tensor_parallel_size", 1), trust_remote_code=True
         )
 
-        _vllm_sys_msg = (
-            "You are a helpful shopping assistant browsing an e-commerce website. "
-            "Given a user instruction, current observation, and available actions, "
-            "pick the best action to find and purchase a matching product. "
-            "Output ONLY one action (e.g., 'search[red shoes]', 'click[buy now]') "
-            "with NO extra text, NO explanation."
-        )
-
-        def vllm_fn(prompt: str, stop: List[str] = None) -> str:
-            messages = [
-                {"role": "system", "content": _vllm_sys_msg},
-                {"role": "user", "content": prompt},
+        def vllm_fn(prompts: List[str], stop: List[str] = None) -> List[str]:
+            conversations = [
+                [
+                    {"role": "system", "content": SYSTEM_MSG},
+                    {"role": "user", "content": prompt},
+                ]
+                for prompt in prompts
             ]
             params = SamplingParams(temperature=0, max_tokens=100, stop=stop or ["\n"])
-            outputs = llm_engine.chat(messages, sampling_params=params)
-            return outputs[0].outputs[0].text
+            outputs = llm_engine.chat(conversations, sampling_params=params, use_tqdm=False)
+            return [output.outputs[0].text for output in outputs]
 
         def cleanup():
             nonlocal llm_engine
@@ -117,19 +126,11 @@ def create_llm_fn(backend: str, model_path: str, **kwargs) -> Tuple[Callable, Ca
         )
         model_name = model_path
 
-        system_msg = (
-            "You are a helpful shopping assistant browsing an e-commerce website. "
-            "Given a user instruction, current observation, and available actions, "
-            "pick the best action to find and purchase a matching product. "
-            "Output ONLY one action (e.g., 'search[red shoes]', 'click[buy now]') "
-            "with NO extra text, NO explanation."
-        )
-
         def api_fn(prompt: str, stop: List[str] = None) -> str:
             response = client.chat.completions.create(
                 model=model_name,
                 messages=[
-                    {"role": "system", "content": system_msg},
+                    {"role": "system", "content": SYSTEM_MSG},
                     {"role": "user", "content": prompt},
                 ],
                 temperature=0,
@@ -139,12 +140,27 @@ def create_llm_fn(backend: str, model_path: str, **kwargs) -> Tuple[Callable, Ca
             text = response.choices[0].message.content or ""
             return text.strip()
 
-        return api_fn, lambda: None
+        return batch_llm_fn(api_fn, max_workers=kwargs.get("max_workers", 8)), lambda: None
 
     else:
         raise ValueError(f"Unknown backend: {backend}. Use 'vllm' or 'api'.")
 
 
+def create_llm_fn(backend: str, model_path: str, **kwargs) -> Tuple[Callable, Callable]:
+    """
+    创建统一的 llm(prompt, stop) 函数（逐条调用，见 create_batch_llm_fn）。
+
+    Returns:
+        (llm_fn, cleanup_fn): cleanup_fn 释放资源
+    """
+    generate, cleanup = create_batch_llm_fn(backend, model_path, **kwargs)
+
+    def llm_fn(prompt: str, stop: List[str] = None) -> str:
+        return generate([prompt], stop=stop)[0]
+
+    return llm_fn, cleanup
+
+
 # ============================================================
 # ReAct Agent 核心逻辑
 # ============================================================
@@ -198,27 +214,19 @@ Now it's your turn:
     return prompt
 
 
-def webshop_run(
-    llm_fn: Callable,
+def webshop_episode(
     env,
     instruction: str,
     observation: str,
     max_steps: int = 50,
     history_window: int = 5,
-) -> Tuple[float, int, bool]:
+    log_prefix: str = "",
+) -> Episode:
     """
-    单轮 WebShop 评测逻辑。
-
-    Args:
-        llm_fn: llm(prompt, stop) -> str
-        env: WebShop 环境实例
-        instruction: 用户指令
-        observation: 初始观察
-        max_steps: 最大步数
-        history_window: prompt 中保留的最近历史步数
+    单轮 WebShop 评测逻辑（episode 生成器：yield prompt，接收 LLM 输出）。
 
     Returns:
-        (reward, steps, success): reward为最终奖励, steps为实际步数, success是否成功
+        {"reward", "steps", "success"}: reward为最终奖励, steps为实际步数, success是否成功
     """
     history = []
 
@@ -234,7 +242,7 @@ def webshop_run(
             history_window=history_window,
         )
 
-        action = llm_fn(prompt, stop=["\n"]).strip()
+        action = (yield prompt).strip()
 
         # 清理动作前缀
         if action.startswith("Action:"):
@@ -242,20 +250,67 @@ def webshop_run(
         if action.startswith("choose["):
             action = "click[" + action[7:]
 
-        _log(f"  Step {step}: {action}")
+        _log(f"{log_prefix}  Step {step}: {action}")
 
         observation, reward, done, info = env.step(action)
 
-        _log(f"  Obs {step}: {observation[:200]}...")
-        _log(f"  Reward: {reward}, Done: {done}")
+        _log(f"{log_prefix}  Obs {step}: {observation[:200]}...")
+        _log(f"{log_prefix}  Reward: {reward}, Done: {done}")
 
         history.append((action, observation))
 
         if done:
-            success = reward >= 0.5
-            return reward, step, success
+            return {"reward": reward, "steps": step, "success": reward >= 0.5}
 
-    return 0.0, max_steps, False
+    return {"reward": 0.0, "steps": max_steps, "success": False}
+
+
+def webshop_run(
+    llm_fn: Callable,
+    env,
+    instruction: str,
+    observation: str,
+    max_steps: int = 50,
+    history_window: int = 5,
+) -> Tuple[float, int, bool]:
+    """
+    单轮 WebShop 评测逻辑（逐步调用 llm_fn）。
+
+    Args:
+        llm_fn: llm(prompt, stop) -> str
+        env: WebShop 环境实例
+        instruction: 用户指令
+        observation: 初始观察
+        max_steps: 最大步数
+        history_window: prompt 中保留的最近历史步数
+
+    Returns:
+        (reward, steps, success): reward为最终奖励, steps为实际步数, success是否成功
+    """
+    result = run_episode(webshop_episode(env, instruction, observation, max_steps, history_window), llm_fn, stop=["\n"])
+    return result["reward"], result["steps"], result["success"]
+
+
+def webshop_task_episode(env, session: int, max_steps: int = 50, history_window: int = 5) -> Episode:
+    """重置环境到指令 session 后运行一局；结果带上 instruction"""
+    observation, _ = env.reset(session=session)
+    instruction = env.get_instruction_text()
+    _log(f"\n[Task {session}] {instruction[:80]}...")
+    result = yield from webshop_episode(
+        env, instruction, observation, max_steps, history_window, log_prefix=f"[Task {session}]"
+    )
+    return {"instruction": instruction, **result}
+
+
+def webshop_streams(envs: List[Any], sessions: List[int], max_steps: int = 50, history_window: int = 5) -> List:
+    """每个环境一个 stream，共享待评测的指令队列：先空出来的环境先领下一条指令"""
+    queue = iter(sessions)
+
+    def _stream(env):
+        for session in queue:
+            yield str(session), webshop_task_episode(env, session, max_steps, history_window)
+
+    return [_stream(env) for env in envs]
 
 
 # ============================================================
@@ -274,6 +329,7 @@ class WebShopEvaluator(BaseEvaluator):
         api_key:          API 密钥（backend=api 时）
         api_base:         API 地址（backend=api 时）
         num_products:     加载的产品数量（默认 1000，可选 1000 或全部）
+        concurrency:      同时进行的 episode 数（默认 8），每个 tick 批量生成一次
     """
 
     def __init__(self, config):
@@ -296,6 +352,7 @@ class WebShopEvaluator(BaseEvaluator):
         max_steps = cfg.get("max_steps", 50)
         num_instructions = cfg.get("num_instructions", 100)
         num_products = cfg.get("num_products", 1000)
+        concurrency = max(1, int(cfg.get("concurrency", 8)))
 
         # --- 设置日志 Tee ---
         LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -318,12 +375,13 @@ class WebShopEvaluator(BaseEvaluator):
             _log(f"WebShop eval: backend={backend}, model={model_path}")
 
             # --- 创建 LLM 函数 ---
-            llm_fn, llm_cleanup = create_llm_fn(
+            generate, llm_cleanup = create_batch_llm_fn(
                 backend=backend,
                 model_path=model_path,
                 api_key=cfg.get("api_key"),
                 api_base=cfg.get("api_base"),
                 tensor_parallel_size=cfg.get("tensor_parallel_size", 1),
+                max_workers=concurrency,
             )
 
             # --- 初始化 WebShop 环境 ---
@@ -334,55 +392,46 @@ class WebShopEvaluator(BaseEvaluator):
                 sys.stdout = old_stdout
                 return result
 
-            env = WebAgentTextEnv(
-                observation_mode="text",
-                num_products=num_products,
-            )
-
             # --- 加载评测指令 ---
             instruction_idxs = list(range(min(num_instructions, 12000)))
 
-            _log(f"WebShop: {len(instruction_idxs)} instructions, max {max_steps} steps each")
+            # 每个并发 episode 一个环境（浏览器状态独立），共用同一个加载了商品的 server
+            envs = [WebAgentTextEnv(observation_mode="text", num_products=num_products)]
+            for _ in range(min(concurrency, len(instruction_idxs)) - 1):
+                envs.append(WebAgentTextEnv(observation_mode="text", num_products=num_products, server=envs[0].server))
+
+            _log(
+                f"WebShop: {len(instruction_idxs)} instructions, max {max_steps} steps each, "
+                f"{len(envs)} concurrent episodes"
+            )
 
             # --- 评测循环 ---
             total_reward = 0.0
             success_count = 0
             total_steps = 0
-
-            for idx, instr_idx in enumerate(instruction_idxs):
-                try:
-                    # 重置环境
-                    observation, _ = env.reset(session=instr_idx)
-                    instruction = env.get_instruction_text()
-
-                    _log(f"\n[Task {idx + 1}/{len(instruction_idxs)}] {instruction[:80]}...")
-
-                    # 运行 agent
-                    reward, steps, success = webshop_run(
-                        llm_fn=llm_fn,
-                        env=env,
-                        instruction=instruction,
-                        observation=observation,
-                        max_steps=max_steps,
+            finished = 0
+
+            def _on_result(record: dict) -> None:
+                nonlocal total_reward, success_count, total_steps, finished
+                finished += 1
+                if "error" in record:
+                    _log(f"[Task {record['key']}] ERROR: {record['error']}")
+                else:
+                    total_reward += record["reward"]
+                    total_steps += record["steps"]
+                    success_count += int(record["success"])
+                    _log(
+                        f"[Task {record['key']}] Result: {'SUCCESS' if record['success'] else 'FAIL'} "
+                        f"(reward={record['reward']:.2f}, steps={record['steps']})"
                     )
 
-                    total_reward += reward
-                    total_steps += steps
-                    if success:
-                        success_count += 1
-
-                    _log(f"  Result: {'SUCCESS' if success else 'FAIL'} (reward={reward:.2f}, steps={steps})")
-
-                    # 打印进度
-                    current_success_rate = success_count / (idx + 1)
-                    _log(f"  Running: {success_count}/{idx + 1} = {current_success_rate:.1%}")
-
-                except Exception as e:
-                    _log(f"  ERROR: {e}")
-                    import traceback
+                # 打印进度
+                _log(f"  Running: {success_count}/{finished} = {success_count / finished:.1%}")
 
-                    _log(traceback.format_exc())
-                    continue
+            episodes_file = log_file.with_suffix(".episodes.jsonl")
+            runner = EpisodeRunner(generate, results_path=episodes_file, on_result=_on_result)
+            runner.run(webshop_streams(envs, instruction_idxs, max_steps=max_steps))
+            _log(f"Episodes: {episodes_file}, generation stats: {runner.stats}")
 
             # --- 汇总结果 ---
             total_count = len(instruction_idxs)
@@ -413,7 +462,7 @@ class WebShopEvaluator(BaseEvaluator):
 
         finally:
             # --- 清理 ---
-            if "env" in locals():
+            for env in locals().get("envs", []):
                 env.close()
 
             # 释放 LLM 资源
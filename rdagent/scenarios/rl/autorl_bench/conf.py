@@ -22,6 +22,8 @@ class AutoRLBenchSettings(ExtendedBaseSettings):
 
     file_path: Path = Path.cwd() / "git_ignore_folder" / "rl_files"
     rdagent_root: Path = Path.cwd()  # Docker 挂载用，可通过 AUTORL_RDAGENT_ROOT 覆盖
+    grading_cpu_workers: int = 1  # 没有 GPU 时 Grading Server 并行评测的任务数
+    grading_drain_timeout: int = 3600  # 结束时等待未完成评测的最长秒数
 
 
 AUTORL_BENCH_SETTING = AutoRLBenchSettings()
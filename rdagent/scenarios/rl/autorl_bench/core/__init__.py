@@ -28,12 +28,17 @@ AutoRL-Bench Core Module
     - OpenCompassEvaluator (opencompass.py)  — 基于 OpenCompass 的评测
     - PerSampleEvaluator (benchmarks/smith/) — 逐样本评测
 
+交互式评测: EpisodeRunner (episodes.py)
+    同时推进 K 局 episode（生成器：yield prompt，接收 LLM 输出），每个 tick 批量生成一次，
+    每局结束即写入 JSONL。WebShop / ALFWorld 评测器基于它实现。
+
 服务:
     - GradingServer (server.py)              — 评测服务器
     - create_grading_server (server.py)      — 创建服务上下文管理器
 ================================================================================
 """
 
+from .episodes import EpisodeRunner, batch_llm_fn, run_episode
 from .evaluator import (
     BaseEvaluator,
     EvalResult,
@@ -67,6 +72,9 @@ __all__ = [
     "BaseEvaluator",
     "validate_eval_result",
     "OpenCompassEvaluator",
+    "EpisodeRunner",
+    "run_episode",
+    "batch_llm_fn",
     # 服务
     "create_grading_server",
     # 工具函数
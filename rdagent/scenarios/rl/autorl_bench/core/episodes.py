@@ -0,0 +1,190 @@
+"""
+AutoRL-Bench Episode Runner
+
+交互式 benchmark（WebShop、ALFWorld 等）的批量 episode 执行器。
+
+逐局逐步评测时，每一步只向推理后端发一个 prompt，GPU 大部分时间在等环境；
+这里同时推进 K 局（每局一个独立的环境），每个 tick 把所有进行中 episode 的 prompt
+合并成一次批量生成调用，结束的 episode 立即写入 JSONL 结果文件，空出的位置由下一局补上。
+
+================================================================================
+接口约定
+================================================================================
+
+Episode: 生成器，yield 下一步的 prompt，接收 LLM 的输出，return 本局结果 dict
+
+    def my_episode(env, ...) -> Episode:
+        for step in range(1, max_steps + 1):
+            action = yield build_prompt(...)
+            ... = env.step(action)
+            if done:
+                return {"reward": reward, "steps": step}
+        return {"reward": 0, "steps": max_steps}
+
+Stream: 可迭代的 (key, episode)，同一个 stream 内的 episode 依次运行、共用一个环境；
+    不同 stream 的 episode 并发运行。stream 在需要下一局时才被迭代，可以在其中 reset 环境。
+
+BatchLLMFn: generate(prompts, stop) -> outputs，一次处理多个 prompt
+================================================================================
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+Episode = Generator[str, str, Dict[str, Any]]
+Stream = Iterable[Tuple[str, Episode]]
+LLMFn = Callable[..., str]
+BatchLLMFn = Callable[..., List[str]]
+
+
+def run_episode(episode: Episode, llm_fn: LLMFn, stop: Optional[List[str]] = None) -> Dict[str, Any]:
+    """用单条调用的 llm(prompt, stop) 顺序跑完一局"""
+    try:
+        prompt = next(episode)
+        while True:
+            prompt = episode.send(llm_fn(prompt, stop=stop))
+    except StopIteration as e:
+        return e.value
+
+
+def batch_llm_fn(llm_fn: LLMFn, max_workers: int = 8) -> BatchLLMFn:
+    """把单条调用的 llm(prompt, stop) 包装成批量函数：用线程池并发请求（适用于 API 后端）"""
+
+    def generate(prompts: List[str], stop: Optional[List[str]] = None) -> List[str]:
+        if len(prompts) <= 1 or max_workers <= 1:
+            return [llm_fn(p, stop=stop) for p in prompts]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as pool:
+            return list(pool.map(lambda p: llm_fn(p, stop=stop), prompts))
+
+    return generate
+
+
+def split_round_robin(items: List[Any], n: int) -> List[List[Any]]:
+    """把 items 轮流分给 n 个 stream（保持各自的原始顺序）"""
+    n = max(1, min(n, len(items)))
+    return [items[i::n] for i in range(n)]
+
+
+class EpisodeRunner:
+    """
+    同时推进多个 stream 的 episode，每个 tick 批量生成一次。
+
+    Args:
+        generate: generate(prompts, stop) -> outputs
+        results_path: 每局结束时追加一行 JSON（key、结果或 error）；None 则不落盘
+        stop: 传给 generate 的 stop 序列
+        on_result: 每局结束时的回调 on_result(record)，用于打印进度
+    """
+
+    def __init__(
+        self,
+        generate: BatchLLMFn,
+        results_path: str | Path | None = None,
+        stop: Optional[List[str]] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.generate = generate
+        self.results_path = Path(results_path) if results_path is not None else None
+        self.stop = stop if stop is not None else ["\n"]
+        self.on_result = on_result
+        self.stats = {"ticks": 0, "prompts": 0, "max_batch": 0, "generate_seconds": 0.0}
+
+    def run(self, streams: List[Stream]) -> List[Dict[str, Any]]:
+        """跑完所有 stream，按结束顺序返回每局的记录"""
+        records: List[Dict[str, Any]] = []
+        iterators: Dict[int, Iterator[Tuple[str, Episode]]] = {}
+        # stream 编号 -> (key, episode, 待生成的 prompt)
+        active: Dict[int, Tuple[str, Episode, str]] = {}
+        out = None
+        if self.results_path is not None:
+            self.results_path.parent.mkdir(parents=True, exist_ok=True)
+            out = open(self.results_path, "a", encoding="utf-8")
+
+        def _finish(key: str, result: Dict[str, Any] | None = None, error: str | None = None) -> None:
+            record = {"key": key, **(result or {})} if error is None else {"key": key, "error": error}
+            records.append(record)
+            if out is not None:
+                out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+            if self.on_result is not None:
+                self.on_result(record)
+
+        def _advance(slot: int, key: str, episode: Episode, output: str | None) -> None:
+            """把输出交给 episode；结束了就从同一个 stream 取下一局，直到拿到下一个 prompt"""
+            while True:
+                try:
+                    prompt = next(episode) if output is None else episode.send(output)
+                    active[slot] = (key, episode, prompt)
+                    return
+                except StopIteration as e:
+                    _finish(key, result=e.value)
+                except Exception as e:
+                    _finish(key, error=f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+                active.pop(slot, None)
+                try:
+                    key, episode = next(iterators[slot])
+                except StopIteration:
+                    return
+                output = None
+
+        try:
+            for slot, stream in enumerate(streams):
+                iterators[slot] = iter(stream)
+                try:
+                    key, episode = next(iterators[slot])
+                except StopIteration:
+                    continue
+                _advance(slot, key, episode, None)
+
+            while active:
+                slots = list(active)
+                prompts = [active[s][2] for s in slots]
+                start = time.time()
+                try:
+                    outputs = self.generate(prompts, stop=self.stop)
+                    if len(outputs) != len(prompts):
+                        raise ValueError(f"generate returned {len(outputs)} outputs for {len(prompts)} prompts")
+                    failure = None
+                except Exception as e:
+                    failure = f"{type(e).__name__}: {e}"
+                self.stats["ticks"] += 1
+                self.stats["prompts"] += len(prompts)
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(prompts))
+                self.stats["generate_seconds"] += time.time() - start
+
+                for i, slot in enumerate(slots):
+                    key, episode, _ = active[slot]
+                    if failure is None:
+                        _advance(slot, key, episode, outputs[i])
+                        continue
+                    # 生成失败只算这一批 episode 失败，和逐局评测时单局出错的处理一致
+                    episode.close()
+                    _finish(key, error=failure)
+                    active.pop(slot)
+                    try:
+                        key, episode = next(iterators[slot])
+                    except StopIteration:
+                        continue
+                    _advance(slot, key, episode, None)
+        finally:
+            for _, episode, _ in active.values():
+                episode.close()
+            if out is not None:
+                out.close()
+        return records
@@ -0,0 +1,57 @@
+"""
+AutoRL-Bench Grading Worker
+
+Grading Server 为每个评测任务启动的子进程：在独立的环境变量（如 CUDA_VISIBLE_DEVICES）下
+加载评测器并执行评测，把结果写入 json 文件。
+
+运行: python -m rdagent.scenarios.rl.autorl_bench.core.grading_worker <job_spec.json> <result.json>
+"""
+
+import importlib
+import json
+import sys
+import traceback
+from pathlib import Path
+
+from rdagent.scenarios.rl.autorl_bench.core.evaluator import BaseEvaluator
+
+
+def load_evaluator(task: str, evaluator_class: str | None = None) -> BaseEvaluator:
+    """获取评测器；evaluator_class（类的完整路径）用于替换 task 注册的评测器，如 CPU 上的 stub 评测器"""
+    from rdagent.scenarios.rl.autorl_bench.benchmarks import (
+        BENCHMARKS,
+        BenchmarkConfig,
+        get_evaluator,
+    )
+
+    if evaluator_class is None:
+        return get_evaluator(task)
+    config = BENCHMARKS.get(task) or BenchmarkConfig(id=task, evaluator_class=evaluator_class)
+    module_path, class_name = evaluator_class.rsplit(".", 1)
+    return getattr(importlib.import_module(module_path), class_name)(config)
+
+
+def run_job(spec: dict) -> dict:
+    try:
+        evaluator = load_evaluator(spec["task"], spec.get("evaluator_class"))
+        return evaluator.run_eval(
+            model_path=spec["model_path"],
+            workspace_path=spec["workspace_path"],
+            model_name=spec["model_name"],
+            gpu_count=spec["gpu_count"],
+        )
+    except Exception as e:
+        traceback.print_exc()
+        return {"score": 0.0, "error": f"{type(e).__name__}: {e}", "accuracy_summary": {}}
+
+
+def main(spec_path: str, result_path: str) -> None:
+    spec = json.loads(Path(spec_path).read_text())
+    result = run_job(spec)
+    tmp = Path(result_path).with_suffix(".tmp")
+    tmp.write_text(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    tmp.replace(result_path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2])
@@ -9,7 +9,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Optional
 
-from rdagent.scenarios.rl.autorl_bench.core.utils import read_run_meta
+from rdagent.scenarios.rl.autorl_bench.core.utils import read_run_meta, read_scores
 
 
 def _parse_iso_time(value: str) -> Optional[datetime]:
@@ -30,8 +30,7 @@ def compute_metrics(
     baseline: Optional[float],
     base_model_path: Optional[str],
 ) -> dict[str, Any]:
-    scores_file = workspace / "scores.json"
-    scores = json.loads(scores_file.read_text()) if scores_file.exists() else []
+    scores = read_scores(workspace)
     score_values = [entry.get("score", 0.0) for entry in scores]
 
     valid_scores = [s for s in score_values if s and s > 0]
@@ -2,12 +2,19 @@
 AutoRL-Bench Grading Server (Simplified)
 
 精简的评测服务，主要提供 submit 接口。
+提交的模型进入任务队列，由 worker 子进程按设备并行评测；客户端通过 /jobs/<job_id> 轮询（或 long-poll）结果。
 """
 
 import json
 import os
+import subprocess
+import sys
 import threading
 import time
+import traceback
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Set
@@ -17,10 +24,20 @@ from flask import Flask, jsonify, request
 from werkzeug.serving import make_server
 
 from rdagent.log import rdagent_logger as logger
-from rdagent.scenarios.rl.autorl_bench.core.utils import read_run_meta, update_run_meta
+from rdagent.scenarios.rl.autorl_bench.conf import AUTORL_BENCH_SETTING
+from rdagent.scenarios.rl.autorl_bench.core.utils import (
+    SCORES_FILE,
+    kill_process_tree,
+    read_run_meta,
+    read_scores,
+    update_run_meta,
+)
 
 app = Flask(__name__)
 
+GRADING_WORKER_MODULE = "rdagent.scenarios.rl.autorl_bench.core.grading_worker"
+MAX_POLL_WAIT = 600.0  # long-poll 单次最长等待秒数
+
 
 def _get_available_gpus() -> Set[str]:
     """从 CUDA_VISIBLE_DEVICES 获取可用 GPU 集合"""
@@ -41,52 +58,106 @@ def _validate_gpu(gpu: str, available: Set[str]) -> Optional[str]:
     return None
 
 
+JOB_DONE_STATUSES = ("done", "failed")
+
+
+@dataclass
+class GradingJob:
+    """一次提交对应的评测任务"""
+
+    job_id: str
+    model_path: str
+    resolved_path: Path
+    cache_key: str
+    requested_gpus: list[str]  # 为空时使用任一空闲设备
+    submitted_at: float = field(default_factory=time.time)
+    status: str = "queued"  # queued / running / done / failed
+    devices: list[str] = field(default_factory=list)  # 分配到的设备
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+
+    def to_dict(self, position: Optional[int] = None) -> dict:
+        info = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "model_path": self.model_path,
+            "devices": self.devices or self.requested_gpus,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if position is not None:
+            info["queue_position"] = position
+        if self.result is not None:
+            info.update(self.result)
+        return info
+
+
 class GradingServer:
-    """评测服务器"""
+    """
+    评测服务器
+
+    提交的模型进入任务队列，调度器把任务分发到空闲的设备上，每个任务在独立的 worker 子进程中评测
+    （子进程的 CUDA_VISIBLE_DEVICES 为分配到的 GPU），因此不同 GPU 上的评测可以并行，同一 GPU 上的评测依次执行。
+    没有 GPU 时最多 cpu_workers 个任务并行。评测结果追加到 workspace 下的 scores.jsonl。
+    """
 
     def __init__(
         self,
         task: str,
         base_model: str,
         workspace: Path,
+        evaluator_class: Optional[str] = None,
+        cpu_workers: int = 1,
     ):
         self.task = task
         self.base_model = base_model
         self.workspace = Path(workspace)
-        self.scores_file = self.workspace / "scores.json"
+        self.scores_file = self.workspace / SCORES_FILE
+        self.jobs_dir = self.workspace / "grading_jobs"
+        self.evaluator_class = evaluator_class  # 替换 task 注册的评测器（类的完整路径），如测试用的 stub 评测器
         self.baseline_score: Optional[float] = None
         self.available_gpus: Set[str] = _get_available_gpus()
-        self._eval_lock = threading.Lock()
-        self._eval_cache: dict[str, dict] = {}
+        if self.available_gpus:
+            self._devices = sorted(self.available_gpus, key=int)
+        else:
+            self._devices = [f"cpu{i}" for i in range(max(cpu_workers, 1))]
+        self._busy: Set[str] = set()
+        self._cond = threading.Condition()
+        self._queue: list[GradingJob] = []
+        self._jobs: dict[str, GradingJob] = {}
+        self._inflight: dict[str, str] = {}  # cache key -> 排队或运行中的 job id，相同的提交合并为一个任务
+        self._procs: dict[str, subprocess.Popen] = {}
+        self._eval_cache: dict[str, str] = {}  # cache key -> 评测成功的 job id
+        self._scores: list[dict] = self.load_scores()
+        self._closed = False
 
     @staticmethod
     def _make_cache_key(resolved_path: Path) -> str:
-        """用路径 + safetensors/bin 文件最新 mtime 组合作为 cache key。
-        模型被覆盖后 mtime 变化，cache 自动失效。"""
+        """用路径 + 模型文件最新 mtime 组合作为 cache key。
+        模型被覆盖后 mtime 变化，cache 自动失效。
+        只扫描模型目录的第一层（save_pretrained 的权重和配置都在这一层），不递归遍历 checkpoint 等子目录。"""
         mtime = 0.0
         if resolved_path.is_dir():
-            for f in resolved_path.rglob("*"):
-                if f.suffix in (".safetensors", ".bin", ".json") and f.is_file():
-                    mt = f.stat().st_mtime
-                    if mt > mtime:
-                        mtime = mt
+            with os.scandir(resolved_path) as it:
+                for entry in it:
+                    if entry.name.endswith((".safetensors", ".bin", ".json")) and entry.is_file():
+                        mtime = max(mtime, entry.stat().st_mtime)
         elif resolved_path.is_file():
             mtime = resolved_path.stat().st_mtime
         return f"{resolved_path}@{mtime}"
 
     def load_scores(self) -> list[dict]:
-        if self.scores_file.exists():
-            return json.loads(self.scores_file.read_text())
-        return []
-
-    def save_scores(self, scores: list[dict]):
-        self.scores_file.write_text(json.dumps(scores, indent=2, ensure_ascii=False))
+        return read_scores(self.workspace)
 
     def get_evaluator(self):
         """获取当前 task 的评测器"""
-        from rdagent.scenarios.rl.autorl_bench.benchmarks import get_evaluator
+        from rdagent.scenarios.rl.autorl_bench.core.grading_worker import (
+            load_evaluator,
+        )
 
-        return get_evaluator(self.task)
+        return load_evaluator(self.task, self.evaluator_class)
 
     def resolve_model_path(self, model_path: str) -> Path:
         """将模型路径约束在 workspace 下，防止访问任意文件系统路径。"""
@@ -110,75 +181,158 @@ class GradingServer:
             raise ValueError("Invalid model_path") from exc
         return resolved_path
 
-    def submit(self, model_path: str, gpu: Optional[str] = None) -> dict:
+    def enqueue(self, model_path: str, gpu: Optional[str] = None) -> dict:
         """
-        提交模型评测
+        提交模型评测，立即返回任务信息（job_id、status 等），通过 get_job 查询结果
 
         Args:
             model_path: 模型路径
             gpu: 指定 GPU（如 "0", "1", "0,1"），必须是 CUDA_VISIBLE_DEVICES 中的子集。
-                 None 则使用 CUDA_VISIBLE_DEVICES 中的第一个 GPU。
-
-        Returns:
-            包含 score、best、improvement 等完整信息的结果
+                 None 则使用任一空闲的 GPU。
 
         Raises:
             ValueError: gpu 不在 CUDA_VISIBLE_DEVICES 范围内，或 model_path 非法
         """
-        if self.available_gpus:
-            if gpu is None:
-                gpu = sorted(self.available_gpus, key=int)[0]
-            else:
-                err = _validate_gpu(gpu, self.available_gpus)
-                if err:
-                    raise ValueError(err)
-
-        # B3 fix: 同一 model_path + 同一内容去重，直接返回缓存结果
+        requested: list[str] = []
+        if self.available_gpus and gpu is not None:
+            err = _validate_gpu(gpu, self.available_gpus)
+            if err:
+                raise ValueError(err)
+            requested = sorted({g.strip() for g in gpu.split(",") if g.strip()}, key=int)
+
+        # B3 fix: 同一 model_path + 同一内容去重，直接返回已有的任务
         # 用路径 + 模型文件最新 mtime 作为 cache key，模型文件被覆盖后自动失效
         resolved_path = self.resolve_model_path(model_path)
         cache_key = self._make_cache_key(resolved_path)
-        if cache_key in self._eval_cache:
-            cached = self._eval_cache[cache_key]
-            logger.info(f"[SUBMIT] Cache hit for {model_path}, score={cached.get('score')}")
-            return cached
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Grading server is shut down")
+            job_id = self._eval_cache.get(cache_key) or self._inflight.get(cache_key)
+            if job_id is not None:
+                logger.info(f"[SUBMIT] Cache hit for {model_path}, job={job_id}")
+                return self._job_info(self._jobs[job_id])
+
+            job = GradingJob(uuid.uuid4().hex[:12], model_path, resolved_path, cache_key, requested)
+            self._jobs[job.job_id] = job
+            self._inflight[cache_key] = job.job_id
+            self._queue.append(job)
+            logger.info(f"[SUBMIT] Queued job {job.job_id} | model_path={model_path} | gpu={gpu}")
+            self._dispatch()
+            return self._job_info(job)
+
+    def get_job(self, job_id: str, wait: Optional[float] = 0.0) -> dict:
+        """
+        查询任务；wait > 0 时最多等待 wait 秒直到任务结束（long-poll），None 表示一直等待
 
-        start_time = time.time()
+        Raises:
+            KeyError: 未知的 job_id
+        """
+        with self._cond:
+            job = self._jobs[job_id]
+            if wait is None or wait > 0:
+                self._cond.wait_for(lambda: job.status in JOB_DONE_STATUSES or self._closed, timeout=wait)
+            return self._job_info(job)
 
-        # B2 fix: 串行化评测，防止多个 vLLM 实例同时抢 GPU
-        with self._eval_lock:
-            # Double-check: 等锁期间可能已被其他线程评完
-            cache_key = self._make_cache_key(resolved_path)
-            if cache_key in self._eval_cache:
-                cached = self._eval_cache[cache_key]
-                logger.info(f"[SUBMIT] Cache hit (after lock) for {model_path}, score={cached.get('score')}")
-                return cached
+    def list_jobs(self) -> list[dict]:
+        with self._cond:
+            return [self._job_info(job) for job in self._jobs.values()]
 
-            scores = self.load_scores()
-            submission_id = len(scores) + 1
+    def submit(self, model_path: str, gpu: Optional[str] = None, timeout: Optional[float] = None) -> dict:
+        """
+        提交模型评测并等待结果
 
-            logger.info(f"[SUBMIT #{submission_id}] Started | model_path={model_path} | gpu={gpu}")
+        Returns:
+            包含 job_id、status，以及 score、best、improvement 等完整信息的结果
 
-            old_cuda = os.environ.get("CUDA_VISIBLE_DEVICES")
-            if gpu is not None:
-                os.environ["CUDA_VISIBLE_DEVICES"] = str(gpu)
+        Raises:
+            ValueError: gpu 不在 CUDA_VISIBLE_DEVICES 范围内，或 model_path 非法
+        """
+        return self.get_job(self.enqueue(model_path, gpu=gpu)["job_id"], wait=timeout)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待所有已提交的任务评测完成，返回是否在 timeout 内完成"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._inflight or self._closed, timeout=timeout)
+
+    def shutdown(self):
+        """停止调度，终止运行中的评测"""
+        with self._cond:
+            self._closed = True
+            procs = list(self._procs.values())
+            self._cond.notify_all()
+        for proc in procs:
+            kill_process_tree(proc)
+
+    def _job_info(self, job: GradingJob) -> dict:
+        position = self._queue.index(job) if job.status == "queued" else None
+        return job.to_dict(position)
+
+    def _dispatch(self):
+        """把排队的任务分配到空闲设备上（需持有 self._cond）；排在前面但设备被占用的任务不阻塞后面的任务"""
+        for job in list(self._queue):
+            free = [d for d in self._devices if d not in self._busy]
+            if job.requested_gpus:
+                if not set(job.requested_gpus) <= set(free):
+                    continue
+                devices = job.requested_gpus
+            elif free:
+                devices = free[:1]
+            else:
+                break
+            self._queue.remove(job)
+            self._busy.update(devices)
+            job.devices, job.status, job.started_at = devices, "running", time.time()
+            threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+
+    def _run_job(self, job: GradingJob):
+        """在 worker 子进程中评测，子进程的 CUDA_VISIBLE_DEVICES 为分配到的 GPU"""
+        spec_path = self.jobs_dir / f"{job.job_id}.json"
+        result_path = self.jobs_dir / f"{job.job_id}.result.json"
+        log_path = self.jobs_dir / f"{job.job_id}.log"
+        env = os.environ.copy()
+        if self.available_gpus:
+            env["CUDA_VISIBLE_DEVICES"] = ",".join(job.devices)
+        logger.info(f"[JOB {job.job_id}] Started | model_path={job.model_path} | devices={job.devices}")
 
-            try:
-                evaluator = self.get_evaluator()
-                gpu_count = len(self.available_gpus) if self.available_gpus else 1
-                result = evaluator.run_eval(
-                    model_path=str(resolved_path),
-                    workspace_path=str(self.workspace),
-                    model_name=self.base_model,
-                    gpu_count=gpu_count,
+        # 任何失败都要走到 _finish，否则任务一直是 running，分配的 GPU 也不会释放
+        try:
+            self.jobs_dir.mkdir(parents=True, exist_ok=True)
+            spec_path.write_text(
+                json.dumps(
+                    {
+                        "task": self.task,
+                        "evaluator_class": self.evaluator_class,
+                        "model_path": str(job.resolved_path),
+                        "workspace_path": str(self.workspace),
+                        "model_name": self.base_model,
+                        "gpu_count": len(job.devices) if self.available_gpus else 1,
+                    },
+                    indent=2,
                 )
-            finally:
-                if old_cuda is not None:
-                    os.environ["CUDA_VISIBLE_DEVICES"] = old_cuda
-                elif "CUDA_VISIBLE_DEVICES" in os.environ:
-                    del os.environ["CUDA_VISIBLE_DEVICES"]
-
-        elapsed_seconds = time.time() - start_time
+            )
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Grading server is shut down")
+                with open(log_path, "w", encoding="utf-8") as log_file:
+                    proc = subprocess.Popen(
+                        [sys.executable, "-m", GRADING_WORKER_MODULE, str(spec_path), str(result_path)],
+                        env=env,
+                        stdout=log_file,
+                        stderr=subprocess.STDOUT,
+                        start_new_session=True,
+                    )
+                self._procs[job.job_id] = proc
+            exit_code = proc.wait()
+            if result_path.exists():
+                result = json.loads(result_path.read_text())
+            else:
+                result = {"score": 0.0, "error": f"Grading worker exited with code {exit_code}, see {log_path}"}
+        except (RuntimeError, OSError, ValueError) as e:
+            logger.error(f"[JOB {job.job_id}] Failed to run the grading worker: {e}\n{traceback.format_exc()}")
+            result = {"score": 0.0, "error": f"Failed to run the grading worker: {e}"}
+        self._finish(job, result)
 
+    def _finish(self, job: GradingJob, result: dict):
         # 解析分数
         score = result.get("score", 0.0)
         error = result.get("error")
@@ -188,40 +342,52 @@ class GradingServer:
         if self.baseline_score is not None:
             improvement = round(score - self.baseline_score, 6)
 
-        # 构建结果
-        entry = {
-            "submission_id": submission_id,
-            "timestamp": datetime.now().isoformat(),
-            "model_path": model_path,
-            "score": score,
-            "baseline_score": self.baseline_score,
-            "improvement": improvement,
-            "elapsed_seconds": round(elapsed_seconds, 2),
-        }
-        # B4 fix: 透传 error 字段
-        if error:
-            entry["error"] = error
-
-        scores.append(entry)
-        self.save_scores(scores)
-        update_run_meta(self.workspace, last_submit_time=int(time.time()))
-
-        # 查找最高分
-        best_entry = max(scores, key=lambda x: x.get("score", 0))
-
-        logger.info(f"[SUBMIT #{submission_id}] Done | score={score}, best={best_entry['score']}")
-
-        response = {
-            **entry,
-            "best": best_entry,
-            "total_submissions": len(scores),
-        }
-
-        # 只缓存成功的评测结果（失败的不缓存，允许重试）
-        if not error:
-            self._eval_cache[self._make_cache_key(resolved_path)] = response
+        with self._cond:
+            job.finished_at = time.time()
+            submission_id = len(self._scores) + 1
+            # 构建结果
+            entry = {
+                "submission_id": submission_id,
+                "timestamp": datetime.now().isoformat(),
+                "model_path": job.model_path,
+                "score": score,
+                "baseline_score": self.baseline_score,
+                "improvement": improvement,
+                "elapsed_seconds": round(job.finished_at - job.started_at, 2),
+                "queued_seconds": round(job.started_at - job.submitted_at, 2),
+                "job_id": job.job_id,
+            }
+            # B4 fix: 透传 error 字段
+            if error:
+                entry["error"] = error
+
+            self._scores.append(entry)
+            with self.scores_file.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            update_run_meta(self.workspace, last_submit_time=int(time.time()))
+
+            # 查找最高分
+            best_entry = max(self._scores, key=lambda x: x.get("score", 0))
+            logger.info(
+                f"[SUBMIT #{submission_id}] Done | job={job.job_id} | score={score}, best={best_entry['score']}"
+            )
 
-        return response
+            job.result = {
+                **entry,
+                "accuracy_summary": result.get("accuracy_summary", {}),
+                "best": best_entry,
+                "total_submissions": len(self._scores),
+            }
+            job.status = "failed" if error else "done"
+            # 只缓存成功的评测结果（失败的不缓存，允许重试）
+            if not error:
+                self._eval_cache[job.cache_key] = job.job_id
+            self._inflight.pop(job.cache_key, None)
+            self._procs.pop(job.job_id, None)
+            self._busy.difference_update(job.devices)
+            self._cond.notify_all()
+            if not self._closed:
+                self._dispatch()
 
     def set_baseline(self, score: float):
         """设置 baseline 分数"""
@@ -240,30 +406,53 @@ def get_server() -> GradingServer:
     return _server
 
 
-def init_server(task: str, base_model: str, workspace: str) -> GradingServer:
+def init_server(
+    task: str,
+    base_model: str,
+    workspace: str,
+    evaluator_class: Optional[str] = None,
+    cpu_workers: int = 1,
+) -> GradingServer:
     """初始化服务器"""
     global _server
-    _server = GradingServer(task, base_model, Path(workspace))
+    if _server is not None:
+        _server.shutdown()
+    _server = GradingServer(task, base_model, Path(workspace), evaluator_class=evaluator_class, cpu_workers=cpu_workers)
     return _server
 
 
+def _get_wait(value) -> float:
+    """long-poll 的等待秒数，限制在 [0, MAX_POLL_WAIT]"""
+    try:
+        wait = float(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid wait: {value!r}")
+    return min(max(wait, 0.0), MAX_POLL_WAIT)
+
+
+def _job_response(job: dict):
+    """评测结束返回 200，否则返回 202（客户端继续轮询 /jobs/<job_id>）"""
+    return jsonify(job), 200 if job["status"] in JOB_DONE_STATUSES else 202
+
+
 # Flask 路由
 @app.route("/submit", methods=["POST"])
 def submit():
     """
-    提交模型评测
+    提交模型评测，立即返回任务信息；通过 GET /jobs/<job_id>?wait=<秒> 查询结果
 
     Request:
-        {"model_path": "/path/to/model"}
+        {"model_path": "/path/to/model", "gpu": "0", "wait": 0}
+        wait 可选：最多等待 wait 秒，期间评测结束则直接返回结果
 
     Response:
         {
-            "submission_id": 1,
-            "score": 85.0,
-            "improvement": 5.0,
-            "best": {...},
-            "total_submissions": 10
+            "job_id": "3f2a...",
+            "status": "queued",  # queued / running / done / failed
+            "queue_position": 0,
+            ...
         }
+        评测结束后还包含 submission_id、score、improvement、best、total_submissions 等字段
     """
     data = request.get_json() or {}
     model_path = data.get("model_path")
@@ -288,16 +477,37 @@ def submit():
             )
 
     try:
-        result = server.submit(model_path, gpu=gpu)
-        return jsonify(result)
-    except ValueError:
-        logger.warning("[SUBMIT] Invalid request", exc_info=True)
+        job = server.enqueue(model_path, gpu=gpu)
+        wait = _get_wait(data.get("wait"))
+        if wait > 0:
+            job = server.get_job(job["job_id"], wait=wait)
+        return _job_response(job)
+    except ValueError as e:
+        logger.warning(f"[SUBMIT] Invalid request: {e}")
         return jsonify({"error": "Invalid request"}), 400
     except (RuntimeError, OSError):
-        logger.exception("[SUBMIT] Internal server error")
+        logger.error(f"[SUBMIT] Internal server error\n{traceback.format_exc()}")
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str):
+    """查询评测任务；?wait=<秒> 时等待任务结束（long-poll），最多 MAX_POLL_WAIT 秒"""
+    server = get_server()
+    try:
+        return _job_response(server.get_job(job_id, wait=_get_wait(request.args.get("wait"))))
+    except KeyError:
+        return jsonify({"error": f"Unknown job_id: {job_id}"}), 404
+    except ValueError:
+        return jsonify({"error": "Invalid request"}), 400
+
+
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    """所有评测任务"""
+    return jsonify(get_server().list_jobs())
+
+
 @app.route("/health", methods=["GET"])
 def health():
     """健康检查"""
@@ -308,6 +518,7 @@ def health():
             "task": server.task,
             "workspace": str(server.workspace),
             "available_gpus": sorted(server.available_gpus, key=int) if server.available_gpus else [],
+            "jobs": dict(Counter(job["status"] for job in server.list_jobs())),
         }
     )
 
@@ -346,9 +557,17 @@ def set_baseline():
     return jsonify({"baseline_score": score, "status": "set"})
 
 
-def run_server(task: str, base_model: str, workspace: str, host: str = "0.0.0.0", port: int = 5000):
+def run_server(
+    task: str,
+    base_model: str,
+    workspace: str,
+    host: str = "0.0.0.0",
+    port: int = 5000,
+    evaluator_class: Optional[str] = None,
+    cpu_workers: int = 1,
+):
     """启动服务器"""
-    init_server(task, base_model, workspace)
+    init_server(task, base_model, workspace, evaluator_class=evaluator_class, cpu_workers=cpu_workers)
     logger.info(f"Grading Server | task={task} | {host}:{port}")
     app.run(host=host, port=port, debug=False, threaded=True)
 
@@ -388,7 +607,9 @@ class LocalServerContext(GradingServerContext):
 
     def __enter__(self):
         logger.info(f"[Local Mode] Starting evaluation server on port {self.port}...")
-        self.server = init_server(self.task, self.base_model, self.workspace)
+        self.server = init_server(
+            self.task, self.base_model, self.workspace, cpu_workers=AUTORL_BENCH_SETTING.grading_cpu_workers
+        )
 
         self._http_server = make_server("0.0.0.0", self.port, app, threaded=True)
         self._thread = threading.Thread(target=self._http_server.serve_forever, daemon=True)
@@ -413,6 +634,8 @@ class LocalServerContext(GradingServerContext):
         if self._http_server:
             self._http_server.shutdown()
             self._http_server = None
+        if self.server:
+            self.server.shutdown()
 
     def get_baseline(self, task: str, model_name: str, model_path: str, workspace_path: str) -> float:
         from rdagent.scenarios.rl.autorl_bench.core.utils import get_baseline_score
@@ -422,7 +645,12 @@ class LocalServerContext(GradingServerContext):
         return baseline
 
     def load_scores(self) -> list:
-        return self.server.load_scores() if self.server else []
+        """等待已提交的评测完成（Agent 可能提交后即退出）后读取评分记录"""
+        if not self.server:
+            return []
+        if not self.server.wait_idle(timeout=AUTORL_BENCH_SETTING.grading_drain_timeout):
+            logger.warning("[Local Mode] Pending evaluations did not finish in time, they are not scored")
+        return self.server.load_scores()
 
 
 def create_grading_server(benchmark, workspace: Path, port: int, base_model: str) -> GradingServerContext:
@@ -444,6 +672,16 @@ if __name__ == "__main__":
     parser.add_argument("--workspace", type=str, default=".")
     parser.add_argument("--port", type=int, default=5000)
     parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument("--evaluator-class", type=str, default=None)
+    parser.add_argument("--cpu-workers", type=int, default=AUTORL_BENCH_SETTING.grading_cpu_workers)
     args = parser.parse_args()
 
-    run_server(args.task, args.base_model, args.workspace, args.host, args.port)
+    run_server(
+        args.task,
+        args.base_model,
+        args.workspace,
+        args.host,
+        args.port,
+        evaluator_class=args.evaluator_class,
+        cpu_workers=args.cpu_workers,
+    )
@@ -9,6 +9,7 @@ import json
 import os
 import re
 import subprocess
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -244,17 +245,26 @@ def submit_to_grading_server(
     model_path: str,
     grading_url: Optional[str] = None,
     timeout: int = 600,
+    poll_interval: int = 60,
 ) -> dict | None:
-    """提交模型到 grading server 评测"""
+    """提交模型到 grading server 评测，并 long-poll 任务直到评测结束或超时（超时返回未完成的任务信息）"""
     url = grading_url or os.environ.get("GRADING_SERVER_URL")
     if not url:
         return None
 
     logger.info(f"Submitting to grading server: {url}/submit")
-    resp = requests.post(f"{url}/submit", json={"model_path": model_path}, timeout=timeout)
+    resp = requests.post(f"{url}/submit", json={"model_path": model_path}, timeout=30)
     resp.raise_for_status()
     result = resp.json()
-    logger.info(f"Grading result: score={result.get('score')}")
+    deadline = time.time() + timeout
+    while result.get("status") not in ("done", "failed") and time.time() < deadline:
+        wait = min(poll_interval, max(int(deadline - time.time()), 1))
+        resp = requests.get(f"{url}/jobs/{result['job_id']}", params={"wait": wait}, timeout=wait + 30)
+        resp.raise_for_status()
+        result = resp.json()
+    logger.info(
+        f"Grading result: job={result.get('job_id')}, status={result.get('status')}, score={result.get('score')}"
+    )
     return result
 
 
@@ -302,6 +312,18 @@ def read_run_meta(workspace: Path) -> dict:
     return json.loads(run_meta.read_text()) if run_meta.exists() else {}
 
 
+SCORES_FILE = "scores.jsonl"
+
+
+def read_scores(workspace: Path) -> list[dict]:
+    """读取 Grading Server 追加写入的评分记录（每行一条）；兼容旧版整体写入的 scores.json。"""
+    scores_file = Path(workspace) / SCORES_FILE
+    if scores_file.exists():
+        return [json.loads(line) for line in scores_file.read_text().splitlines() if line.strip()]
+    legacy_file = Path(workspace) / "scores.json"
+    return json.loads(legacy_file.read_text()) if legacy_file.exists() else []
+
+
 def setup_workspace(
     run_id: str,
     agent_id: str,
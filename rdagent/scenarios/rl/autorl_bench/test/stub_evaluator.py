@@ -0,0 +1,45 @@
+"""
+CPU 上的 stub 评测器，用于测试 Grading Server（不加载模型）
+
+模型目录下的 stub.json 控制评测结果: {"score": 60.0, "sleep": 1.0, "error": "..."}
+accuracy_summary 记录评测进程的 pid、CUDA_VISIBLE_DEVICES、gpu_count 以及起止时间。
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from rdagent.scenarios.rl.autorl_bench.core.evaluator import BaseEvaluator, EvalResult
+
+
+class StubEvaluator(BaseEvaluator):
+    def __init__(self, config):
+        self.config = config
+        self.benchmark_id = config.id
+
+    def run_eval(
+        self,
+        model_path: str,
+        workspace_path: str,
+        model_name: str = "",
+        gpu_count: int = 1,
+        test_range: str = "[:]",
+        **kwargs,
+    ) -> EvalResult:
+        result = self.get_default_result(self.benchmark_id, model_path)
+        stub_file = Path(model_path) / "stub.json"
+        stub = json.loads(stub_file.read_text()) if stub_file.exists() else {}
+        start = time.time()
+        time.sleep(stub.get("sleep", 0.0))
+        result["score"] = stub.get("score", 50.0)
+        result["accuracy_summary"] = {
+            "pid": os.getpid(),
+            "cuda_visible_devices": os.environ.get("CUDA_VISIBLE_DEVICES"),
+            "gpu_count": gpu_count,
+            "start": start,
+            "end": time.time(),
+        }
+        if stub.get("error"):
+            result["error"] = stub["error"]
+        return result
@@ -5,7 +5,7 @@
   - LoRA adapter 拒绝与 OpenCompass vLLM 环境变量
   - baseline 失败不再变成 0.0
   - ALFWorld prompt 截断
-  - 评测锁、model_path 去重缓存、error 字段透传
+  - 评测任务队列、model_path 去重缓存、error 字段透传
 
 运行: python -m rdagent.scenarios.rl.autorl_bench.test.test_fixes
 """
@@ -13,7 +13,6 @@
 import json
 import sys
 import tempfile
-import threading
 import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -226,88 +225,63 @@ def test_alfworld_prompt_truncation():
 
 
 # ============================================================
-# B2+B3: 评测锁 + 去重缓存
+# B2+B3: 评测任务队列 + 去重缓存
 # ============================================================
-def test_b2b3_lock_and_cache():
-    print("\n=== B2+B3: Eval lock + dedup cache ===")
-    from rdagent.scenarios.rl.autorl_bench.core.server import GradingServer
+STUB_EVALUATOR = "rdagent.scenarios.rl.autorl_bench.test.stub_evaluator.StubEvaluator"
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        server = GradingServer("gsm8k", "test-model", Path(tmpdir))
 
-        report("Server has _eval_lock", hasattr(server, "_eval_lock"))
-        report("Server has _eval_cache", hasattr(server, "_eval_cache"))
+def _stub_model(tmpdir: str, name: str, **stub) -> Path:
+    model_dir = Path(tmpdir) / name
+    model_dir.mkdir()
+    (model_dir / "config.json").write_text("{}")
+    (model_dir / "stub.json").write_text(json.dumps(stub))
+    return model_dir
+
 
-        # Mock evaluator to track concurrency
-        call_log = []
-        active_count = [0]
-        max_concurrent = [0]
+def test_b2b3_queue_and_cache():
+    print("\n=== B2+B3: Eval job queue + dedup cache ===")
+    from rdagent.scenarios.rl.autorl_bench.core.server import GradingServer
 
-        def mock_run_eval(**kwargs):
-            active_count[0] += 1
-            max_concurrent[0] = max(max_concurrent[0], active_count[0])
-            call_log.append(kwargs.get("model_path", ""))
-            time.sleep(0.3)
-            active_count[0] -= 1
-            return {"score": 85.0, "accuracy_summary": {}}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server = GradingServer("gsm8k", "test-model", Path(tmpdir), evaluator_class=STUB_EVALUATOR)
+        report("Server has _eval_cache", hasattr(server, "_eval_cache"))
 
-        mock_evaluator = MagicMock()
-        mock_evaluator.run_eval = mock_run_eval
-
-        with patch.object(server, "get_evaluator", return_value=mock_evaluator):
-            # B2 test: concurrent submits should be serialized
-            model_a = Path(tmpdir) / "model_a"
-            model_b = Path(tmpdir) / "model_b"
-            model_a.mkdir()
-            model_b.mkdir()
-            (model_a / "config.json").write_text("{}")
-            (model_b / "config.json").write_text("{}")
-
-            results = []
-
-            def submit_wrapper(mp):
-                r = server.submit(str(mp))
-                results.append(r)
-
-            t1 = threading.Thread(target=submit_wrapper, args=(model_a,))
-            t2 = threading.Thread(target=submit_wrapper, args=(model_b,))
-            t1.start()
-            t2.start()
-            t1.join()
-            t2.join()
+        try:
+            # B2 test: concurrent submits return job ids immediately, a single worker evaluates them in turn
+            model_a = _stub_model(tmpdir, "model_a", score=85.0, sleep=0.3)
+            model_b = _stub_model(tmpdir, "model_b", score=85.0, sleep=0.3)
 
+            start = time.time()
+            jobs = [server.enqueue(str(model_a)), server.enqueue(str(model_b))]
+            report("B2: submit returns immediately", time.time() - start < 0.5, f"{time.time() - start:.2f}s")
+            results = [server.get_job(job["job_id"], wait=None) for job in jobs]
+            spans = [(r["accuracy_summary"]["start"], r["accuracy_summary"]["end"]) for r in results]
             report(
-                "B2: max concurrent evals = 1 (lock works)",
-                max_concurrent[0] == 1,
-                f"max_concurrent={max_concurrent[0]}",
+                "B2: evaluations on the same device do not overlap",
+                spans[0][1] <= spans[1][0] or spans[1][1] <= spans[0][0],
+                f"spans={spans}",
             )
-            report("B2: both evaluations completed", len(results) == 2, f"results={len(results)}")
+            report("B2: both evaluations completed", [r["status"] for r in results] == ["done", "done"])
 
             # B3 test: same model_path should hit cache
-            call_log.clear()
-            server.submit(str(model_a))  # should hit cache
-
+            cached = server.submit(str(model_a))
             report(
                 "B3: duplicate submit uses cache (no re-eval)",
-                str(model_a.resolve()) not in [str(Path(p).resolve()) for p in call_log],
-                f"call_log after cache hit: {call_log}",
+                cached["job_id"] == jobs[0]["job_id"] and len(server.load_scores()) == 2,
+                f"job_id={cached['job_id']}, submissions={len(server.load_scores())}",
             )
 
             # B3 test: failed eval should NOT be cached
-            def mock_fail_eval(**kwargs):
-                return {"score": 0.0, "error": "GPU OOM", "accuracy_summary": {}}
-
-            mock_evaluator.run_eval = mock_fail_eval
-            fail_model = Path(tmpdir) / "fail_model"
-            fail_model.mkdir()
-            (fail_model / "config.json").write_text("{}")
-
-            server.submit(str(fail_model))
+            fail_model = _stub_model(tmpdir, "fail_model", score=0.0, error="GPU OOM")
+            failed = server.submit(str(fail_model))
+            retried = server.submit(str(fail_model))
             report(
                 "B3: failed eval not cached",
-                str(fail_model.resolve()) not in server._eval_cache,
-                f"cached={str(fail_model.resolve()) in server._eval_cache}",
+                failed["status"] == "failed" and retried["job_id"] != failed["job_id"],
+                f"status={failed['status']}",
             )
+        finally:
+            server.shutdown()
 
 
 # ============================================================
@@ -318,26 +292,15 @@ def test_b4_error_passthrough():
     from rdagent.scenarios.rl.autorl_bench.core.server import GradingServer
 
     with tempfile.TemporaryDirectory() as tmpdir:
-        server = GradingServer("gsm8k", "test-model", Path(tmpdir))
-
-        def mock_error_eval(**kwargs):
-            return {
-                "score": 0.0,
-                "error": "vLLM model load failed: config.json not found",
-                "accuracy_summary": {},
-            }
-
-        mock_evaluator = MagicMock()
-        mock_evaluator.run_eval = mock_error_eval
-
-        model_dir = Path(tmpdir) / "error_model"
-        model_dir.mkdir()
-        (model_dir / "config.json").write_text("{}")
+        server = GradingServer("gsm8k", "test-model", Path(tmpdir), evaluator_class=STUB_EVALUATOR)
+        model_dir = _stub_model(tmpdir, "error_model", score=0.0, error="vLLM model load failed: config.json not found")
 
-        with patch.object(server, "get_evaluator", return_value=mock_evaluator):
+        try:
             result = server.submit(str(model_dir))
-            report("Error field present in response", "error" in result, f"error={result.get('error', 'MISSING')}")
-            report("Score is 0.0", result.get("score") == 0.0)
+        finally:
+            server.shutdown()
+        report("Error field present in response", "error" in result, f"error={result.get('error', 'MISSING')}")
+        report("Score is 0.0", result.get("score") == 0.0)
 
     # Test _parse_results with non-numeric values (B4 in opencompass)
     import pandas as pd
@@ -370,7 +333,7 @@ def main():
     test_b1_lora_detection()
     test_baseline_integrity()
     test_alfworld_prompt_truncation()
-    test_b2b3_lock_and_cache()
+    test_b2b3_queue_and_cache()
     test_b4_error_passthrough()
 
     print(f"\n{'='*50}")
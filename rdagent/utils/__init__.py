@@ -24,6 +24,20 @@ from rdagent.utils.agent.tpl import T
 # Default timeout (in seconds) for all regex operations
 REGEX_TIMEOUT = 120.0
 
+# A byte-level BPE tokenizer never yields more tokens than the UTF-8 bytes of a text,
+# and rarely less than a token per 8 characters of logs.
+MAX_CHARS_PER_TOKEN = 8
+
+
+def estimate_token_range(*texts: str) -> tuple[int, int]:
+    """
+    A cheap (lower, upper) estimation of the number of tokens of `texts`, to skip the tokenization
+    when a text is clearly under or over a budget.
+    """
+    n_chars = sum(len(t) for t in texts)
+    n_bytes = sum(len(t.encode("utf-8", errors="replace")) for t in texts)
+    return n_chars // MAX_CHARS_PER_TOKEN, n_bytes
+
 
 def get_module_by_module_path(module_path: Union[str, ModuleType]) -> ModuleType:
     """Load module from path like a/b/c/d.py or a.b.c.d
@@ -100,8 +114,13 @@ def filter_with_time_limit(regex_patterns: Union[str, list[str]], text: str) ->
 def filter_redundant_text(stdout: str) -> str:
     """
     Filter out progress bars and other redundant patterns from stdout using regex-based trimming.
+
+    The patterns suggested by the LLM are kept in a library (see `rdagent.utils.filter_patterns`). They are only
+    applied to the stdouts over the budget, before asking the LLM, which is then only asked when the remaining
+    text is still over it; the stdouts under the budget are returned as they are.
     """
     from rdagent.oai.llm_utils import APIBackend  # avoid circular import
+    from rdagent.utils.filter_patterns import get_filter_pattern_library
 
     # Compile a regex that matches common progress‐bar patterns
     progress_bar_pattern = r"""(
@@ -130,6 +149,29 @@ def filter_redundant_text(stdout: str) -> str:
         [line for line in filtered_stdout_lines if lines_to_count[line] <= max(len(filtered_stdout_lines) // 10, 10)]
     )
 
+    def _under_budget(stdout: str) -> bool:
+        """Whether the stdout is returned without asking the LLM"""
+        system_prompt = T(".prompts:filter_redundant_text.system").r()
+        user_prompt = T(".prompts:filter_redundant_text.user").r(stdout=stdout)
+        budget = APIBackend().chat_token_limit * 0.1
+        min_token_size, max_token_size = estimate_token_range(user_prompt, system_prompt)
+        if max_token_size < budget or min_token_size >= budget:
+            return max_token_size < budget
+        try:
+            return (
+                APIBackend().build_messages_and_calculate_token(user_prompt=user_prompt, system_prompt=system_prompt)
+                < budget
+            )
+        except ValueError:
+            return False
+
+    # the learned patterns were tailored to other stdouts, so they only prune the texts the LLM would be asked about
+    library = get_filter_pattern_library()
+    if library is not None and not _under_budget(filtered_stdout):
+        pruned_stdout = library.apply(filtered_stdout, timeout=REGEX_TIMEOUT)
+        if pruned_stdout != filtered_stdout:
+            filtered_stdout = try_regex_sub(r"\s*\n", pruned_stdout, replace_with="\n")
+
     def _shrink_stdout_once(stdout: str) -> str:
         head = stdout[: int(APIBackend().chat_token_limit * 0.3)]
         tail = stdout[-int(APIBackend().chat_token_limit * 0.3) :]
@@ -144,6 +186,12 @@ def filter_redundant_text(stdout: str) -> str:
         for __ in range(10):
             try:
                 user_prompt = T(".prompts:filter_redundant_text.user").r(stdout=truncated_stdout)
+                min_token_size, max_token_size = estimate_token_range(user_prompt, system_prompt)
+                if max_token_size < APIBackend().chat_token_limit * 0.1:
+                    return truncated_stdout
+                elif min_token_size > APIBackend().chat_token_limit * 0.6:
+                    truncated_stdout = _shrink_stdout_once(truncated_stdout)
+                    continue
                 stdout_token_size = APIBackend().build_messages_and_calculate_token(
                     user_prompt=user_prompt,
                     system_prompt=system_prompt,
@@ -175,6 +223,8 @@ def filter_redundant_text(stdout: str) -> str:
 
         needs_sub = response.get("needs_sub", True)
         regex_patterns = response.get("regex_patterns", [])
+        if library is not None and needs_sub and isinstance(regex_patterns, list):
+            library.learn(regex_patterns)
 
         try:
             new_filtered = filter_with_time_limit(regex_patterns, truncated_stdout)
@@ -4,12 +4,17 @@ Here are some infrastructure to build a agent
 The motivation of template and AgentOutput Design
 """
 
-import inspect
+import copy
+import os
+import random
+import sys
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 import yaml
-from jinja2 import Environment, FunctionLoader, StrictUndefined
+from jinja2 import Environment, FunctionLoader, StrictUndefined, Template
 
 from rdagent.core.conf import RD_AGENT_SETTINGS
 from rdagent.log import rdagent_logger as logger
@@ -19,23 +24,51 @@ PROJ_PATH = DIRNAME.parent.parent  # rdagent
 
 
 def get_caller_dir(upshift: int = 0) -> Path:
-    # Inspect the calling stack to get the caller's directory
-    stack = inspect.stack()
-    caller_frame = stack[1 + upshift]
-    caller_module = inspect.getmodule(caller_frame[0])
-    if caller_module and caller_module.__file__:
-        caller_dir = Path(caller_module.__file__).parent
+    # Get the caller's directory from its frame (`inspect.stack()` would read the source of every frame)
+    caller_frame = sys._getframe(1 + upshift)
+    caller_file = caller_frame.f_globals.get("__file__")
+    if caller_file:
+        caller_dir = Path(caller_file).parent
     else:
         caller_dir = DIRNAME
     return caller_dir
 
 
-def load_content(uri: str, caller_dir: Path | None = None, ftype: str = "yaml") -> Any:
-    """
-    Please refer to RDAT.__init__ file
-    """
-    if caller_dir is None:
-        caller_dir = get_caller_dir(upshift=1)
+class _FileCache:
+    """The parsed content of the template files, reloaded when their modification time or size changes."""
+
+    def __init__(self) -> None:
+        self._cache: dict[Path, tuple[tuple[int, int], Any]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, file_path: Path, ftype: str) -> Any:
+        file_path = file_path.absolute()
+        st = file_path.stat()  # raises FileNotFoundError like `open`
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._cache.get(file_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        if ftype == "yaml":
+            # Parse the UTF-8 encoded YAML configuration for cross-platform compatibility
+            with file_path.open(encoding="utf-8") as file:
+                content = yaml.safe_load(file)
+        else:
+            content = file_path.read_text()
+        with self._lock:
+            self._cache[file_path] = (signature, content)
+        return content
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+_FILE_CACHE = _FileCache()
+
+
+def _resolve(uri: str, caller_dir: Path, ftype: str = "yaml") -> tuple[Any, Path]:
+    """The content of `uri` and the file it is loaded from."""
     # Parse the URI
     path_part, *yaml_trace = uri.split(":")
     assert len(yaml_trace) <= 1, f"Invalid uri {uri}, only one yaml trace is allowed."
@@ -63,16 +96,13 @@ def load_content(uri: str, caller_dir: Path | None = None, ftype: str = "yaml")
 
     for file_path in file_path_l:
         try:
+            content = _FILE_CACHE.load(file_path, ftype)
             if ftype == "yaml":
-                # Parse the UTF-8 encoded YAML configuration for cross-platform compatibility
-                with file_path.open(encoding="utf-8") as file:
-                    yaml_content = yaml.safe_load(file)
                 # Traverse the YAML content to get the desired template
                 for key in yaml_trace:
-                    yaml_content = yaml_content[key]
-                return yaml_content
-
-            return file_path.read_text()
+                    content = content[key]
+            # the parsed files are shared, so the callers get their own copy of the mutable content
+            return (content if isinstance(content, str) else copy.deepcopy(content)), file_path
         except FileNotFoundError:
             continue  # the file does not exist, so goto the next loop.
         except KeyError:
@@ -81,6 +111,64 @@ def load_content(uri: str, caller_dir: Path | None = None, ftype: str = "yaml")
         raise FileNotFoundError(f"Cannot find {uri} in {file_path_l}")
 
 
+def load_content(uri: str, caller_dir: Path | None = None, ftype: str = "yaml") -> Any:
+    """
+    Please refer to RDAT.__init__ file
+    """
+    if caller_dir is None:
+        caller_dir = get_caller_dir(upshift=1)
+    return _resolve(uri, caller_dir, ftype)[0]
+
+
+def _load_include(name: str) -> tuple[str, str, Callable[[], bool]]:
+    """
+    The source of an included template for the jinja loader.
+    The compiled include is reused until its file changes or it would be resolved from another file.
+    """
+    source, file_path = _resolve(name, DIRNAME)
+    app_tpl, cwd = RD_AGENT_SETTINGS.app_tpl, os.getcwd()
+    st = file_path.stat()
+
+    def uptodate() -> bool:
+        try:
+            changed = file_path.stat()
+        except OSError:
+            return False
+        return (
+            (changed.st_mtime_ns, changed.st_size) == (st.st_mtime_ns, st.st_size)
+            and RD_AGENT_SETTINGS.app_tpl == app_tpl
+            and os.getcwd() == cwd
+        )
+
+    return source, str(file_path), uptodate
+
+
+# loader=FunctionLoader(_load_include) is for supporting grammar like below.
+# `{% include "scenarios.data_science.share:component_spec.DataLoadSpec" %}`
+_JINJA_ENV = Environment(undefined=StrictUndefined, loader=FunctionLoader(_load_include), cache_size=1000)
+
+
+@lru_cache(maxsize=1024)
+def _compile(template: str) -> Template:
+    return _JINJA_ENV.from_string(template)
+
+
+@lru_cache(maxsize=1024)
+def _project_uri(caller_dir: Path, uri: str) -> str:
+    try:
+        # modify the uri to a raltive path to the project for easier finding prompts.yaml
+        return f"{str(caller_dir.resolve().relative_to(PROJ_PATH)).replace('/', '.')}{uri}"
+    except ValueError:
+        return uri
+
+
+def _should_log(uri: str) -> bool:
+    if any(pattern in uri for pattern in RD_AGENT_SETTINGS.tpl_log_uris):
+        return True
+    rate = RD_AGENT_SETTINGS.tpl_log_sample_rate
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
 # class T(SingletonBaseClass): TODO: singleton does not support args now.
 class RDAT:
     """
@@ -112,36 +200,27 @@ class RDAT:
         self.uri = uri
         caller_dir = get_caller_dir(1)
         if uri.startswith("."):
-            try:
-                # modify the uri to a raltive path to the project for easier finding prompts.yaml
-                self.uri = f"{str(caller_dir.resolve().relative_to(PROJ_PATH)).replace('/', '.')}{uri}"
-            except ValueError:
-                pass
+            self.uri = _project_uri(caller_dir, uri)
         self.template = load_content(uri, caller_dir=caller_dir, ftype=ftype)
 
     def r(self, **context: Any) -> str:
         """
         Render the template with the given context.
         """
-        # loader=FunctionLoader(load_conent) is for supporting grammar like below.
-        # `{% include "scenarios.data_science.share:component_spec.DataLoadSpec" %}`
-        rendered = (
-            Environment(undefined=StrictUndefined, loader=FunctionLoader(load_content))
-            .from_string(self.template)
-            .render(**context)
-            .strip("\n")
-        )
+        # the templates (and the included ones) are compiled once by a shared jinja environment
+        rendered = _compile(self.template).render(**context).strip("\n")
         while "\n\n\n" in rendered:
             rendered = rendered.replace("\n\n\n", "\n\n")
-        logger.log_object(
-            obj={
-                "uri": self.uri,
-                "template": self.template,
-                "context": context,
-                "rendered": rendered,
-            },
-            tag="debug_tpl",
-        )
+        if _should_log(self.uri):
+            logger.log_object(
+                obj={
+                    "uri": self.uri,
+                    "template": self.template,
+                    "context": context,
+                    "rendered": rendered,
+                },
+                tag="debug_tpl",
+            )
         return rendered
 
 
@@ -7,6 +7,7 @@ Tries to create uniform environment for the agent to run;
 
 # TODO: move the scenario specific docker env into other folders.
 
+import atexit
 import contextlib
 import json
 import os
@@ -15,6 +16,7 @@ import re
 import select
 import shutil
 import subprocess
+import threading
 import time
 import uuid
 import zipfile
@@ -60,6 +62,7 @@ from rdagent.log import rdagent_logger as logger
 from rdagent.oai.llm_utils import md5_hash
 from rdagent.utils import filter_redundant_text
 from rdagent.utils.agent.tpl import T
+from rdagent.utils.env_cache import FILE_DIGEST_CACHE, ContentAddressedStore
 from rdagent.utils.fmt import shrink_text
 from rdagent.utils.workflow import wait_retry
 
@@ -113,6 +116,119 @@ def cleanup_container(container: docker.models.containers.Container | None, cont
             logger.warning(f"Failed to cleanup{context_str} container {container.id}: {cleanup_error}")
 
 
+class DockerContainerPool:
+    """
+    Warm containers kept alive between runs, so that an entry is run with `docker exec` in a running container
+    instead of creating, starting and removing a container for each run.
+
+    The containers are keyed by everything fixed at creation (image, volumes, resources); the environment
+    variables and the entry are given to each exec. A container is used by one run at a time: concurrent runs
+    with the same key get different containers. At most `max_idle` containers are kept idle per pool, and an idle
+    container is removed after `idle_timeout` seconds (checked when the pool is used).
+    """
+
+    def __init__(self) -> None:
+        self._idle: dict[str, list[tuple[float, Any]]] = {}  # key -> [(idle since, container)]
+        self._n_processes: dict[str, int] = {}  # container id -> the number of processes when it is idle
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def register(self, container: Any) -> None:
+        """Record the processes of a new container, to recognize the runs which leave processes behind."""
+        n_processes = len(container.top()["Processes"])
+        with self._lock:
+            self._n_processes[container.id] = n_processes
+
+    def _evict(self, max_idle: int, idle_timeout: float) -> list:
+        """Pop the idle containers over the limits (with the lock held)."""
+        now = time.time()
+        evicted = []
+        for key in list(self._idle):
+            kept = []
+            for since, container in self._idle[key]:
+                (evicted if now - since > idle_timeout else kept).append((since, container))
+            self._idle[key] = kept
+        idle = sorted(
+            ((since, key, container) for key, items in self._idle.items() for since, container in items),
+            key=lambda item: item[0],
+        )
+        for since, key, container in idle[: max(0, len(idle) - max_idle)]:
+            self._idle[key].remove((since, container))
+            evicted.append((since, container))
+        for key in [key for key, items in self._idle.items() if not items]:
+            del self._idle[key]
+        for _, container in evicted:
+            self._n_processes.pop(container.id, None)
+        return [container for _, container in evicted]
+
+    def acquire(self, key: str, max_idle: int, idle_timeout: float) -> Any | None:
+        """A running idle container for `key`, or None if there is none."""
+        with self._lock:
+            evicted = self._evict(max_idle, idle_timeout)
+            candidates = self._idle.get(key, [])
+        for container in evicted:
+            cleanup_container(container, context="idle pooled")
+        while True:
+            with self._lock:
+                if not candidates:
+                    return None
+                _, container = candidates.pop()
+            try:
+                container.reload()
+                if container.status == "running":
+                    return container
+            except docker.errors.APIError:
+                pass
+            with self._lock:
+                self._n_processes.pop(container.id, None)
+            cleanup_container(container, context="stopped pooled")
+
+    def release(self, key: str, container: Any, max_idle: int, idle_timeout: float) -> None:
+        """
+        Give back a container acquired (or registered) for `key` after its run.
+        It is removed instead if the run left processes behind (e.g. killed at timeout with detached children).
+        """
+        try:
+            n_processes = len(container.top()["Processes"])
+        except docker.errors.APIError:
+            n_processes = None
+        with self._lock:
+            expected = self._n_processes.get(container.id)
+        if n_processes is None or expected is None or n_processes > expected:
+            with self._lock:
+                self._n_processes.pop(container.id, None)
+            cleanup_container(container, context="pooled")
+            return
+        with self._lock:
+            self._idle.setdefault(key, []).append((time.time(), container))
+            evicted = self._evict(max_idle, idle_timeout)
+        for c in evicted:
+            cleanup_container(c, context="idle pooled")
+
+    def close(self) -> None:
+        """Remove all the idle containers."""
+        with self._lock:
+            containers = [container for items in self._idle.values() for _, container in items]
+            self._idle.clear()
+            self._n_processes.clear()
+        for container in containers:
+            cleanup_container(container, context="pooled")
+
+
+DOCKER_CONTAINER_POOL = DockerContainerPool()
+_GPU_KWARGS_CACHE: dict[tuple[str, str | None], dict] = {}  # (image, CUDA_VISIBLE_DEVICES) -> `_gpu_kwargs`
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Generator[bytes, None, None]:
+    """Split the chunks of an exec output stream into lines, like the log stream of a container."""
+    rest = b""
+    for chunk in chunks:
+        *lines, rest = (rest + chunk).split(b"\n")
+        yield from lines
+    if rest:
+        yield rest
+
+
 # Normalize all bind paths in volumes to absolute paths using the workspace (working_dir).
 def normalize_volumes(vols: dict[str, str | dict[str, str]], working_dir: str) -> dict:
     abs_vols: dict[str, str | dict[str, str]] = {}
@@ -170,9 +286,10 @@ class EnvConf(ExtendedBaseSettings):
     """it is a function to calculating hash keys"""
 
     def get_workspace_content_for_hash(self, local_path: str | Path) -> list[list[str]]:
-        """Get content of key files in workspace for cache hash calculation.
+        """Get the content digest of key files in workspace for cache hash calculation.
 
-        Scans .py, .csv, and .yaml files.
+        Scans .py, .csv, and .yaml files. The files are hashed by streaming and the digests are
+        remembered by (size, mtime), so unchanged large files are not read again.
         """
         # we must add the information of data (beyond code) into the key.
         # Otherwise, all commands operating on data will become invalid (e.g. rm -r submission.csv)
@@ -186,7 +303,7 @@ class EnvConf(ExtendedBaseSettings):
         # data_key = sorted(data_key)
         local_path = Path(local_path)
         return [
-            [str(path.relative_to(local_path)), path.read_text()]
+            [str(path.relative_to(local_path)), FILE_DIGEST_CACHE.digest(path)]
             for path in sorted(
                 list(local_path.rglob("*.py")) + list(local_path.rglob("*.csv")) + list(local_path.rglob("*.yaml"))
             )
@@ -213,19 +330,26 @@ class EnvResult:
     """
     The result of running the environment.
     It contains the stdout, the exit code, and the running time in seconds.
+    `startup_time` is the part of the running time spent before the entry starts (e.g. creating the container).
     """
 
     full_stdout: str
     exit_code: int
     running_time: float
     stored_full_stdout_to_truncated_stdout: Dict[str, str]
+    startup_time: float = 0.0  # the default of the results pickled before it was added
 
-    def __init__(self, stdout: str, exit_code: int, running_time: float):
+    def __init__(self, stdout: str, exit_code: int, running_time: float, startup_time: float = 0.0):
         self.full_stdout = stdout
         self.exit_code = exit_code
         self.running_time = running_time
+        self.startup_time = startup_time
         self.stored_full_stdout_to_truncated_stdout = {}
 
+    @property
+    def execution_time(self) -> float:
+        return self.running_time - self.startup_time
+
     def update_stdout(self, stdout: str) -> None:
         self.full_stdout = stdout
 
@@ -329,20 +453,20 @@ class Env(Generic[ASpecificEnvConf]):
         for retry_index in range(self.conf.retry_count + 1):
             try:
                 start = time.time()
-                log_output, return_code = self._run(
+                log_output, return_code, startup_time = self._run_timed(
                     entry,
                     local_path,
                     env,
                     running_extra_volume=running_extra_volume,
                 )
                 end = time.time()
-                logger.info(f"Running time: {end - start} seconds")
+                logger.info(f"Running time: {end - start} seconds (startup: {startup_time:.2f} seconds)")
                 if self.conf.running_timeout_period is not None and end - start + 1 >= self.conf.running_timeout_period:
                     logger.warning(
                         f"The running time exceeds {self.conf.running_timeout_period} seconds, so the process is killed."
                     )
                     log_output += f"\n\nThe running time exceeds {self.conf.running_timeout_period} seconds, so the process is killed."
-                return EnvResult(log_output, return_code, end - start)
+                return EnvResult(log_output, return_code, end - start, startup_time)
             except Exception as e:
                 if retry_index == self.conf.retry_count:
                     raise
@@ -404,15 +528,18 @@ class Env(Generic[ASpecificEnvConf]):
 
         # Exclude configured directories from chmod operation to prevent modifying
         # read-only or specially configured directories that may produce warnings.
+        # Only the paths changed by the entry (i.e. newer than a marker file created before it) are changed, so
+        # the workspace is walked but not rewritten; without the marker (e.g. no writable /tmp), all the paths are.
         def _get_chmod_cmd(workspace_path: str) -> str:
-            find_cmd = f"find {workspace_path} -mindepth 1 -maxdepth 1"
+            workspace_path = workspace_path.rstrip("/")
+            find_cmd = f"find {workspace_path} -mindepth 1"
 
             # Use configurable exclude paths from DockerConf
-            for name in self.conf.exclude_chmod_paths:
-                if name:  # Skip empty names
-                    find_cmd += f" ! -name {name}"
+            excluded = [f"-path {workspace_path}/{name}" for name in self.conf.exclude_chmod_paths if name]
+            if excluded:
+                find_cmd += " \\( " + " -o ".join(excluded) + " \\) -prune -o"
 
-            chmod_cmd = f"{find_cmd} -exec chmod -R 777 {{}} +"
+            chmod_cmd = f"{find_cmd} ! -type l ${{chmod_marker:+-cnewer $chmod_marker}} -exec chmod 777 {{}} +"
             return chmod_cmd
 
         if self.conf.redirect_stdout_to_file:
@@ -427,9 +554,16 @@ class Env(Generic[ASpecificEnvConf]):
             timeout_cmd = f"timeout --kill-after=10 {self.conf.running_timeout_period} {entry}"
         entry_add_timeout = (
             f"/bin/sh -c '"  # start of the sh command
+            + (
+                # the file times come from a coarse clock: wait for a tick so that the files changed by the
+                # entry are strictly newer than the marker
+                "chmod_marker=$(mktemp 2>/dev/null) && sleep 0.02 2>/dev/null; "
+                if isinstance(self.conf, DockerConf)
+                else ""
+            )
             + f"{timeout_cmd}; entry_exit_code=$?; "
             + (
-                f"{_get_chmod_cmd(self.conf.mount_path)}; "
+                f"{_get_chmod_cmd(self.conf.mount_path)}; rm -f $chmod_marker; "
                 # We don't have to change the permission of the cache and input folder to remove it
                 # + f"if [ -d {self.conf.mount_path}/cache ]; then chmod 777 {self.conf.mount_path}/cache; fi; " +
                 #     f"if [ -d {self.conf.mount_path}/input ]; then chmod 777 {self.conf.mount_path}/input; fi; "
@@ -478,9 +612,12 @@ class Env(Generic[ASpecificEnvConf]):
         Run the folder under the environment.
         Will cache the output and the folder diff for next round of running.
         Use the python codes and the parameters(entry, running_extra_volume) as key to hash the input.
+
+        The workspace after the run is kept in a content-addressed store (see `rdagent.utils.env_cache`):
+        a miss only writes file contents that have not been seen before, and a hit only restores the files
+        that differ from the cached workspace.
         """
-        target_folder = Path(RD_AGENT_SETTINGS.pickle_cache_folder_path_str) / f"utils.env.run"
-        target_folder.mkdir(parents=True, exist_ok=True)
+        store = ContentAddressedStore(Path(RD_AGENT_SETTINGS.pickle_cache_folder_path_str) / "utils.env.run_cas")
 
         if cache_key_extra_func is not None:
             cache_key_extra = cache_key_extra_func(local_path)
@@ -493,17 +630,27 @@ class Env(Generic[ASpecificEnvConf]):
             + json.dumps({"extra_volumes": self.conf.extra_volumes})
             # + json.dumps(data_key)
         )
-        if Path(target_folder / f"{key}.pkl").exists() and Path(target_folder / f"{key}.zip").exists():
-            with open(target_folder / f"{key}.pkl", "rb") as f:
-                ret = pickle.load(f)
-            self.unzip_a_file_into_a_folder(str(target_folder / f"{key}.zip"), local_path, cache_files_to_extract)
-        else:
+        ret = store.load(key, local_path, cache_files_to_extract)
+        if ret is None:
             ret = self.__run_with_retry(entry, local_path, env, running_extra_volume)
-            with open(target_folder / f"{key}.pkl", "wb") as f:
-                pickle.dump(ret, f)
-            self.zip_a_folder_into_a_file(local_path, str(target_folder / f"{key}.zip"))
+            store.save(key, ret, local_path)
+            if RD_AGENT_SETTINGS.env_cache_size_limit > 0:
+                store.gc(RD_AGENT_SETTINGS.env_cache_size_limit)
         return cast(EnvResult, ret)
 
+    def _run_timed(
+        self,
+        entry: str | None,
+        local_path: str = ".",
+        env: dict | None = None,
+        running_extra_volume: Mapping = MappingProxyType({}),
+    ) -> tuple[str, int, float]:
+        """
+        `_run` with the time spent before the entry starts (0 if the environment does not measure it).
+        """
+        log_output, return_code = self._run(entry, local_path, env, running_extra_volume=running_extra_volume)
+        return log_output, return_code, 0.0
+
     @abstractmethod
     def _run(
         self,
@@ -804,6 +951,15 @@ class DockerConf(EnvConf):
 
     retry_count: int = 5  # retry count for the docker run
     retry_wait_seconds: int = 10  # retry wait seconds for the docker run
+
+    enable_container_pool: bool = False
+    """Keep the containers alive after a run, and run the next entries with the same image, volumes and resources
+    in them with `docker exec` (see `DockerContainerPool`), saving the start and removal of a container per run."""
+    container_pool_size: int = 4
+    """The maximum number of idle containers kept alive (by all the docker environments of the process)."""
+    container_idle_timeout: int = 600
+    """The seconds after which an idle container is removed."""
+
     save_logs_to_file: bool = True
     terminal_tail_lines: int = 20
 
@@ -1121,7 +1277,7 @@ class FTDockerConf(DockerConf):
         # Add dataset_info.json if it exists
         # NOTE: data.json is excluded because it is a generated file
         for path in local_path.rglob("dataset_info.json"):
-            content.append([str(path.relative_to(local_path)), path.read_text()])
+            content.append([str(path.relative_to(local_path)), FILE_DIGEST_CACHE.digest(path)])
 
         # Sort again to ensure deterministic order (though super is sorted, appended one might not be)
         content.sort(key=lambda x: x[0])
@@ -1249,6 +1405,10 @@ class DockerEnv(Env[DockerConf]):
 
         # Check if specific GPUs are requested via CUDA_VISIBLE_DEVICES
         cuda_visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+        # the availability is checked once per image and selection, not by starting a container per run;
+        # a failed probe (possibly transient) is not remembered
+        if (self.conf.image, cuda_visible) in _GPU_KWARGS_CACHE:
+            return _GPU_KWARGS_CACHE[(self.conf.image, cuda_visible)].copy()
         if cuda_visible:
             # Use device_ids to specify exact GPUs (cannot use count with device_ids)
             device_ids = [gpu.strip() for gpu in cuda_visible.split(",") if gpu.strip()]
@@ -1283,7 +1443,10 @@ class DockerEnv(Env[DockerConf]):
                 cleanup_container(container, context="GPU test")
             return gpu_kwargs
 
-        return _f()
+        result = _f()
+        if result:
+            _GPU_KWARGS_CACHE[(self.conf.image, cuda_visible)] = result
+        return result.copy()
 
     def _generate_log_header(self, entry: str | None = None) -> str:
         """
@@ -1416,6 +1579,30 @@ class DockerEnv(Env[DockerConf]):
         running_extra_volume: Mapping = MappingProxyType({}),
         **kwargs: Any,
     ) -> tuple[str, int]:
+        log_output, exit_status, _ = self._run_timed(entry, local_path, env, running_extra_volume)
+        return log_output, exit_status
+
+    def _print_run_info(self, container: Any, entry: str | None, env: dict, volumes: dict) -> None:
+        print(Rule("[bold green]Docker Logs Begin[/bold green]", style="dark_orange"))
+        table = Table(title="Run Info", show_header=False)
+        table.add_column("Key", style="bold cyan")
+        table.add_column("Value", style="bold magenta")
+        table.add_row("Image", self.conf.image)
+        table.add_row("Container ID", container.id)
+        table.add_row("Container Name", container.name)
+        table.add_row("Entry", entry)
+        table.add_row("Env", "\n".join(f"{k}:{v}" for k, v in env.items()))
+        table.add_row("Volumes", "\n".join(f"{k}:\n  {v}" for k, v in volumes.items()))
+        print(table)
+
+    def _run_timed(
+        self,
+        entry: str | None = None,
+        local_path: str = ".",
+        env: dict | None = None,
+        running_extra_volume: Mapping = MappingProxyType({}),
+    ) -> tuple[str, int, float]:
+        start = time.time()
         if env is None:
             env = {}
         env["PYTHONWARNINGS"] = "ignore"
@@ -1442,6 +1629,17 @@ class DockerEnv(Env[DockerConf]):
             volumes[lp] = rp if isinstance(rp, dict) else {"bind": rp, "mode": self.conf.extra_volume_mode}
 
         volumes = normalize_volumes(cast(dict[str, str | dict[str, str]], volumes), self.conf.mount_path)
+        container_kwargs = {
+            "volumes": volumes,
+            "working_dir": self.conf.mount_path,
+            "network": self.conf.network,
+            "shm_size": self.conf.shm_size,
+            "mem_limit": self.conf.mem_limit,  # Set memory limit
+            "cpu_count": self.conf.cpu_count,  # Set CPU limit
+            **self._gpu_kwargs(client),
+        }
+        if self.conf.enable_container_pool:
+            return self._run_in_pool(client, start, entry, local_path, env, container_kwargs)
 
         log_output = ""
         container: docker.models.containers.Container | None = None  # type: ignore[no-any-unimported]
@@ -1450,37 +1648,22 @@ class DockerEnv(Env[DockerConf]):
             container = client.containers.run(
                 image=self.conf.image,
                 command=entry,
-                volumes=volumes,
                 environment=env,
                 detach=True,
-                working_dir=self.conf.mount_path,
                 # auto_remove=True, # remove too fast might cause the logs not to be get
-                network=self.conf.network,
-                shm_size=self.conf.shm_size,
-                mem_limit=self.conf.mem_limit,  # Set memory limit
-                cpu_count=self.conf.cpu_count,  # Set CPU limit
-                **self._gpu_kwargs(client),
+                **container_kwargs,
             )
             assert container is not None  # Ensure container was created successfully
+            startup_time = time.time() - start
             logs = container.logs(stream=True)
-            print(Rule("[bold green]Docker Logs Begin[/bold green]", style="dark_orange"))
-            table = Table(title="Run Info", show_header=False)
-            table.add_column("Key", style="bold cyan")
-            table.add_column("Value", style="bold magenta")
-            table.add_row("Image", self.conf.image)
-            table.add_row("Container ID", container.id)
-            table.add_row("Container Name", container.name)
-            table.add_row("Entry", entry)
-            table.add_row("Env", "\n".join(f"{k}:{v}" for k, v in env.items()))
-            table.add_row("Volumes", "\n".join(f"{k}:\n  {v}" for k, v in volumes.items()))
-            print(table)
+            self._print_run_info(container, entry, env, volumes)
 
             # Process logs (supports tail mode if configured)
             log_output = self._process_container_logs(logs, local_path, entry=entry)
 
             exit_status = container.wait()["StatusCode"]
             print(Rule("[bold green]Docker Logs End[/bold green]", style="dark_orange"))
-            return log_output, exit_status
+            return log_output, exit_status, startup_time
         except docker.errors.ContainerError as e:
             raise RuntimeError(f"Error while running the container: {e}")
         except docker.errors.ImageNotFound:
@@ -1490,6 +1673,51 @@ class DockerEnv(Env[DockerConf]):
         finally:
             cleanup_container(container)
 
+    def _run_in_pool(  # type: ignore[no-any-unimported]
+        self,
+        client: docker.DockerClient,
+        start: float,
+        entry: str | None,
+        local_path: str,
+        env: dict,
+        container_kwargs: dict,
+    ) -> tuple[str, int, float]:
+        """Run the entry with `docker exec` in a warm container of `DOCKER_CONTAINER_POOL`."""
+        key = md5_hash(json.dumps({"image": self.conf.image, **container_kwargs}, sort_keys=True, default=repr))
+        pool_args = (self.conf.container_pool_size, self.conf.container_idle_timeout)
+        container = None
+        reusable = False
+        try:
+            container = DOCKER_CONTAINER_POOL.acquire(key, *pool_args)
+            if container is None:
+                container = client.containers.run(
+                    image=self.conf.image,
+                    entrypoint=["tail", "-f", "/dev/null"],  # kept alive until removed
+                    init=True,  # so that the container stops at once
+                    detach=True,
+                    labels={"rdagent.container_pool": key},
+                    **container_kwargs,
+                )
+                DOCKER_CONTAINER_POOL.register(container)
+            exec_id = client.api.exec_create(container.id, entry, environment=env, workdir=self.conf.mount_path)["Id"]
+            startup_time = time.time() - start
+            self._print_run_info(container, entry, env, container_kwargs["volumes"])
+            logs = _iter_lines(client.api.exec_start(exec_id, stream=True))
+            log_output = self._process_container_logs(logs, local_path, entry=entry)
+            exit_status = client.api.exec_inspect(exec_id)["ExitCode"]
+            print(Rule("[bold green]Docker Logs End[/bold green]", style="dark_orange"))
+            reusable = True
+            return log_output, exit_status, startup_time
+        except docker.errors.ImageNotFound:
+            raise RuntimeError("Docker image not found.")
+        except docker.errors.APIError as e:
+            raise RuntimeError(f"Error while running the container: {e}")
+        finally:
+            if reusable:
+                DOCKER_CONTAINER_POOL.release(key, container, *pool_args)
+            else:
+                cleanup_container(container)
+
     def refresh_env(self) -> None:
         """Remove the Docker image associated with this environment."""
         client = docker.from_env()
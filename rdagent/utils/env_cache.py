@@ -0,0 +1,270 @@
+"""
+Content-addressed storage for the results of `Env.cached_run`.
+
+Layout of a store folder:
+
+- ``blobs/<2 hex>/<sha256>``: the content of one file; written once and shared by all the runs.
+- ``manifests/<key>.json``: the files (relative path -> digest) and symlinks of a workspace after a run.
+  The mtime of the manifest is used as the last access time for garbage collection.
+- ``results/<key>.pkl``: the pickled result of a run.
+
+Compared with zipping the whole workspace per key, only unseen file contents are written and
+a cache hit only touches the files that differ from the cached workspace.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import stat
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from rdagent.log import rdagent_logger as logger
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+class FileDigestCache:
+    """
+    Stream-hash files and remember the digest by (path, size, mtime_ns, inode).
+
+    Like git's "racily clean" rule, a digest is not remembered if the file was modified within
+    `racy_window` seconds of hashing, because a rewrite in the same timestamp granularity would not be noticed.
+    """
+
+    def __init__(self, racy_window: float = 2.0) -> None:
+        self.racy_window = racy_window
+        self._cache: dict[str, tuple[int, int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def hash_file(path: str | Path) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def digest(self, path: str | Path, st: os.stat_result | None = None) -> str:
+        path = os.path.abspath(path)
+        st = os.stat(path) if st is None else st
+        signature = (st.st_size, st.st_mtime_ns, st.st_ino)
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached is not None and cached[:3] == signature:
+            return cached[3]
+        digest = self.hash_file(path)
+        if time.time() - st.st_mtime_ns / 1e9 > self.racy_window:
+            with self._lock:
+                self._cache[path] = (*signature, digest)
+        return digest
+
+
+FILE_DIGEST_CACHE = FileDigestCache()
+
+
+class ContentAddressedStore:
+    """
+    Store workspace snapshots as per-run manifests over deduplicated file blobs.
+
+    Parameters
+    ----------
+    root : str | Path
+        The folder of the store.
+
+    Files are always copied out of the store on a cache hit: the workspace is written in place afterwards
+    (e.g. `FBWorkspace.inject_files` or a container running as root), which would corrupt a hardlinked blob.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.manifest_dir = self.root / "manifests"
+        self.result_dir = self.root / "results"
+        for d in (self.blob_dir, self.manifest_dir, self.result_dir):
+            d.mkdir(parents=True, exist_ok=True)
+
+    # helpers
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _put_blob(self, src: str, digest: str) -> None:
+        blob = self._blob_path(digest)
+        if blob.exists():
+            return
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+        shutil.copyfile(src, tmp)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, blob)
+
+    @staticmethod
+    def _walk(local_path: Path) -> tuple[dict[str, os.stat_result], dict[str, str]]:
+        """Return the regular files (relative path -> stat) and the symlinks (relative path -> target)."""
+        files, links = {}, {}
+        stack = [local_path]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    rel = os.path.relpath(entry.path, local_path)
+                    if entry.is_symlink():
+                        links[rel] = os.readlink(entry.path)
+                    elif entry.is_dir():
+                        stack.append(Path(entry.path))
+                    elif entry.is_file():
+                        files[rel] = entry.stat()
+        return files, links
+
+    # public interface
+    def save(self, key: str, result: Any, local_path: str | Path) -> None:
+        """Snapshot `local_path` and store it with `result` under `key`; only unseen contents are written."""
+        local_path = Path(local_path)
+        files, links = self._walk(local_path)
+        manifest: dict[str, Any] = {"files": {}, "links": links}
+        for rel, st in files.items():
+            src = str(local_path / rel)
+            digest = FILE_DIGEST_CACHE.digest(src, st)
+            self._put_blob(src, digest)
+            manifest["files"][rel] = {"digest": digest, "size": st.st_size, "mode": stat.S_IMODE(st.st_mode)}
+        self._atomic_write(self.result_dir / f"{key}.pkl", pickle.dumps(result))
+        self._atomic_write(self.manifest_dir / f"{key}.json", json.dumps(manifest).encode())
+
+    def load(self, key: str, local_path: str | Path, files_to_restore: list[str] | None = None) -> Any | None:
+        """
+        Restore the workspace of `key` into `local_path` and return the stored result, or None on a miss.
+
+        If `files_to_restore` is None, `local_path` is made identical to the snapshot (files that are not
+        in the snapshot are removed); otherwise only the listed files are restored.
+        """
+        manifest_path = self.manifest_dir / f"{key}.json"
+        result_path = self.result_dir / f"{key}.pkl"
+        try:
+            manifest = json.loads(manifest_path.read_text())
+            result = pickle.loads(result_path.read_bytes())
+        except (FileNotFoundError, json.JSONDecodeError, pickle.UnpicklingError, EOFError):
+            return None
+
+        local_path = Path(local_path)
+        local_path.mkdir(parents=True, exist_ok=True)
+        files, links = manifest["files"], manifest["links"]
+        if files_to_restore is not None:
+            missing = [f for f in files_to_restore if f not in files and f not in links]
+            for f in missing:
+                logger.warning(f"File {f} not found in cache manifest.")
+            files = {k: v for k, v in files.items() if k in files_to_restore}
+            links = {k: v for k, v in links.items() if k in files_to_restore}
+
+        # check the blobs before touching the workspace, so a miss never leaves it half restored
+        for meta in files.values():
+            try:
+                if self._blob_path(meta["digest"]).stat().st_size != meta["size"]:
+                    return None  # corrupted
+            except FileNotFoundError:
+                return None  # garbage collected
+
+        if files_to_restore is None:
+            current_files, current_links = self._walk(local_path)
+            for rel in set(current_files) - set(files) | set(current_links) - set(links):
+                (local_path / rel).unlink()
+
+        try:
+            for rel, meta in files.items():
+                self._restore_file(local_path / rel, meta)
+        except FileNotFoundError:
+            # the blob was garbage collected concurrently
+            return None
+        for rel, target in links.items():
+            dst = local_path / rel
+            if dst.is_symlink() and os.readlink(dst) == target:
+                continue
+            if dst.is_dir() and not dst.is_symlink():
+                shutil.rmtree(dst)
+            elif dst.exists() or dst.is_symlink():
+                dst.unlink()
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.symlink(target, dst)
+        os.utime(manifest_path)  # mark as recently used
+        return result
+
+    def _restore_file(self, dst: Path, meta: dict) -> None:
+        if dst.is_file() and not dst.is_symlink():
+            st = dst.stat()
+            if st.st_size == meta["size"] and FILE_DIGEST_CACHE.digest(dst, st) == meta["digest"]:
+                return  # unchanged
+        blob = self._blob_path(meta["digest"])
+        if blob.stat().st_size != meta["size"]:
+            raise FileNotFoundError(f"Blob {blob} is corrupted.")
+        if dst.is_symlink() or dst.exists():
+            if dst.is_dir() and not dst.is_symlink():
+                shutil.rmtree(dst)
+            else:
+                dst.unlink()
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(blob, dst)
+        os.chmod(dst, meta["mode"])
+
+    def gc(self, max_bytes: int) -> int:
+        """
+        Remove the least recently used runs until the blobs fit in `max_bytes`.
+        Blobs which are not referenced by any manifest are removed first.
+
+        Returns
+        -------
+        int
+            The number of bytes freed.
+        """
+        blob_sizes: dict[str, int] = {}
+        for sub in self.blob_dir.iterdir():
+            if sub.is_dir():
+                for blob in sub.iterdir():
+                    if not blob.name.startswith("."):
+                        blob_sizes[blob.name] = blob.stat().st_size
+
+        manifests = []  # (last access, key, referenced digests)
+        ref_count: dict[str, int] = {}
+        for path in self.manifest_dir.glob("*.json"):
+            try:
+                digests = {meta["digest"] for meta in json.loads(path.read_text())["files"].values()}
+                manifests.append((path.stat().st_mtime, path.stem, digests))
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            for d in digests:
+                ref_count[d] = ref_count.get(d, 0) + 1
+
+        freed = 0
+
+        def _remove_blob(digest: str) -> None:
+            nonlocal freed
+            self._blob_path(digest).unlink(missing_ok=True)
+            freed += blob_sizes.pop(digest, 0)
+
+        for digest in [d for d in blob_sizes if d not in ref_count]:
+            _remove_blob(digest)
+
+        total = sum(blob_sizes.values())
+        for _, key, digests in sorted(manifests):
+            if total <= max_bytes:
+                break
+            (self.manifest_dir / f"{key}.json").unlink(missing_ok=True)
+            (self.result_dir / f"{key}.pkl").unlink(missing_ok=True)
+            for d in digests:
+                ref_count[d] -= 1
+                if ref_count[d] == 0 and d in blob_sizes:
+                    total -= blob_sizes[d]
+                    _remove_blob(d)
+        if freed:
+            logger.info(f"Env cache GC freed {freed / 2**20:.1f} MiB in {self.root}")
+        return freed
@@ -0,0 +1,198 @@
+"""
+A persistent library of the regex patterns suggested by the LLM to filter redundant text out of the stdout.
+
+The logs of the same pipelines contain the same kinds of noise (progress bars, repeated warnings, per-step
+metrics) in every run, so the patterns learned from former runs are applied before asking the LLM again.
+The library is a json file shared by the processes; each pattern keeps its statistics:
+
+- suggested: how many times the LLM suggested it;
+- hits: how many times it matched, and removed_chars: the number of characters it removed;
+- last_used: the last time it was suggested or matched; the least recently used patterns are dropped beyond the limit.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import regex  # type: ignore[import-untyped]
+from filelock import FileLock
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.log import rdagent_logger as logger
+
+STAT_KEYS = ("suggested", "hits", "removed_chars")
+
+# the patterns whose meaning depends on the other groups or on global flags can't join the combined pattern
+_STANDALONE = regex.compile(r"\\[1-9]|\\g<|\(\?P=|\(\?\(|\(\?\||\(\?[a-zA-Z]+\)")
+
+
+def compile_pattern(pattern: str) -> regex.Pattern | None:
+    """
+    Compile a suggested pattern; None if it is invalid or if it matches the empty string (e.g. `.*`),
+    which is too greedy to be reused on other texts.
+    """
+    if not isinstance(pattern, str) or not pattern:
+        return None
+    try:
+        compiled = regex.compile(pattern)
+        if compiled.fullmatch("", timeout=1.0) is not None:
+            return None
+    except Exception:
+        return None
+    return compiled
+
+
+class FilterPatternLibrary:
+    """
+    Parameters
+    ----------
+    path : str | Path
+        The json file of the library.
+    max_patterns : int
+        The number of patterns kept; the least recently used ones are dropped beyond it. No limit if <= 0.
+    """
+
+    def __init__(self, path: str | Path, max_patterns: int = 200) -> None:
+        self.path = Path(path)
+        self.max_patterns = max_patterns
+        self.patterns: dict[str, dict[str, float]] = {}
+        self._mtime: int | None = None  # of the file when it was loaded
+        # the statistics since the last save, which are added to the ones on the disk when saving
+        self._pending: dict[str, dict[str, float]] = defaultdict(lambda: dict.fromkeys((*STAT_KEYS, "last_used"), 0))
+        self._combined: tuple[tuple[str, ...], regex.Pattern | None, dict[int, str], list[tuple[str, regex.Pattern]]]
+        self._combined = ((), None, {}, [])
+
+    def _read(self) -> dict[str, dict[str, float]]:
+        try:
+            return json.loads(self.path.read_text())["patterns"]
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Failed to read the filter pattern library {self.path}: {e}")
+            return {}
+
+    def _merge_pending(self, patterns: dict[str, dict[str, float]]) -> dict[str, dict[str, float]]:
+        for pattern, delta in self._pending.items():
+            stat = patterns.setdefault(pattern, dict.fromkeys((*STAT_KEYS, "last_used"), 0))
+            for k in STAT_KEYS:
+                stat[k] = stat.get(k, 0) + delta[k]
+            stat["last_used"] = max(stat.get("last_used", 0), delta["last_used"])
+        return patterns
+
+    def reload(self) -> None:
+        """Load the library again if another process changed it"""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self.patterns = self._merge_pending(self._read())
+
+    def save(self) -> None:
+        """Add the statistics since the last save to the library on the disk"""
+        if not self._pending:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with FileLock(str(self.path) + ".lock"):
+            patterns = self._merge_pending(self._read())
+            if 0 < self.max_patterns < len(patterns):
+                kept = set(sorted(patterns, key=lambda p: patterns[p]["last_used"], reverse=True)[: self.max_patterns])
+                patterns = {p: patterns[p] for p in patterns if p in kept}
+            tmp = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+            tmp.write_text(json.dumps({"patterns": patterns}, indent=2))
+            os.replace(tmp, self.path)
+            self._mtime = self.path.stat().st_mtime_ns
+        self.patterns = patterns
+        self._pending.clear()
+
+    def learn(self, patterns: list[str]) -> None:
+        """Record the patterns suggested by the LLM; the invalid or too greedy ones are ignored"""
+        now = time.time()
+        for pattern in patterns:
+            if compile_pattern(pattern) is None:
+                continue
+            self._pending[pattern]["suggested"] += 1
+            self._pending[pattern]["last_used"] = now
+        self.save()
+
+    def _compile(self) -> tuple[regex.Pattern | None, dict[int, str], list[tuple[str, regex.Pattern]]]:
+        """
+        The known patterns combined into one alternation, with the index of the group wrapping each pattern
+        (to attribute the matches), and the patterns which have to be applied on their own.
+        """
+        key = tuple(self.patterns)
+        if key != self._combined[0]:
+            parts, groups, standalone, n_groups = [], {}, [], 0
+            for pattern in key:
+                compiled = compile_pattern(pattern)
+                if compiled is None:
+                    continue
+                if _STANDALONE.search(pattern):
+                    standalone.append((pattern, compiled))
+                    continue
+                groups[n_groups + 1] = pattern
+                n_groups += 1 + compiled.groups
+                parts.append(f"({pattern})")
+            combined = None
+            if parts:
+                try:
+                    combined = regex.compile("|".join(parts))
+                    assert combined.groups == n_groups
+                except Exception:  # e.g. conflicting group names; apply them one by one
+                    combined, groups = None, {}
+                    standalone = [(p, c) for p in key if (c := compile_pattern(p)) is not None]
+            self._combined = (key, combined, groups, standalone)
+        return self._combined[1:]
+
+    def apply(self, text: str, timeout: float = 120.0) -> str:
+        """Remove the matches of the known patterns from `text` in a single pass and record their hits"""
+        self.reload()
+        combined, groups, standalone = self._compile()
+        hits: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+
+        def _remove(pattern: str | None):
+            def _sub(m: regex.Match) -> str:
+                stat = hits[groups[m.lastindex] if pattern is None else pattern]
+                stat[0] += 1
+                stat[1] += m.end() - m.start()
+                return ""
+
+            return _sub
+
+        for pattern, compiled in [(None, combined), *standalone]:
+            if compiled is None:
+                continue
+            try:
+                text = compiled.sub(_remove(pattern), text, timeout=timeout)
+            except TimeoutError:
+                logger.warning(f"The filter patterns timed out after {timeout} seconds; skipping them.")
+            except Exception as e:
+                logger.warning(f"The filter patterns raised an error: {e}; skipping them.")
+
+        now = time.time()
+        for pattern, (n, removed) in hits.items():
+            self._pending[pattern]["hits"] += n
+            self._pending[pattern]["removed_chars"] += removed
+            self._pending[pattern]["last_used"] = now
+        if hits:
+            self.save()
+        return text
+
+
+_LIBRARIES: dict[str, FilterPatternLibrary] = {}
+
+
+def get_filter_pattern_library() -> FilterPatternLibrary | None:
+    """The library configured by `RD_AGENT_SETTINGS.stdout_filter_pattern_library`; None if it is disabled"""
+    path = RD_AGENT_SETTINGS.stdout_filter_pattern_library
+    if not path:
+        return None
+    if path not in _LIBRARIES:
+        _LIBRARIES[path] = FilterPatternLibrary(path, max_patterns=RD_AGENT_SETTINGS.stdout_filter_pattern_limit)
+    return _LIBRARIES[path]
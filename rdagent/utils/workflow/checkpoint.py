@@ -0,0 +1,254 @@
+"""
+Incremental session checkpoints of `LoopBase`.
+
+Most of the bytes of a session are large strings (the code of the workspaces, the feedback, the prompts ...)
+which do not change once an experiment is finished. Pickling the whole loop after every step rewrites all of
+them again, so a session of hundreds of loops produces hundreds of MB per step.
+
+Instead, each step file `__session__/<loop>/<step>_<name>` only contains the structure of the loop, and every
+str/bytes of at least `RD_AGENT_SETTINGS.session_blob_min_size` bytes is replaced by its digest. The contents are
+kept in an append-only log `__session__/blobs.log` shared by all the step files of the session, so a dump only
+appends the contents it has never written before. The log is compacted when the step files referring to
+most of its bytes have been removed (e.g. by `LoopBase.truncate_session_folder`).
+
+Layout of a step file: `MAGIC`, the length (8 bytes) and pickle of the referenced digests, then the pickle of the loop.
+Layout of a log record: the digest (20 bytes), the length (8 bytes), the content.
+
+Step files written by plain `pickle.dump` (the previous format) are still loaded by `load_session_obj`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import pickle
+import struct
+import threading
+import uuid
+from pathlib import Path
+from typing import Any
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+
+MAGIC = b"RDSESS01"
+BLOB_LOG_NAME = "blobs.log"
+_RECORD_HEADER = struct.Struct(">20sQ")
+_LENGTH = struct.Struct(">Q")
+
+
+class SessionBlobStore:
+    """The append-only content log of one session folder."""
+
+    def __init__(self, session_folder: str | Path) -> None:
+        self.session_folder = Path(session_folder)
+        self.path = self.session_folder / BLOB_LOG_NAME
+        self._index: dict[bytes, tuple[int, int]] = {}  # digest -> (offset of the content, length)
+        self._end = 0  # the end of the last complete record
+        self._lock = threading.Lock()
+        self.dumps_since_compaction = 0
+
+    def _refresh(self) -> None:
+        """Index the records appended since the last refresh (possibly by another process)."""
+        if not self.path.exists():
+            self._index, self._end = {}, 0
+            return
+        size = self.path.stat().st_size
+        if size < self._end:  # compacted (or removed) by someone else
+            self._index, self._end = {}, 0
+        with self.path.open("rb") as f:
+            f.seek(self._end)
+            while self._end + _RECORD_HEADER.size <= size:
+                digest, length = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+                offset = self._end + _RECORD_HEADER.size
+                if offset + length > size:  # an incomplete record of an interrupted write
+                    break
+                self._index[digest] = (offset, length)
+                self._end = offset + length
+                f.seek(self._end)
+
+    def put_many(self, blobs: dict[bytes, str | bytes]) -> int:
+        """Append the contents (by digest) which are not in the log yet; return the number of bytes written."""
+        with self._lock:
+            self._refresh()
+            new = {d: _encode(obj) for d, obj in blobs.items() if d not in self._index}
+            if not new:
+                return 0
+            self.session_folder.mkdir(parents=True, exist_ok=True)
+            with self.path.open("r+b" if self.path.exists() else "wb") as f:
+                f.truncate(self._end)  # drop an incomplete record
+                f.seek(self._end)
+                for digest, data in new.items():
+                    f.write(_RECORD_HEADER.pack(digest, len(data)))
+                    self._index[digest] = (self._end + _RECORD_HEADER.size, len(data))
+                    f.write(data)
+                    self._end += _RECORD_HEADER.size + len(data)
+            return sum(_RECORD_HEADER.size + len(data) for data in new.values())
+
+    def get(self, digest: bytes) -> bytes:
+        with self._lock:
+            if digest not in self._index:
+                self._refresh()
+            offset, length = self._index[digest]
+            with self.path.open("rb") as f:
+                f.seek(offset)
+                return f.read(length)
+
+    def compact(self, min_dead_ratio: float = 0.5) -> int:
+        """
+        Rewrite the log without the contents which are not referenced by any step file
+        if they take more than `min_dead_ratio` of it; return the number of bytes freed.
+        """
+        live: set[bytes] = set()
+        for step_file in self.session_folder.glob("*/*_*"):
+            try:
+                live.update(read_digests(step_file))
+            except (OSError, pickle.UnpicklingError, EOFError):
+                continue
+        with self._lock:
+            self._refresh()
+            live_bytes = sum(_RECORD_HEADER.size + length for d, (_, length) in self._index.items() if d in live)
+            freed = self._end - live_bytes
+            if self._end == 0 or freed <= self._end * min_dead_ratio:
+                return 0
+            tmp = self.path.with_name(f".{BLOB_LOG_NAME}.{uuid.uuid4().hex}.tmp")
+            index, end = {}, 0
+            with self.path.open("rb") as src, tmp.open("wb") as dst:
+                for digest, (offset, length) in self._index.items():
+                    if digest not in live:
+                        continue
+                    src.seek(offset)
+                    dst.write(_RECORD_HEADER.pack(digest, length))
+                    dst.write(src.read(length))
+                    index[digest] = (end + _RECORD_HEADER.size, length)
+                    end += _RECORD_HEADER.size + length
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp, self.path)
+            self._index, self._end = index, end
+            self.dumps_since_compaction = 0
+            return freed
+
+
+_STORES: dict[Path, SessionBlobStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_blob_store(session_folder: str | Path) -> SessionBlobStore:
+    session_folder = Path(session_folder).absolute()
+    with _STORES_LOCK:
+        if session_folder not in _STORES:
+            _STORES[session_folder] = SessionBlobStore(session_folder)
+        return _STORES[session_folder]
+
+
+class _DigestCache:
+    """
+    Remember the digests of the large objects of the latest dump by `id`, so the unchanged contents are not hashed
+    again. The objects are referenced to keep their ids valid; entries not used by a dump are dropped after it.
+    """
+
+    def __init__(self) -> None:
+        self.entries: dict[int, tuple[Any, bytes]] = {}
+
+    def digest(self, obj: str | bytes) -> bytes:
+        cached = self.entries.get(id(obj))
+        if cached is not None and cached[0] is obj:
+            return cached[1]
+        digest = hashlib.sha1(_encode(obj)).digest()  # noqa: S324
+        self.entries[id(obj)] = (obj, digest)
+        return digest
+
+
+_DIGEST_CACHE = _DigestCache()
+
+
+def _encode(obj: str | bytes) -> bytes:
+    return obj.encode("utf-8", "surrogatepass") if isinstance(obj, str) else bytes(obj)
+
+
+class _SessionPickler(pickle.Pickler):
+    def __init__(self, file: io.BytesIO, min_size: int) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.min_size = min_size
+        self.refs: dict[bytes, str | bytes] = {}  # digest -> object
+        self.seen: dict[int, tuple[Any, bytes]] = {}  # the entries of `_DIGEST_CACHE` used by this dump
+
+    def persistent_id(self, obj: Any) -> Any:
+        t = type(obj)
+        if (t is str or t is bytes) and len(obj) >= self.min_size:
+            digest = _DIGEST_CACHE.digest(obj)
+            self.refs[digest] = obj
+            self.seen[id(obj)] = (obj, digest)
+            return (t is str, digest)
+        return None
+
+
+class _SessionUnpickler(pickle.Unpickler):
+    def __init__(self, file: Any, store: SessionBlobStore) -> None:
+        super().__init__(file)
+        self.store = store
+        self.loaded: dict[tuple[bool, bytes], Any] = {}
+
+    def persistent_load(self, pid: Any) -> Any:
+        if pid not in self.loaded:
+            is_str, digest = pid
+            data = self.store.get(digest)
+            obj = data.decode("utf-8", "surrogatepass") if is_str else data
+            _DIGEST_CACHE.entries[id(obj)] = (obj, digest)  # the next dump does not need to hash it again
+            self.loaded[pid] = obj
+        return self.loaded[pid]
+
+
+def dump_session_obj(obj: Any, path: str | Path) -> None:
+    """Write `obj` to the step file `path`; its large contents go to the blob log of the session folder."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not RD_AGENT_SETTINGS.session_incremental_checkpoint:
+        with path.open("wb") as f:
+            pickle.dump(obj, f)
+        return
+
+    buf = io.BytesIO()
+    pickler = _SessionPickler(buf, RD_AGENT_SETTINGS.session_blob_min_size)
+    pickler.dump(obj)
+    _DIGEST_CACHE.entries = pickler.seen
+
+    store = get_blob_store(path.parent.parent)
+    # the contents must be in the log before the step file referring to them
+    store.put_many(pickler.refs)
+    header = pickle.dumps(sorted(pickler.refs), protocol=pickle.HIGHEST_PROTOCOL)
+    # not in the folder of the step files, which may be listed by `glob("*/*_*")` while dumping
+    tmp = path.parent.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+    with tmp.open("wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(buf.getbuffer())
+    os.replace(tmp, path)
+
+    store.dumps_since_compaction += 1
+    if store.dumps_since_compaction >= RD_AGENT_SETTINGS.session_compact_interval > 0:
+        store.dumps_since_compaction = 0
+        store.compact()
+
+
+def read_digests(path: str | Path) -> list[bytes]:
+    """The digests of the contents referenced by a step file (empty for the plain pickle format)."""
+    with Path(path).open("rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return []
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        return pickle.loads(f.read(length))
+
+
+def load_session_obj(path: str | Path) -> Any:
+    """Load a step file written by `dump_session_obj` (or by plain `pickle.dump`)."""
+    path = Path(path)
+    with path.open("rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            f.seek(0)
+            return pickle.load(f)
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        f.seek(length, os.SEEK_CUR)
+        return _SessionUnpickler(f, get_blob_store(path.parent.parent)).load()
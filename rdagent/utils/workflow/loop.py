@@ -13,7 +13,6 @@ import concurrent.futures
 import copy
 import multiprocessing.queues
 import os
-import pickle
 from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -27,6 +26,11 @@ from rdagent.core.conf import RD_AGENT_SETTINGS
 from rdagent.log import rdagent_logger as logger
 from rdagent.log.conf import LOG_SETTINGS
 from rdagent.log.timer import RD_Agent_TIMER_wrapper, RDAgentTimer
+from rdagent.utils.workflow.checkpoint import (
+    dump_session_obj,
+    get_blob_store,
+    load_session_obj,
+)
 from rdagent.utils.workflow.tracking import WorkflowTracker
 
 
@@ -426,10 +430,7 @@ class LoopBase:
     def dump(self, path: str | Path) -> None:
         if RD_Agent_TIMER_wrapper.timer.started:
             RD_Agent_TIMER_wrapper.timer.update_remain_time()
-        path = Path(path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("wb") as f:
-            pickle.dump(self, f)
+        dump_session_obj(self, path)
 
     def truncate_session_folder(self, li: int, si: int) -> None:
         """
@@ -449,6 +450,7 @@ class LoopBase:
                 step_id = int(step_session.name.split("_", 1)[0])
                 if step_id > si:
                     step_session.unlink()
+        get_blob_store(self.session_folder).compact()
 
     @classmethod
     def load(
@@ -495,8 +497,7 @@ class LoopBase:
         else:
             session_folder = path.parent.parent
 
-        with path.open("rb") as f:
-            session = cast(LoopBase, pickle.load(f))
+        session = cast(LoopBase, load_session_obj(path))
 
         # set session folder
         if checkout:
@@ -0,0 +1,122 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.oai.backend.base import APIBackend
+from rdagent.oai.llm_conf import LLM_SETTINGS
+from rdagent.oai.utils.rate_limit import TokenBucketRateLimiter, backoff_seconds
+
+
+class FakeBackend(APIBackend):
+    """Answers with the last user message after `latency` seconds; fails the first `n_failures` calls."""
+
+    def __init__(self, latency: float = 0.05, n_failures: int = 0, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.n_failures = n_failures
+        self.n_calls = 0
+        self.retry_wait_seconds = 0.01
+
+    def supports_response_schema(self) -> bool:
+        return False
+
+    def _calculate_token_from_messages(self, messages: list[dict[str, Any]]) -> int:
+        return sum(len(m["content"]) for m in messages)
+
+    def _create_embedding_inner_function(self, input_content_list: list[str]) -> list[list[float]]:
+        self.n_calls += 1
+        return [[float(len(c))] for c in input_content_list]
+
+    def _answer(self, messages: list[dict[str, Any]]) -> tuple[str, str | None]:
+        self.n_calls += 1
+        if self.n_calls <= self.n_failures:
+            raise ConnectionError("temporary failure")
+        return f"re: {messages[-1]['content']}", "stop"
+
+    def _create_chat_completion_inner_function(self, messages, response_format=None, *args, **kwargs):
+        time.sleep(self.latency)
+        return self._answer(messages)
+
+    async def _acreate_chat_completion_inner_function(self, messages, response_format=None, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._answer(messages)
+
+
+@pytest.mark.offline
+class AsyncBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_patch = patch.object(LLM_SETTINGS, "prompt_cache_path", str(Path(self.tmp_dir.name) / "cache.db"))
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def test_concurrent_calls_and_coalescing(self):
+        async def ask(backend: FakeBackend) -> list[str]:
+            prompts = ["a", "b", "a", "a", "b"]
+            return await asyncio.gather(*[backend.acreate_chat_completion(p) for p in prompts])
+
+        backend = FakeBackend(use_chat_cache=False, dump_chat_cache=False)
+        start = time.time()
+        self.assertEqual(asyncio.run(ask(backend)), ["re: a", "re: b", "re: a", "re: a", "re: b"])
+        self.assertLess(time.time() - start, 5 * backend.latency)
+        self.assertEqual(backend.n_calls, 5)
+
+        # identical prompts in flight share a call when the cache is used
+        backend = FakeBackend(use_chat_cache=True, dump_chat_cache=True)
+        self.assertEqual(asyncio.run(ask(backend)), ["re: a", "re: b", "re: a", "re: a", "re: b"])
+        self.assertEqual(backend.n_calls, 2)
+        # and the sync api reads the results written by the async one
+        self.assertEqual(backend.build_messages_and_create_chat_completion("a"), "re: a")
+        self.assertEqual(backend.n_calls, 2)
+
+    def test_retry_and_embedding(self):
+        backend = FakeBackend(n_failures=2, use_chat_cache=False, dump_chat_cache=False)
+        self.assertEqual(asyncio.run(backend.acreate_chat_completion("x")), "re: x")
+        self.assertEqual(backend.n_calls, 3)
+        self.assertEqual(asyncio.run(backend.acreate_embedding(["ab", "c"])), [[2.0], [1.0]])
+
+    def test_rate_limiter(self):
+        limiter = TokenBucketRateLimiter(rpm=60, tpm=600)
+        self.assertEqual(limiter.reserve(tokens=100), 0)
+        self.assertEqual(limiter.reserve(tokens=500), 0)
+        # one minute of tokens has been used, 60 more take 6 seconds to refill
+        self.assertAlmostEqual(limiter.reserve(tokens=60), 6, delta=0.1)
+        limiter.consume(60)
+        self.assertAlmostEqual(limiter.reserve(tokens=0), 12, delta=0.1)
+        self.assertEqual(TokenBucketRateLimiter().reserve(tokens=10**9), 0)
+
+        self.assertEqual([backoff_seconds(i, base=3) for i in (0, 5)], [3, 3])  # the fixed wait by default
+        with (
+            patch.object(LLM_SETTINGS, "retry_backoff_factor", 2.0),
+            patch.object(LLM_SETTINGS, "retry_backoff_max_seconds", 60.0),
+        ):
+            self.assertTrue(4 <= backoff_seconds(3, base=1) <= 8)
+            self.assertTrue(30 <= backoff_seconds(10, base=1) <= 60)
+
+
+def benchmark(n: int = 50, latency: float = 0.1):
+    backend = FakeBackend(latency=latency, use_chat_cache=False, dump_chat_cache=False)
+    start = time.time()
+    for i in range(n):
+        backend.build_messages_and_create_chat_completion(str(i))
+    print(f"{n} sequential calls: {time.time() - start:.2f}s")
+
+    async def _run():
+        return await asyncio.gather(*[backend.acreate_chat_completion(str(i)) for i in range(n)])
+
+    start = time.time()
+    asyncio.run(_run())
+    print(f"{n} concurrent async calls: {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
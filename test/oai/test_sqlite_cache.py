@@ -0,0 +1,113 @@
+import multiprocessing as mp
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import pytest
+
+from rdagent.oai.backend.base import SQliteLazyCache, SQliteWALCache
+from rdagent.oai.llm_conf import LLM_SETTINGS
+
+
+def _write_entries(engine: str, cache_location: str, worker_id: int, n: int) -> None:
+    cache_cls = SQliteWALCache if engine == "sqlite_wal" else SQliteLazyCache
+    cache = cache_cls(cache_location=cache_location)
+    for i in range(n):
+        cache.chat_set(f"worker{worker_id}-{i}", f"response {worker_id}-{i}")
+        cache.chat_get(f"worker{worker_id}-{i}")
+
+
+def benchmark(writers: tuple[int, ...] = (1, 8, 32), n_per_writer: int = 200) -> None:
+    """
+    Compare the write throughput (chat_set + chat_get per op) of the cache engines.
+
+    Usage: python test/oai/test_sqlite_cache.py
+    """
+    ctx = mp.get_context("fork")
+    for engine in ("sqlite", "sqlite_wal"):
+        for n_proc in writers:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                cache_location = str(Path(tmp_dir) / "prompt_cache.db")
+                start = time.perf_counter()
+                procs = [
+                    ctx.Process(target=_write_entries, args=(engine, cache_location, i, n_per_writer))
+                    for i in range(n_proc)
+                ]
+                for p in procs:
+                    p.start()
+                for p in procs:
+                    p.join()
+                duration = time.perf_counter() - start
+                n_rows = (
+                    SQliteWALCache(cache_location=cache_location)
+                    ._get_conn()
+                    .execute("SELECT COUNT(*) FROM chat_cache")
+                    .fetchone()[0]
+                )
+                print(
+                    f"{engine:>10} | {n_proc:>2} writers | {n_rows:>6} rows | {duration:7.2f}s | "
+                    f"{n_proc * n_per_writer / duration:9.1f} ops/s"
+                )
+
+
+@pytest.mark.offline
+class SQliteWALCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_location = str(Path(self.tmp_dir.name) / "prompt_cache.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_your_writes_and_batching(self):
+        cache = SQliteWALCache(cache_location=self.cache_location)
+        cache.chat_set("q", "a")
+        cache.embedding_set({"text": [0.1, 0.2]})
+        cache.message_set("conv", [{"role": "user", "content": "hi"}])
+        # served from the pending writes / LRU before they are committed
+        self.assertEqual(cache.chat_get("q"), "a")
+        self.assertEqual(cache.embedding_get("text"), [0.1, 0.2])
+        self.assertEqual(cache.message_get("conv"), [{"role": "user", "content": "hi"}])
+
+        cache.flush()
+        # the legacy engine reads the same schema
+        legacy = SQliteLazyCache(cache_location=self.cache_location)
+        self.assertEqual(legacy.chat_get("q"), "a")
+        self.assertEqual(legacy.embedding_get("text"), [0.1, 0.2])
+        self.assertIsNone(legacy.chat_get("missing"))
+
+    def test_batch_size_triggers_flush(self):
+        cache = SQliteWALCache(cache_location=self.cache_location)
+        for i in range(LLM_SETTINGS.prompt_cache_batch_size):
+            cache.chat_set(f"q{i}", f"a{i}")
+        n_rows = cache._get_conn().execute("SELECT COUNT(*) FROM chat_cache").fetchone()[0]
+        self.assertEqual(n_rows, LLM_SETTINGS.prompt_cache_batch_size)
+
+    def test_forked_writers(self):
+        # the parent owns a connection before forking; children must open their own ones
+        cache = SQliteWALCache(cache_location=self.cache_location)
+        cache.chat_set("parent", "value")
+        ctx = mp.get_context("fork")
+        procs = [ctx.Process(target=_write_entries, args=("sqlite_wal", self.cache_location, i, 20)) for i in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+        cache.flush()
+        n_rows = cache._get_conn().execute("SELECT COUNT(*) FROM chat_cache").fetchone()[0]
+        self.assertEqual(n_rows, 4 * 20 + 1)
+        self.assertEqual(cache.chat_get("worker3-19"), "response 3-19")
+
+    def test_pool_workers(self):
+        # the workers of a pool exit without running the exit hooks, nothing is flushed explicitly
+        cache = SQliteWALCache(cache_location=self.cache_location)
+        with mp.get_context("fork").Pool(4) as pool:
+            pool.starmap(_write_entries, [("sqlite_wal", self.cache_location, i, 20) for i in range(8)])
+        n_rows = cache._get_conn().execute("SELECT COUNT(*) FROM chat_cache").fetchone()[0]
+        self.assertEqual(n_rows, 8 * 20)
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,122 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.scenarios.data_science.scen import utils
+from rdagent.scenarios.data_science.scen.utils import (
+    describe_data_folder_v2,
+    estimate_num_lines,
+    get_file_len_size,
+    preview_csv,
+    preview_parquet,
+)
+
+
+def _make_table(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "id": np.arange(n),
+            "label": rng.choice(["cat", "dog", "bird"], size=n),
+            "city": rng.choice([f"city_{i}" for i in range(500)], size=n),
+            "value": np.where(rng.random(n) < 0.1, np.nan, rng.normal(size=n)),
+        }
+    )
+
+
+@pytest.mark.offline
+class DataPreviewTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.cache_patch = patch.object(
+            RD_AGENT_SETTINGS, "pickle_cache_folder_path_str", str(self.root / "pickle_cache")
+        )
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def test_small_files_are_read_entirely(self):
+        (self.root / "data").mkdir()
+        df = _make_table(100)
+        df.to_csv(self.root / "data" / "train.csv", index=False)
+        self.assertEqual(get_file_len_size(self.root / "data" / "train.csv")[0], 101)
+        desc = describe_data_folder_v2(self.root / "data")
+        self.assertIn("It has 100 rows and 4 columns.", desc)
+        self.assertIn("label (object) has 3 unique values", desc)
+
+    def test_sampled_previews(self):
+        n = 50_000
+        df = _make_table(n)
+        df.to_csv(self.root / "train.csv", index=False)
+        df.to_parquet(self.root / "train.parquet", index=False, row_group_size=5_000)
+
+        with patch.multiple(
+            utils, PREVIEW_FULL_READ_MAX_BYTES=1024, PREVIEW_HEAD_ROWS=200, PREVIEW_SAMPLE_RANGE_BYTES=4096
+        ):
+            csv_desc = preview_csv(self.root / "train.csv", "train.csv", simple=False)
+            parquet_desc = preview_parquet(self.root / "train.parquet", "train.parquet", simple=False)
+            n_lines = estimate_num_lines(self.root / "train.csv")
+
+        estimated_rows = int(csv_desc.split("It has about ")[1].split(" rows")[0])
+        self.assertAlmostEqual(estimated_rows, n, delta=n * 0.1)
+        self.assertAlmostEqual(n_lines, n + 1, delta=n * 0.1)
+        self.assertIn("label (object) has about 3 unique values", csv_desc)
+        self.assertIn("id (int64) has range: 0.00 - ", csv_desc)
+        # the distinct values of an ID column are scaled to the number of rows
+        self.assertEqual(utils._estimate_distinct(df["id"].sample(1000, random_state=0), n), n)
+
+        # the number of rows, the range and the nan values are exact with the statistics of the footer
+        self.assertIn(f"It has {n} rows and 4 columns.", parquet_desc)
+        self.assertIn(f"id (int64) has range: 0.00 - {n - 1:.2f}, 0 nan values", parquet_desc)
+        self.assertIn(f"{df['value'].isnull().sum()} nan values", parquet_desc)
+        self.assertIn("(estimated from a sample of 2000 rows)", parquet_desc)
+        city_unique = int(parquet_desc.split("city (object) has about ")[1].split(" ")[0])
+        self.assertTrue(250 < city_unique <= 750)
+        self.assertIn("   id label", parquet_desc)  # the head of the table
+
+    def test_cache(self):
+        path = self.root / "train.csv"
+        _make_table(100).to_csv(path, index=False)
+        with patch.object(pd, "read_csv", wraps=pd.read_csv) as read_csv:
+            first = preview_csv(path, "train.csv", simple=False)
+            self.assertEqual(preview_csv(path, "train.csv", simple=False), first)
+            self.assertEqual(read_csv.call_count, 1)
+            # a modified file is previewed again
+            _make_table(120).to_csv(path, index=False)
+            self.assertIn("It has 120 rows", preview_csv(path, "train.csv", simple=False))
+            self.assertEqual(read_csv.call_count, 2)
+
+
+def benchmark(n: int = 5_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp) / "data"
+        folder.mkdir()
+        for start in range(0, n, n // 10):
+            df = _make_table(n // 10, seed=start)
+            df["id"] += start
+            df.to_csv(folder / "train.csv", index=False, mode="a", header=start == 0)
+        with patch.object(RD_AGENT_SETTINGS, "pickle_cache_folder_path_str", str(Path(tmp) / "pickle_cache")):
+            start = time.time()
+            describe_data_folder_v2(folder)
+            print(f"sampled preview: {time.time() - start:.2f}s")
+            start = time.time()
+            describe_data_folder_v2(folder)
+            print(f"cached preview: {time.time() - start:.2f}s")
+            with patch.object(utils, "PREVIEW_FULL_READ_MAX_BYTES", 2**40):
+                start = time.time()
+                describe_data_folder_v2(folder)
+                print(f"full read preview: {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,107 @@
+import resource
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rdagent.scenarios.data_science.debug.data import (
+    GenericDataHandler,
+    UniqueIDDataReducer,
+    create_debug_data,
+    stream_sample_file,
+)
+
+
+def _make_competition(folder: Path, n: int = 2_000, n_images: int = 0) -> None:
+    folder.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    ids = np.arange(n)
+    labels = rng.choice(["cat", "dog", "bird", "rare"], size=n, p=[0.5, 0.3, 0.1995, 0.0005])
+    pd.DataFrame({"image_id": ids, "feature": rng.normal(size=n), "label": labels}).to_csv(
+        folder / "train.csv", index=False
+    )
+    pd.DataFrame({"image_id": ids, "width": rng.uniform(10, 100, size=n)}).to_parquet(
+        folder / "train_meta.parquet", index=False
+    )
+    pd.DataFrame({"text": [f"line {i}" for i in range(n)]}).to_json(folder / "test.jsonl", orient="records", lines=True)
+    pd.DataFrame({"image_id": ids[:10], "label": ["cat"] * 10}).to_csv(folder / "sample_submission.csv", index=False)
+    (folder / "images").mkdir()
+    for i in range(n_images):
+        (folder / "images" / f"{i}.jpg").write_bytes(b"jpg")
+
+
+@pytest.mark.offline
+class StreamingSamplerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_streaming_sample(self):
+        _make_competition(self.root / "comp", n_images=2_000)
+        create_debug_data(
+            "comp", dataset_path=self.root, min_frac=0.05, min_num=5, streaming=True, n_jobs=2, chunksize=300
+        )
+        sample = self.root / "sample" / "comp"
+
+        train = pd.read_csv(sample / "train.csv")
+        meta = pd.read_parquet(sample / "train_meta.parquet")
+        self.assertTrue(40 < len(train) < 200)
+        # the files sharing the ID column keep the same rows
+        self.assertEqual(set(train["image_id"]), set(meta["image_id"]))
+        # every class of the label is kept, even the rare ones
+        self.assertEqual(
+            set(train["label"]),
+            {"cat", "dog", "bird", "rare"} & set(pd.read_csv(self.root / "comp" / "train.csv")["label"]),
+        )
+        self.assertEqual(list(meta.dtypes), list(pd.read_parquet(self.root / "comp" / "train_meta.parquet").dtypes))
+        # at least `min_num` rows
+        self.assertGreaterEqual(len(pd.read_csv(sample / "sample_submission.csv")), 5)
+        self.assertTrue(40 < len(pd.read_json(sample / "test.jsonl", lines=True)) < 200)
+        # the images of the sampled rows are kept
+        self.assertTrue({f"{i}.jpg" for i in train["image_id"]} <= {p.name for p in (sample / "images").iterdir()})
+
+    def test_min_num_and_determinism(self):
+        src = self.root / "small.csv"
+        pd.DataFrame({"a": range(20), "b": np.linspace(0, 1, 20)}).to_csv(src, index=False)
+        r1 = stream_sample_file(src, self.root / "s1.csv", min_frac=0.01, min_num=5, chunksize=7)
+        r2 = stream_sample_file(src, self.root / "s2.csv", min_frac=0.01, min_num=5, chunksize=3)
+        self.assertEqual((r1["rows_in"], r1["rows_out"]), (20, 5))
+        s1, s2 = pd.read_csv(self.root / "s1.csv"), pd.read_csv(self.root / "s2.csv")
+        self.assertEqual(list(s1.columns), ["a", "b"])
+        self.assertEqual(len(s2), 5)
+
+
+def benchmark(n: int = 2_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "train.csv"
+        rng = np.random.default_rng(0)
+        for start in range(0, n, n // 10):  # written by parts to keep the peak RSS of the process low
+            size = min(n // 10, n - start)
+            df = pd.DataFrame({"id": np.arange(start, start + size), "label": rng.integers(0, 10, size=size)})
+            for i in range(20):
+                df[f"f{i}"] = rng.normal(size=size)
+            df.to_csv(src, index=False, mode="a", header=start == 0)
+
+        # streaming first: the peak RSS of the process only grows
+        result = stream_sample_file(src, Path(tmp) / "sample.csv", min_frac=0.01, min_num=5)
+        print(
+            f"stream_sample_file: {result['seconds']:.1f}s ({result['rows_in'] / result['seconds']:.0f} rows/s), "
+            f"{result['rows_out']} rows, peak RSS {result['peak_rss_mb']:.0f} MB"
+        )
+        start = time.time()
+        reduced = UniqueIDDataReducer(min_frac=0.01, min_num=5).reduce(GenericDataHandler().load(src))
+        print(
+            f"load + UniqueIDDataReducer: {time.time() - start:.1f}s, {len(reduced)} rows, "
+            f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
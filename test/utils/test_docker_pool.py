@@ -0,0 +1,204 @@
+import itertools
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from rdagent.utils import env as env_module
+from rdagent.utils.env import DockerConf, DockerContainerPool, DockerEnv
+
+
+class _FakeContainer:
+    """A container whose commands run on the host, in the folder it is mounted at"""
+
+    ids = itertools.count()
+
+    def __init__(self, client: "_FakeDockerClient", command: str | None, environment: dict | None, **kwargs) -> None:
+        time.sleep(client.startup_delay)
+        self.id = self.name = f"fake-{next(self.ids)}"
+        self.kwargs = kwargs
+        self.status = "running"
+        self.removed = False
+        self.n_processes = 2  # the init and the keeper
+        if command is not None:  # a container per run
+            self.process = client.popen(command, environment, kwargs["working_dir"])
+
+    def logs(self, stream: bool = True):
+        return iter(self.process.stdout.readline, b"")
+
+    def wait(self) -> dict:
+        return {"StatusCode": self.process.wait()}
+
+    def top(self) -> dict:
+        return {"Processes": [[]] * self.n_processes}
+
+    def reload(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        self.status = "exited"
+
+    def remove(self) -> None:
+        self.removed = True
+
+
+class _FakeAPI:
+    def __init__(self, client: "_FakeDockerClient") -> None:
+        self.client = client
+        self.execs: dict[str, subprocess.Popen] = {}
+
+    def exec_create(self, container_id: str, cmd: str, environment: dict, workdir: str) -> dict:
+        exec_id = f"exec-{len(self.execs)}"
+        self.execs[exec_id] = (cmd, environment, workdir)
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id: str, stream: bool = True):
+        process = self.execs[exec_id] = self.client.popen(*self.execs[exec_id])
+        return iter(lambda: process.stdout.read(7), b"")  # chunks are not lines
+
+    def exec_inspect(self, exec_id: str) -> dict:
+        return {"ExitCode": self.execs[exec_id].wait()}
+
+
+class _FakeDockerClient:
+    def __init__(self, startup_delay: float = 0.0) -> None:
+        self.startup_delay = startup_delay
+        self.created: list[_FakeContainer] = []
+        self.api = _FakeAPI(self)
+        self.containers = self
+
+    def run(self, image: str, command: str | None = None, environment: dict | None = None, **kwargs) -> _FakeContainer:
+        container = _FakeContainer(self, command, environment, **kwargs)
+        self.created.append(container)
+        return container
+
+    @staticmethod
+    def popen(cmd: str, environment: dict | None, workdir: str) -> subprocess.Popen:
+        return subprocess.Popen(
+            shlex.split(cmd),
+            cwd=workdir,
+            env={**os.environ, **(environment or {})},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+
+
+def _make_env(ws: Path, **kwargs) -> DockerEnv:
+    conf = DockerConf(
+        image="fake",
+        mount_path=str(ws),
+        default_entry="python main.py",
+        enable_cache=False,
+        enable_gpu=False,
+        save_logs_to_file=False,
+        terminal_tail_lines=0,
+        **kwargs,
+    )
+    return DockerEnv(conf)
+
+
+@pytest.mark.offline
+class DockerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.client = _FakeDockerClient(startup_delay=0.2)
+        self.pool = DockerContainerPool()
+        self.patches = [
+            patch.object(env_module.docker, "from_env", return_value=self.client),
+            patch.object(env_module, "DOCKER_CONTAINER_POOL", self.pool),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        self.pool.close()
+        for p in self.patches:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def _workspace(self, name: str) -> Path:
+        ws = self.root / name
+        ws.mkdir()
+        (ws / "main.py").write_text("print('line 1')\nprint('a long line, ' * 3 + 'end')\n")
+        return ws
+
+    def test_pooled_runs(self):
+        ws = self._workspace("ws")
+        env = _make_env(ws, enable_container_pool=True, container_pool_size=1)
+        first = env.run("python main.py", str(ws))
+        self.assertEqual(first.stdout.splitlines(), ["line 1", "a long line, " * 3 + "end"])
+        self.assertGreaterEqual(first.startup_time, 0.2)
+        second = env.run('sh -c "echo $RD_VAR; exit 3"', str(ws), env={"RD_VAR": "from exec"})
+        self.assertEqual((second.stdout.strip(), second.exit_code), ("from exec", 3))
+        self.assertLess(second.startup_time, 0.1)  # run in the warm container
+        self.assertEqual(len(self.client.created), 1)
+        self.assertAlmostEqual(second.execution_time, second.running_time - second.startup_time)
+
+        # other volumes need another container; the pool only keeps one idle container
+        ws2 = self._workspace("ws2")
+        _make_env(ws2, enable_container_pool=True, container_pool_size=1).run("python main.py", str(ws2))
+        self.assertEqual(len(self.client.created), 2)
+        self.assertTrue(self.client.created[0].removed)
+
+        # a container whose run left processes behind is not reused
+        self.client.created[1].n_processes = 3
+        env.run("python main.py", str(ws))
+        self.assertTrue(self.client.created[1].removed)
+        self.assertEqual(len(self.client.created), 3)
+
+    def test_chmod_changed_paths(self):
+        ws = self._workspace("ws")
+        (ws / "input").mkdir()
+        os.chmod(ws / "main.py", 0o644)
+        env = _make_env(ws, exclude_chmod_paths=["input"])
+        result = env.run("mkdir -p out && touch out/pred.csv input/new.csv", str(ws))
+        self.assertEqual(result.exit_code, 0)
+        self.assertGreaterEqual(result.startup_time, 0.2)
+        self.assertTrue(self.client.created[0].removed)  # not pooled
+
+        def mode(p: str) -> int:
+            return (ws / p).stat().st_mode & 0o777
+
+        self.assertEqual((mode("out"), mode("out/pred.csv")), (0o777, 0o777))
+        self.assertEqual((mode("main.py"), mode("input/new.csv")), (0o644, 0o644))
+
+    def test_gpu_probe_failures_are_not_cached(self):
+        env = _make_env(self._workspace("ws"))
+        env.conf.enable_gpu = True
+        client = MagicMock()
+        client.containers.run.side_effect = [env_module.docker.errors.APIError("daemon busy"), MagicMock()]
+        with patch.object(env_module, "_GPU_KWARGS_CACHE", {}), patch.dict(os.environ, {"CUDA_VISIBLE_DEVICES": ""}):
+            self.assertEqual(env._gpu_kwargs(client), {})  # a transient failure
+            self.assertIn("device_requests", env._gpu_kwargs(client))  # probed again
+            self.assertIn("device_requests", env._gpu_kwargs(client))  # and then remembered
+        self.assertEqual(client.containers.run.call_count, 2)
+
+
+def benchmark(n_runs: int = 10, startup_delay: float = 0.5):
+    with tempfile.TemporaryDirectory() as tmp:
+        ws = Path(tmp)
+        (ws / "main.py").write_text("print('done')\n")
+        client = _FakeDockerClient(startup_delay=startup_delay)
+        with patch.object(env_module.docker, "from_env", return_value=client):
+            for enable_container_pool in (False, True):
+                env = _make_env(ws, enable_container_pool=enable_container_pool)
+                start = time.time()
+                results = [env.run("python main.py", str(ws)) for _ in range(n_runs)]
+                print(
+                    f"{n_runs} runs with a container startup of {startup_delay}s, "
+                    f"{'pooled' if enable_container_pool else 'a container per run'}: {time.time() - start:.2f}s "
+                    f"(startup {sum(r.startup_time for r in results):.2f}s, "
+                    f"execution {sum(r.execution_time for r in results):.2f}s)"
+                )
+        env_module.DOCKER_CONTAINER_POOL.close()
+
+
+if __name__ == "__main__":
+    benchmark()
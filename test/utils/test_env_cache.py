@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.utils.env import LocalConf, LocalEnv
+from rdagent.utils.env_cache import ContentAddressedStore, FileDigestCache
+
+
+@pytest.mark.offline
+class ContentAddressedStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.ws = self.root / "ws"
+        self.ws.mkdir()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_dedup_restore_and_gc(self):
+        store = ContentAddressedStore(self.root / "store")
+        (self.ws / "data.csv").write_text("a,b\n" * 1000)
+        (self.ws / "sub").mkdir()
+        (self.ws / "sub" / "main.py").write_text("print(1)")
+        os.symlink("/tmp", self.ws / "input")
+        store.save("k1", {"res": 1}, self.ws)
+        (self.ws / "sub" / "main.py").write_text("print(2)")
+        store.save("k2", {"res": 2}, self.ws)
+        # data.csv is shared by both runs
+        blobs = [p for p in (self.root / "store" / "blobs").rglob("*") if p.is_file()]
+        self.assertEqual(len(blobs), 3)
+
+        (self.ws / "stray.txt").write_text("x")
+        (self.ws / "data.csv").unlink()
+        self.assertEqual(store.load("k1", self.ws), {"res": 1})
+        self.assertFalse((self.ws / "stray.txt").exists())
+        self.assertEqual((self.ws / "sub" / "main.py").read_text(), "print(1)")
+        self.assertEqual((self.ws / "data.csv").read_text(), "a,b\n" * 1000)
+        self.assertEqual(os.readlink(self.ws / "input"), "/tmp")
+        self.assertIsNone(store.load("missing", self.ws))
+
+        # only restore the requested files
+        (self.ws / "stray.txt").write_text("x")
+        self.assertEqual(store.load("k2", self.ws, ["sub/main.py"]), {"res": 2})
+        self.assertTrue((self.ws / "stray.txt").exists())
+        self.assertEqual((self.ws / "sub" / "main.py").read_text(), "print(2)")
+
+        # k1 is used more recently, so k2 is evicted first
+        os.utime(self.root / "store" / "manifests" / "k2.json", (0, 0))
+        freed = store.gc(max_bytes=len("a,b\n" * 1000) + 10)
+        self.assertEqual(freed, len("print(2)"))
+        self.assertIsNone(store.load("k2", self.ws))
+        self.assertEqual(store.load("k1", self.ws), {"res": 1})
+
+        # a miss because of a missing blob leaves the workspace untouched
+        (self.ws / "stray.txt").write_text("x")
+        (self.ws / "sub" / "main.py").write_text("print(3)")
+        next(p for p in (self.root / "store" / "blobs").rglob("*") if p.stat().st_size == 8).unlink()
+        self.assertIsNone(store.load("k1", self.ws))
+        self.assertTrue((self.ws / "stray.txt").exists())
+        self.assertEqual((self.ws / "sub" / "main.py").read_text(), "print(3)")
+
+    def test_digest_cache(self):
+        cache = FileDigestCache(racy_window=0)
+        f = self.ws / "a.txt"
+        f.write_text("hello")
+        digest = cache.digest(f)
+        with patch.object(FileDigestCache, "hash_file", side_effect=AssertionError):
+            self.assertEqual(cache.digest(f), digest)  # served from the stat cache
+        time.sleep(0.01)
+        f.write_text("world")
+        self.assertNotEqual(cache.digest(f), digest)
+
+    def test_cached_run(self):
+        counter = self.root / "counter.txt"
+        (self.ws / "main.py").write_text(
+            f"open({str(counter)!r}, 'a').write('1')\nopen('out.txt', 'w').write('done')\nprint('finished')\n"
+        )
+        env = LocalEnv(
+            conf=LocalConf(
+                bin_path=str(Path(sys.executable).parent),
+                default_entry="python main.py",
+                enable_cache=True,
+                live_output=False,
+            )
+        )
+        with patch.object(RD_AGENT_SETTINGS, "pickle_cache_folder_path_str", str(self.root / "cache")):
+            res1 = env.run(local_path=str(self.ws))
+            (self.ws / "out.txt").unlink()
+            res2 = env.run(local_path=str(self.ws))
+        self.assertEqual(counter.read_text(), "1")  # the second run is served from the cache
+        self.assertEqual(res2.exit_code, 0)
+        self.assertEqual(res1.full_stdout, res2.full_stdout)
+        self.assertEqual((self.ws / "out.txt").read_text(), "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
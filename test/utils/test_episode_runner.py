@@ -0,0 +1,195 @@
+import json
+import re
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import pytest
+
+from rdagent.scenarios.rl.autorl_bench.benchmarks.alfworld.eval import (
+    alfworld_episode,
+    alfworld_run,
+)
+from rdagent.scenarios.rl.autorl_bench.benchmarks.webshop.eval import (
+    webshop_episode,
+    webshop_run,
+    webshop_streams,
+)
+from rdagent.scenarios.rl.autorl_bench.core.episodes import (
+    EpisodeRunner,
+    batch_llm_fn,
+    run_episode,
+)
+
+
+class _FakeShopEnv:
+    """Instruction `session` asks for item `session`; the buy is rewarded if the item was searched first"""
+
+    def __init__(self):
+        self.session, self.searched = None, False
+
+    def reset(self, session: int):
+        self.session, self.searched = session, False
+        return "WebShop [SEP] Search", None
+
+    def get_instruction_text(self) -> str:
+        return f"i want item {self.session}"
+
+    def get_available_actions(self) -> dict:
+        if not self.searched:
+            return {"has_search_bar": True, "clickables": []}
+        return {"has_search_bar": False, "clickables": [f"item {self.session}", "item 0"]}
+
+    def step(self, action: str):
+        if action == "crash[]":
+            raise RuntimeError("the fake shop crashed")
+        if action.startswith("search["):
+            self.searched = True
+            return f"results for {action[7:-1]}", 0.0, False, {}
+        if action == f"click[item {self.session}]" and self.searched:
+            return "Thank you for shopping", 1.0, True, {}
+        if action == "click[item 0]":
+            return "Thank you for shopping", 0.1, True, {}
+        return "Invalid action", 0.0, False, {}
+
+
+class _FakeLLM:
+    """Deterministic: searches the wanted item, then buys it (through `choose[` for the even ones); 7 and 13 fail"""
+
+    def __init__(self, latency: float = 0.0, per_prompt: float = 0.0):
+        self.latency, self.per_prompt = latency, per_prompt
+        self.calls: list[int] = []
+
+    def _answer(self, prompt: str) -> str:
+        item = int(re.search(r"Instruction: i want item (\d+)", prompt).group(1))
+        if "search[<your query>]" in prompt:
+            return f"search[item {item}]"
+        if item == 7:
+            return "click[item 0]"
+        if item == 13:
+            return "crash[]"
+        return f"Action: choose[item {item}]" if item % 2 == 0 else f"click[item {item}]"
+
+    def __call__(self, prompt: str, stop=None) -> str:
+        return self.generate([prompt], stop=stop)[0]
+
+    def generate(self, prompts: list[str], stop=None) -> list[str]:
+        self.calls.append(len(prompts))
+        time.sleep(self.latency + self.per_prompt * len(prompts))  # a batched forward pass on the GPU
+        return [self._answer(p) for p in prompts]
+
+
+class _FakeHouseEnv:
+    """An ALFWorld-like batch env of size 1: reaching the goal takes `goal` actions"""
+
+    def __init__(self, goal: int):
+        self.goal, self.done = goal, 0
+
+    def step(self, actions: list[str]):
+        self.done += actions[0] == "go"
+        won = self.done >= self.goal
+        return [f"You arrive at loc 1. step {self.done}"], [0], [won], {"won": [won]}
+
+
+@pytest.mark.offline
+class EpisodeRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.results = Path(self.tmp_dir.name) / "episodes.jsonl"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _sequential(self, sessions: list[int]) -> dict:
+        env, llm, results = _FakeShopEnv(), _FakeLLM(), {}
+        for session in sessions:
+            observation, _ = env.reset(session=session)
+            try:
+                results[session] = webshop_run(llm, env, env.get_instruction_text(), observation, max_steps=4)
+            except RuntimeError:
+                results[session] = None
+        return results
+
+    def test_batched_episodes_match_the_sequential_ones(self):
+        sessions = list(range(1, 21))
+        llm = _FakeLLM()
+        runner = EpisodeRunner(llm.generate, results_path=self.results)
+        records = runner.run(webshop_streams([_FakeShopEnv() for _ in range(4)], sessions, max_steps=4))
+
+        # every instruction runs once, with the same outcome as one at a time
+        self.assertEqual(sorted(int(r["key"]) for r in records), sessions)
+        batched = {int(r["key"]): None if "error" in r else (r["reward"], r["steps"], r["success"]) for r in records}
+        self.assertEqual(batched, self._sequential(sessions))
+        self.assertEqual(batched[7], (0.1, 2, False))
+        self.assertIn("the fake shop crashed", next(r["error"] for r in records if r["key"] == "13"))
+        self.assertEqual(records[0]["instruction"], "i want item 1")
+
+        # one generation per tick for all the active episodes
+        self.assertEqual(max(llm.calls), 4)
+        self.assertEqual(len(llm.calls), runner.stats["ticks"])
+        self.assertEqual((len(llm.calls), sum(llm.calls)), (10, 40))  # 2 steps per episode, 5 episodes per env
+
+        # the records are streamed to the disk as the episodes finish
+        lines = [json.loads(line) for line in self.results.read_text().splitlines()]
+        self.assertEqual(lines, json.loads(json.dumps(records)))
+
+    def test_generation_failures_and_empty_streams(self):
+        failures = iter([True, False])
+
+        def generate(prompts: list[str], stop=None) -> list[str]:
+            if next(failures, False):
+                raise ConnectionError("rate limited")
+            return ["go"] * len(prompts)
+
+        def episode(goal: int):
+            result = yield from alfworld_episode(_FakeHouseEnv(goal), "", "ob", max_steps=10)
+            return {"goal": goal, **result}
+
+        streams = [[(f"a{g}", episode(g)) for g in (1, 2)], [], [("b", episode(3))]]
+        records = EpisodeRunner(generate).run(streams)
+        self.assertEqual(
+            records,
+            [
+                {"key": "a1", "error": "ConnectionError: rate limited"},
+                {"key": "b", "error": "ConnectionError: rate limited"},
+                {"key": "a2", "goal": 2, "reward": True, "steps": 2},
+            ],
+        )
+
+    def test_sequential_helpers(self):
+        self.assertEqual(alfworld_run(lambda p, stop: "go", _FakeHouseEnv(3), "prompt\n", "ob"), (True, 3))
+        self.assertEqual(alfworld_run(lambda p, stop: "wait", _FakeHouseEnv(3), "", "ob", max_steps=5), (0, 5))
+
+        llm = _FakeLLM()
+        generate = batch_llm_fn(llm, max_workers=4)
+        prompts = [f"Instruction: i want item {i}\nsearch[<your query>]" for i in range(6)]
+        self.assertEqual(generate(prompts), [f"search[item {i}]" for i in range(6)])
+        self.assertEqual(llm.calls, [1] * 6)
+
+
+def benchmark(n_instructions: int = 64, concurrency: int = 8):
+    sessions = list(range(1, n_instructions + 1))
+    # a forward pass costs 50ms, plus 2ms per prompt in the batch
+    llm = _FakeLLM(latency=0.05, per_prompt=0.002)
+    start = time.time()
+    env = _FakeShopEnv()
+    for session in sessions:
+        observation, _ = env.reset(session=session)
+        try:
+            run_episode(webshop_episode(env, env.get_instruction_text(), observation, max_steps=4), llm, stop=["\n"])
+        except RuntimeError:
+            pass
+    print(f"{n_instructions} WebShop episodes one at a time: {time.time() - start:.2f}s, {len(llm.calls)} LLM calls")
+
+    llm = _FakeLLM(latency=0.05, per_prompt=0.002)
+    start = time.time()
+    envs = [_FakeShopEnv() for _ in range(concurrency)]
+    EpisodeRunner(llm.generate).run(webshop_streams(envs, sessions, max_steps=4))
+    print(
+        f"{n_instructions} WebShop episodes, {concurrency} at a time: {time.time() - start:.2f}s, {len(llm.calls)} LLM calls"
+    )
+
+
+if __name__ == "__main__":
+    benchmark()
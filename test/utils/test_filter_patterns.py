@@ -0,0 +1,117 @@
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.utils import filter_redundant_text
+from rdagent.utils.filter_patterns import FilterPatternLibrary
+
+NOISE_PATTERNS = [r"Epoch \d+ step \d+/\d+ - loss: \S+\n", r"(?:Warning|UserWarning): (\w+) is deprecated\n"]
+
+
+class _FakeAPIBackend:
+    """Counts the tokens as 4 characters each and suggests the noise patterns of the training logs"""
+
+    chat_token_limit = 100_000
+    n_tokenizations = 0
+    n_completions = 0
+
+    def build_messages_and_calculate_token(self, user_prompt: str, system_prompt: str) -> int:
+        type(self).n_tokenizations += 1
+        time.sleep(0.005)
+        return (len(user_prompt) + len(system_prompt)) // 4
+
+    def build_messages_and_create_chat_completion(self, user_prompt: str, **kwargs) -> str:
+        type(self).n_completions += 1
+        time.sleep(0.5)  # a round trip
+        return json.dumps({"needs_sub": True, "regex_patterns": [*NOISE_PATTERNS, "(unclosed"]})
+
+
+def _training_log(seed: int, n_steps: int = 2000) -> str:
+    lines = [f"Epoch {seed} step {i}/{n_steps} - loss: {1 / (i + 1):.4f}" for i in range(n_steps)]
+    lines += [f"UserWarning: {name}_{seed} is deprecated" for name in ("a", "b")]
+    return "\n".join([*lines, f"Epoch {seed}: val_auc=0.9{seed}", "done"]) + "\n"
+
+
+@pytest.mark.offline
+class FilterPatternLibraryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "patterns.json"
+        _FakeAPIBackend.n_tokenizations = _FakeAPIBackend.n_completions = 0
+        self.patches = [
+            patch("rdagent.oai.llm_utils.APIBackend", _FakeAPIBackend),
+            patch.object(RD_AGENT_SETTINGS, "stdout_filter_pattern_library", str(self.path)),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def test_learned_patterns_are_reused(self):
+        self.assertEqual(filter_redundant_text(_training_log(1)), "Epoch 1: val_auc=0.91\ndone")
+        self.assertEqual(_FakeAPIBackend.n_completions, 1)
+        # only the valid patterns are kept
+        stats = json.loads(self.path.read_text())["patterns"]
+        self.assertEqual(list(stats), NOISE_PATTERNS)
+
+        # the next logs of the same kind are filtered without asking the LLM; they are tokenized once, to check
+        # that they are over the budget, and not again once pruned
+        _FakeAPIBackend.n_tokenizations = 0
+        self.assertEqual(filter_redundant_text(_training_log(2)), "Epoch 2: val_auc=0.92\ndone")
+        self.assertEqual((_FakeAPIBackend.n_completions, _FakeAPIBackend.n_tokenizations), (1, 1))
+        _FakeAPIBackend.n_tokenizations = 0
+        stats = json.loads(self.path.read_text())["patterns"]
+        self.assertEqual([stats[p]["hits"] for p in NOISE_PATTERNS], [2000, 2])
+        self.assertEqual(stats[NOISE_PATTERNS[1]]["suggested"], 1)
+
+        # the short texts are not tokenized either, nor pruned by the patterns learned on other stdouts
+        self.assertEqual(filter_redundant_text("  a\n\n\nb\n"), "  a\nb")
+        short = "Epoch 3 step 1/2 - loss: 0.5\nUserWarning: x is deprecated\nTraceback: boom"
+        self.assertEqual(filter_redundant_text(short + "\n"), short)
+        self.assertEqual(_FakeAPIBackend.n_tokenizations, 0)
+        stats = json.loads(self.path.read_text())["patterns"]
+        self.assertEqual([stats[p]["hits"] for p in NOISE_PATTERNS], [2000, 2])
+
+    def test_library(self):
+        lib = FilterPatternLibrary(self.path, max_patterns=3)
+        other = FilterPatternLibrary(self.path, max_patterns=3)  # e.g. in another process
+        lib.learn([r"(a)(b)", r"(\d)\1", r"x+", r".*", r"\s*"])  # the ones matching the empty string are not kept
+        self.assertEqual(other.apply("ab x 11 12 ab"), "   12 ")
+        self.assertEqual(
+            {p: s["hits"] for p, s in json.loads(self.path.read_text())["patterns"].items()},
+            {r"(a)(b)": 2, r"(\d)\1": 1, r"x+": 1},
+        )
+        # the statistics of both processes are kept; the least recently used patterns are dropped
+        self.assertEqual(lib.apply("x"), "")
+        lib.learn([r"y"])
+        self.assertEqual(lib.apply("ab y 11"), "  11")
+        stats = json.loads(self.path.read_text())["patterns"]
+        self.assertEqual({p: s["hits"] for p, s in stats.items()}, {r"(a)(b)": 3, r"x+": 2, r"y": 1})
+
+
+def benchmark(n_logs: int = 10):
+    with tempfile.TemporaryDirectory() as tmp, patch("rdagent.oai.llm_utils.APIBackend", _FakeAPIBackend):
+        for path in ("", str(Path(tmp) / "patterns.json")):
+            _FakeAPIBackend.n_tokenizations = _FakeAPIBackend.n_completions = 0
+            with patch.object(RD_AGENT_SETTINGS, "stdout_filter_pattern_library", path):
+                start = time.time()
+                for seed in range(n_logs):
+                    filter_redundant_text(_training_log(seed))
+            print(
+                f"{n_logs} training logs {'with' if path else 'without'} the pattern library: "
+                f"{time.time() - start:.2f}s, {_FakeAPIBackend.n_completions} LLM calls, "
+                f"{_FakeAPIBackend.n_tokenizations} tokenizations"
+            )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,204 @@
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.scenarios.finetune.scen import utils
+from rdagent.scenarios.finetune.scen.utils import (
+    FinetuneDatasetDescriptor,
+    _compute_column_stats,
+    _iter_json_records,
+    _sample_records,
+)
+
+
+class _FakeEncoding:
+    """One token per whitespace-separated word (the tiktoken files can't be downloaded offline)"""
+
+    def encode(self, text: str) -> list[str]:
+        return text.split()
+
+    def encode_batch(self, texts: list[str]) -> list[list[str]]:
+        return [t.split() for t in texts]
+
+
+def _records(n: int, start: int = 0) -> list[dict]:
+    return [
+        {"id": i, "instruction": " ".join(["word"] * (i % 7 + 1)), "output": "" if i % 5 == 0 else f'["{i}\\" ]'}
+        for i in range(start, start + n)
+    ]
+
+
+def _write_dataset(root: Path, n: int) -> list[Path]:
+    """The same number of records in each format"""
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "a.json").write_text(json.dumps(_records(n, 0), indent=1))
+    (root / "b.jsonl").write_text("\n".join(json.dumps(r) for r in _records(n, n)) + "\n\n  \n")
+    pd.DataFrame(_records(n, 2 * n)).to_csv(root / "c.csv", index=False)
+    pd.DataFrame(_records(n, 3 * n)).to_parquet(root / "d.parquet", index=False, row_group_size=max(n // 4, 1))
+    return [root / name for name in ("a.json", "b.jsonl", "c.csv", "d.parquet")]
+
+
+@pytest.mark.offline
+class FinetuneDatasetStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.patches = [
+            patch.object(RD_AGENT_SETTINGS, "pickle_cache_folder_path_str", str(self.root / "pickle_cache")),
+            patch.object(utils, "_get_encoding", lambda: _FakeEncoding()),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def test_streaming_json(self):
+        path = self.root / "data.json"
+        data = [*_records(50), [1, {"a": "]"}], 12345, "x", None, 1.5e10]
+        path.write_text(json.dumps(data))
+        with patch.object(utils, "STATS_READ_CHUNK_BYTES", 7):  # the elements and numbers span the chunks
+            self.assertEqual(list(_iter_json_records(path)), data)
+            path.write_text(' \n{"a": [1, 2]} ')
+            self.assertEqual(list(_iter_json_records(path)), [{"a": [1, 2]}])
+            path.write_text(" [ ] ")
+            self.assertEqual(list(_iter_json_records(path)), [])
+            path.write_text("[1, 2 3]")
+            with self.assertRaises(json.JSONDecodeError):
+                list(_iter_json_records(path))
+
+    def test_counts_and_samples(self):
+        files = _write_dataset(self.root / "ds", 200)
+        descriptor = FinetuneDatasetDescriptor()
+        self.assertEqual([descriptor._count_samples_in_file(f) for f in files], [200] * 4)
+
+        # all the records are kept in order when they fit
+        samples, total = _sample_records(files, max_samples=1000)
+        self.assertEqual(total, 800)
+        self.assertEqual([r["id"] for r in samples], list(range(800)))
+        self.assertEqual(samples[2]["output"], '["2\\" ]')
+
+        # otherwise a uniform sample across the files, with only the sampled records decoded
+        with patch.object(utils.json, "loads", wraps=json.loads) as loads:
+            samples, total = _sample_records(files, max_samples=100)
+        self.assertEqual((len(samples), total), (100, 800))
+        ids = [r["id"] for r in samples]
+        self.assertEqual(len(set(ids)), 100)
+        self.assertEqual(samples, _sample_records(files, max_samples=100)[0])  # deterministic
+        self.assertTrue(all(any(lo <= i < lo + 200 for i in ids) for lo in range(0, 800, 200)))
+        self.assertLess(loads.call_count, 200)
+
+        # the descriptions read the first rows and the footers only
+        with patch.object(pd, "read_parquet") as read_parquet:
+            desc = descriptor.describe_file_parquet(files[3])
+        read_parquet.assert_not_called()
+        self.assertEqual((desc["shape"], desc["columns"]), ((200, 3), ["id", "instruction", "output"]))
+        self.assertEqual(desc["samples"][0]["id"], 600)
+        self.assertEqual(descriptor.describe_file_csv(files[2])["shape"], (200, 3))
+        self.assertEqual(descriptor.describe_file_json(files[0])["samples"], _records(3))
+
+    def test_column_stats(self):
+        data = _records(300) + [{"id": 0}, "not a record"]
+        expected = _compute_column_stats(data)
+        self.assertEqual((expected["instruction"]["min_tokens"], expected["instruction"]["max_tokens"]), (1, 7))
+        self.assertEqual((expected["output"]["empty_count"], expected["output"]["max_tokens"]), (61, 2))
+        with patch.object(utils, "STATS_PARALLEL_MIN_TEXTS", 10):
+            self.assertEqual(_compute_column_stats(data, max_workers=2), expected)
+
+    def test_cached_stats(self):
+        dataset = self.root / "ds"
+        files = _write_dataset(dataset, 100)
+        with patch.object(utils, "_iter_record_batches", wraps=utils._iter_record_batches) as read:
+            info = FinetuneDatasetDescriptor().analyze_dataset(dataset)
+            self.assertEqual((info["total_samples"], info["tasks"]["_root"]["sample_count"]), (400, 400))
+            self.assertEqual(read.call_count, 4)
+            self.assertEqual(FinetuneDatasetDescriptor().analyze_dataset(dataset)["tasks"], info["tasks"])
+            self.assertEqual(read.call_count, 4)
+
+            # a modified file invalidates the statistics
+            (files[1]).write_text(json.dumps({"id": 1, "instruction": "a b"}) + "\n")
+            info = FinetuneDatasetDescriptor().analyze_dataset(dataset)
+            self.assertEqual(info["total_samples"], 301)
+            self.assertEqual(read.call_count, 8)
+
+
+def _legacy_stats(files: list[Path], max_samples: int = 50000) -> tuple[int, list]:
+    """Counting by loading each file and taking the first records, as the descriptor did before"""
+    total, data = 0, []
+    for f in files:
+        if f.suffix == ".json":
+            total += len(json.loads(f.read_text()))
+        elif f.suffix == ".jsonl":
+            with open(f, encoding="utf-8") as fh:
+                total += sum(1 for line in fh if line.strip())
+        else:
+            total += len(pd.read_csv(f) if f.suffix == ".csv" else pd.read_parquet(f))
+    for f in files:
+        if f.suffix == ".json":
+            data.extend(json.loads(f.read_text())[: max_samples - len(data)])
+        elif f.suffix == ".jsonl":
+            with open(f, encoding="utf-8") as fh:
+                for line in fh:
+                    if len(data) >= max_samples:
+                        break
+                    if line.strip():
+                        data.append(json.loads(line))
+        elif f.suffix == ".csv":
+            data.extend(pd.read_csv(f, nrows=max_samples - len(data)).to_dict("records"))
+        else:
+            data.extend(pd.read_parquet(f).head(max_samples - len(data)).to_dict("records"))
+    return total, data
+
+
+def _measure(fn, *args) -> tuple[float, float]:
+    """The seconds and the peak memory (MB) above the baseline of `fn(*args)`, run in a forked process"""
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+
+    def _run():
+        base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.time()
+        fn(*args)
+        queue.put((time.time() - start, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024))
+
+    process = ctx.Process(target=_run)
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _streaming_stats(folder: Path) -> None:
+    FinetuneDatasetDescriptor()._generate_stats(folder, include_column_stats=True)
+
+
+def benchmark(n: int = 500_000):
+    with tempfile.TemporaryDirectory() as tmp, patch.object(utils, "_get_encoding", lambda: _FakeEncoding()):
+        files = _write_dataset(Path(tmp) / "ds", n)
+        size_mb = sum(f.stat().st_size for f in files) / 2**20
+        with patch.object(RD_AGENT_SETTINGS, "pickle_cache_folder_path_str", str(Path(tmp) / "pickle_cache")):
+            for name, fn in [
+                ("loading the files", lambda: _compute_column_stats(_legacy_stats(files)[1], max_workers=1)),
+                ("streaming", lambda: _streaming_stats(files[0].parent)),
+            ]:
+                seconds, peak_mb = _measure(fn)
+                print(f"{4 * n} records ({size_mb:.0f} MB), {name}: {seconds:.2f}s, peak memory +{peak_mb:.0f} MB")
+            _streaming_stats(files[0].parent)
+            start = time.time()
+            _streaming_stats(files[0].parent)
+            print(f"{4 * n} records ({size_mb:.0f} MB), cached: {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,149 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.scenarios.rl.autorl_bench.core import server as server_module
+from rdagent.scenarios.rl.autorl_bench.core.server import GradingServer, init_server
+from rdagent.scenarios.rl.autorl_bench.core.utils import read_scores
+
+STUB_EVALUATOR = "rdagent.scenarios.rl.autorl_bench.test.stub_evaluator.StubEvaluator"
+
+
+def _model(workspace: Path, name: str, **stub) -> str:
+    model_dir = workspace / "output" / name
+    model_dir.mkdir(parents=True, exist_ok=True)
+    (model_dir / "config.json").write_text("{}")
+    (model_dir / "stub.json").write_text(json.dumps(stub))
+    return str(model_dir)
+
+
+def _overlap(a: dict, b: dict) -> bool:
+    a, b = a["accuracy_summary"], b["accuracy_summary"]
+    return a["start"] < b["end"] and b["start"] < a["end"]
+
+
+@pytest.mark.offline
+class GradingServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.workspace = Path(self.tmp_dir.name)
+        self.servers: list[GradingServer] = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+        self.tmp_dir.cleanup()
+
+    def _server(self, **kwargs) -> GradingServer:
+        server = GradingServer("gsm8k", "test-model", self.workspace, evaluator_class=STUB_EVALUATOR, **kwargs)
+        self.servers.append(server)
+        return server
+
+    def test_per_device_workers(self):
+        with patch.dict(os.environ, {"CUDA_VISIBLE_DEVICES": "0,1"}):
+            server = self._server()
+        start = time.time()
+        jobs = [server.enqueue(_model(self.workspace, f"v{i}", score=i, sleep=1.0)) for i in range(2)]
+        jobs.append(server.enqueue(_model(self.workspace, "v2", score=2), gpu="1,0"))
+        self.assertLess(time.time() - start, 0.5)  # the submissions do not wait for the evaluations
+        self.assertEqual([job["status"] for job in jobs], ["running", "running", "queued"])
+        self.assertEqual(jobs[2]["queue_position"], 0)
+
+        results = [server.get_job(job["job_id"], wait=None) for job in jobs]
+        self.assertEqual([r["status"] for r in results], ["done"] * 3)
+        # the jobs on distinct GPUs run concurrently in workers seeing their own devices
+        self.assertTrue(_overlap(results[0], results[1]))
+        self.assertEqual(
+            [(r["accuracy_summary"]["cuda_visible_devices"], r["accuracy_summary"]["gpu_count"]) for r in results],
+            [("0", 1), ("1", 1), ("0,1", 2)],
+        )
+        self.assertFalse(_overlap(results[1], results[2]))
+        self.assertEqual(os.environ.get("CUDA_VISIBLE_DEVICES"), None)
+        self.assertEqual(results[2]["best"]["score"], 2)
+        # appended in the order of completion, and jobs 0 and 1 run concurrently
+        self.assertEqual(sorted(s["score"] for s in read_scores(self.workspace)), [0, 1, 2])
+
+    def test_cache_and_failures(self):
+        server = self._server(cpu_workers=1)
+        model_a = _model(self.workspace, "a", score=10.0, sleep=0.5)
+        model_b = _model(self.workspace, "b", score=20.0, sleep=0.5)
+        first = server.enqueue(model_a)
+        self.assertEqual(server.enqueue(model_a)["job_id"], first["job_id"])  # merged while queued
+        results = [server.submit(model_a), server.submit(model_b)]
+        self.assertFalse(_overlap(*results))  # a single CPU worker
+        self.assertEqual(server.submit(model_a)["submission_id"], 1)  # cached
+
+        failing = _model(self.workspace, "c", error="GPU OOM")
+        failed = server.submit(failing)
+        self.assertEqual((failed["status"], failed["error"]), ("failed", "GPU OOM"))
+        self.assertNotEqual(server.submit(failing)["job_id"], failed["job_id"])  # the failures are not cached
+        self.assertEqual([s["submission_id"] for s in server.load_scores()], [1, 2, 3, 4])
+
+        with self.assertRaises(ValueError):
+            server.enqueue("/etc")
+
+        # a job failing before its worker starts is finished and frees its worker
+        jobs_dir = server.jobs_dir
+        (self.workspace / "not_a_dir").write_text("")
+        server.jobs_dir = self.workspace / "not_a_dir" / "jobs"
+        failed = server.submit(_model(self.workspace, "d", score=30.0), timeout=30)
+        self.assertEqual(failed["status"], "failed")
+        self.assertIn("Failed to run the grading worker", failed["error"])
+        server.jobs_dir = jobs_dir
+        self.assertEqual(server.submit(_model(self.workspace, "e", score=40.0))["score"], 40.0)
+
+    def test_http_api(self):
+        server = init_server("gsm8k", "test-model", str(self.workspace), evaluator_class=STUB_EVALUATOR)
+        self.servers.append(server)
+        client = server_module.app.test_client()
+        resp = client.post("/submit", json={"model_path": _model(self.workspace, "v1", score=42.0, sleep=0.5)})
+        self.assertEqual(resp.status_code, 202)
+        job_id = resp.get_json()["job_id"]
+        self.assertEqual(client.get(f"/jobs/{job_id}").status_code, 202)
+
+        resp = client.get(f"/jobs/{job_id}?wait=60")  # long-poll
+        self.assertEqual((resp.status_code, resp.get_json()["score"]), (200, 42.0))
+        resp = client.post("/submit", json={"model_path": "output/v1", "wait": 60})
+        self.assertEqual((resp.status_code, resp.get_json()["job_id"]), (200, job_id))
+        self.assertEqual([job["job_id"] for job in client.get("/jobs").get_json()], [job_id])
+        self.assertEqual(client.get("/health").get_json()["jobs"], {"done": 1})
+        self.assertEqual(client.get("/jobs/unknown").status_code, 404)
+        self.assertEqual(client.post("/submit", json={"model_path": "../x"}).status_code, 400)
+
+
+def benchmark(n_jobs: int = 8, eval_seconds: float = 2.0):
+    with tempfile.TemporaryDirectory() as tmp, patch.dict(os.environ, {"CUDA_VISIBLE_DEVICES": "0,1,2,3"}):
+        workspace = Path(tmp)
+        server = GradingServer("gsm8k", "test-model", workspace, evaluator_class=STUB_EVALUATOR)
+        models = [_model(workspace, f"v{i}", score=i, sleep=eval_seconds) for i in range(n_jobs)]
+        start = time.time()
+        submit_seconds = []
+
+        def _submit(model_path: str):
+            t = time.time()
+            job = server.enqueue(model_path)
+            submit_seconds.append(time.time() - t)
+            server.get_job(job["job_id"], wait=None)
+
+        threads = [threading.Thread(target=_submit, args=(m,)) for m in models]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        print(
+            f"{n_jobs} submissions of {eval_seconds}s evaluations on 4 GPUs: {time.time() - start:.2f}s "
+            f"(one at a time: >= {n_jobs * eval_seconds:.0f}s), "
+            f"a submission returns in {max(submit_seconds) * 1000:.1f}ms"
+        )
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark()
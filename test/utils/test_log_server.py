@@ -0,0 +1,114 @@
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.core.proposal import Hypothesis
+from rdagent.log.server import app as server
+from rdagent.log.storage import FileStorage
+from rdagent.log.ui.conf import UI_SETTING
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _log_hypotheses(path: Path, start: int, n: int) -> None:
+    storage = FileStorage(path)
+    for i in range(start, start + n):
+        h = Hypothesis(f"hypothesis {i}", "reason", "", "", "", "")
+        storage.log(h, f"Loop_{i}.r.hypothesis generation.1", T0 + timedelta(minutes=i))
+
+
+@pytest.mark.offline
+class LogServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.settings = patch.multiple(
+            UI_SETTING, trace_folder=str(self.root / "traces"), web_message_cache_folder=str(self.root / "cache")
+        )
+        self.settings.start()
+        self.log_folder = patch.object(server, "log_folder_path", self.root / "traces")
+        self.log_folder.start()
+        server.rdagent_processes.clear()
+        self.client = server.app.test_client()
+
+    def tearDown(self):
+        server.rdagent_processes.clear()
+        self.log_folder.stop()
+        self.settings.stop()
+        self.tmp_dir.cleanup()
+
+    def _trace(self, **kwargs):
+        resp = self.client.post("/trace", json={"id": "Data Science/t1", **kwargs})
+        self.assertEqual(resp.status_code, 200)
+        return resp.get_json()
+
+    def test_lazy_cached_loading(self):
+        trace_dir = self.root / "traces" / "Data Science" / "t1"
+        _log_hypotheses(trace_dir, 0, 5)
+        self.assertEqual(server._collect_existing_trace_ids(self.root / "traces"), ["Data Science/t1"])
+        self.assertEqual(server.rdagent_processes, {})  # nothing is loaded before the first request
+
+        msgs = self._trace(all=True)
+        self.assertEqual([m["content"]["hypothesis"] for m in msgs[:-1]], [f"hypothesis {i}" for i in range(5)])
+        self.assertEqual(msgs[-1]["tag"], "END")
+        self.assertEqual(self._trace(all=True), [])
+
+        # after a restart, only the objects logged since are unpickled
+        server.rdagent_processes.clear()
+        _log_hypotheses(trace_dir, 5, 2)
+        with patch.object(FileStorage, "load_msg", autospec=True, side_effect=FileStorage.load_msg) as load_msg:
+            msgs = self._trace(all=True)
+            self.assertEqual(load_msg.call_count, 2)
+        self.assertEqual([m["content"]["hypothesis"] for m in msgs[:-1]], [f"hypothesis {i}" for i in range(7)])
+
+        # paging by offset
+        page = self._trace(offset=3, limit=2)
+        self.assertEqual([m["content"]["hypothesis"] for m in page["messages"]], ["hypothesis 3", "hypothesis 4"])
+        self.assertEqual((page["next_offset"], page["total"]), (5, 8))
+        self.assertEqual(len(self._trace(offset=6)["messages"]), 2)
+
+        # the cache is converted again when the logs are truncated
+        FileStorage(trace_dir).truncate(T0 + timedelta(minutes=2, seconds=30))
+        server.rdagent_processes.clear()
+        self.assertEqual(len(self._trace(all=True)), 3 + 1)
+
+    def test_interrupted_sync(self):
+        trace_dir = self.root / "traces" / "Data Science" / "t1"
+        _log_hypotheses(trace_dir, 0, 3)
+        cache = server.TraceMessageCache(trace_dir)
+        cache.sync()
+        with cache.path.open("ab") as f:
+            f.write(b'{"tag": "partial"')  # appended without its meta
+        _log_hypotheses(trace_dir, 3, 1)
+        cache = server.TraceMessageCache(trace_dir)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.sync(), 1)
+        self.assertEqual(cache.read(2, 10)[-1]["content"]["hypothesis"], "hypothesis 3")
+
+
+def benchmark(n_traces: int = 20, n_msgs: int = 500):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for t in range(n_traces):
+            _log_hypotheses(root / "traces" / "Data Science" / f"t{t}", 0, n_msgs)
+        with (
+            patch.multiple(UI_SETTING, trace_folder=str(root / "traces"), web_message_cache_folder=str(root / "cache")),
+            patch.object(server, "log_folder_path", root / "traces"),
+        ):
+            client = server.app.test_client()
+            for name in ("first load", "load after a restart"):
+                server.rdagent_processes.clear()
+                start = time.time()
+                for trace_id in server._collect_existing_trace_ids(root / "traces"):
+                    client.post("/trace", json={"id": trace_id, "offset": 0, "limit": 50})
+                print(f"{name} of {n_traces} traces of {n_msgs} messages: {time.time() - start:.2f}s")
+            server.rdagent_processes.clear()
+
+
+if __name__ == "__main__":
+    benchmark()
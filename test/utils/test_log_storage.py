@@ -0,0 +1,98 @@
+import pickle
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from rdagent.log.storage import FileStorage
+
+
+@pytest.mark.offline
+class FileStorageIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "log"
+        self.t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _log_all(self, fs: FileStorage) -> None:
+        # logged out of order
+        fs.log("c", tag="Loop_1.coding.100", timestamp=self.t0 + timedelta(seconds=3))
+        fs.log("a", tag="Loop_0.coding.100", timestamp=self.t0 + timedelta(seconds=1))
+        fs.log("b", tag="Loop_0.running.100-101", timestamp=self.t0 + timedelta(seconds=2))
+        fs.log({"x": 1}, tag="Loop_0.coding.100", timestamp=self.t0, save_type="json")
+
+    def test_iter_and_truncate(self):
+        fs = FileStorage(self.path)
+        self._log_all(fs)
+        msgs = list(fs.iter_msg())
+        self.assertEqual([m.content for m in msgs], ["a", "b", "c"])
+        self.assertEqual(
+            [(m.tag, m.pid_trace) for m in msgs[:2]], [("Loop_0.coding", "100"), ("Loop_0.running", "100-101")]
+        )
+        self.assertEqual([m.content for m in fs.iter_msg(tag="coding")], ["a", "c"])
+        self.assertEqual([m.content for m in fs.iter_msg(tag="Loop_0")], ["a", "b"])
+        self.assertEqual([m.content for m in fs.iter_msg(start=self.t0 + timedelta(seconds=2))], ["b", "c"])
+        self.assertEqual([m.content for m in fs.iter_msg(pattern="Loop_1/**/*.pkl")], ["c"])
+
+        fs.truncate(self.t0 + timedelta(seconds=1))
+        self.assertEqual([m.content for m in FileStorage(self.path).iter_msg()], ["a"])
+        self.assertFalse((self.path / "Loop_1").exists())
+
+    def test_folder_without_index(self):
+        self._log_all(FileStorage(self.path))
+        (self.path / FileStorage.INDEX_NAME).unlink()
+        fs = FileStorage(self.path)
+        fs.log("d", tag="Loop_2.coding.100", timestamp=self.t0 + timedelta(seconds=4))
+        self.assertEqual([m.content for m in fs.iter_msg()], ["a", "b", "c", "d"])
+
+    def test_lazy_loading(self):
+        fs = FileStorage(self.path)
+        self._log_all(fs)
+        it = fs.iter_msg()
+        self.assertEqual(next(it).content, "a")
+        # the payloads are loaded when their messages are yielded
+        (self.path / "Loop_1").rename(self.path / "moved")
+        self.assertEqual([m.content for m in it], ["b"])
+
+
+def benchmark(n: int = 20_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        fs = FileStorage(tmp)
+        t0 = datetime.now(timezone.utc)
+        payload = "x" * 2_000
+        for i in range(n):
+            fs.log(
+                payload,
+                tag=f"Loop_{i // 100}.{['coding', 'running', 'feedback'][i % 3]}.100",
+                timestamp=t0 + timedelta(microseconds=i),
+            )
+
+        # the previous implementation: list, unpickle everything, then sort
+        start = time.time()
+        msgs = []
+        for f in Path(tmp).glob("**/*.pkl"):
+            with f.open("rb") as fp:
+                content = pickle.load(fp)
+            msgs.append((datetime.strptime(f.stem, "%Y-%m-%d_%H-%M-%S-%f").replace(tzinfo=timezone.utc), content))
+        msgs.sort(key=lambda x: x[0])
+        print(f"glob + unpickle all {n} messages: {time.time() - start:.2f}s")
+
+        start = time.time()
+        first = next(fs.iter_msg())
+        print(f"first message from the index:    {time.time() - start:.2f}s")
+        start = time.time()
+        selected = list(fs.iter_msg(tag="Loop_3"))
+        print(f"{len(selected)} messages of one loop:        {time.time() - start:.2f}s")
+        start = time.time()
+        n_all = sum(1 for _ in fs.iter_msg())
+        print(f"all {n_all} messages from the index:  {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,100 @@
+import asyncio
+import pickle
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.utils.workflow import LoopBase, LoopMeta
+from rdagent.utils.workflow.checkpoint import BLOB_LOG_NAME, load_session_obj
+
+
+class DummyLoop(LoopBase, metaclass=LoopMeta):
+    def __init__(self, session_folder: Path, code_size: int = 10_000) -> None:
+        super().__init__()
+        self.session_folder = session_folder
+        self.code_size = code_size
+        self.hist: list[dict] = []
+
+    def propose(self, prev_out):
+        li = prev_out[self.LOOP_IDX_KEY]
+        return {"code": f"# loop {li}\n" + "x = 1\n" * (self.code_size // 6), "shared": "y = 2\n" * 1000}
+
+    def record(self, prev_out):
+        self.hist.append(prev_out["propose"])
+
+
+@pytest.mark.offline
+class LoopCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.session_folder = Path(self.tmp_dir.name) / "__session__"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_dump_resume_and_compact(self):
+        loop = DummyLoop(self.session_folder)
+        asyncio.run(loop.run(loop_n=3))
+        log_size = (self.session_folder / BLOB_LOG_NAME).stat().st_size
+        # each step file only keeps the structure; the contents are written once
+        self.assertTrue(all(p.stat().st_size < 2_000 for p in self.session_folder.glob("*/*_*")))
+        self.assertLess(log_size, 4 * 12_000)
+
+        loaded = DummyLoop.load(self.session_folder, replace_timer=False)
+        self.assertEqual(loaded.hist, loop.hist)
+        self.assertEqual(dict(loaded.step_idx), {0: 2, 1: 2, 2: 2})
+        self.assertIs(loaded.hist[0]["shared"], loaded.hist[1]["shared"])
+
+        # removing the latest loops makes their contents garbage
+        loaded.truncate_session_folder(0, 1)
+        self.assertLess((self.session_folder / BLOB_LOG_NAME).stat().st_size, log_size)
+        self.assertEqual(DummyLoop.load(self.session_folder, replace_timer=False).hist, loop.hist[:1])
+
+    def test_plain_pickle_format(self):
+        loop = DummyLoop(self.session_folder)
+        with patch.object(RD_AGENT_SETTINGS, "session_incremental_checkpoint", False):
+            loop.dump(self.session_folder / "0" / "0_propose")
+        with (self.session_folder / "0" / "0_propose").open("rb") as f:
+            self.assertIsInstance(pickle.load(f), DummyLoop)
+        self.assertIsInstance(load_session_obj(self.session_folder / "0" / "0_propose"), DummyLoop)
+
+
+def benchmark(n_loops: int = 300, code_size: int = 20_000):
+    """Dump after every step of a session of `n_loops` loops and resume from the last step."""
+    for incremental in [False, True]:
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            patch.object(RD_AGENT_SETTINGS, "session_incremental_checkpoint", incremental),
+        ):
+            session_folder = Path(tmp) / "__session__"
+            loop = DummyLoop(session_folder, code_size=code_size)
+            dump_time = 0.0
+            for li in range(n_loops):
+                loop.loop_prev_out[li][loop.LOOP_IDX_KEY] = li
+                loop.loop_prev_out[li]["propose"] = loop.propose(loop.loop_prev_out[li])
+                loop.record(loop.loop_prev_out[li])
+                loop.loop_prev_out.pop(li)
+                for si, name in enumerate(loop.steps):
+                    start = time.time()
+                    loop.dump(session_folder / str(li) / f"{si}_{name}")
+                    dump_time += time.time() - start
+            size = sum(p.stat().st_size for p in session_folder.rglob("*") if p.is_file())
+            last_step = session_folder / str(n_loops - 1) / f"1_{loop.steps[1]}"
+            start = time.time()
+            loaded = load_session_obj(last_step)
+            resume_time = time.time() - start
+            assert len(loaded.hist) == n_loops
+            print(
+                f"{'incremental' if incremental else 'plain pickle'}: dump {dump_time:.2f}s in total "
+                f"(last step {last_step.stat().st_size / 2**20:.2f} MiB), session folder {size / 2**20:.1f} MiB, "
+                f"resume {resume_time:.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    benchmark()
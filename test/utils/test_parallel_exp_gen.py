@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.app.data_science.conf import DS_RD_SETTING
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.core.proposal import ExperimentFeedback
+from rdagent.scenarios.data_science.experiment.experiment import DSExperiment
+from rdagent.scenarios.data_science.proposal.exp_gen.base import DSHypothesis, DSTrace
+from rdagent.scenarios.data_science.proposal.exp_gen.router import (
+    ParallelMultiTraceExpGen,
+)
+from rdagent.scenarios.data_science.proposal.exp_gen.trace_scheduler import (
+    RoundRobinScheduler,
+)
+
+
+def _make_trace(n_roots: int) -> DSTrace:
+    trace = DSTrace(scen=SimpleNamespace(competition="aerial-cactus-identification"))
+    for i in range(n_roots):
+        trace.set_current_selection(trace.NEW_ROOT)
+        exp = DSExperiment(pending_tasks_list=[], hypothesis=DSHypothesis("Model", f"root {i}"))
+        trace.sync_dag_parent_and_hist((exp, ExperimentFeedback("", decision=True)), i)
+    return trace
+
+
+class _FakeExpGen:
+    """Propose `hypotheses[leaf]` after `delay` seconds, checking the selection of the trace it is given"""
+
+    def __init__(self, hypotheses: dict[int, str], delay: float = 0.2) -> None:
+        self.hypotheses = hypotheses
+        self.delay = delay
+        self.n_calls = 0
+        self.lock = threading.Lock()
+
+    def gen(self, trace: DSTrace, plan=None) -> DSExperiment:
+        with self.lock:
+            self.n_calls += 1
+        leaf = trace.get_current_selection()[0]
+        time.sleep(self.delay)
+        assert trace.get_current_selection() == (leaf,)  # not changed by the other proposals
+        return DSExperiment(pending_tasks_list=[], hypothesis=DSHypothesis("Model", self.hypotheses[leaf]))
+
+
+def _make_scheduler(trace: DSTrace, max_trace_num: int) -> RoundRobinScheduler:
+    scheduler = RoundRobinScheduler(max_trace_num)
+    scheduler.rec_commit_idx = len(trace.hist)  # the nodes of the trace were not selected by this scheduler
+    return scheduler
+
+
+def _make_exp_gen(exp_gen: _FakeExpGen, trace: DSTrace, max_trace_num: int) -> ParallelMultiTraceExpGen:
+    gen = ParallelMultiTraceExpGen.__new__(ParallelMultiTraceExpGen)
+    gen.exp_gen = gen.draft_exp_gen = exp_gen
+    gen.trace_scheduler = _make_scheduler(trace, max_trace_num)
+    gen.queued_exps = []
+    return gen
+
+
+@pytest.mark.offline
+class ParallelExpGenTest(unittest.TestCase):
+    def setUp(self):
+        self.settings = [
+            patch.object(RD_AGENT_SETTINGS, "step_semaphore", 4),
+            patch.multiple(DS_RD_SETTING, exp_gen_batch_size=4, enable_planner=False, merge_hours=0),
+        ]
+        for p in self.settings:
+            p.start()
+
+    def tearDown(self):
+        for p in self.settings:
+            p.stop()
+
+    def test_next_batch(self):
+        trace = _make_trace(3)
+        scheduler = _make_scheduler(trace, max_trace_num=3)
+        selections = asyncio.run(scheduler.next_batch(trace, 5))
+        self.assertEqual(selections, [(0,), (1,), (2,)])
+        scheduler.release(trace, (1,))
+        self.assertEqual(asyncio.run(scheduler.next(trace)), (1,))
+
+        # new sub-traces are not limited to one per batch
+        scheduler = _make_scheduler(trace, max_trace_num=5)
+        self.assertEqual(asyncio.run(scheduler.next_batch(trace, 3)), [trace.NEW_ROOT, trace.NEW_ROOT, (0,)])
+
+    def test_concurrent_proposals(self):
+        trace = _make_trace(3)
+        fake = _FakeExpGen({0: "use a larger model", 1: "Use a larger model!", 2: "add features"})
+        gen = _make_exp_gen(fake, trace, max_trace_num=3)
+        loop = SimpleNamespace(loop_idx=3, get_unfinished_loop_cnt=lambda li: li - 3)
+
+        start = time.time()
+        exp = asyncio.run(gen.async_gen(trace, loop))
+        self.assertLess(time.time() - start, 2 * fake.delay)  # proposed concurrently
+        self.assertEqual(exp.local_selection, (0,))
+        self.assertEqual(trace.get_current_selection(), (0,))
+        # the near-duplicate proposal is dropped and its leaf released
+        self.assertEqual([e.local_selection for e in gen.queued_exps], [(2,)])
+        self.assertEqual(gen.trace_scheduler.uncommited_rec_status[1], 0)
+
+        # the queued proposal is used by the next loop
+        loop.loop_idx = 4
+        exp = asyncio.run(gen.async_gen(trace, loop))
+        self.assertEqual((exp.local_selection, fake.n_calls), ((2,), 3))
+        self.assertEqual(set(trace.uncommitted_experiments), {3, 4})
+
+
+def benchmark(n_leaves: int = 4, delay: float = 1.0):
+    with (
+        patch.object(RD_AGENT_SETTINGS, "step_semaphore", n_leaves),
+        patch.multiple(DS_RD_SETTING, enable_planner=False, merge_hours=0),
+    ):
+        for batch_size in (1, n_leaves):
+            trace = _make_trace(n_leaves)
+            fake = _FakeExpGen({i: f"hypothesis on leaf {i}" for i in range(n_leaves)}, delay=delay)
+            gen = _make_exp_gen(fake, trace, max_trace_num=n_leaves)
+            start = time.time()
+            with patch.object(DS_RD_SETTING, "exp_gen_batch_size", batch_size):
+                for li in range(n_leaves):
+                    loop = SimpleNamespace(loop_idx=n_leaves + li, get_unfinished_loop_cnt=lambda li: li - n_leaves)
+                    asyncio.run(gen.async_gen(trace, loop))
+            print(
+                f"{n_leaves} proposals of {delay:.1f}s with exp_gen_batch_size={batch_size}: {time.time() - start:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    benchmark()
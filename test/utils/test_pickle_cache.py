@@ -0,0 +1,85 @@
+import os
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.core.cache import (
+    FlatPickleCacheBackend,
+    ShardedPickleCacheBackend,
+    get_pickle_cache_backend,
+)
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.core.utils import cache_with_pickle
+
+CALLS = []
+
+
+@cache_with_pickle(lambda x: f"key_{x}")
+def square(x: int) -> int:
+    CALLS.append(x)
+    return x * x
+
+
+@pytest.mark.offline
+class ShardedPickleCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_decorator_layout_and_stats(self):
+        CALLS.clear()
+        with patch.object(RD_AGENT_SETTINGS, "pickle_cache_folder_path_str", str(self.root)):
+            self.assertEqual([square(2), square(2), square(3)], [4, 4, 9])
+            stats = get_pickle_cache_backend().stats()
+        self.assertEqual(CALLS, [2, 3])
+        files = list((self.root / f"{__name__}.square").glob("*/*.pkl"))
+        self.assertEqual(len(files), 2)  # stored in shard folders
+        (s,) = stats
+        self.assertEqual((s["hits"], s["misses"], s["entries"]), (1, 2, 2))
+
+    def test_compress_legacy_and_prune(self):
+        # an entry of the flat layout is still served and moved into its shard
+        (self.root / "ns").mkdir()
+        (self.root / "ns" / "old.pkl").write_bytes(pickle.dumps("legacy"))
+        backend = ShardedPickleCacheBackend(self.root, compress=True)
+        self.assertEqual(backend.get("ns", "old"), (True, "legacy"))
+        self.assertFalse((self.root / "ns" / "old.pkl").exists())
+        self.assertEqual(backend.get("ns", "missing"), (False, None))
+
+        for i in range(3):
+            backend.put("ns", f"k{i}", b"x" * 10_000)
+        self.assertEqual(len(list((self.root / "ns").glob("*/*.pkl.gz"))), 3)
+        self.assertEqual(backend.get("ns", "k0"), (True, b"x" * 10_000))
+
+        # "old" and "k1" are the least recently used
+        size = {s["namespace"]: s["size"] for s in backend.stats()}["ns"]
+        entry_size = next((self.root / "ns").glob("*/k2.pkl.gz")).stat().st_size
+        self.assertEqual(backend.prune(size - entry_size, namespace="ns"), 2)
+        self.assertEqual(backend.get("ns", "old"), (False, None))
+        self.assertEqual(backend.get("ns", "k1"), (False, None))
+        self.assertEqual(backend.get("ns", "k0")[0], True)
+        self.assertEqual(backend.get("ns", "k2")[0], True)
+
+    def test_flat_prune(self):
+        backend = FlatPickleCacheBackend(self.root)
+        for i, ns in enumerate(["a", "a", "b"]):
+            backend.put(ns, f"k{i}", b"x" * 1000)
+            os.utime(self.root / ns / f"k{i}.pkl", (i, i))
+        self.assertEqual(backend.get("a", "k0"), (True, b"x" * 1000))  # now the most recently used
+
+        entry_size = (self.root / "a" / "k0.pkl").stat().st_size
+        self.assertEqual(backend.prune(entry_size, namespace="a"), 1)
+        self.assertEqual([backend.get("a", "k0")[0], backend.get("a", "k1")[0]], [True, False])
+        self.assertEqual(backend.prune(0), 2)
+        self.assertEqual(list(self.root.glob("*/*.pkl")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
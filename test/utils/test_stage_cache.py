@@ -0,0 +1,185 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.app.data_science.conf import DS_RD_SETTING
+from rdagent.scenarios.data_science.experiment.experiment import DSFBWorkspace
+from rdagent.scenarios.data_science.experiment.stage_cache import StageCache
+
+MAIN = """
+import time
+
+import pandas as pd
+from stage_cache import StageCache
+
+from ensemble import ensemble
+from features import feat_eng
+
+STAGE_SECONDS = {stage_seconds}
+
+
+def load_data():
+    time.sleep(STAGE_SECONDS)
+    df = pd.read_csv("./workspace_input/train.csv")
+    return df[["x"]], df["y"]
+
+
+def scale(v):
+    return v * {scale}
+
+
+def train(X, y):
+    time.sleep(STAGE_SECONDS)
+    return scale(X["x"] + y)
+
+
+cache = StageCache(root="./cache", size_limit=0)
+X, y = cache.run("load_data", load_data)
+X = cache.run("feature", feat_eng, X)
+pred = cache.run("model", train, X, y, deps=[scale])
+pd.Series([cache.run("ensemble", ensemble, [pred])]).to_csv("scores.csv")
+"""
+
+
+def _load_data():
+    return [1, 2], 3
+
+
+def _append_feature(X, y):
+    X.append(10)
+    return X, y
+
+
+def _append_large_feature(X, y):
+    X.append(99)
+    return X, y
+
+
+def _train(X, y):
+    return sum(X) + y
+
+
+N_FOLDS = 5
+
+
+def _fold_weight():
+    return 1 / N_FOLDS
+
+
+def _train_folds(X, y):
+    return [round(_fold_weight() * x, 2) for x in X]
+
+
+def _make_workspace(path: Path, stage_seconds: float = 0.0, scale: int = 1, n_rows: int = 3) -> DSFBWorkspace:
+    ws = DSFBWorkspace()
+    ws.workspace_path = path
+    (path / "workspace_input").mkdir(parents=True, exist_ok=True)
+    (path / "workspace_input" / "train.csv").write_text("x,y\n" + "".join(f"{i},{i}\n" for i in range(n_rows)))
+    ws.inject_files(
+        **{
+            "main.py": MAIN.format(stage_seconds=stage_seconds, scale=scale),
+            "features.py": "def feat_eng(X):\n    return X + 1\n",
+            "ensemble.py": "def ensemble(preds):\n    return sum(p.sum() for p in preds)\n",
+        }
+    )
+    return ws
+
+
+def _run_main(ws: DSFBWorkspace) -> None:
+    # no bytecode, which would be stale when a module is rewritten with the same size within a second
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    subprocess.run([sys.executable, "main.py"], cwd=ws.workspace_path, env=env, check=True, capture_output=True)
+
+
+def _run(ws: DSFBWorkspace) -> tuple[list[str], float]:
+    """The stages loaded from the cache and the score of a run of main.py"""
+    _run_main(ws)
+    report = ws.log_stage_cache_report()
+    score = float((ws.workspace_path / "scores.csv").read_text().splitlines()[1].split(",")[1])
+    return [stage["name"] for stage in report["stages"] if stage["hit"]], score
+
+
+@pytest.mark.offline
+class StageCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings = patch.object(DS_RD_SETTING, "enable_stage_cache", True)
+        self.settings.start()
+
+    def tearDown(self):
+        self.settings.stop()
+        self.tmp_dir.cleanup()
+
+    def test_resume_from_invalidated_stage(self):
+        ws = _make_workspace(Path(self.tmp_dir.name))
+        self.assertIn("stage_cache.py", [p.name for p in ws.workspace_path.iterdir()])
+        self.assertNotIn("stage_cache.py", ws.file_dict)  # not shown to the coders
+        self.assertEqual(_run(ws), ([], 9.0))
+        self.assertEqual(_run(ws), (["load_data", "feature", "model", "ensemble"], 9.0))
+        self.assertIsNone(ws.log_stage_cache_report())  # the report is consumed
+
+        # only the edited stage and the stages using its outputs are run again
+        ws.inject_files(**{"ensemble.py": "def ensemble(preds):\n    return -sum(p.sum() for p in preds)\n"})
+        self.assertEqual(_run(ws), (["load_data", "feature", "model"], -9.0))
+        ws.inject_files(**{"features.py": "def feat_eng(X):\n    return X + 2\n"})
+        self.assertEqual(_run(ws), (["load_data"], -12.0))
+        # a dependency listed in `deps`
+        ws.inject_files(**{"main.py": MAIN.format(stage_seconds=0.0, scale=2)})
+        self.assertEqual(_run(ws), (["load_data", "feature"], -24.0))
+        # a change of the input data invalidates all the stages
+        _make_workspace(ws.workspace_path, scale=2, n_rows=4)
+        self.assertEqual(_run(ws)[0], [])
+
+    def test_stage_modifying_its_input(self):
+        root = Path(self.tmp_dir.name)
+        (root / "input").mkdir()
+
+        def _pipeline(feat) -> tuple[list[str], int]:
+            cache = StageCache(root=root / "cache", input_path=root / "input", size_limit=0, report_path=None)
+            X, y = cache.run("load_data", _load_data)
+            X, y = cache.run("feature", feat, X, y)
+            score = cache.run("model", _train, X, y)
+            return [s["name"] for s in cache.stages if s["hit"]], score
+
+        self.assertEqual(_pipeline(_append_feature), ([], 16))
+        self.assertEqual(_pipeline(_append_feature), (["load_data", "feature", "model"], 16))
+        # the model uses the output of the edited stage, which is the object loaded by the first one
+        self.assertEqual(_pipeline(_append_large_feature), (["load_data"], 105))
+
+    def test_module_globals_in_key(self):
+        root = Path(self.tmp_dir.name)
+        (root / "input").mkdir()
+
+        def _run_folds() -> tuple[bool, list]:
+            cache = StageCache(root=root / "cache", input_path=root / "input", size_limit=0, report_path=None)
+            result = cache.run("model", _train_folds, [1, 2], 0)
+            return cache.stages[-1]["hit"], result
+
+        self.assertEqual(_run_folds(), (False, [0.2, 0.4]))
+        self.assertEqual(_run_folds(), (True, [0.2, 0.4]))
+        # a constant used through a helper which is not listed in `deps`
+        with patch.object(sys.modules[__name__], "N_FOLDS", 4):
+            self.assertEqual(_run_folds(), (False, [0.25, 0.5]))
+        self.assertEqual(_run_folds(), (True, [0.2, 0.4]))
+
+
+def benchmark(stage_seconds: float = 1.0):
+    with tempfile.TemporaryDirectory() as tmp, patch.object(DS_RD_SETTING, "enable_stage_cache", True):
+        ws = _make_workspace(Path(tmp), stage_seconds=stage_seconds)
+        for name in ("first run", "re-run after an ensemble change"):
+            start = time.time()
+            _run_main(ws)
+            report = ws.log_stage_cache_report()
+            print(f"{name}: {time.time() - start:.2f}s, {report['saved_seconds']:.2f}s saved by the stage cache")
+            ws.inject_files(**{"ensemble.py": "def ensemble(preds):\n    return max(p.max() for p in preds)\n"})
+
+
+if __name__ == "__main__":
+    benchmark()
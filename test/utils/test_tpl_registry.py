@@ -0,0 +1,124 @@
+import importlib.util
+import inspect
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import yaml
+from jinja2 import Environment, FunctionLoader, StrictUndefined
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.utils.agent import tpl
+from rdagent.utils.agent.tpl import T
+
+MODULE = """
+from rdagent.utils.agent.tpl import T
+
+
+def render(**context):
+    t = T(".prompts:greeting.user")
+    return t.uri, t.r(**context)
+"""
+
+
+@pytest.mark.offline
+class TemplateRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.cwd = os.getcwd()
+        os.chdir(self.root)  # the templates under the current directory are found by their uri
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def _write_yaml(self, path: Path, content: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(yaml.safe_dump(content))
+
+    def test_cached_loading_and_rendering(self):
+        self._write_yaml(self.root / "tplpkg" / "share.yaml", {"name": {"full": "Ada {{ suffix }}"}})
+        self._write_yaml(
+            self.root / "tplpkg" / "mod" / "prompts.yaml",
+            {"greeting": {"user": 'Hello {% include "tplpkg.share:name.full" %}, {{ n }}'}},
+        )
+        (self.root / "tplpkg" / "mod" / "caller.py").write_text(MODULE)
+        spec = importlib.util.spec_from_file_location("caller", self.root / "tplpkg" / "mod" / "caller.py")
+        caller = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(caller)
+
+        with patch.object(tpl.yaml, "safe_load", side_effect=yaml.safe_load) as safe_load:
+            for n in range(3):
+                self.assertEqual(caller.render(n=n, suffix="L."), (".prompts:greeting.user", f"Hello Ada L., {n}"))
+            self.assertEqual(safe_load.call_count, 2)  # each file is parsed once
+
+            # the changed files are loaded again, including the included ones
+            self._write_yaml(self.root / "tplpkg" / "share.yaml", {"name": {"full": "Grace {{ suffix }}"}})
+            self.assertEqual(caller.render(n=0, suffix="H.")[1], "Hello Grace H., 0")
+            self.assertEqual(safe_load.call_count, 3)
+
+        # the callers get their own copy of the parsed content
+        T("tplpkg.share:name").template["full"] = "changed"
+        self.assertEqual(T("tplpkg.share:name").template, {"full": "Grace {{ suffix }}"})
+        with self.assertRaises(FileNotFoundError):
+            T("tplpkg.share:missing")
+
+    def test_sampled_logging(self):
+        self._write_yaml(self.root / "tplpkg" / "share.yaml", {"a": "A", "b": "B"})
+        with patch.object(tpl.logger, "log_object") as log_object:
+            T("tplpkg.share:a").r()
+            self.assertEqual(log_object.call_count, 1)  # every rendering is logged by default
+            with patch.multiple(RD_AGENT_SETTINGS, tpl_log_sample_rate=0.0, tpl_log_uris=["share:b"]):
+                T("tplpkg.share:a").r()
+                T("tplpkg.share:b").r()
+            self.assertEqual([c.kwargs["obj"]["uri"] for c in log_object.call_args_list][1:], ["tplpkg.share:b"])
+
+
+def _legacy_render(uri: str, **context) -> str:
+    """Loading and rendering a template from scratch, as each rendering did before the registry"""
+    inspect.stack()
+    path_part, yaml_trace = uri.split(":")
+    with (tpl.PROJ_PATH / path_part.replace(".", "/")).with_suffix(".yaml").open(encoding="utf-8") as f:
+        content = yaml.safe_load(f)
+    for key in yaml_trace.split("."):
+        content = content[key]
+
+    def load_include(name: str) -> str:
+        inspect.stack()
+        return tpl._resolve(name, tpl.DIRNAME)[0]
+
+    env = Environment(undefined=StrictUndefined, loader=FunctionLoader(load_include))
+    return env.from_string(content).render(**context).strip("\n")
+
+
+def benchmark(n: int = 200):
+    uri = "components.coder.data_science.pipeline.prompts:pipeline_coder.system"
+    context = dict(
+        task_desc="task",
+        queried_former_failed_knowledge=[],
+        out_spec="spec",
+        runtime_environment="env",
+        package_info=None,
+        enable_model_dump=True,
+        enable_stage_cache=False,
+        enable_debug_mode=True,
+        spec="spec",
+    )
+    with patch.object(tpl.logger, "log_object"):
+        for name, render in [
+            ("from scratch", lambda: _legacy_render(uri, **context)),
+            ("with the registry", lambda: T(uri).r(**context)),
+        ]:
+            start = time.time()
+            for _ in range(n):
+                render()
+            print(f"{n} renderings of {uri} {name}: {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
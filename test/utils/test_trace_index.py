@@ -0,0 +1,159 @@
+import pickle
+import random
+import time
+import unittest
+
+import pytest
+
+from rdagent.core.experiment import Experiment
+from rdagent.core.proposal import ExperimentFeedback, Trace
+
+
+def _make_trace(n: int, seed: int = 0, n_roots: int = 5, p_jump: float = 0.1) -> Trace:
+    """
+    A trace of `n` nodes in `n_roots` sub-traces: each node extends the latest node of a random sub-trace, or a
+    random node with probability `p_jump`. One node in 3 is a SOTA.
+    """
+    rng = random.Random(seed)
+    trace = Trace(scen=None)
+    latest = []
+    for i in range(n):
+        if i < n_roots:
+            trace.set_current_selection(Trace.NEW_ROOT)
+            latest.append(i)
+        else:
+            k = rng.randrange(n_roots)
+            trace.set_current_selection((latest[k] if rng.random() >= p_jump else rng.randrange(i),))
+            latest[k] = i
+        exp = Experiment(sub_tasks=[])
+        trace.sync_dag_parent_and_hist((exp, ExperimentFeedback("", decision=rng.random() < 0.3)), i)
+    return trace
+
+
+# the implementations scanning `dag_parent` and `hist`
+def _legacy_get_parents(trace: Trace, child_idx: int) -> list[int]:
+    ancestors: list[int] = []
+    curr = child_idx
+    while True:
+        ancestors.insert(0, curr)
+        parent_tuple = trace.dag_parent[curr]
+        if not parent_tuple or parent_tuple[0] == curr:
+            break
+        curr = parent_tuple[0]
+    return ancestors
+
+
+def _legacy_get_children(trace: Trace, parent_idx: int | None) -> list:
+    target_parents = (parent_idx,) if parent_idx is not None else Trace.NEW_ROOT
+    return [trace.hist[i] for i, parents in enumerate(trace.dag_parent) if parents == target_parents]
+
+
+def _legacy_get_leaves(trace: Trace) -> list[int]:
+    parent_indices = set(idx for parents in trace.dag_parent for idx in parents)
+    return sorted(set(range(len(trace.hist))) - parent_indices)
+
+
+def _legacy_exp2idx(trace: Trace, exp: Experiment) -> int | None:
+    for i, (_exp, _) in enumerate(trace.hist):
+        if _exp == exp:
+            return i
+    return None
+
+
+def _legacy_get_sota_experiment(trace: Trace, node_id: int) -> Experiment | None:
+    for i in reversed(_legacy_get_parents(trace, node_id)):
+        if trace.hist[i][1].decision:
+            return trace.hist[i][0]
+    return None
+
+
+@pytest.mark.offline
+class TraceIndexTest(unittest.TestCase):
+    def _check(self, trace: Trace) -> None:
+        n = len(trace.hist)
+        self.assertEqual(trace.get_leaves(), _legacy_get_leaves(trace))
+        self.assertEqual(trace.get_children(None), _legacy_get_children(trace, None))
+        for i in range(n):
+            path = trace.get_parents(i)
+            self.assertEqual(path, _legacy_get_parents(trace, i))
+            self.assertEqual(trace.get_children(i), _legacy_get_children(trace, i))
+            self.assertIs(trace.get_sota_experiment(i), _legacy_get_sota_experiment(trace, i))
+            self.assertEqual(trace.exp2idx(trace.hist[i][0]), i)
+            self.assertTrue(trace.is_parent(path[0], i))
+            self.assertTrue(trace.is_parent(i, i))
+            if len(path) > 1:
+                self.assertFalse(trace.is_parent(i, path[-2]))
+        self.assertEqual(trace.exp2idx([trace.hist[3][0], trace.hist[1][0]]), [3, 1])
+        self.assertIsNone(trace.exp2idx(Experiment(sub_tasks=[])))
+        self.assertFalse(trace.is_parent(None, 0))
+
+    def test_index_matches_scans(self):
+        trace = _make_trace(300)
+        self._check(trace)
+        # the latest node is selected with (-1,)
+        trace.set_current_selection(Trace.SEL_LATEST_SOTA)
+        trace.sync_dag_parent_and_hist((Experiment(sub_tasks=[]), ExperimentFeedback("", decision=False)), 300)
+        self.assertEqual(trace.get_parents(300)[-2:], [299, 300])
+        self._check(trace)
+
+    def test_rebuild(self):
+        trace = _make_trace(50)
+        trace.get_leaves()
+        # pickled traces (or the ones pickled before the index) rebuild it
+        restored = pickle.loads(pickle.dumps(trace))
+        del restored.__dict__["_dag_index"]
+        self._check(restored)
+        # so do the traces whose lists are modified without `sync_dag_parent_and_hist`
+        trace.hist.insert(0, trace.hist.pop())
+        self.assertEqual(trace.exp2idx(trace.hist[0][0]), 0)
+        trace.hist = trace.hist[:10]
+        trace.dag_parent = trace.dag_parent[:10]
+        self._check(trace)
+
+    def test_snapshot(self):
+        trace = _make_trace(50)
+        leaves = trace.get_leaves()
+        snapshot = trace.snapshot()
+        # the trace keeps growing, e.g. recorded by the event loop while a thread proposes on the snapshot
+        for i in range(50, 60):
+            trace.set_current_selection((leaves[0],))
+            trace.sync_dag_parent_and_hist((Experiment(sub_tasks=[]), ExperimentFeedback("", decision=True)), i)
+        self.assertEqual((len(snapshot.hist), len(snapshot.dag_parent)), (50, 50))
+        self.assertEqual(snapshot.get_leaves(), leaves)
+        self.assertEqual(snapshot.dag_index.size, 50)
+        self.assertIsNot(snapshot.dag_index.children, trace.dag_index.children)
+        self._check(snapshot)
+        self._check(trace)
+
+
+def benchmark(n: int = 10_000, n_queries: int = 1_000, p_jump: float = 0.1):
+    trace = _make_trace(n, p_jump=p_jump)
+    rng = random.Random(1)
+    nodes = [rng.randrange(n) for _ in range(n_queries)]
+    queries = {
+        "get_parents": (lambda i: trace.get_parents(i), lambda i: _legacy_get_parents(trace, i)),
+        "get_children": (lambda i: trace.get_children(i), lambda i: _legacy_get_children(trace, i)),
+        "exp2idx": (lambda i: trace.exp2idx(trace.hist[i][0]), lambda i: _legacy_exp2idx(trace, trace.hist[i][0])),
+        "get_sota_experiment": (
+            lambda i: trace.get_sota_experiment(i),
+            lambda i: _legacy_get_sota_experiment(trace, i),
+        ),
+        "get_leaves": (lambda i: trace.get_leaves(), lambda i: _legacy_get_leaves(trace)),
+    }
+    depth = trace.dag_index.depth
+    print(f"{n_queries} queries on a trace of {n} nodes (mean depth {sum(depth) / n:.0f}):")
+    for name, (indexed, legacy) in queries.items():
+        start = time.time()
+        for i in nodes:
+            indexed(i)
+        indexed_seconds = time.time() - start
+        start = time.time()
+        for i in nodes:
+            legacy(i)
+        legacy_seconds = time.time() - start
+        print(f"  {name}: {indexed_seconds * 1000:.1f}ms indexed, {legacy_seconds * 1000:.1f}ms by scans")
+
+
+if __name__ == "__main__":
+    benchmark()
+    benchmark(p_jump=0.001)
@@ -0,0 +1,154 @@
+import math
+import pickle
+import random
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rdagent.core.proposal import ExperimentFeedback
+from rdagent.log.storage import FileStorage
+from rdagent.scenarios.data_science.experiment.experiment import DSExperiment
+from rdagent.scenarios.data_science.proposal.exp_gen.base import DSTrace
+from rdagent.scenarios.data_science.proposal.exp_gen.scheduler_replay import (
+    load_recorded_trace,
+    replay,
+)
+from rdagent.scenarios.data_science.proposal.exp_gen.trace_scheduler import (
+    MCTSScheduler,
+    RoundRobinScheduler,
+    SOTABasedScheduler,
+    TraceLengthScheduler,
+)
+
+
+def _make_trace(n: int, n_roots: int = 5, seed: int = 0) -> DSTrace:
+    """A trace of `n` nodes in `n_roots` sub-traces, expanding random nodes; one node in 3 is a SOTA."""
+    rng = random.Random(seed)
+    trace = DSTrace(scen=SimpleNamespace(competition="aerial-cactus-identification"))
+    for i in range(n):
+        trace.set_current_selection(trace.NEW_ROOT if i < n_roots else (rng.randrange(i),))
+        exp = DSExperiment(pending_tasks_list=[])
+        exp.result = pd.DataFrame({"score": [rng.random()]}, index=["ensemble"])
+        trace.sync_dag_parent_and_hist((exp, ExperimentFeedback("", decision=rng.random() < 0.3)), i)
+    return trace
+
+
+def _observed(scheduler, trace: DSTrace):
+    scheduler.rec_commit_idx = len(trace.hist)  # the nodes were not selected by this scheduler
+    scheduler.process_uncommitted_nodes(trace)
+    return scheduler
+
+
+# the implementations scoring one node at a time
+def _legacy_probabilistic_select(scheduler, trace: DSTrace) -> tuple[int, ...]:
+    leaves = trace.get_leaves()
+    potentials = [scheduler.calculate_potential(trace, leaf) for leaf in leaves]
+    return (random.choices(leaves, weights=scheduler._softmax_probabilities(potentials), k=1)[0],)
+
+
+def _legacy_mcts_scores(scheduler: MCTSScheduler, trace: DSTrace) -> list[float]:
+    n = len(trace.hist)
+    priors = scheduler._softmax_probabilities([scheduler.calculate_potential(trace, i) for i in range(n)])
+    scores = []
+    for i, prior in enumerate(priors):
+        visits = scheduler.visit_count[i]
+        q = scheduler.value_sum[i] / visits if visits > 0 else 0.0
+        u = scheduler.c_puct * prior * math.sqrt(max(1, scheduler.global_visit_count)) / (1 + visits)
+        scores.append(q + u)
+    return scores
+
+
+@pytest.mark.offline
+class TraceSchedulerTest(unittest.TestCase):
+    def test_probabilistic_schedulers(self):
+        trace = _make_trace(300)
+        leaves = trace.get_leaves()
+        for scheduler in [
+            TraceLengthScheduler(5),
+            TraceLengthScheduler(5, inverse=True),
+            SOTABasedScheduler(5, temperature=0.5),
+            SOTABasedScheduler(5, inverse=True),
+        ]:
+            _observed(scheduler, trace)
+            np.testing.assert_allclose(
+                scheduler.calculate_potentials(trace, leaves),
+                [scheduler.calculate_potential(trace, leaf) for leaf in leaves],
+            )
+            for seed in range(20):
+                random.seed(seed)
+                legacy = _legacy_probabilistic_select(scheduler, trace)
+                random.seed(seed)
+                self.assertEqual(scheduler.select(trace), legacy)
+
+    def test_mcts_scores(self):
+        trace = _make_trace(200)
+        scheduler = _observed(MCTSScheduler(5), trace)
+        # each node is visited by the feedbacks of its sub-tree
+        for i in (0, 7, 150):
+            self.assertEqual(scheduler.visit_count[i], sum(i in trace.get_parents(j) for j in range(len(trace.hist))))
+        for _ in range(3):
+            scores = _legacy_mcts_scores(scheduler, trace)
+            np.testing.assert_allclose(scheduler.scores(trace), scores)
+            self.assertEqual(scheduler.select(trace), (int(np.argmax(scores)),))
+
+        # the schedulers pickled with the statistics in dicts are converted
+        state = {k: v for k, v in scheduler.__dict__.items() if k not in ("visit_count", "value_sum", "prior")}
+        state.update(node_visit_count={3: 2}, node_value_sum={3: 1.0}, node_prior={100: 0.5})
+        restored = pickle.loads(pickle.dumps(scheduler))
+        restored.__dict__.clear()
+        restored.__setstate__(state)
+        self.assertEqual((restored._get_q(3), restored.prior[100], restored._get_q(1000)), (0.5, 0.5, 0.0))
+
+    def test_replay(self):
+        recorded = _make_trace(60)
+        with tempfile.TemporaryDirectory() as tmp:
+            FileStorage(tmp).log(recorded, "trace.1")  # as logged by a process
+            recorded = load_recorded_trace(tmp)
+        for scheduler in [RoundRobinScheduler(5), MCTSScheduler(5), SOTABasedScheduler(5)]:
+            stats = replay(scheduler, recorded, n_steps=40, n_parallel=3, seed=1)
+            self.assertEqual(stats["n_nodes"], 40)
+            self.assertEqual(scheduler.uncommited_rec_status[DSTrace.NEW_ROOT], 0)
+        # the outcomes are reproducible
+        outcomes = [replay(MCTSScheduler(5), recorded, n_steps=40, seed=1) for _ in range(2)]
+        for stats in outcomes:
+            del stats["select_seconds"], stats["selections_per_second"]
+        self.assertEqual(outcomes[0], outcomes[1])
+
+
+def benchmark(n: int = 5_000, n_selections: int = 50):
+    trace = _make_trace(n, n_roots=50)
+    for scheduler, legacy in [
+        (SOTABasedScheduler(50), lambda s: _legacy_probabilistic_select(s, trace)),
+        (MCTSScheduler(50), lambda s: (int(np.argmax(_legacy_mcts_scores(s, trace))),)),
+    ]:
+        scheduler = _observed(scheduler, trace)
+        start = time.time()
+        for _ in range(n_selections):
+            scheduler.select(trace)
+        vectorized_seconds = time.time() - start
+        start = time.time()
+        for _ in range(n_selections):
+            legacy(scheduler)
+        legacy_seconds = time.time() - start
+        print(
+            f"{n_selections} selections of {type(scheduler).__name__} on {n} nodes: "
+            f"{vectorized_seconds * 1000:.0f}ms vectorized, {legacy_seconds * 1000:.0f}ms per node"
+        )
+
+    recorded = _make_trace(500, n_roots=5)
+    for scheduler in [RoundRobinScheduler(5), TraceLengthScheduler(5), SOTABasedScheduler(5), MCTSScheduler(5)]:
+        stats = replay(scheduler, recorded, n_steps=500, n_parallel=4)
+        print(
+            f"replay of {type(scheduler).__name__}: {stats['selections_per_second']:.0f} selections/s, "
+            f"{stats['n_sota']} SOTA, mean depth {stats['mean_depth']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,168 @@
+import json
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from rdagent.core.proposal import ExperimentFeedback, Trace
+from rdagent.log.storage import FileStorage
+from rdagent.log.ui import utils
+from rdagent.log.ui.conf import UI_SETTING
+from rdagent.log.ui.utils import get_score_stat, get_sota_exp_stat, load_times_info
+from rdagent.scenarios.data_science.proposal.exp_gen.base import DSTrace
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _exp(i: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        experiment_workspace=SimpleNamespace(all_codes=f"code {i}"),
+        hypothesis=SimpleNamespace(hypothesis=f"hypothesis {i}", component="Workflow"),
+        result=pd.DataFrame({"score": [float(i)]}, index=["ensemble"]),
+    )
+
+
+class _FakeRun:
+    """Log the messages of the loops of a data science run: loop `i` scores `i` and is merged when `i >= 2`"""
+
+    def __init__(self, path: Path) -> None:
+        self.storage = FileStorage(path)
+        self.trace = DSTrace(scen=SimpleNamespace(competition="aerial-cactus-identification"))
+        self.n_loops = 0
+
+    def log_loop(self, decision: bool = True) -> None:
+        i = self.n_loops
+        t = T0 + timedelta(hours=i)
+        exp = _exp(i)
+        self.storage.log(
+            {"start_time": t, "end_time": t + timedelta(minutes=5)}, f"Loop_{i}.direct_exp_gen.exp_gen_time_info.1", t
+        )
+        uri = (
+            "scenarios.data_science.proposal.exp_gen.merge"
+            if i >= 2
+            else "scenarios.data_science.proposal.exp_gen.proposal"
+        )
+        self.storage.log({"uri": uri}, f"Loop_{i}.direct_exp_gen.debug_tpl.1", t + timedelta(minutes=1))
+        for j, step in enumerate(["coding", "running", "feedback"]):
+            start = t + timedelta(minutes=10 * (j + 1))
+            self.storage.log(
+                {"start_time": start, "end_time": start + timedelta(minutes=10)}, f"Loop_{i}.{step}.time_info.1", start
+            )
+        self.storage.log(exp, f"Loop_{i}.running.1", t + timedelta(minutes=20))
+        self.storage.log(
+            json.dumps(
+                {
+                    "score": i,
+                    "is_lower_better": False,
+                    "gold_medal": i >= 3,
+                    "silver_medal": False,
+                    "bronze_medal": False,
+                    "above_median": True,
+                    "valid_submission": True,
+                    "submission_exists": True,
+                }
+            ),
+            f"Loop_{i}.running.mle_score.1",
+            t + timedelta(minutes=25),
+        )
+        self.trace.set_current_selection(Trace.SEL_LATEST_SOTA)
+        self.trace.sync_dag_parent_and_hist((exp, ExperimentFeedback("", decision=decision)), i)
+        self.storage.log(self.trace, "trace", t + timedelta(minutes=40))
+        if decision:
+            self.storage.log(exp, "sota_exp_to_submit", t + timedelta(minutes=41))
+        self.n_loops += 1
+
+
+@pytest.mark.offline
+class RunSummaryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_path = Path(self.tmp_dir.name) / "log"
+        self.settings = patch.multiple(
+            UI_SETTING, enable_cache=True, summary_cache_folder=str(Path(self.tmp_dir.name) / "summary")
+        )
+        self.settings.start()
+        utils._RUN_SUMMARIES.clear()
+
+    def tearDown(self):
+        self.settings.stop()
+        utils._RUN_SUMMARIES.clear()
+        self.tmp_dir.cleanup()
+
+    def _stats(self):
+        auto = get_sota_exp_stat(self.log_path, selector="auto")
+        best_valid = get_sota_exp_stat(self.log_path, selector="best_valid")
+        return auto, best_valid, get_score_stat(self.log_path, auto[1]), load_times_info(self.log_path)
+
+    def test_incremental_updates(self):
+        run = _FakeRun(self.log_path)
+        for _ in range(3):
+            run.log_loop()
+        auto, best_valid, score_stat, times = self._stats()
+        self.assertEqual(auto[0].experiment_workspace.all_codes, "code 2")
+        self.assertEqual((auto[1], auto[3]), (2, "above_median"))
+        self.assertEqual(best_valid[1], 2)
+        self.assertEqual(score_stat, (True, True, True, 1.0))
+        self.assertEqual(sorted(times[1]), ["coding", "exp_gen", "feedback", "running"])
+
+        # a refresh without new messages does not unpickle anything
+        with patch.object(FileStorage, "load_msg", autospec=True, side_effect=FileStorage.load_msg) as load_msg:
+            self._stats()
+            self.assertEqual(load_msg.call_count, 0)
+            # a new loop only unpickles its messages (and the latest trace and sota experiment)
+            run.log_loop(decision=False)
+            run.log_loop()
+            auto, best_valid, score_stat, times = self._stats()
+            self.assertLessEqual(load_msg.call_count, 2 * 9)
+        self.assertEqual((auto[1], auto[3]), (4, "gold"))
+        self.assertEqual(best_valid[1], 4)
+        self.assertEqual(score_stat, (True, True, True, 2 / 3))
+        self.assertEqual(len(times), 5)
+
+        # the summary is persisted and matches the one built from all the messages
+        utils._RUN_SUMMARIES.clear()
+        with patch.object(FileStorage, "load_msg", autospec=True, side_effect=FileStorage.load_msg) as load_msg:
+            persisted = self._stats()
+            self.assertEqual(load_msg.call_count, 0)
+        with patch.object(UI_SETTING, "enable_cache", False):
+            rebuilt = self._stats()
+        self.assertEqual(persisted[0][1:], rebuilt[0][1:])
+        self.assertEqual(persisted[2:], rebuilt[2:])
+
+        # the summary starts over when the logs are truncated
+        FileStorage(self.log_path).truncate(T0 + timedelta(hours=1, minutes=50))
+        auto, best_valid, score_stat, times = self._stats()
+        self.assertEqual((auto[1], best_valid[1], len(times)), (1, 1, 2))
+
+
+def benchmark(n_loops: int = 200, n_refreshes: int = 10):
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "log"
+        run = _FakeRun(log_path)
+        for _ in range(n_loops):
+            run.log_loop()
+
+        def refresh():
+            get_sota_exp_stat(log_path, selector="auto")
+            get_score_stat(log_path, get_sota_exp_stat(log_path, selector="best_valid")[1])
+            load_times_info(log_path)
+
+        for enable_cache in (False, True):
+            with patch.multiple(UI_SETTING, enable_cache=enable_cache, summary_cache_folder=str(Path(tmp) / "summary")):
+                refresh()  # the summary of the logs so far
+                start = time.time()
+                for _ in range(n_refreshes):
+                    run.log_loop()
+                    refresh()
+                name = "incremental summary" if enable_cache else "reading all the messages"
+                print(f"{n_refreshes} refreshes of a {run.n_loops}-loop run, {name}: {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    benchmark()
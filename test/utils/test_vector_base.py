@@ -0,0 +1,147 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from rdagent.components.knowledge_management.graph import (
+    UndirectedGraph,
+    UndirectedNode,
+)
+from rdagent.components.knowledge_management.vector_base import (
+    Document,
+    MatrixVectorBase,
+    PDVectorBase,
+)
+
+
+class FakeEmbedding:
+    """Deterministic embeddings, so the vector bases can be tested without calling the API."""
+
+    def __init__(self, dim: int = 32) -> None:
+        self.dim = dim
+
+    def embed(self, content: str) -> list[float]:
+        rng = np.random.default_rng(abs(hash(content)) % (2**32))
+        return rng.standard_normal(self.dim).tolist()
+
+    def create_embedding(self, input_content: str | list[str], *args, **kwargs):
+        if isinstance(input_content, str):
+            return self.embed(input_content)
+        return [self.embed(c) for c in input_content]
+
+
+def _patch_api(fake: FakeEmbedding):
+    return patch("rdagent.components.knowledge_management.vector_base.APIBackend", return_value=fake)
+
+
+def benchmark(sizes: tuple[int, ...] = (10_000, 100_000, 1_000_000), dim: int = 256, n_query: int = 32) -> None:
+    """
+    Compare the search latency of PDVectorBase and MatrixVectorBase.
+    PDVectorBase is skipped above 100k vectors because a single query takes too long.
+
+    Usage: python test/utils/test_vector_base.py
+    """
+    fake = FakeEmbedding(dim)
+    rng = np.random.default_rng(0)
+    queries = [f"query {i}" for i in range(n_query)]
+    with _patch_api(fake):
+        for size in sizes:
+            embeddings = rng.standard_normal((size, dim), dtype=np.float32)
+            docs = [Document(content=f"doc {i}", label=f"label{i % 4}", embedding=embeddings[i]) for i in range(size)]
+
+            mvb = MatrixVectorBase()
+            start = time.perf_counter()
+            for doc in docs:
+                mvb.add(doc)
+            add_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for q in queries:
+                mvb.search(q, topk_k=10)
+            single_time = (time.perf_counter() - start) / n_query
+            start = time.perf_counter()
+            mvb.batch_search(queries, topk_k=10)
+            batch_time = (time.perf_counter() - start) / n_query
+            print(
+                f"matrix | {size:>9} vectors | add {add_time / size * 1e6:7.2f}us/doc | "
+                f"search {single_time * 1e3:8.2f}ms/query | batch_search {batch_time * 1e3:8.2f}ms/query"
+            )
+
+            if size <= 100_000:
+                pdvb = PDVectorBase()
+                start = time.perf_counter()
+                pdvb.add(docs)
+                add_time = time.perf_counter() - start
+                start = time.perf_counter()
+                pdvb.search(queries[0], topk_k=10)
+                single_time = time.perf_counter() - start
+                print(
+                    f"pandas | {size:>9} vectors | add {add_time / size * 1e6:7.2f}us/doc | "
+                    f"search {single_time * 1e3:8.2f}ms/query"
+                )
+
+
+@pytest.mark.offline
+class MatrixVectorBaseTest(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeEmbedding()
+        self.contents = [f"content {i}" for i in range(200)]
+
+    def _build(self, vb):
+        for i, c in enumerate(self.contents):
+            vb.add(Document(content=c, label=f"label{i % 3}", embedding=self.fake.embed(c)))
+        return vb
+
+    def test_same_results_as_pandas(self):
+        with _patch_api(self.fake):
+            mvb = self._build(MatrixVectorBase(initial_capacity=8))  # force several growths
+            pdvb = self._build(PDVectorBase())
+            self.assertEqual(len(mvb), len(pdvb))
+            for kwargs in [
+                {"topk_k": 5},
+                {"topk_k": 3, "constraint_labels": ["label1"]},
+                {"topk_k": None, "similarity_threshold": 0.2},
+            ]:
+                docs, scores = mvb.search("content 7", **kwargs)
+                pd_docs, pd_scores = pdvb.search("content 7", **kwargs)
+                order = np.argsort(pd_scores)[::-1]
+                self.assertEqual([d.id for d in docs], [pd_docs[i].id for i in order])
+                np.testing.assert_allclose(scores, np.array(pd_scores)[order], rtol=1e-5)
+                if kwargs.get("constraint_labels"):
+                    self.assertTrue(all(d.label == "label1" for d in docs))
+            self.assertEqual(mvb.search("content 7", topk_k=1)[0][0].content, "content 7")
+
+    def test_batch_search(self):
+        with _patch_api(self.fake):
+            mvb = self._build(MatrixVectorBase())
+            queries = ["content 1", "content 42", "content 199"]
+            batch = mvb.batch_search(queries, topk_k=4)
+            for query, (docs, scores) in zip(queries, batch):
+                self.assertEqual(docs[0].content, query)
+                single_docs, single_scores = mvb.search(query, topk_k=4)
+                self.assertEqual([d.id for d in docs], [d.id for d in single_docs])
+                np.testing.assert_allclose(scores, single_scores, rtol=1e-5)
+            self.assertEqual(mvb.batch_search(queries, constraint_labels=["missing"]), [([], [])] * 3)
+
+    def test_graph_query_by_content_single_embedding_call(self):
+        with _patch_api(self.fake) as api:
+            graph = UndirectedGraph()
+            for i in range(20):
+                graph.add_node(
+                    UndirectedNode(content=f"error {i}", label="error"),
+                    neighbor=UndirectedNode(content=f"fix {i}", label="fix"),
+                )
+            api.reset_mock()
+            res = graph.query_by_content(
+                content=["error 3", "error 11"],
+                topk_k=1,
+                constraint_labels=["fix"],
+                block=True,
+            )
+            self.assertEqual(api.call_count, 1)
+            self.assertEqual([n.content for n in res], ["fix 3", "fix 11"])
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,134 @@
+import json
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.log.ui.conf import UI_SETTING
+from rdagent.log.ui.storage import WebStorage
+
+
+class _ReceiveHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        failing = any(m["msg"]["content"]["config"] in self.server.failing for m in body)
+        self.send_response(500 if failing else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server(port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("localhost", port), _ReceiveHandler)
+    server.requests = []
+    server.failing = set()  # the configs the server always fails on
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _log_configs(ws: WebStorage, n: int) -> None:
+    for i in range(n):
+        ws.log(SimpleNamespace(experiment_setting=f"config {i}"), tag="scenario")
+
+
+@pytest.mark.offline
+class WebStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.settings = patch.multiple(
+            UI_SETTING,
+            web_storage_spill_folder=self.tmp_dir.name,
+            web_storage_retry_interval=0.2,
+            web_storage_flush_interval=0.05,
+            web_storage_timeout=1.0,
+        )
+        self.settings.start()
+
+    def tearDown(self):
+        self.settings.stop()
+        self.tmp_dir.cleanup()
+
+    def test_batched_sending(self):
+        server = _start_server()
+        try:
+            ws = WebStorage(port=server.server_address[1], path="trace")
+            _log_configs(ws, 500)
+            self.assertTrue(ws.sender.flush(timeout=10))
+            received = [m for batch in server.requests for m in batch]
+            self.assertEqual([m["msg"]["content"]["config"] for m in received], [f"config {i}" for i in range(500)])
+            self.assertLess(len(server.requests), 500)
+            self.assertEqual(ws.stats["sent"], 500)
+            self.assertEqual(ws.stats["pending"], 0)
+            ws.sender.close()
+        finally:
+            server.shutdown()
+
+    def test_spill_and_replay(self):
+        port = _free_port()
+        ws = WebStorage(port=port, path="trace")
+        start = time.time()
+        _log_configs(ws, 50)
+        self.assertLess(time.time() - start, 1)  # logging does not wait for the server
+        self.assertTrue(ws.sender.flush(timeout=10))
+        self.assertEqual(ws.stats["spilled"], 50)
+        self.assertEqual(len(list(ws.sender.spill_folder.glob("*.jsonl"))), 1)
+
+        server = _start_server(port)
+        try:
+            deadline = time.time() + 10
+            while ws.stats["replayed"] < 50 and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(ws.stats["replayed"], 50)
+            self.assertEqual(len({m["msg"]["content"]["config"] for batch in server.requests for m in batch}), 50)
+            self.assertEqual(list(ws.sender.spill_folder.iterdir()), [])
+            ws.sender.close()
+        finally:
+            server.shutdown()
+
+    def test_failing_message(self):
+        server = _start_server()
+        server.failing.add("config 7")
+        try:
+            ws = WebStorage(port=server.server_address[1], path="trace")
+            _log_configs(ws, 20)
+            self.assertTrue(ws.sender.flush(timeout=10))
+            deadline = time.time() + 10
+            while ws.stats["replayed"] + ws.stats["dropped"] < 20 and time.time() < deadline:
+                time.sleep(0.05)
+            # the other messages of the batch get through and only the failing one is dropped
+            self.assertEqual((ws.stats["replayed"], ws.stats["dropped"]), (19, 1))
+            accepted = [[m["msg"]["content"]["config"] for m in batch] for batch in server.requests]
+            accepted = [c for batch in accepted if "config 7" not in batch for c in batch]
+            self.assertEqual(sorted(accepted), sorted(f"config {i}" for i in range(20) if i != 7))
+            self.assertEqual(list(ws.sender.spill_folder.iterdir()), [])
+            ws.sender.close()
+        finally:
+            server.shutdown()
+
+    def test_backpressure(self):
+        with patch.object(UI_SETTING, "web_storage_queue_size", 10):
+            ws = WebStorage(port=_free_port(), path="trace")
+            _log_configs(ws, 100)
+            ws.sender.close()
+            stats = ws.stats
+        self.assertEqual(stats["spilled"], 100)
+        self.assertEqual(stats["dropped"], 0)
+        spilled = [
+            json.loads(line) for p in ws.sender.spill_folder.glob("*.jsonl") for line in p.read_text().splitlines()
+        ]
+        self.assertEqual(len(spilled), 100)
@@ -0,0 +1,79 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+import pytest
+
+from rdagent.core.conf import RD_AGENT_SETTINGS
+from rdagent.core.utils import (
+    LLM_CACHE_SEED_GEN,
+    WorkerPool,
+    multiprocessing_imap,
+    multiprocessing_wrapper,
+    shutdown_worker_pool,
+)
+
+
+def seed_and_pid(x):
+    return x, LLM_CACHE_SEED_GEN.get_next_seed(), os.getpid()
+
+
+def sleep_and_return(x):
+    time.sleep(x)
+    return x
+
+
+@pytest.mark.offline
+class WorkerPoolTest(unittest.TestCase):
+    def tearDown(self):
+        shutdown_worker_pool()
+
+    def test_same_results_as_fresh_pool(self):
+        calls = [(seed_and_pid, (i,)) for i in range(6)]
+        LLM_CACHE_SEED_GEN.set_seed(1)
+        expected = [r[:2] for r in multiprocessing_wrapper(calls, n=3)]
+        with patch.object(RD_AGENT_SETTINGS, "multi_proc_persistent_pool", True):
+            LLM_CACHE_SEED_GEN.set_seed(1)
+            first = multiprocessing_wrapper(calls, n=3)
+            second = multiprocessing_wrapper(calls, n=3)
+        self.assertEqual([r[:2] for r in first], expected)
+        # the workers are reused by the following calls
+        self.assertEqual({r[2] for r in first}, {r[2] for r in second})
+
+    def test_streaming_timeout_and_errors(self):
+        pool = WorkerPool()
+        try:
+            calls = [(sleep_and_return, (0.5,)), (sleep_and_return, (0.05,))]
+            self.assertEqual([i for i, _ in pool.imap_unordered(calls, n=2)], [1, 0])
+
+            with self.assertRaises(TimeoutError):
+                list(pool.imap_unordered([(sleep_and_return, (10,)), (sleep_and_return, (0.05,))], n=2, timeout=0.5))
+            with self.assertRaises(ValueError):
+                list(pool.imap_unordered([(int, ("x",)), (sleep_and_return, (0.05,))], n=2))
+
+            # cancel the remaining tasks by leaving the loop
+            for _ in pool.imap_unordered([(sleep_and_return, (0.05,)), (sleep_and_return, (10,))], n=2):
+                break
+            # the pool recovers from the killed workers
+            self.assertEqual(sorted(r for _, r in pool.imap_unordered([(abs, (-1,)), (abs, (-2,))], n=2)), [1, 2])
+        finally:
+            pool.shutdown()
+
+    def test_sequential_imap(self):
+        self.assertEqual(list(multiprocessing_imap([(abs, (-1,)), (abs, (-2,))], n=1)), [(0, 1), (1, 2)])
+
+
+def benchmark():
+    calls = [(abs, (-i,)) for i in range(8)]
+    for persistent in [False, True]:
+        with patch.object(RD_AGENT_SETTINGS, "multi_proc_persistent_pool", persistent):
+            start = time.time()
+            for _ in range(20):
+                multiprocessing_wrapper(calls, n=4)
+            print(f"20 calls with {'persistent' if persistent else 'fresh'} workers: {time.time() - start:.2f}s")
+        shutdown_worker_pool()
+
+
+if __name__ == "__main__":
+    benchmark()